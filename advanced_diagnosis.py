@@ -7,6 +7,7 @@ from typing import Any
 
 from advanced_turf_science import SCIENCE_TOPIC_ALIASES
 from course_profile import infer_regional_management_context, summarize_known_profile_for_questions
+from entity_matcher import EDGE, SUBSTRING, match_entities, register_vocabulary
 from knowledge_base import load_advanced_turf_science
 
 
@@ -516,6 +517,17 @@ DIAGNOSTIC_BUCKETS = {
 }
 
 
+def _diagnosis_vocabulary():
+    for key, bucket in DIAGNOSTIC_BUCKETS.items():
+        for trigger in bucket["triggers"]:
+            yield "diagnostic_trigger", trigger, key, SUBSTRING
+    for term in PRODUCT_DECISION_TERMS:
+        yield "diagnosis_product_decision", term, term, EDGE
+
+
+register_vocabulary("advanced_diagnosis", _diagnosis_vocabulary)
+
+
 def answer_advanced_diagnosis(question: str, course_profile: dict[str, Any] | None = None) -> dict[str, Any] | None:
     """Return a structured differential diagnosis for symptom-style questions."""
     q = (question or "").lower()
@@ -554,16 +566,7 @@ def answer_advanced_diagnosis(question: str, course_profile: dict[str, Any] | No
 
 
 def _looks_like_product_decision(question_lower: str) -> bool:
-    return any(_contains_term(question_lower, term) for term in PRODUCT_DECISION_TERMS)
-
-
-def _contains_term(question_lower: str, term: str) -> bool:
-    escaped = re.escape(str(term or "").lower().strip())
-    if not escaped:
-        return False
-    prefix = r"\b" if str(term or "")[:1].isalnum() else ""
-    suffix = r"\b" if str(term or "")[-1:].isalnum() else ""
-    return re.search(prefix + escaped + suffix, question_lower) is not None
+    return bool(match_entities(question_lower).terms("diagnosis_product_decision"))
 
 
 def _looks_like_diagnosis(question_lower: str) -> bool:
@@ -598,14 +601,17 @@ def _looks_like_diagnosis(question_lower: str) -> bool:
 
 def _score_buckets(question_lower: str) -> list[tuple[int, str, dict[str, Any]]]:
     scored = []
+    hits = match_entities(question_lower)
+    matched_triggers = hits.terms("diagnostic_trigger")
+    matched_aliases = hits.terms("science_alias")
     for key, bucket in DIAGNOSTIC_BUCKETS.items():
         score = 0
         for trigger in bucket["triggers"]:
-            if trigger in question_lower:
+            if trigger in matched_triggers:
                 score += 6 if len(trigger) > 8 else 3
         for topic in bucket["topics"]:
             for alias in SCIENCE_TOPIC_ALIASES.get(topic, []):
-                if alias in question_lower:
+                if alias in matched_aliases:
                     score += 4
         score += _token_overlap(question_lower, bucket["label"])
         if score:
@@ -6,6 +6,7 @@ import re
 from typing import Any
 
 from course_profile import infer_regional_management_context, summarize_known_profile_for_questions
+from entity_matcher import SUBSTRING, match_entities, register_vocabulary
 from knowledge_base import load_advanced_turf_science
 
 
@@ -283,6 +284,19 @@ PRODUCT_DECISION_TERMS = [
 ]
 
 
+def _science_vocabulary():
+    for topic, aliases in SCIENCE_TOPIC_ALIASES.items():
+        for alias in aliases:
+            yield "science_alias", alias, topic, SUBSTRING
+    for term in SCIENCE_INTENT_TERMS:
+        yield "science_intent", term, term, SUBSTRING
+    for term in PRODUCT_DECISION_TERMS:
+        yield "science_product_decision", term, term, SUBSTRING
+
+
+register_vocabulary("advanced_turf_science", _science_vocabulary)
+
+
 def answer_advanced_turf_science(question: str, course_profile: dict[str, Any] | None = None) -> dict[str, Any] | None:
     """Return a deterministic expert answer for advanced turf science topics."""
     q = (question or "").lower()
@@ -321,23 +335,24 @@ def answer_advanced_turf_science(question: str, course_profile: dict[str, Any] |
 
 
 def _looks_like_product_decision(question_lower: str) -> bool:
-    return any(term in question_lower for term in PRODUCT_DECISION_TERMS)
+    return bool(match_entities(question_lower).terms("science_product_decision"))
 
 
 def _has_science_intent(question_lower: str) -> bool:
-    return any(term in question_lower for term in SCIENCE_INTENT_TERMS)
+    return bool(match_entities(question_lower).terms("science_intent"))
 
 
 def _best_topic(question_lower: str, science: dict[str, Any]) -> tuple[str | None, int]:
     best_key = None
     best_score = 0
+    matched_aliases = match_entities(question_lower).terms("science_alias")
     for key, record in science.items():
         score = 0
         key_text = key.replace("_", " ")
         if key_text in question_lower:
             score += 8
         for alias in SCIENCE_TOPIC_ALIASES.get(key, []):
-            if alias in question_lower:
+            if alias in matched_aliases:
                 score += 6 if len(alias) > 8 else 3
         score += _token_overlap_score(question_lower, key_text)
         score += _token_overlap_score(question_lower, record.get("domain", ""))
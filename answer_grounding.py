@@ -5,6 +5,9 @@ Checks if the AI response is supported by the retrieved sources.
 import logging
 import re
 
+from constants import GROUNDING_CONTEXT_TOKENS
+from token_accounting import truncate_to_tokens
+
 logger = logging.getLogger(__name__)
 
 # Grounding check prompt
@@ -77,7 +80,7 @@ def check_answer_grounding(
             model=model,
             messages=[
                 {"role": "user", "content": GROUNDING_PROMPT.format(
-                    context=context[:4000],  # Limit context size
+                    context=truncate_to_tokens(context, GROUNDING_CONTEXT_TOKENS),
                     answer=answer,
                     question=question
                 )}
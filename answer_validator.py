@@ -13,13 +13,125 @@ Runs AFTER LLM generation, BEFORE returning to user.
 import re
 import logging
 from typing import Dict, List, Optional, Tuple
+from entity_matcher import SUBSTRING, EntityMatcher
 from knowledge_base import (
     load_products, load_diseases, load_lookup_tables,
     get_product_info, get_disease_info
 )
+from knowledge_snapshot import build_with_source_reads, note_source_reads, register_snapshot_listener
 
 logger = logging.getLogger(__name__)
 
+RATE_CATEGORIES = ['fungicides', 'herbicides', 'insecticides', 'pgrs']
+RATE_MENTION_PATTERNS = [
+    re.compile(r'(\d+\.?\d*)\s*(?:fl\s*)?oz'),
+    re.compile(r'(\d+\.?\d*)\s*ounces?'),
+]
+FRAC_MENTION_PATTERN = re.compile(r'frac\s*(?:code\s*)?(\d+|M\d+|P\d+)', re.IGNORECASE)
+# Accept "HRAC Group 29", "HRAC 29", and "Group 29" style mentions.
+HRAC_MENTION_PATTERN = re.compile(r'(?:hrac\s*(?:group\s*)?|group\s*)(\d+|[A-Z])', re.IGNORECASE)
+_RATE_NUMBER_PATTERN = re.compile(r'(\d+\.?\d*)')
+
+
+class ValidatorModel:
+    """
+    Product tables the validators check answers against, compiled once per
+    KB generation. Every product name (rate, FRAC and HRAC tables) is in one
+    automaton, so an answer is scanned once for all three checks.
+    """
+
+    def __init__(self, products: Dict):
+        self.rate_lookup: Dict[str, Dict] = {}
+        self.frac_lookup: Dict[str, str] = {}
+        self.hrac_lookup: Dict[str, str] = {}
+        known_names = []
+
+        for category in RATE_CATEGORIES:
+            for ai_name, info in products.get(category, {}).items():
+                rates = info.get('rates', {})
+                # Parse out numeric rate ranges from the rate strings
+                all_rates = [
+                    float(number)
+                    for rate_str in rates.values()
+                    for number in _RATE_NUMBER_PATTERN.findall(str(rate_str))
+                ]
+                if not all_rates:
+                    continue
+                entry = {
+                    'ai_name': ai_name,
+                    'display_name': ai_name.title(),
+                    'min_rate': min(all_rates),
+                    'max_rate': max(all_rates),
+                    'rate_strings': rates,
+                    'rate_summary': ', '.join(f"{k}: {v}" for k, v in rates.items()),
+                    'category': category,
+                }
+                self.rate_lookup[ai_name.lower()] = entry
+                for trade in info.get('trade_names', []):
+                    self.rate_lookup[trade.lower()] = entry
+
+        for ai_name, info in products.get('fungicides', {}).items():
+            frac = info.get('frac_code')
+            if frac is not None:
+                self.frac_lookup[ai_name.lower()] = str(frac)
+                for trade in info.get('trade_names', []):
+                    self.frac_lookup[trade.lower()] = str(frac)
+
+        for ai_name, info in products.get('herbicides', {}).items():
+            hrac = info.get('hrac_group')
+            if hrac is not None:
+                self.hrac_lookup[ai_name.lower()] = str(hrac)
+                for trade in info.get('trade_names', []):
+                    self.hrac_lookup[trade.lower()] = str(hrac)
+
+        for items in products.values():
+            for ai_name, info in items.items():
+                known_names.append(ai_name)
+                known_names.extend(info.get('trade_names', []))
+        self.known_product_names = tuple(known_names)
+        self.known_product_index = frozenset(name.lower() for name in known_names)
+
+        # Hit values carry each name's table position so results keep the
+        # order the per-answer table walk used to produce.
+        self.matcher = EntityMatcher(
+            [('rate', name, order, SUBSTRING) for order, name in enumerate(self.rate_lookup)]
+            + [('frac', name, order, SUBSTRING) for order, name in enumerate(self.frac_lookup)]
+            + [('hrac', name, order, SUBSTRING) for order, name in enumerate(self.hrac_lookup)]
+        )
+
+    def first_positions(self, answer_lower: str, kind: str) -> List[Tuple[str, int]]:
+        """(name, first start) for each table name in the answer, in table order."""
+        first = {}
+        for hit in self.matcher.find(answer_lower).of_kind(kind):
+            if hit.term not in first or hit.start < first[hit.term][1]:
+                first[hit.term] = (hit.value, hit.start)
+        return [(name, start) for name, (_, start) in sorted(first.items(), key=lambda item: item[1][0])]
+
+    def positions(self, answer_lower: str, kind: str) -> List[Tuple[int, int, str]]:
+        """(start, end, name) for every occurrence, ordered by table position then offset."""
+        hits = sorted(self.matcher.find(answer_lower).of_kind(kind), key=lambda hit: (hit.value, hit.start))
+        return [(hit.start, hit.end, hit.term) for hit in hits]
+
+
+_validator_model = None
+
+
+@register_snapshot_listener
+def _reset_validator_model(_snapshot=None) -> None:
+    """Recompile the validator tables from the next snapshot after a KB reload."""
+    global _validator_model
+    _validator_model = None
+
+
+def get_validator_model() -> ValidatorModel:
+    """Get or build the compiled validator model (lazy singleton)."""
+    global _validator_model
+    if _validator_model is None:
+        _validator_model = build_with_source_reads(lambda: ValidatorModel(load_products()))
+    model, sources = _validator_model
+    note_source_reads(sources)
+    return model
+
 
 def validate_answer(answer: str, question: str) -> Dict:
     """
@@ -84,69 +196,29 @@ def _validate_product_rates(answer: str) -> List[str]:
     Check if product rates mentioned in the answer match the knowledge base.
     """
     issues = []
-    products = load_products()
+    model = get_validator_model()
     answer_lower = answer.lower()
 
-    # Build a rate lookup from all products
-    rate_lookup = {}
-    for category in ['fungicides', 'herbicides', 'insecticides', 'pgrs']:
-        if category not in products:
-            continue
-        for ai_name, info in products[category].items():
-            rates = info.get('rates', {})
-            trade_names = info.get('trade_names', [])
-
-            # Parse out numeric rate ranges from the rate strings
-            all_rates = []
-            for rate_type, rate_str in rates.items():
-                nums = re.findall(r'(\d+\.?\d*)', str(rate_str))
-                if nums:
-                    all_rates.extend([float(n) for n in nums])
-
-            if all_rates:
-                max_rate = max(all_rates)
-                min_rate = min(all_rates)
-                entry = {
-                    'ai_name': ai_name,
-                    'min_rate': min_rate,
-                    'max_rate': max_rate,
-                    'rate_strings': rates,
-                    'category': category
-                }
-                rate_lookup[ai_name.lower()] = entry
-                for trade in trade_names:
-                    rate_lookup[trade.lower()] = entry
-
-    # Look for rate mentions in the answer
+    # Look for rate mentions near each product name in the answer
     # Pattern: "ProductName at X oz/1000" or "apply X fl oz of ProductName"
-    for name_key, rate_info in rate_lookup.items():
-        if name_key not in answer_lower:
-            continue
+    for name_key, name_pos in model.first_positions(answer_lower, 'rate'):
+        rate_info = model.rate_lookup[name_key]
 
         # Find rate mentions near this product name
         # Pattern: number followed by oz, fl oz, etc within ~100 chars
-        name_pos = answer_lower.find(name_key)
         window = answer_lower[max(0, name_pos - 80):name_pos + len(name_key) + 80]
 
-        rate_patterns = [
-            r'(\d+\.?\d*)\s*(?:fl\s*)?oz',
-            r'(\d+\.?\d*)\s*ounces?',
-        ]
-
-        for pattern in rate_patterns:
-            matches = re.findall(pattern, window)
-            for match in matches:
+        for pattern in RATE_MENTION_PATTERNS:
+            for match in pattern.findall(window):
                 mentioned_rate = float(match)
                 max_label = rate_info['max_rate']
 
                 # Flag if mentioned rate is more than 2x the max label rate
                 # (some slack for area calculations, tank mix concentrations)
                 if mentioned_rate > max_label * 2.5 and mentioned_rate > 1.0:
-                    display_name = rate_info['ai_name'].title()
-                    rate_strs = ', '.join(f"{k}: {v}" for k, v in rate_info['rate_strings'].items())
                     issues.append(
-                        f"Rate check: {mentioned_rate} oz for {display_name} may exceed label rates. "
-                        f"Verified rates: {rate_strs}."
+                        f"Rate check: {mentioned_rate} oz for {rate_info['display_name']} may exceed label rates. "
+                        f"Verified rates: {rate_info['rate_summary']}."
                     )
 
     return issues
@@ -162,39 +234,23 @@ def _validate_frac_codes(answer: str) -> List[str]:
     """
     issues = []
     seen = set()  # Deduplicate warnings
-    products = load_products()
     answer_lower = answer.lower()
 
     if 'frac' not in answer_lower:
         return issues
 
-    # Build FRAC lookup for all fungicides
-    frac_lookup = {}
-    fungicides = products.get('fungicides', {})
-    for ai_name, info in fungicides.items():
-        frac = info.get('frac_code')
-        if frac is not None:
-            frac_lookup[ai_name.lower()] = str(frac)
-            for trade in info.get('trade_names', []):
-                frac_lookup[trade.lower()] = str(frac)
-
-    # Find all product name positions in the answer
-    product_positions = []  # list of (start_pos, end_pos, product_name, actual_frac)
-    for product_name, actual_frac in frac_lookup.items():
-        start = 0
-        while True:
-            pos = answer_lower.find(product_name, start)
-            if pos == -1:
-                break
-            product_positions.append((pos, pos + len(product_name), product_name, actual_frac))
-            start = pos + 1
+    # Find all fungicide name positions in the answer
+    model = get_validator_model()
+    product_positions = [  # list of (start_pos, end_pos, product_name, actual_frac)
+        (start, end, name, model.frac_lookup[name])
+        for start, end, name in model.positions(answer_lower, 'frac')
+    ]
 
     if not product_positions:
         return issues
 
     # For each FRAC code mention, find the closest product name and validate only that pair
-    frac_pattern = r'frac\s*(?:code\s*)?(\d+|M\d+|P\d+)'
-    frac_mentions = re.finditer(frac_pattern, answer, re.IGNORECASE)
+    frac_mentions = FRAC_MENTION_PATTERN.finditer(answer)
 
     for match in frac_mentions:
         mentioned_frac = match.group(1).upper()
@@ -235,37 +291,21 @@ def _validate_herbicide_moa_codes(answer: str) -> List[str]:
     """Check HRAC/group assignments for herbicides in the structured KB."""
     issues = []
     seen = set()
-    products = load_products()
     answer_lower = answer.lower()
 
     if 'hrac' not in answer_lower and 'group' not in answer_lower:
         return issues
 
-    hrac_lookup = {}
-    herbicides = products.get('herbicides', {})
-    for ai_name, info in herbicides.items():
-        hrac = info.get('hrac_group')
-        if hrac is not None:
-            hrac_lookup[ai_name.lower()] = str(hrac)
-            for trade in info.get('trade_names', []):
-                hrac_lookup[trade.lower()] = str(hrac)
-
-    product_positions = []
-    for product_name, actual_hrac in hrac_lookup.items():
-        start = 0
-        while True:
-            pos = answer_lower.find(product_name, start)
-            if pos == -1:
-                break
-            product_positions.append((pos, pos + len(product_name), product_name, actual_hrac))
-            start = pos + 1
+    model = get_validator_model()
+    product_positions = [
+        (start, end, name, model.hrac_lookup[name])
+        for start, end, name in model.positions(answer_lower, 'hrac')
+    ]
 
     if not product_positions:
         return issues
 
-    # Accept "HRAC Group 29", "HRAC 29", and "Group 29" style mentions.
-    hrac_pattern = r'(?:hrac\s*(?:group\s*)?|group\s*)(\d+|[A-Z])'
-    for match in re.finditer(hrac_pattern, answer, re.IGNORECASE):
+    for match in HRAC_MENTION_PATTERN.finditer(answer):
         mentioned_hrac = match.group(1).upper()
         mention_pos = match.start()
 
@@ -37,7 +37,9 @@ from feedback_system import (
 )
 from constants import (
     STATIC_FOLDERS, SEARCH_FOLDERS, DEFAULT_SOURCES,
-    MAX_CONTEXT_LENGTH, MAX_SOURCES
+    MAX_CONTEXT_TOKENS, MAX_SOURCES, RETRIEVAL_CONTEXT_TOKENS, STRUCTURED_KB_CONTEXT_TOKENS,
+    COURSE_PROFILE_CONTEXT_TOKENS, WEATHER_CONTEXT_TOKENS,
+    SUPPLEMENTED_RETRIEVAL_CONTEXT_TOKENS, WEB_SUPPLEMENT_CONTEXT_TOKENS, SUPPLEMENTED_CONTEXT_TOKENS,
 )
 from search_service import (
     detect_topic, detect_specific_subject, detect_state, get_embedding,
@@ -55,8 +57,13 @@ from source_policy import public_product_label_resources, safe_public_resources
 from query_rewriter import rewrite_query
 from answer_grounding import check_answer_grounding, add_grounding_warning, calculate_grounding_confidence
 from knowledge_base import build_context_from_knowledge, extract_product_names, extract_disease_names, load_products
-from reranker import rerank_results, is_cross_encoder_available
-from web_search import should_trigger_web_search, should_supplement_with_web_search, search_web_for_turf_info, format_web_search_disclaimer
+from knowledge_snapshot import get_knowledge_snapshot, refresh_knowledge_snapshot, warm_knowledge_snapshot
+from eval_engine import EVAL_SUITES, eval_job_status, start_eval_job
+from reranker import rerank_results, is_cross_encoder_available, warm_reranker
+from web_search import (
+    should_trigger_web_search, should_supplement_with_web_search, search_web_for_turf_info, format_web_search_disclaimer,
+    predict_web_search_needed, prefetch_web_search,
+)
 from weather_service import get_weather_data, get_weather_context, get_weather_warnings, format_weather_for_response
 from hallucination_filter import filter_hallucinations
 from query_classifier import classify_query, get_response_for_category
@@ -67,7 +74,9 @@ from advanced_diagnosis import answer_advanced_diagnosis
 from advanced_turf_science import answer_advanced_turf_science
 from expert_mode_router import route_expert_mode
 from image_diagnosis import answer_image_diagnosis, validate_image_attachment
+from attachment_store import build_attachment_reference, find_image_blob, iter_image_blobs
 from safety_gate import apply_post_llm_safety_gate, get_pre_llm_safety_response
+from token_accounting import count_message_tokens, record_llm_usage
 from verified_kb import (
     answer_from_verified_kb,
     answer_product_context_needed,
@@ -123,6 +132,18 @@ app.config.update(
 app.register_blueprint(turf_bp)
 Config.validate_runtime()
 
+try:
+    warm_knowledge_snapshot()
+except Exception as exc:
+    logger.warning("Knowledge snapshot warmup failed; loading lazily: %s", exc)
+
+# gunicorn imports the app in each worker (no --preload), so this runs post-fork.
+if Config.RERANKER_PRELOAD:
+    try:
+        warm_reranker()
+    except Exception as exc:
+        logger.warning("Reranker warmup failed; loading lazily: %s", exc)
+
 _openai_client = None
 _pinecone_client = None
 _pinecone_index = None
@@ -420,6 +441,15 @@ def inject_auth_context():
     }
 
 
+@app.before_request
+def refresh_structured_knowledge():
+    try:
+        refresh_knowledge_snapshot()
+    except Exception as exc:
+        logger.warning("Knowledge snapshot refresh failed; serving the loaded generation: %s", exc)
+    return None
+
+
 @app.before_request
 def protect_admin_routes():
     if not request.path.startswith('/admin'):
@@ -979,7 +1009,6 @@ def _kb_trust_gate_payload(kb_quality: dict | None = None) -> dict:
     }
 
 
-APP_ROOT = Path(__file__).resolve().parent
 EVAL_CACHE_PATH = Path(Config.DATA_DIR) / "eval_dashboard_cache.json"
 EVAL_CACHE_TTL_SECONDS = 300
 EVAL_HISTORY_LIMIT = 12
@@ -1002,167 +1031,76 @@ def _write_eval_dashboard_cache(payload: dict) -> None:
         logger.warning(f"Could not persist eval dashboard cache: {exc}")
 
 
-def _run_eval_suite(module_name: str, case_path: str) -> dict:
-    if module_name == 'scripts.run_general_turf_eval':
-        from scripts.run_general_turf_eval import load_cases, run_eval
-    elif module_name == 'scripts.run_anti_slop_eval':
-        from scripts.run_anti_slop_eval import load_cases, run_eval
-    elif module_name == 'scripts.run_ambiguity_eval':
-        from scripts.run_ambiguity_eval import load_cases, run_eval
-    elif module_name == 'scripts.run_comprehensive_100_eval':
-        from scripts.run_comprehensive_100_eval import load_cases, run_eval
-    elif module_name == 'scripts.run_no_account_turf_eval':
-        from scripts.run_no_account_turf_eval import load_cases, run_eval
-    elif module_name == 'scripts.run_context_switch_eval':
-        from scripts.run_context_switch_eval import load_cases, run_eval
-    elif module_name == 'scripts.run_phd_turf_eval':
-        from scripts.run_phd_turf_eval import load_cases, run_eval
-    elif module_name == 'scripts.run_product_label_eval':
-        from scripts.run_product_label_eval import load_cases, run_eval
-    else:
-        from scripts.run_image_eval import load_cases, run_eval
-    if module_name == 'scripts.run_comprehensive_100_eval':
-        return run_eval(load_cases())
-    return run_eval(load_cases(Path(case_path)))
-
-
-def _fresh_eval_dashboard_payload() -> dict:
-    """Run the curated eval suites and summarize current quality health."""
-    suite_reports = []
-    failing_cases = []
-    total_cases = 0
-    total_passed = 0
-    total_failed = 0
-
-    # Keep the admin dashboard aligned with the handoff quality story: one broad
-    # regression sweep, plus the narrower families that catch specific behavior drift.
-    suites = [
-        ('general_turf', 'General Turf', 'scripts.run_general_turf_eval', APP_ROOT / 'scripts' / 'general_turf_eval_cases.json'),
-        ('anti_slop', 'Anti-Slop', 'scripts.run_anti_slop_eval', APP_ROOT / 'scripts' / 'anti_slop_eval_cases.json'),
-        ('ambiguity', 'Ambiguity', 'scripts.run_ambiguity_eval', APP_ROOT / 'scripts' / 'ambiguity_eval_cases.json'),
-        ('comprehensive_100', 'Comprehensive 100', 'scripts.run_comprehensive_100_eval', APP_ROOT / 'scripts' / 'run_comprehensive_100_eval.py'),
-        ('no_account', 'No-Account', 'scripts.run_no_account_turf_eval', APP_ROOT / 'scripts' / 'no_account_turf_eval_cases.json'),
-        ('context_switch', 'Context Switch', 'scripts.run_context_switch_eval', APP_ROOT / 'scripts' / 'context_switch_eval_cases.json'),
-        ('phd_turf', 'PhD Turf', 'scripts.run_phd_turf_eval', APP_ROOT / 'scripts' / 'phd_turf_eval_cases.json'),
-        ('product_label', 'Product / Label', 'scripts.run_product_label_eval', APP_ROOT / 'scripts' / 'product_label_eval_cases.json'),
-        ('image', 'Image', 'scripts.run_image_eval', APP_ROOT / 'scripts' / 'image_eval_cases.json'),
-    ]
-
-    for key, label, module_name, case_path in suites:
-        try:
-            report = _run_eval_suite(module_name, str(case_path))
-            summary = report.get('summary') or report
-            cases = int(summary.get('cases', 0) or 0)
-            passed = int(summary.get('passed', 0) or 0)
-            failed = int(summary.get('failed', 0) or 0)
-            pass_rate = round((passed / cases) * 100, 1) if cases else 0.0
-
-            suite_failures = []
-            for item in report.get('results', []):
-                if item.get('passed'):
-                    continue
-                failure_messages = item.get('failures') or item.get('reasons') or []
-                failure_entry = {
-                    'suite': label,
-                    'id': item.get('id'),
-                    'question': item.get('question'),
-                    'kb_verdict': item.get('kb_verdict'),
-                    'selected_mode': item.get('selected_mode') or item.get('mode'),
-                    'confidence_label': item.get('confidence_label') or item.get('confidence'),
-                    'failures': failure_messages,
-                }
-                suite_failures.append(failure_entry)
-                failing_cases.append(failure_entry)
-
-            suite_reports.append({
-                'key': key,
-                'label': label,
-                'cases': cases,
-                'passed': passed,
-                'failed': failed,
-                'pass_rate': pass_rate,
-                'failing_cases': suite_failures,
-            })
-            total_cases += cases
-            total_passed += passed
-            total_failed += failed
-        except Exception as exc:
-            error_text = str(exc)
-            suite_reports.append({
-                'key': key,
-                'label': label,
-                'cases': 0,
-                'passed': 0,
-                'failed': 0,
-                'pass_rate': 0.0,
-                'error': error_text,
-                'failing_cases': [],
-            })
-            failing_cases.append({
-                'suite': label,
-                'id': f'{key}_eval_error',
-                'question': 'Eval suite failed to run',
-                'kb_verdict': None,
-                'selected_mode': None,
-                'confidence_label': None,
-                'failures': [error_text],
-            })
-
-    run_at = datetime.now(timezone.utc).isoformat()
-    return {
-        'summary': {
-            'suite_count': len(suite_reports),
-            'cases': total_cases,
-            'passed': total_passed,
-            'failed': total_failed,
-            'pass_rate': round((total_passed / total_cases) * 100, 1) if total_cases else 0.0,
-            'run_at': run_at,
-            'cached': False,
-        },
-        'suites': suite_reports,
-        'failing_cases': failing_cases[:12],
+def _store_eval_run(fresh: dict) -> None:
+    """Persist a finished eval job as the latest dashboard payload plus a short history."""
+    cache_payload = _read_eval_dashboard_cache()
+    history = cache_payload.get('history', []) if isinstance(cache_payload, dict) else []
+    history_entry = {
+        'run_at': fresh['summary'].get('run_at'),
+        'suite_count': fresh['summary'].get('suite_count', 0),
+        'cases': fresh['summary'].get('cases', 0),
+        'passed': fresh['summary'].get('passed', 0),
+        'failed': fresh['summary'].get('failed', 0),
+        'pass_rate': fresh['summary'].get('pass_rate', 0.0),
     }
+    _write_eval_dashboard_cache({
+        'latest': fresh,
+        'history': [history_entry, *history][:EVAL_HISTORY_LIMIT],
+    })
+
 
+def _eval_dashboard_payload() -> dict:
+    """Return the latest eval summary and the status of any background run.
 
-def _eval_dashboard_payload(force_refresh: bool = False) -> dict:
-    """Return cached eval summaries when fresh, else rerun and persist a short history."""
+    This never starts a run; ``admin_eval_dashboard_refresh`` does. Suites run
+    in ``eval_engine`` worker processes, and the dashboard polls this payload's
+    ``job`` entry until the run finishes and ``_store_eval_run`` records it.
+    """
     now = time.time()
     cache_payload = _read_eval_dashboard_cache()
     history = cache_payload.get('history', []) if isinstance(cache_payload, dict) else []
     latest = cache_payload.get('latest', {}) if isinstance(cache_payload, dict) else {}
 
+    stale = True
     latest_run_at = latest.get('summary', {}).get('run_at') if isinstance(latest, dict) else None
-    if latest_run_at and not force_refresh:
+    if latest_run_at:
         try:
             last_ts = datetime.fromisoformat(latest_run_at).timestamp()
-            if (now - last_ts) < EVAL_CACHE_TTL_SECONDS:
-                cached = dict(latest)
-                cached_summary = dict(cached.get('summary', {}))
-                cached_summary['cached'] = True
-                cached_summary['age_seconds'] = round(now - last_ts, 1)
-                cached['summary'] = cached_summary
-                cached['history'] = history[:EVAL_HISTORY_LIMIT]
-                return cached
+            stale = (now - last_ts) >= EVAL_CACHE_TTL_SECONDS
         except Exception:
             pass
 
-    fresh = _fresh_eval_dashboard_payload()
-    history_entry = {
-        'run_at': fresh['summary'].get('run_at'),
-        'suite_count': fresh['summary'].get('suite_count', 0),
-        'cases': fresh['summary'].get('cases', 0),
-        'passed': fresh['summary'].get('passed', 0),
-        'failed': fresh['summary'].get('failed', 0),
-        'pass_rate': fresh['summary'].get('pass_rate', 0.0),
-    }
-    next_history = [history_entry, *history][:EVAL_HISTORY_LIMIT]
-    cache_to_write = {
-        'latest': fresh,
-        'history': next_history,
-    }
-    _write_eval_dashboard_cache(cache_to_write)
-    fresh['history'] = next_history
-    return fresh
+    if latest:
+        payload = dict(latest)
+        summary = dict(payload.get('summary', {}))
+        summary['cached'] = True
+        summary['stale'] = stale
+        try:
+            summary['age_seconds'] = round(now - datetime.fromisoformat(summary['run_at']).timestamp(), 1)
+        except Exception:
+            pass
+        payload['summary'] = summary
+    else:
+        payload = {
+            'summary': {
+                'suite_count': len(EVAL_SUITES),
+                'cases': 0,
+                'passed': 0,
+                'failed': 0,
+                'pass_rate': 0.0,
+                'run_at': None,
+                'cached': False,
+            },
+            'suites': [
+                {'key': suite.key, 'label': suite.label, 'cases': 0, 'passed': 0, 'failed': 0,
+                 'pass_rate': 0.0, 'failing_cases': [], 'pending': True}
+                for suite in EVAL_SUITES
+            ],
+            'failing_cases': [],
+        }
+    payload['history'] = history[:EVAL_HISTORY_LIMIT]
+    payload['job'] = eval_job_status()
+    return payload
 
 def _text_list_from_value(value, *, separator_pattern=r',|;'):
     if isinstance(value, list):
@@ -1277,18 +1215,12 @@ def _dedupe_regression_items(items: list[dict]) -> list[dict]:
 
 
 def _feedback_attachment_payload(image_attachment: dict | None) -> dict | None:
-    if not image_attachment:
-        return None
-    data_url = str(image_attachment.get('data_url') or '').strip()
-    if not data_url.startswith('data:image/'):
+    """Store the upload out of band and keep only a reference + thumbnail on the row."""
+    try:
+        return build_attachment_reference(image_attachment)
+    except OSError as exc:
+        logger.warning("Could not store uploaded image attachment: %s", exc)
         return None
-    return {
-        'kind': 'uploaded_image',
-        'name': image_attachment.get('name') or 'turf-image',
-        'mime_type': image_attachment.get('mime_type') or '',
-        'size_bytes': image_attachment.get('size_bytes'),
-        'data_url': data_url,
-    }
 
 
 def _attach_feedback_id(response: dict | None, feedback_id: int | str | None) -> dict | None:
@@ -1323,6 +1255,21 @@ def _save_expert_response(conversation_id: str, question: str, response: dict, a
     )
 
 
+def _log_pipeline_timings(timings: dict, prompt_tokens: int, weather_timing: str = "") -> None:
+    """Log per-stage time for one general-path answer; ``timings`` holds cumulative seconds per stage."""
+    prev = 0
+    timing_parts = []
+    for key in sorted(timings.keys(), key=lambda item: int(item.split('_', 1)[0])):
+        elapsed = timings[key]
+        delta = elapsed - prev
+        timing_parts.append(f"{key}={delta:.1f}s")
+        prev = elapsed
+    logging.info(
+        f"⏱️ PIPELINE TIMING [{timings['10_total']:.1f}s total, {prompt_tokens} prompt tokens]: {' | '.join(timing_parts)}"
+        f"{weather_timing}"
+    )
+
+
 def _log_expert_router_event(question: str, router_decision: dict | None, resolved_mode: str, response: dict | None = None):
     """Persist router telemetry for expert/admin review."""
     if not router_decision:
@@ -1669,6 +1616,7 @@ def ask():
                 course_profile,
                 openai_client,
                 model=Config.VISION_MODEL,
+                cache_scope=profile_key,
             )
             if image_response:
                 image_info = image_response.get('image_diagnosis', {}) or {}
@@ -1920,6 +1868,12 @@ def ask():
         )
 
         _timings['4_search'] = _time.time() - _t0
+        # Weak raw vector scores predict a web supplement: start Tavily now so it
+        # overlaps scoring and reranking instead of running after them.
+        web_prefetch = None
+        if Config.WEB_SEARCH_SPECULATIVE and predict_web_search_needed(search_results):
+            web_prefetch = prefetch_web_search(question)
+
         # Combine and score results first to check if we have anything
         all_matches = (
             search_results['general'].get('matches', []) +
@@ -1945,7 +1899,7 @@ def ask():
         retrieval_context, sources, images = build_context(
             evidence_results,
             SEARCH_FOLDERS,
-            max_chars=3600,
+            max_tokens=RETRIEVAL_CONTEXT_TOKENS,
         )
 
         # Calculate preliminary confidence to decide on web search
@@ -1962,7 +1916,7 @@ def ask():
         if should_trigger_web_search(search_results):
             # No results at all - full web search fallback
             logging.debug('No Pinecone results found - triggering web search fallback')
-            web_search_result = search_web_for_turf_info(openai_client, question, supplement_mode=False)
+            web_search_result = search_web_for_turf_info(openai_client, question, supplement_mode=False, prefetch=web_prefetch)
             if web_search_result:
                 used_web_search = True
                 retrieval_context = web_search_result['context']
@@ -1972,17 +1926,19 @@ def ask():
         elif should_supplement_with_web_search(prelim_confidence):
             # Have some results but low confidence - supplement with web search
             logging.debug(f'Low confidence ({prelim_confidence:.0f}%) - supplementing with web search')
-            web_search_result = search_web_for_turf_info(openai_client, question, supplement_mode=True)
+            web_search_result = search_web_for_turf_info(openai_client, question, supplement_mode=True, prefetch=web_prefetch)
             if web_search_result:
                 used_web_search = True
                 supplement_mode = True
                 # Append web search context to existing context
                 retrieval_context = assemble_context_sections([
-                    {'title': 'RETRIEVED SOURCE CONTEXT', 'content': retrieval_context, 'max_chars': 2500},
-                    {'title': 'SUPPLEMENTAL WEB SEARCH', 'content': web_search_result['context'], 'max_chars': 1600},
-                ], max_chars=4200)
+                    {'title': 'RETRIEVED SOURCE CONTEXT', 'content': retrieval_context, 'max_tokens': SUPPLEMENTED_RETRIEVAL_CONTEXT_TOKENS},
+                    {'title': 'SUPPLEMENTAL WEB SEARCH', 'content': web_search_result['context'], 'max_tokens': WEB_SUPPLEMENT_CONTEXT_TOKENS},
+                ], max_tokens=SUPPLEMENTED_CONTEXT_TOKENS)
                 sources = sources + web_search_result['sources']
                 logging.debug('Web search supplement added')
+        if web_prefetch is not None:
+            web_prefetch.discard()
 
         structured_kb_context = ""
         if not used_web_search or supplement_mode:
@@ -1990,7 +1946,7 @@ def ask():
             knowledge_question = question
             if course_profile_kb_hint and _should_apply_profile_kb_hint(question, question_topic):
                 knowledge_question = f"{question}\nSaved regional context: {course_profile_kb_hint}"
-            structured_kb_context = build_context_from_knowledge(knowledge_question)
+            structured_kb_context = build_context_from_knowledge(knowledge_question, max_tokens=STRUCTURED_KB_CONTEXT_TOKENS)
             if structured_entities:
                 sources.append({
                     'name': 'Structured Turf Knowledge Base',
@@ -2003,11 +1959,17 @@ def ask():
         # Add weather context if location provided and topic is relevant
         weather_data = None
         weather_context = ""
+        weather_timing = ""
         weather_topics = {'chemical', 'fungicide', 'herbicide', 'insecticide', 'irrigation', 'cultural', 'diagnostic', 'disease'}
         if (lat and lon) or city:
             if question_topic in weather_topics or product_need:
                 weather_data = get_weather_data(lat=lat, lon=lon, city=city, state=state)
                 if weather_data:
+                    weather_cache_info = weather_data.get('cache') or {}
+                    if 'saved_ms' in weather_cache_info:
+                        weather_timing = f" | weather={weather_cache_info['status']} saved {weather_cache_info['saved_ms']:.0f}ms"
+                    elif 'upstream_ms' in weather_cache_info:
+                        weather_timing = f" | weather=miss upstream {weather_cache_info['upstream_ms']:.0f}ms"
                     weather_context = get_weather_context(weather_data)
                     logging.debug(f"Added weather context for {weather_data.get('location', 'unknown')}")
 
@@ -2026,11 +1988,11 @@ def ask():
                 })
 
         context = assemble_context_sections([
-            {'title': 'COURSE PROFILE MEMORY', 'content': profile_context_for_prompt, 'max_chars': 1000},
-            {'title': 'STRUCTURED TURF KNOWLEDGE BASE DATA', 'content': structured_kb_context, 'max_chars': 2200},
-            {'title': 'RETRIEVED SOURCE CONTEXT', 'content': retrieval_context, 'max_chars': 3600},
-            {'title': 'WEATHER CONTEXT', 'content': weather_context, 'max_chars': 900},
-        ], max_chars=MAX_CONTEXT_LENGTH)
+            {'title': 'COURSE PROFILE MEMORY', 'content': profile_context_for_prompt, 'max_tokens': COURSE_PROFILE_CONTEXT_TOKENS},
+            {'title': 'STRUCTURED TURF KNOWLEDGE BASE DATA', 'content': structured_kb_context, 'max_tokens': STRUCTURED_KB_CONTEXT_TOKENS},
+            {'title': 'RETRIEVED SOURCE CONTEXT', 'content': retrieval_context, 'max_tokens': RETRIEVAL_CONTEXT_TOKENS},
+            {'title': 'WEATHER CONTEXT', 'content': weather_context, 'max_tokens': WEATHER_CONTEXT_TOKENS},
+        ], max_tokens=MAX_CONTEXT_TOKENS)
 
         # Process sources
         sources = [s for s in sources if s.get('url') is not None or s.get('note')]  # Allow web search sources
@@ -2076,7 +2038,7 @@ def ask():
                 return jsonify(_attach_feedback_id(clarifying_response, feedback_id))
 
         # Generate AI response with topic-specific prompt and conversation history
-        from prompts import build_system_prompt
+        from prompts import build_system_prompt, prompt_variant_name
         system_prompt = build_system_prompt(question_topic, product_need)
 
         # Build messages array - skip history if topic changed
@@ -2092,6 +2054,7 @@ def ask():
                 conversation_id, system_prompt, context, question
             )
 
+        prompt_tokens = count_message_tokens(messages)
         _timings['6_pre_llm'] = _time.time() - _t0
         answer = openai_client.chat.completions.create(
             model=Config.CHAT_MODEL,
@@ -2100,6 +2063,14 @@ def ask():
             temperature=Config.CHAT_TEMPERATURE,
             timeout=30  # Don't hang longer than 30s during a live demo
         )
+        record_llm_usage(
+            answer,
+            route='ask',
+            model=Config.CHAT_MODEL,
+            prompt_variant=prompt_variant_name(question_topic, product_need),
+            messages=len(messages),
+            estimated_prompt_tokens=prompt_tokens,
+        )
         assistant_response = answer.choices[0].message.content
         if not assistant_response:
             assistant_response = "I wasn't able to generate a response. Please try rephrasing your question."
@@ -2214,15 +2185,7 @@ def ask():
         _log_expert_router_event(question, router_decision, resolved_mode='general', response=response_data)
 
         _timings['10_total'] = _time.time() - _t0
-        # Log timing breakdown
-        prev = 0
-        timing_parts = []
-        for key in sorted(_timings.keys(), key=lambda item: int(item.split('_', 1)[0])):
-            elapsed = _timings[key]
-            delta = elapsed - prev
-            timing_parts.append(f"{key}={delta:.1f}s")
-            prev = elapsed
-        logging.info(f"⏱️ PIPELINE TIMING [{_timings['10_total']:.1f}s total]: {' | '.join(timing_parts)}")
+        _log_pipeline_timings(_timings, prompt_tokens, weather_timing)
 
         return jsonify(response_data)
 
@@ -3686,11 +3649,38 @@ def admin_stats():
 @app.route('/admin/cache')
 def admin_cache_stats():
     """Get cache statistics for monitoring."""
-    from cache import get_embedding_cache, get_source_url_cache, get_search_cache
+    from cache import (
+        get_embedding_cache, get_rerank_score_cache, get_source_url_cache, get_search_cache, get_weather_cache,
+        get_web_search_cache, get_image_analysis_cache,
+    )
+    rerank_cache = get_rerank_score_cache()
     return jsonify({
         'embedding_cache': get_embedding_cache().stats(),
         'source_url_cache': get_source_url_cache().stats(),
-        'search_cache': get_search_cache().stats()
+        'search_cache': get_search_cache().stats(),
+        'rerank_score_cache': rerank_cache.stats() if rerank_cache is not None else None,
+        'weather_cache': get_weather_cache().stats(),
+        'web_search_cache': get_web_search_cache().stats(),
+        'image_analysis_cache': get_image_analysis_cache().stats(),
+    })
+
+
+@app.route('/admin/perf')
+def admin_perf_stats():
+    """Prompt, completion and cached prompt tokens for recent chat completions, reranker batching, web search and image uploads."""
+    from reranker import reranker_stats
+    from token_accounting import get_llm_usage_ledger, prompt_variant_token_counts
+    from image_preprocessing import preprocessing_stats
+    from web_search import web_search_stats
+    ledger = get_llm_usage_ledger()
+    limit = max(0, min(request.args.get('limit', 50, type=int) or 0, 500))
+    return jsonify({
+        'llm_usage': ledger.stats(),
+        'recent_requests': ledger.recent(limit),
+        'system_prompts': prompt_variant_token_counts(Config.CHAT_MODEL),
+        'reranker': reranker_stats(),
+        'web_search': web_search_stats(),
+        'image_preprocessing': preprocessing_stats(),
     })
 
 
@@ -3832,10 +3822,12 @@ def admin_knowledge_status():
     """Get knowledge base status."""
     from knowledge_builder import IndexTracker, scan_for_pdfs
     tracker = IndexTracker()
-    stats = tracker.get_stats()
-
-    all_pdfs = scan_for_pdfs()
-    unindexed = [f for f, _ in all_pdfs if not tracker.is_indexed(f)]
+    try:
+        stats = tracker.get_stats()
+        all_pdfs = scan_for_pdfs()
+        unindexed = [f for f, _ in all_pdfs if not tracker.is_indexed(f)]
+    finally:
+        tracker.close()
 
     return jsonify({
         'indexed_files': stats['total_files'],
@@ -3843,7 +3835,8 @@ def admin_knowledge_status():
         'last_run': stats['last_run'],
         'total_pdfs': len(all_pdfs),
         'unindexed': len(unindexed),
-        'unindexed_sample': [os.path.basename(f) for f in unindexed[:10]]
+        'unindexed_sample': [os.path.basename(f) for f in unindexed[:10]],
+        'structured_snapshot': get_knowledge_snapshot().summary(),
     })
 
 
@@ -4054,9 +4047,15 @@ def admin_kb_quality_dashboard():
 
 @app.route('/admin/eval-dashboard')
 def admin_eval_dashboard():
-    """Return live eval-suite summaries for admin quality review."""
-    refresh = request.args.get('refresh', '').lower() == 'true'
-    return jsonify(_eval_dashboard_payload(force_refresh=refresh))
+    """Return the latest eval-suite summaries and run status for admin quality review."""
+    return jsonify(_eval_dashboard_payload())
+
+
+@app.route('/admin/eval-dashboard/refresh', methods=['POST'])
+def admin_eval_dashboard_refresh():
+    """Start a background eval run unless one is already running in any worker."""
+    start_eval_job(on_complete=_store_eval_run)
+    return jsonify(_eval_dashboard_payload())
 
 
 @app.route('/admin/kb-gaps')
@@ -4427,6 +4426,59 @@ def admin_export_moderation():
     )
 
 
+@app.route('/admin/attachments/<digest>')
+def admin_attachment_blob(digest):
+    """Serve one stored upload so the review UI can load full images lazily."""
+    found = find_image_blob(digest)
+    if not found:
+        abort(404)
+    path, mime_type = found
+    response = send_from_directory(os.path.dirname(path), os.path.basename(path), mimetype=mime_type, max_age=86400)
+    response.headers['Cache-Control'] = 'private, max-age=86400, immutable'
+    return response
+
+
+@app.route('/admin/export/attachments')
+def admin_export_attachments():
+    """Stream stored uploads as a zip with a manifest mapping feedback rows to blobs."""
+    import zipfile
+    from feedback_system import export_attachment_manifest
+    from flask import Response, stream_with_context
+
+    manifest = export_attachment_manifest()
+
+    class _ChunkBuffer:
+        def __init__(self):
+            self.chunks = []
+
+        def write(self, data):
+            self.chunks.append(bytes(data))
+            return len(data)
+
+        def flush(self):
+            pass
+
+        def drain(self):
+            chunks, self.chunks = self.chunks, []
+            return b''.join(chunks)
+
+    def generate():
+        buffer = _ChunkBuffer()
+        with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+            archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+            yield buffer.drain()
+            for digest, path, _mime_type in iter_image_blobs([item['blob_sha256'] for item in manifest]):
+                archive.write(path, arcname=f"blobs/{os.path.basename(path)}")
+                yield buffer.drain()
+        yield buffer.drain()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename=feedback_attachments.zip'}
+    )
+
+
 @app.route('/admin/export/analytics')
 def admin_export_analytics():
     """Export analytics data as JSON"""
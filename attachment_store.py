@@ -0,0 +1,159 @@
+"""Content-addressed storage for uploaded image attachments.
+
+Feedback rows used to carry the full base64 data URL of every uploaded image.
+Images now live once on disk under ``DATA_DIR/attachments`` keyed by the sha256
+of their bytes; feedback rows keep a small reference plus an inline thumbnail,
+and the admin UI fetches the full image only when asked.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+from typing import Any, Iterator
+
+try:  # pragma: no cover - Pillow is optional at runtime
+    from PIL import Image
+except Exception:  # pragma: no cover
+    Image = None
+
+
+# Images at or below this size stay inline; a thumbnail would not be smaller.
+INLINE_ATTACHMENT_MAX_BYTES = int(os.getenv("INLINE_ATTACHMENT_MAX_BYTES", str(48 * 1024)))
+THUMBNAIL_MAX_SIDE = int(os.getenv("ATTACHMENT_THUMBNAIL_MAX_SIDE", "320"))
+THUMBNAIL_JPEG_QUALITY = 70
+
+_SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+_DATA_URL_PATTERN = re.compile(r"^data:(image/[a-zA-Z0-9.+-]+);base64,(.+)$", flags=re.DOTALL)
+_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+_MIME_BY_EXTENSION = {
+    ".jpg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".gif": "image/gif",
+}
+
+
+def attachment_dir() -> str:
+    return os.path.join(os.getenv("DATA_DIR", "data"), "attachments")
+
+
+def decode_data_url(data_url: str) -> tuple[str, bytes] | None:
+    """Return ``(mime_type, raw_bytes)`` for an image data URL, or None."""
+    match = _DATA_URL_PATTERN.match(str(data_url or "").strip())
+    if not match:
+        return None
+    try:
+        return match.group(1).lower(), base64.b64decode(match.group(2), validate=True)
+    except (ValueError, binascii.Error):
+        return None
+
+
+def encode_data_url(mime_type: str, raw: bytes) -> str:
+    return f"data:{mime_type};base64," + base64.b64encode(raw).decode("ascii")
+
+
+def _blob_path(digest: str, mime_type: str) -> str:
+    extension = _EXTENSIONS.get(mime_type, ".bin")
+    return os.path.join(attachment_dir(), digest[:2], f"{digest}{extension}")
+
+
+def store_image_blob(mime_type: str, raw: bytes) -> str:
+    """Persist image bytes once and return their sha256 digest."""
+    digest = hashlib.sha256(raw).hexdigest()
+    path = _blob_path(digest, mime_type)
+    if os.path.exists(path):
+        return digest
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(raw)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return digest
+
+
+def find_image_blob(digest: str) -> tuple[str, str] | None:
+    """Return ``(path, mime_type)`` for a stored blob, or None."""
+    digest = str(digest or "").lower()
+    if not _SHA256_PATTERN.match(digest):
+        return None
+    directory = os.path.join(attachment_dir(), digest[:2])
+    for extension, mime_type in _MIME_BY_EXTENSION.items():
+        path = os.path.join(directory, f"{digest}{extension}")
+        if os.path.exists(path):
+            return path, mime_type
+    return None
+
+
+def iter_image_blobs(digests: list[str]) -> Iterator[tuple[str, str, str]]:
+    """Yield ``(digest, path, mime_type)`` for each stored blob in ``digests``."""
+    for digest in dict.fromkeys(digests):
+        found = find_image_blob(digest)
+        if found:
+            yield digest, found[0], found[1]
+
+
+def build_thumbnail(raw: bytes, *, max_side: int = THUMBNAIL_MAX_SIDE) -> tuple[str, bytes] | None:
+    """Return a small JPEG ``(mime_type, bytes)`` preview, or None without Pillow."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(raw)) as image:
+            image.thumbnail((max_side, max_side))
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=THUMBNAIL_JPEG_QUALITY, optimize=True)
+    except Exception:
+        return None
+    return "image/jpeg", output.getvalue()
+
+
+def build_attachment_reference(image_attachment: dict[str, Any] | None) -> dict[str, Any] | None:
+    """Store an uploaded image out of band and return the row-sized reference.
+
+    The returned ``data_url`` is the image itself when it is small, otherwise a
+    thumbnail. ``blob_sha256`` points at the full image when it was stored.
+    """
+    if not image_attachment:
+        return None
+    data_url = str(image_attachment.get("data_url") or "").strip()
+    decoded = decode_data_url(data_url)
+    if decoded is None:
+        return None
+    mime_type, raw = decoded
+    reference: dict[str, Any] = {
+        "kind": "uploaded_image",
+        "name": image_attachment.get("name") or "turf-image",
+        "mime_type": image_attachment.get("mime_type") or mime_type,
+        "size_bytes": image_attachment.get("size_bytes") or len(raw),
+    }
+    if len(raw) <= INLINE_ATTACHMENT_MAX_BYTES:
+        reference["data_url"] = data_url
+        return reference
+
+    reference["blob_sha256"] = store_image_blob(mime_type, raw)
+    thumbnail = build_thumbnail(raw)
+    if thumbnail:
+        reference["data_url"] = encode_data_url(*thumbnail)
+        reference["thumbnail"] = True
+    return reference
@@ -10,8 +10,11 @@ This keeps customer accounts out of SQL while still providing:
 from __future__ import annotations
 
 import json
+import logging
 import os
 import secrets
+import tempfile
+import threading
 import uuid
 from datetime import datetime, timezone
 from datetime import timedelta
@@ -24,9 +27,17 @@ from config import Config
 from persistence_backend import dynamodb_scan_all, dynamodb_table, to_plain_value, using_dynamodb
 
 try:  # pragma: no cover - boto3 is deployment-specific
-    from boto3.dynamodb.conditions import Attr
+    from boto3.dynamodb.conditions import Attr, Key
 except Exception:  # pragma: no cover
     Attr = None
+    Key = None
+
+try:  # pragma: no cover - boto3 is deployment-specific
+    from botocore.exceptions import ClientError
+except Exception:  # pragma: no cover
+    ClientError = None
+
+logger = logging.getLogger(__name__)
 
 
 DATA_DIR = os.getenv("DATA_DIR", "data")
@@ -34,6 +45,11 @@ ACCOUNTS_PATH = os.path.join(DATA_DIR, "accounts", "users.json")
 PASSWORD_RESET_PATH = os.path.join(DATA_DIR, "accounts", "password_resets.json")
 EMAIL_VERIFICATION_PATH = os.path.join(DATA_DIR, "accounts", "email_verifications.json")
 
+# Per-worker index over users.json, keyed by path and invalidated by stat
+# signature so edits from other workers are picked up on the next lookup.
+_ACCOUNT_INDEX: dict[str, Any] = {}
+_ACCOUNT_LOCK = threading.RLock()
+
 
 def _utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -81,9 +97,83 @@ def save_account_store(store: dict[str, Any]) -> None:
         for account in incoming.values():
             table.put_item(Item=account)
         return
-    _ensure_store_dir()
-    with open(ACCOUNTS_PATH, "w", encoding="utf-8") as handle:
-        json.dump(store, handle, indent=2, sort_keys=True)
+    with _ACCOUNT_LOCK:
+        _write_json_atomic(ACCOUNTS_PATH, store)
+        _ACCOUNT_INDEX.pop(ACCOUNTS_PATH, None)
+
+
+def _write_json_atomic(path: str, payload: dict[str, Any]) -> None:
+    """Write JSON to a sibling temp file and rename it over ``path``."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2, sort_keys=True)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _stat_signature(path: str) -> tuple[int, int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _local_account_index() -> dict[str, Any]:
+    """Return the email/id index for the local store, rebuilding it on change."""
+    path = ACCOUNTS_PATH
+    signature = _stat_signature(path)
+    with _ACCOUNT_LOCK:
+        cached = _ACCOUNT_INDEX.get(path)
+        if cached is not None and cached["signature"] == signature:
+            return cached
+        users = load_account_store()["users"] if signature is not None else []
+        index = {
+            "signature": signature,
+            "users": users,
+            "by_id": {item["id"]: item for item in users if item.get("id")},
+            "by_email": {item["email"]: item for item in users if item.get("email")},
+        }
+        _ACCOUNT_INDEX[path] = index
+        return index
+
+
+def _put_account(account: dict[str, Any]) -> None:
+    """Insert or replace one account record."""
+    if using_dynamodb():
+        dynamodb_table(Config.DYNAMODB_ACCOUNTS_TABLE).put_item(Item=account)
+        return
+    with _ACCOUNT_LOCK:
+        users = [item for item in _local_account_index()["users"] if item.get("id") != account["id"]]
+        users.append(account)
+        save_account_store({"users": users})
+
+
+def _remove_account(account_id: str) -> None:
+    if using_dynamodb():
+        dynamodb_table(Config.DYNAMODB_ACCOUNTS_TABLE).delete_item(Key={"id": account_id})
+        return
+    with _ACCOUNT_LOCK:
+        users = [item for item in _local_account_index()["users"] if item.get("id") != account_id]
+        save_account_store({"users": users})
+
+
+def _has_any_account() -> bool:
+    if using_dynamodb():
+        table = dynamodb_table(Config.DYNAMODB_ACCOUNTS_TABLE)
+        response = table.scan(Limit=1, ProjectionExpression="id")
+        return bool(response.get("Items"))
+    return bool(_local_account_index()["users"])
 
 
 def load_password_reset_store() -> dict[str, Any]:
@@ -113,9 +203,7 @@ def save_password_reset_store(store: dict[str, Any]) -> None:
     if using_dynamodb():
         _save_token_store(store, token_type="password_reset")
         return
-    _ensure_store_dir()
-    with open(PASSWORD_RESET_PATH, "w", encoding="utf-8") as handle:
-        json.dump(store, handle, indent=2, sort_keys=True)
+    _write_json_atomic(PASSWORD_RESET_PATH, store)
 
 
 def load_email_verification_store() -> dict[str, Any]:
@@ -145,9 +233,7 @@ def save_email_verification_store(store: dict[str, Any]) -> None:
     if using_dynamodb():
         _save_token_store(store, token_type="email_verification")
         return
-    _ensure_store_dir()
-    with open(EMAIL_VERIFICATION_PATH, "w", encoding="utf-8") as handle:
-        json.dump(store, handle, indent=2, sort_keys=True)
+    _write_json_atomic(EMAIL_VERIFICATION_PATH, store)
 
 
 def _save_token_store(store: dict[str, Any], *, token_type: str) -> None:
@@ -169,11 +255,15 @@ def _save_token_store(store: dict[str, Any], *, token_type: str) -> None:
 
 
 def list_accounts() -> list[dict[str, Any]]:
-    return load_account_store()["users"]
+    if using_dynamodb():
+        return load_account_store()["users"]
+    return [dict(item) for item in _local_account_index()["users"]]
 
 
 def count_accounts() -> int:
-    return len(list_accounts())
+    if using_dynamodb():
+        return len(list_accounts())
+    return len(_local_account_index()["users"])
 
 
 def _normalize_email(email: str) -> str:
@@ -200,19 +290,44 @@ def get_account_by_email(email: str) -> dict[str, Any] | None:
     normalized = _normalize_email(email)
     if not normalized:
         return None
-    for account in list_accounts():
-        if account.get("email") == normalized:
-            return account
-    return None
+    if using_dynamodb():
+        if Key is None:
+            raise RuntimeError("boto3 is required for the DynamoDB persistence backend.")
+        table = dynamodb_table(Config.DYNAMODB_ACCOUNTS_TABLE)
+        try:
+            response = table.query(
+                IndexName=Config.DYNAMODB_ACCOUNTS_EMAIL_INDEX,
+                KeyConditionExpression=Key("email").eq(normalized),
+                Limit=1,
+            )
+        except ClientError as exc:
+            if not _is_email_index_unavailable(exc):
+                raise
+            # Tables created before the email index (or while it backfills)
+            # fall back to the old scan until create_dynamodb_tables adds it.
+            logger.warning("Account email index %s unavailable; scanning accounts: %s", Config.DYNAMODB_ACCOUNTS_EMAIL_INDEX, exc)
+            items = dynamodb_scan_all(table, FilterExpression=Attr("email").eq(normalized))
+            return items[0] if items else None
+        items = response.get("Items") or []
+        return to_plain_value(items[0]) if items else None
+    account = _local_account_index()["by_email"].get(normalized)
+    return dict(account) if account else None
+
+
+def _is_email_index_unavailable(exc: Exception) -> bool:
+    error = getattr(exc, "response", {}).get("Error", {})
+    return error.get("Code") == "ValidationException"
 
 
 def get_account_by_id(account_id: str) -> dict[str, Any] | None:
     if not account_id:
         return None
-    for account in list_accounts():
-        if account.get("id") == account_id:
-            return account
-    return None
+    if using_dynamodb():
+        table = dynamodb_table(Config.DYNAMODB_ACCOUNTS_TABLE)
+        item = table.get_item(Key={"id": account_id}).get("Item")
+        return to_plain_value(item) if item else None
+    account = _local_account_index()["by_id"].get(account_id)
+    return dict(account) if account else None
 
 
 def create_account(
@@ -235,8 +350,7 @@ def create_account(
     if not accepted_terms or not accepted_privacy:
         return None, "You must accept the Terms and Privacy Policy."
 
-    store = load_account_store()
-    assigned_role = role or ("admin" if not store["users"] else "user")
+    assigned_role = role or ("user" if _has_any_account() else "admin")
     now = _utc_now()
     account = {
         "id": uuid.uuid4().hex,
@@ -251,8 +365,7 @@ def create_account(
         "privacy_accepted_at": now,
         "status": "active",
     }
-    store["users"].append(account)
-    save_account_store(store)
+    _put_account(account)
     return public_account(account), None
 
 
@@ -270,14 +383,13 @@ def verify_credentials(email: str, password: str) -> dict[str, Any] | None:
 def mark_email_verified(account_id: str) -> dict[str, Any] | None:
     if not account_id:
         return None
-    store = load_account_store()
-    for account in store["users"]:
-        if account.get("id") != account_id:
-            continue
-        account["email_verified_at"] = account.get("email_verified_at") or _utc_now()
-        save_account_store(store)
-        return public_account(account)
-    return None
+    account = get_account_by_id(account_id)
+    if not account:
+        return None
+    if not account.get("email_verified_at"):
+        account["email_verified_at"] = _utc_now()
+        _put_account(account)
+    return public_account(account)
 
 
 def update_account(
@@ -291,62 +403,48 @@ def update_account(
     if not account_id:
         return None, "Missing account id."
 
-    store = load_account_store()
-    for account in store["users"]:
-        if account.get("id") != account_id:
-            continue
-
-        if name is not None:
-            account["name"] = str(name or "").strip()[:120]
-        if organization is not None:
-            account["organization"] = str(organization or "").strip()[:160]
-
-        if new_password is not None and str(new_password).strip():
-            if len(str(new_password or "")) < 10:
-                return None, "Password must be at least 10 characters."
-            if not current_password:
-                return None, "Enter your current password to set a new password."
-            if not check_password_hash(account.get("password_hash", ""), str(current_password or "")):
-                return None, "Current password is incorrect."
-            account["password_hash"] = generate_password_hash(str(new_password))
-
-        save_account_store(store)
-        return public_account(account), None
+    account = get_account_by_id(account_id)
+    if not account:
+        return None, "Account not found."
 
-    return None, "Account not found."
+    if name is not None:
+        account["name"] = str(name or "").strip()[:120]
+    if organization is not None:
+        account["organization"] = str(organization or "").strip()[:160]
+
+    if new_password is not None and str(new_password).strip():
+        if len(str(new_password or "")) < 10:
+            return None, "Password must be at least 10 characters."
+        if not current_password:
+            return None, "Enter your current password to set a new password."
+        if not check_password_hash(account.get("password_hash", ""), str(current_password or "")):
+            return None, "Current password is incorrect."
+        account["password_hash"] = generate_password_hash(str(new_password))
+
+    _put_account(account)
+    return public_account(account), None
 
 
 def deactivate_account(account_id: str) -> tuple[dict[str, Any] | None, str | None]:
     if not account_id:
         return None, "Missing account id."
-    store = load_account_store()
-    for account in store["users"]:
-        if account.get("id") != account_id:
-            continue
-        account["status"] = "disabled"
-        account["disabled_at"] = _utc_now()
-        save_account_store(store)
-        return public_account(account), None
-    return None, "Account not found."
+    account = get_account_by_id(account_id)
+    if not account:
+        return None, "Account not found."
+    account["status"] = "disabled"
+    account["disabled_at"] = _utc_now()
+    _put_account(account)
+    return public_account(account), None
 
 
 def delete_account(account_id: str) -> tuple[dict[str, Any] | None, str | None]:
     if not account_id:
         return None, "Missing account id."
 
-    store = load_account_store()
-    removed = None
-    remaining = []
-    for account in store["users"]:
-        if account.get("id") == account_id and removed is None:
-            removed = account
-            continue
-        remaining.append(account)
+    removed = get_account_by_id(account_id)
     if removed is None:
         return None, "Account not found."
-
-    store["users"] = remaining
-    save_account_store(store)
+    _remove_account(account_id)
 
     reset_store = load_password_reset_store()
     reset_store["tokens"] = [
@@ -486,17 +584,14 @@ def consume_password_reset_token(token: str, new_password: str) -> tuple[dict[st
         if not expires_at or expires_at < now:
             return None, "That reset link has expired."
 
-        account_id = item.get("account_id")
-        account_store = load_account_store()
-        for account in account_store["users"]:
-            if account.get("id") != account_id:
-                continue
-            account["password_hash"] = generate_password_hash(str(new_password))
-            save_account_store(account_store)
-            item["used_at"] = now.isoformat()
-            save_password_reset_store(reset_store)
-            return public_account(account), None
-        return None, "Account not found."
+        account = get_account_by_id(item.get("account_id"))
+        if not account:
+            return None, "Account not found."
+        account["password_hash"] = generate_password_hash(str(new_password))
+        _put_account(account)
+        item["used_at"] = now.isoformat()
+        save_password_reset_store(reset_store)
+        return public_account(account), None
 
     return None, "That reset link is not valid."
 
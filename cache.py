@@ -1,16 +1,22 @@
 """
 Caching utilities for the Greenside application.
-Provides in-memory caching for embeddings, source URLs, and search results
-to reduce API calls and improve response times.
+Provides in-memory caching for embeddings, source URLs, search results,
+rerank scores, image analyses and upstream API responses such as weather, to
+reduce API calls and improve response times.
 """
 import hashlib
 import time
 import os
 import json
 import logging
+import re
+import sqlite3
+from collections import OrderedDict, namedtuple
 from functools import lru_cache
 from threading import Lock
 
+from config import Config
+
 logger = logging.getLogger(__name__)
 
 
@@ -408,3 +414,723 @@ def get_cached_search_results(index, embedding, search_type, top_k, filters=None
     except Exception as e:
         logger.error(f"Search failed: {e}")
         return {'matches': []}
+
+
+def normalize_query(query):
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r'\s+', ' ', (query or '').lower()).strip().rstrip('?.!').strip()
+
+
+class RerankScoreCache:
+    """
+    Two-tier cache of cross-encoder scores.
+
+    Keys are (model id, hash of the normalized rewritten query, hash of the
+    exact passage text that was scored), so chunks sharing a prefix never
+    collide and a changed chunk simply misses. A per-worker LRU sits in front
+    of a SQLite table shared by every worker on the host, itself bounded by
+    least-recent use. Opening the table under a different model id clears it.
+    """
+
+    # Disk rows refresh their recency at most this often, to keep hits read-only.
+    TOUCH_INTERVAL_SECONDS = 300
+    PRUNE_EVERY_WRITES = 200
+
+    def __init__(self, model_id, db_path=None, memory_entries=2000, disk_entries=50000):
+        """
+        Initialize the rerank score cache.
+
+        Args:
+            model_id: Identifies the scoring model; scores never cross models
+            db_path: SQLite file for the shared tier (None keeps scores in memory only)
+            memory_entries: Per-worker LRU size
+            disk_entries: Shared tier size
+        """
+        self.model_id = model_id
+        self._memory = OrderedDict()
+        self._memory_entries = max(1, memory_entries)
+        self._disk_entries = max(1, disk_entries)
+        self._lock = Lock()
+        self._writes = 0
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._conn = None
+        if db_path:
+            try:
+                self._conn = self._open(db_path)
+            except sqlite3.Error as e:
+                logger.warning(f"Rerank score cache disk tier unavailable, using memory only: {e}")
+                self._conn = None
+
+    def _open(self, db_path):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rerank_scores (
+                key TEXT PRIMARY KEY,
+                score REAL NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS rerank_scores_last_used ON rerank_scores (last_used)")
+        conn.execute("CREATE TABLE IF NOT EXISTS rerank_meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID")
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT value FROM rerank_meta WHERE key = 'model_id'").fetchone()
+        if row is None or row[0] != self.model_id:
+            conn.execute("DELETE FROM rerank_scores")
+            conn.execute("INSERT OR REPLACE INTO rerank_meta VALUES ('model_id', ?)", (self.model_id,))
+        conn.execute("COMMIT")
+        return conn
+
+    normalize_query = staticmethod(normalize_query)
+
+    def key(self, query_hash, passage):
+        """Cache key for one scored passage under a hashed query."""
+        passage_hash = hashlib.sha256(passage.encode()).hexdigest()[:24]
+        return f"{query_hash}:{passage_hash}"
+
+    def query_hash(self, query):
+        content = f"{self.model_id}|{self.normalize_query(query)}"
+        return hashlib.sha256(content.encode()).hexdigest()[:24]
+
+    def get_many(self, keys):
+        """
+        Look up scores for many keys.
+
+        Returns:
+            Dict of key -> score for the keys found in either tier
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+            self._memory_hits += len(found)
+        if missing and self._conn is not None:
+            now = time.time()
+            disk = {}
+            try:
+                with self._lock:
+                    for start in range(0, len(missing), 500):
+                        batch = missing[start:start + 500]
+                        rows = self._conn.execute(
+                            f"SELECT key, score, last_used FROM rerank_scores WHERE key IN ({','.join('?' * len(batch))})",
+                            batch,
+                        ).fetchall()
+                        for key, score, last_used in rows:
+                            disk[key] = score
+                            if now - last_used > self.TOUCH_INTERVAL_SECONDS:
+                                self._conn.execute("UPDATE rerank_scores SET last_used = ? WHERE key = ?", (now, key))
+            except sqlite3.Error as e:
+                logger.debug(f"Rerank score cache read failed: {e}")
+            if disk:
+                with self._lock:
+                    for key, score in disk.items():
+                        self._remember(key, score)
+                    self._disk_hits += len(disk)
+                found.update(disk)
+        with self._lock:
+            self._misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, scores):
+        """Store key -> score pairs in both tiers."""
+        if not scores:
+            return
+        now = time.time()
+        with self._lock:
+            for key, score in scores.items():
+                self._remember(key, score)
+            if self._conn is None:
+                return
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rerank_scores VALUES (?, ?, ?)",
+                    [(key, float(score), now) for key, score in scores.items()],
+                )
+                self._writes += len(scores)
+                if self._writes >= self.PRUNE_EVERY_WRITES:
+                    self._writes = 0
+                    self._prune()
+            except sqlite3.Error as e:
+                logger.debug(f"Rerank score cache write failed: {e}")
+
+    def _remember(self, key, score):
+        self._memory[key] = score
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self):
+        excess = self._conn.execute("SELECT COUNT(*) FROM rerank_scores").fetchone()[0] - self._disk_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM rerank_scores WHERE key IN (SELECT key FROM rerank_scores ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self):
+        """Return cache statistics."""
+        with self._lock:
+            total = self._memory_hits + self._disk_hits + self._misses
+            hit_rate = ((self._memory_hits + self._disk_hits) / total * 100) if total > 0 else 0
+            disk_size = None
+            if self._conn is not None:
+                try:
+                    disk_size = self._conn.execute("SELECT COUNT(*) FROM rerank_scores").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                'model_id': self.model_id,
+                'size': len(self._memory),
+                'max_size': self._memory_entries,
+                'disk_size': disk_size,
+                'disk_max_size': self._disk_entries if self._conn is not None else None,
+                'memory_hits': self._memory_hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': f"{hit_rate:.1f}%"
+            }
+
+    def clear(self):
+        """Clear both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_hits = self._disk_hits = self._misses = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM rerank_scores")
+
+
+# Global rerank score cache instance
+_rerank_score_cache = None
+_rerank_score_cache_lock = Lock()
+
+
+def get_rerank_score_cache(model_id=None):
+    """
+    Get the global rerank score cache, reopening it if the model changed.
+
+    Returns:
+        The cache, or None before any model id is known
+    """
+    global _rerank_score_cache
+    if model_id is None or (_rerank_score_cache is not None and _rerank_score_cache.model_id == model_id):
+        return _rerank_score_cache
+    with _rerank_score_cache_lock:
+        if _rerank_score_cache is None or _rerank_score_cache.model_id != model_id:
+            db_path = os.path.join(Config.DATA_DIR, 'greenside_rerank_cache.db') if Config.RERANK_CACHE_DISK else None
+            _rerank_score_cache = RerankScoreCache(
+                model_id,
+                db_path=db_path,
+                memory_entries=Config.RERANK_CACHE_MEMORY_ENTRIES,
+                disk_entries=Config.RERANK_CACHE_DISK_ENTRIES,
+            )
+    return _rerank_score_cache
+
+
+CacheLookup = namedtuple('CacheLookup', ['value', 'status', 'fetch_ms'])
+
+
+class StaleWhileRevalidateCache:
+    """
+    Thread-safe LRU cache for upstream API responses with stale-while-revalidate.
+
+    Entries are fresh for ``ttl_seconds``. For ``stale_seconds`` after that they
+    are still returned, marked stale, so the caller can answer immediately and
+    refresh in the background; ``begin_refresh`` makes sure only one refresh per
+    key is in flight. Failures are remembered for ``negative_ttl_seconds`` so an
+    upstream outage is not retried on every request. Each entry keeps the
+    latency of the fetch that produced it, and hits add it to ``saved_ms``.
+    """
+
+    FRESH = 'fresh'
+    STALE = 'stale'
+    NEGATIVE = 'negative'
+    MISS = 'miss'
+
+    def __init__(self, max_size=512, ttl_seconds=600, stale_seconds=3600, negative_ttl_seconds=60, clock=time.time):
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._max_size = max(1, max_size)
+        self._ttl = ttl_seconds
+        self._stale = stale_seconds
+        self._negative_ttl = negative_ttl_seconds
+        self._clock = clock
+        self._lock = Lock()
+        self._hits = 0
+        self._stale_hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._saved_ms = 0.0
+
+    def _status(self, entry, now):
+        value, stored_at, fetch_ms, ok = entry
+        age = now - stored_at
+        if not ok:
+            return self.NEGATIVE if age < self._negative_ttl else None
+        if age < self._ttl:
+            return self.FRESH
+        if age < self._ttl + self._stale:
+            return self.STALE
+        return None
+
+    def get(self, key):
+        """
+        Look up ``key``.
+
+        Returns:
+            CacheLookup(value, status, fetch_ms); value is None unless status is fresh or stale
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            status = self._status(entry, self._clock()) if entry is not None else None
+            if status is None:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return CacheLookup(None, self.MISS, 0.0)
+            self._entries.move_to_end(key)
+            if status == self.NEGATIVE:
+                self._negative_hits += 1
+                return CacheLookup(None, status, 0.0)
+            if status == self.FRESH:
+                self._hits += 1
+            else:
+                self._stale_hits += 1
+            self._saved_ms += entry[2]
+            return CacheLookup(entry[0], status, entry[2])
+
+    def set(self, key, value, fetch_ms=0.0):
+        """Store a successful response and the upstream latency it took."""
+        with self._lock:
+            self._store(key, (value, self._clock(), float(fetch_ms), True))
+
+    def set_failure(self, key):
+        """Remember a failed fetch, unless a still-servable response is cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._status(entry, self._clock()) in (self.FRESH, self.STALE):
+                return
+            self._store(key, (None, self._clock(), 0.0, False))
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def begin_refresh(self, key):
+        """Claim the background refresh for ``key``; False if one is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._refreshes += 1
+            return True
+
+    def end_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def stats(self):
+        """Return cache statistics."""
+        with self._lock:
+            served = self._hits + self._stale_hits + self._negative_hits
+            total = served + self._misses
+            hit_rate = (served / total * 100) if total > 0 else 0
+            return {
+                'size': len(self._entries),
+                'max_size': self._max_size,
+                'hits': self._hits,
+                'stale_hits': self._stale_hits,
+                'negative_hits': self._negative_hits,
+                'misses': self._misses,
+                'background_refreshes': self._refreshes,
+                'upstream_ms_saved': round(self._saved_ms, 1),
+                'hit_rate': f"{hit_rate:.1f}%"
+            }
+
+    def clear(self):
+        """Clear the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._refreshing.clear()
+            self._hits = self._stale_hits = self._negative_hits = self._misses = self._refreshes = 0
+            self._saved_ms = 0.0
+
+
+# Global weather cache instance
+_weather_cache = None
+
+
+def get_weather_cache():
+    """Get or create the global weather response cache."""
+    global _weather_cache
+    if _weather_cache is None:
+        _weather_cache = StaleWhileRevalidateCache(
+            max_size=Config.WEATHER_CACHE_ENTRIES,
+            ttl_seconds=Config.WEATHER_CACHE_TTL,
+            stale_seconds=Config.WEATHER_CACHE_STALE_SECONDS,
+            negative_ttl_seconds=Config.WEATHER_NEGATIVE_CACHE_TTL,
+        )
+    return _weather_cache
+
+
+class WebSearchCache:
+    """
+    TTL cache of raw web search responses, keyed by the normalized query.
+
+    Responses live in a SQLite table shared by every worker on the host, so a
+    question answered by one worker is a hit for the others; without a
+    database path they are kept in a per-worker LRU instead. Both are bounded
+    by ``max_entries``, evicting the oldest responses first.
+    """
+
+    PRUNE_EVERY_WRITES = 50
+
+    def __init__(self, db_path=None, ttl_seconds=86400, max_entries=5000, clock=time.time):
+        self._ttl = ttl_seconds
+        self._max_entries = max(1, max_entries)
+        self._clock = clock
+        self._memory = OrderedDict()
+        self._lock = Lock()
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+        self._conn = None
+        if db_path:
+            try:
+                self._conn = self._open(db_path)
+            except sqlite3.Error as e:
+                logger.warning(f"Web search cache disk tier unavailable, using memory only: {e}")
+                self._conn = None
+
+    def _open(self, db_path):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS web_search_results (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                response TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS web_search_results_stored_at ON web_search_results (stored_at)")
+        return conn
+
+    @staticmethod
+    def key(query):
+        return hashlib.sha256(normalize_query(query).encode()).hexdigest()[:32]
+
+    def get(self, query):
+        """
+        Get the cached response for ``query`` if it has not expired.
+
+        Returns:
+            Response dict or None
+        """
+        key = self.key(query)
+        cutoff = self._clock() - self._ttl
+        with self._lock:
+            response = None
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT response FROM web_search_results WHERE key = ? AND stored_at > ?", (key, cutoff)
+                    ).fetchone()
+                    response = json.loads(row[0]) if row else None
+                except (sqlite3.Error, ValueError) as e:
+                    logger.debug(f"Web search cache read failed: {e}")
+            else:
+                entry = self._memory.get(key)
+                if entry is not None and entry[1] > cutoff:
+                    self._memory.move_to_end(key)
+                    response = entry[0]
+            if response is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return response
+
+    def set(self, query, response):
+        """Store a response."""
+        key = self.key(query)
+        now = self._clock()
+        with self._lock:
+            if self._conn is None:
+                self._memory[key] = (response, now)
+                self._memory.move_to_end(key)
+                while len(self._memory) > self._max_entries:
+                    self._memory.popitem(last=False)
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO web_search_results VALUES (?, ?, ?, ?)",
+                    (key, normalize_query(query), json.dumps(response), now),
+                )
+                self._writes += 1
+                if self._writes % self.PRUNE_EVERY_WRITES == 0:
+                    self._prune(now)
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.debug(f"Web search cache write failed: {e}")
+
+    def _prune(self, now):
+        self._conn.execute("DELETE FROM web_search_results WHERE stored_at <= ?", (now - self._ttl,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM web_search_results").fetchone()[0] - self._max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM web_search_results WHERE key IN "
+                "(SELECT key FROM web_search_results ORDER BY stored_at LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self):
+        """Return cache statistics."""
+        with self._lock:
+            total = self._hits + self._misses
+            hit_rate = (self._hits / total * 100) if total > 0 else 0
+            size = len(self._memory)
+            if self._conn is not None:
+                try:
+                    size = self._conn.execute("SELECT COUNT(*) FROM web_search_results").fetchone()[0]
+                except sqlite3.Error:
+                    size = None
+            return {
+                'size': size,
+                'max_size': self._max_entries,
+                'persistent': self._conn is not None,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': f"{hit_rate:.1f}%"
+            }
+
+    def clear(self):
+        """Clear the cache."""
+        with self._lock:
+            self._memory.clear()
+            self._hits = self._misses = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM web_search_results")
+
+
+# Global web search cache instance
+_web_search_cache = None
+_web_search_cache_lock = Lock()
+
+
+def get_web_search_cache():
+    """Get or create the global web search response cache."""
+    global _web_search_cache
+    if _web_search_cache is None:
+        with _web_search_cache_lock:
+            if _web_search_cache is None:
+                db_path = os.path.join(Config.DATA_DIR, 'greenside_web_search_cache.db') if Config.WEB_SEARCH_CACHE_DISK else None
+                _web_search_cache = WebSearchCache(
+                    db_path=db_path,
+                    ttl_seconds=Config.WEB_SEARCH_CACHE_TTL,
+                    max_entries=Config.WEB_SEARCH_CACHE_ENTRIES,
+                )
+    return _web_search_cache
+
+
+class ImageAnalysisCache:
+    """
+    Vision analyses of uploaded images, found again by perceptual hash.
+
+    Each entry pairs the 64-bit difference hash of an image with the
+    structured analysis the vision model returned for it, scoped to one
+    account or course profile. ``find`` returns the closest earlier analysis
+    within ``max_distance`` differing bits, so re-uploads, recompressed copies
+    and slightly different crops of the same photo reuse one vision call.
+
+    Entries live in a SQLite table shared by workers (a per-worker dict
+    without a database path), at most ``max_per_scope`` per scope and
+    ``max_entries`` overall, oldest first out.
+    """
+
+    PRUNE_EVERY_WRITES = 50
+
+    def __init__(self, db_path=None, ttl_seconds=7 * 86400, max_entries=5000, max_per_scope=200,
+                 max_distance=6, clock=time.time):
+        self._ttl = ttl_seconds
+        self._max_entries = max(1, max_entries)
+        self._max_per_scope = max(1, max_per_scope)
+        self._max_distance = max_distance
+        self._clock = clock
+        self._memory = {}
+        self._lock = Lock()
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+        self._conn = None
+        if db_path:
+            try:
+                self._conn = self._open(db_path)
+            except sqlite3.Error as e:
+                logger.warning(f"Image analysis cache disk tier unavailable, using memory only: {e}")
+                self._conn = None
+
+    def _open(self, db_path):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS image_analyses (
+                scope TEXT NOT NULL,
+                image_hash TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (scope, image_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS image_analyses_stored_at ON image_analyses (stored_at)")
+        return conn
+
+    def _candidates(self, scope, cutoff):
+        if self._conn is None:
+            return [
+                (int(image_hash, 16), analysis)
+                for image_hash, (analysis, stored_at) in self._memory.get(scope, {}).items()
+                if stored_at > cutoff
+            ]
+        rows = self._conn.execute(
+            "SELECT image_hash, analysis FROM image_analyses WHERE scope = ? AND stored_at > ?", (scope, cutoff)
+        ).fetchall()
+        return [(int(image_hash, 16), json.loads(analysis)) for image_hash, analysis in rows]
+
+    def find(self, scope, image_hash):
+        """
+        Get the analysis of the nearest earlier image in ``scope``.
+
+        Returns:
+            ``(analysis, distance)`` or None when nothing is within ``max_distance`` bits
+        """
+        best = None
+        with self._lock:
+            try:
+                for stored_hash, analysis in self._candidates(str(scope), self._clock() - self._ttl):
+                    distance = (stored_hash ^ image_hash).bit_count()
+                    if distance <= self._max_distance and (best is None or distance < best[1]):
+                        best = (analysis, distance)
+            except (sqlite3.Error, ValueError) as e:
+                logger.debug(f"Image analysis cache read failed: {e}")
+            if best is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return best
+
+    def add(self, scope, image_hash, analysis):
+        """Store the analysis of an image."""
+        scope = str(scope)
+        key = f"{image_hash:016x}"
+        now = self._clock()
+        with self._lock:
+            if self._conn is None:
+                entries = self._memory.setdefault(scope, {})
+                entries.pop(key, None)
+                entries[key] = (analysis, now)
+                while len(entries) > self._max_per_scope:
+                    entries.pop(next(iter(entries)))
+                while sum(len(items) for items in self._memory.values()) > self._max_entries:
+                    oldest_scope = min(self._memory, key=lambda name: next(iter(self._memory[name].values()))[1])
+                    oldest = self._memory[oldest_scope]
+                    oldest.pop(next(iter(oldest)))
+                    if not oldest:
+                        del self._memory[oldest_scope]
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO image_analyses VALUES (?, ?, ?, ?)",
+                    (scope, key, json.dumps(analysis), now),
+                )
+                self._conn.execute(
+                    "DELETE FROM image_analyses WHERE scope = ? AND image_hash NOT IN "
+                    "(SELECT image_hash FROM image_analyses WHERE scope = ? ORDER BY stored_at DESC LIMIT ?)",
+                    (scope, scope, self._max_per_scope),
+                )
+                self._writes += 1
+                if self._writes % self.PRUNE_EVERY_WRITES == 0:
+                    self._prune(now)
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.debug(f"Image analysis cache write failed: {e}")
+
+    def _prune(self, now):
+        self._conn.execute("DELETE FROM image_analyses WHERE stored_at <= ?", (now - self._ttl,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM image_analyses").fetchone()[0] - self._max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM image_analyses WHERE (scope, image_hash) IN "
+                "(SELECT scope, image_hash FROM image_analyses ORDER BY stored_at LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self):
+        """Return cache statistics; every hit is a vision call avoided."""
+        with self._lock:
+            total = self._hits + self._misses
+            hit_rate = (self._hits / total * 100) if total > 0 else 0
+            size = sum(len(items) for items in self._memory.values())
+            if self._conn is not None:
+                try:
+                    size = self._conn.execute("SELECT COUNT(*) FROM image_analyses").fetchone()[0]
+                except sqlite3.Error:
+                    size = None
+            return {
+                'size': size,
+                'max_size': self._max_entries,
+                'persistent': self._conn is not None,
+                'max_distance': self._max_distance,
+                'hits': self._hits,
+                'misses': self._misses,
+                'vision_calls_avoided': self._hits,
+                'hit_rate': f"{hit_rate:.1f}%"
+            }
+
+    def clear(self):
+        """Clear the cache."""
+        with self._lock:
+            self._memory.clear()
+            self._hits = self._misses = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM image_analyses")
+
+
+# Global image analysis cache instance
+_image_analysis_cache = None
+_image_analysis_cache_lock = Lock()
+
+
+def get_image_analysis_cache():
+    """Get or create the global image analysis cache."""
+    global _image_analysis_cache
+    if _image_analysis_cache is None:
+        with _image_analysis_cache_lock:
+            if _image_analysis_cache is None:
+                db_path = os.path.join(Config.DATA_DIR, 'greenside_image_analysis_cache.db') if Config.IMAGE_ANALYSIS_CACHE_DISK else None
+                _image_analysis_cache = ImageAnalysisCache(
+                    db_path=db_path,
+                    ttl_seconds=Config.IMAGE_ANALYSIS_CACHE_TTL,
+                    max_entries=Config.IMAGE_ANALYSIS_CACHE_ENTRIES,
+                    max_per_scope=Config.IMAGE_ANALYSIS_CACHE_PER_SCOPE,
+                    max_distance=Config.IMAGE_ANALYSIS_MATCH_DISTANCE,
+                )
+    return _image_analysis_cache
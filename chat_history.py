@@ -9,11 +9,20 @@ import logging
 import os
 import re
 import sqlite3
+import threading
 import uuid
+from collections import OrderedDict, deque
 from datetime import datetime
 
 from config import Config
-from persistence_backend import dynamodb_query_all, dynamodb_scan_all, dynamodb_table, to_plain_value, using_dynamodb
+from persistence_backend import (
+    dynamodb_query_all,
+    dynamodb_query_limited,
+    dynamodb_scan_all,
+    dynamodb_table,
+    to_plain_value,
+    using_dynamodb,
+)
 
 try:  # pragma: no cover - boto3 is deployment-specific
     from boto3.dynamodb.conditions import Attr, Key
@@ -25,10 +34,21 @@ except Exception:  # pragma: no cover
 DATA_DIR = os.environ.get('DATA_DIR', 'data' if os.path.exists('data') else '.')
 DB_PATH = os.path.join(DATA_DIR, 'greenside_conversations.db')
 
+# Per-worker ring buffer of the most recent messages per conversation.
+# Each entry carries the conversation's message_count at the time it was
+# filled, so a write from another worker is detected with one tiny read.
+HISTORY_RING_SIZE = int(os.environ.get('CHAT_HISTORY_RING_SIZE', '20'))
+HISTORY_RING_MAX_CONVERSATIONS = int(os.environ.get('CHAT_HISTORY_RING_CONVERSATIONS', '1024'))
+_HISTORY_RING = OrderedDict()
+_HISTORY_RING_LOCK = threading.Lock()
+_INITIALIZED_DB_PATHS = set()
+
 def init_database():
     """Initialize SQLite database for chat history"""
     if using_dynamodb():
         return
+    if DB_PATH in _INITIALIZED_DB_PATHS and os.path.exists(DB_PATH):
+        return
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
@@ -62,14 +82,23 @@ def init_database():
     columns = {row[1] for row in cursor.fetchall()}
     if "account_id" not in columns:
         cursor.execute("ALTER TABLE conversations ADD COLUMN account_id TEXT")
+    if "message_count" not in columns:
+        cursor.execute("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+        cursor.execute(
+            'UPDATE conversations SET message_count = '
+            '(SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.id)'
+        )
 
     # Indexes for performance
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_session ON conversations(session_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_account_session ON conversations(account_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_conv_time ON messages(conversation_id, timestamp)')
+    # Serves the newest-first tail read in get_conversation_history directly.
+    cursor.execute('DROP INDEX IF EXISTS idx_conv_time')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_conv_tail ON messages(conversation_id, timestamp DESC, id DESC)')
     
     conn.commit()
     conn.close()
+    _INITIALIZED_DB_PATHS.add(DB_PATH)
     logging.getLogger(__name__).debug("Chat history database initialized")
 
 
@@ -195,6 +224,77 @@ def get_conversation_id(session_id):
     
     return result[0] if result else None
 
+def _ring_key(conversation_id):
+    return str(conversation_id)
+
+
+def _ring_get(conversation_id):
+    with _HISTORY_RING_LOCK:
+        entry = _HISTORY_RING.get(_ring_key(conversation_id))
+        if entry is not None:
+            _HISTORY_RING.move_to_end(_ring_key(conversation_id))
+        return entry
+
+
+def _ring_store(conversation_id, version, messages, complete):
+    if HISTORY_RING_SIZE <= 0:
+        return
+    with _HISTORY_RING_LOCK:
+        _HISTORY_RING[_ring_key(conversation_id)] = {
+            'version': version,
+            'messages': deque(messages, maxlen=HISTORY_RING_SIZE),
+            'complete': complete,
+        }
+        _HISTORY_RING.move_to_end(_ring_key(conversation_id))
+        while len(_HISTORY_RING) > max(1, HISTORY_RING_MAX_CONVERSATIONS):
+            _HISTORY_RING.popitem(last=False)
+
+
+def _ring_append(conversation_id, version, message):
+    """Extend a ring only if it was current right before this write."""
+    with _HISTORY_RING_LOCK:
+        entry = _HISTORY_RING.get(_ring_key(conversation_id))
+        if entry is None:
+            return
+        if version is None or entry['version'] != version - 1:
+            _HISTORY_RING.pop(_ring_key(conversation_id), None)
+            return
+        if len(entry['messages']) == entry['messages'].maxlen:
+            entry['complete'] = False
+        entry['messages'].append(message)
+        entry['version'] = version
+
+
+def _ring_discard(conversation_ids):
+    with _HISTORY_RING_LOCK:
+        for conversation_id in conversation_ids:
+            _HISTORY_RING.pop(_ring_key(conversation_id), None)
+
+
+def clear_history_cache():
+    """Drop every cached conversation tail in this worker."""
+    with _HISTORY_RING_LOCK:
+        _HISTORY_RING.clear()
+
+
+def _conversation_version(conversation_id):
+    """Return the stored message count for one conversation (a primary-key read)."""
+    if using_dynamodb():
+        table = dynamodb_table(Config.DYNAMODB_CHAT_TABLE)
+        response = table.get_item(
+            Key={"pk": f"conversation#{conversation_id}", "sk": "meta"},
+            ProjectionExpression="message_count",
+        )
+        item = to_plain_value(response.get("Item") or {})
+        return int(item.get("message_count") or 0)
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        row = conn.execute('SELECT message_count FROM conversations WHERE id = ?', (conversation_id,)).fetchone()
+    finally:
+        conn.close()
+    return int(row[0] or 0) if row else 0
+
+
 def save_message(conversation_id, role, content, sources=None, confidence_score=None):
     """Save a message to the database"""
     try:
@@ -216,11 +316,26 @@ def save_message(conversation_id, role, content, sources=None, confidence_score=
                     "timestamp": now,
                 }
             )
-            meta_response = table.get_item(Key={"pk": f"conversation#{conversation_id}", "sk": "meta"})
-            meta = to_plain_value(meta_response.get("Item") or {})
-            if meta:
-                meta["last_active"] = now
-                table.put_item(Item=meta)
+            version = None
+            try:
+                response = table.update_item(
+                    Key={"pk": f"conversation#{conversation_id}", "sk": "meta"},
+                    UpdateExpression="SET last_active = :now ADD message_count :one",
+                    ConditionExpression="attribute_exists(pk)",
+                    ExpressionAttributeValues={":now": now, ":one": 1},
+                    ReturnValues="UPDATED_NEW",
+                )
+                version = int(to_plain_value(response.get("Attributes") or {}).get("message_count") or 0)
+            except Exception as e:
+                if getattr(e, "response", {}).get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
+            _ring_append(conversation_id, version, {
+                'role': role,
+                'content': content,
+                'sources': sources or [],
+                'confidence_score': confidence_score,
+                'timestamp': now,
+            })
             return
         init_database()
         conn = sqlite3.connect(DB_PATH)
@@ -231,31 +346,48 @@ def save_message(conversation_id, role, content, sources=None, confidence_score=
         cursor.execute('''
             INSERT INTO messages (conversation_id, role, content, sources, confidence_score)
             VALUES (?, ?, ?, ?, ?)
+            RETURNING timestamp
         ''', (conversation_id, role, content, sources_json, confidence_score))
+        timestamp = cursor.fetchone()[0]
 
-        # Update last_active timestamp
+        # Update last_active timestamp and the ring-buffer version
         cursor.execute('''
             UPDATE conversations
-            SET last_active = CURRENT_TIMESTAMP
+            SET last_active = CURRENT_TIMESTAMP, message_count = message_count + 1
             WHERE id = ?
+            RETURNING message_count
         ''', (conversation_id,))
+        row = cursor.fetchone()
 
         conn.commit()
         conn.close()
+        _ring_append(conversation_id, row[0] if row else None, {
+            'role': role,
+            'content': content,
+            'sources': json.loads(sources_json) if sources_json else None,
+            'confidence_score': confidence_score,
+            'timestamp': timestamp,
+        })
     except Exception as e:
         logging.getLogger(__name__).error(f"DB error in save_message: {e}")
 
-def get_conversation_history(conversation_id, limit=10):
-    """Get recent messages from a conversation"""
+
+def _read_conversation_tail(conversation_id, limit):
+    """Read the newest ``limit`` messages from storage, oldest first."""
     if using_dynamodb():
         if Key is None:
             raise RuntimeError("boto3 is required for the DynamoDB persistence backend.")
         table = dynamodb_table(Config.DYNAMODB_CHAT_TABLE)
-        items = dynamodb_query_all(
+        items = dynamodb_query_limited(
             table,
-            KeyConditionExpression=Key("pk").eq(f"conversation#{conversation_id}"),
+            limit=limit,
+            KeyConditionExpression=(
+                Key("pk").eq(f"conversation#{conversation_id}")
+                & Key("sk").begins_with("message#")
+            ),
+            ScanIndexForward=False,
         )
-        messages = [
+        return [
             {
                 "role": item.get("role"),
                 "content": item.get("content"),
@@ -263,32 +395,29 @@ def get_conversation_history(conversation_id, limit=10):
                 "confidence_score": item.get("confidence_score"),
                 "timestamp": item.get("timestamp"),
             }
-            for item in items
-            if item.get("entity_type") == "message"
+            for item in reversed(items)
         ]
-        messages.sort(key=lambda item: item.get("timestamp") or "")
-        return messages[-limit:]
     init_database()
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    
+
     cursor.execute('''
         SELECT role, content, sources, confidence_score, timestamp
         FROM messages
         WHERE conversation_id = ?
-        ORDER BY timestamp DESC
+        ORDER BY timestamp DESC, id DESC
         LIMIT ?
     ''', (conversation_id, limit))
-    
+
     results = cursor.fetchall()
     conn.close()
-    
+
     # Return in chronological order (oldest first)
     messages = []
     for row in reversed(results):
         role, content, sources_json, confidence, timestamp = row
         sources = json.loads(sources_json) if sources_json else None
-        
+
         messages.append({
             'role': role,
             'content': content,
@@ -296,10 +425,29 @@ def get_conversation_history(conversation_id, limit=10):
             'confidence_score': confidence,
             'timestamp': timestamp
         })
-    
+
     return messages
 
 
+def get_conversation_history(conversation_id, limit=10):
+    """Get recent messages from a conversation"""
+    if limit > HISTORY_RING_SIZE or not conversation_id:
+        return _read_conversation_tail(conversation_id, limit)
+
+    if not using_dynamodb():
+        init_database()
+    version = _conversation_version(conversation_id)
+    entry = _ring_get(conversation_id)
+    if entry is not None and entry['version'] == version:
+        messages = list(entry['messages'])
+        if entry['complete'] or len(messages) >= limit:
+            return [dict(message) for message in messages[-limit:]]
+
+    messages = _read_conversation_tail(conversation_id, HISTORY_RING_SIZE)
+    _ring_store(conversation_id, version, messages, complete=len(messages) < HISTORY_RING_SIZE)
+    return [dict(message) for message in messages[-limit:]]
+
+
 def export_account_conversations(account_id):
     """Export all stored conversations and messages for one account."""
     if not account_id:
@@ -399,6 +547,7 @@ def delete_account_conversations(account_id):
                 table.delete_item(Key={"pk": item["pk"], "sk": item["sk"]})
             if session_id:
                 table.delete_item(Key={"pk": f"session#{session_id}", "sk": f"conversation#{convo_id}"})
+        _ring_discard([convo.get("conversation_id") for convo in conversations])
         return len(conversations)
     init_database()
     conn = sqlite3.connect(DB_PATH)
@@ -411,6 +560,7 @@ def delete_account_conversations(account_id):
     cursor.execute('DELETE FROM conversations WHERE account_id = ?', (account_id,))
     conn.commit()
     conn.close()
+    _ring_discard(conversation_ids)
     return deleted
 
 def build_context_for_ai(conversation_id, current_question):
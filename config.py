@@ -23,13 +23,65 @@ class Config:
     CHAT_MAX_TOKENS = int(os.getenv("CHAT_MAX_TOKENS", "1000"))
     CHAT_TEMPERATURE = float(os.getenv("CHAT_TEMPERATURE", "0.2"))
     VISION_MODEL = os.getenv("VISION_MODEL", "gpt-4o-mini")
+    # Recent chat completions kept per worker for the /admin/perf token view.
+    LLM_USAGE_HISTORY = int(os.getenv("LLM_USAGE_HISTORY", "500"))
+    # Cross-encoder reranking: "sentence-transformers" (PyTorch) or "onnx" (int8
+    # export from scripts/export_onnx_reranker.py, run with ONNX Runtime).
+    RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "sentence-transformers").lower()
+    RERANKER_ONNX_DIR = os.getenv("RERANKER_ONNX_DIR", "models/ms-marco-MiniLM-L-6-v2-onnx-int8")
+    RERANKER_THREADS = int(os.getenv("RERANKER_THREADS", "2"))
+    RERANKER_PRELOAD = os.getenv("RERANKER_PRELOAD", "true").lower() != "false"
+    # Pairs from concurrent requests are scored together; 0 scores each request separately.
+    RERANK_BATCH_WINDOW_MS = float(os.getenv("RERANK_BATCH_WINDOW_MS", "3"))
+    RERANK_MAX_BATCH_PAIRS = int(os.getenv("RERANK_MAX_BATCH_PAIRS", "128"))
+    # Rerank scores: per-worker LRU in front of a SQLite tier shared by workers.
+    RERANK_CACHE_MEMORY_ENTRIES = int(os.getenv("RERANK_CACHE_MEMORY_ENTRIES", "2000"))
+    RERANK_CACHE_DISK_ENTRIES = int(os.getenv("RERANK_CACHE_DISK_ENTRIES", "50000"))
+    RERANK_CACHE_DISK = os.getenv("RERANK_CACHE_DISK", "true").lower() != "false"
     MAX_IMAGE_UPLOAD_BYTES = int(os.getenv("MAX_IMAGE_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+    # Uploads are resized to what the vision model keeps (fit 2048 px, 768 px on
+    # the short side), stripped of EXIF and re-encoded before analysis and storage.
+    IMAGE_PREPROCESS = os.getenv("IMAGE_PREPROCESS", "true").lower() != "false"
+    IMAGE_PREPROCESS_FORMAT = os.getenv("IMAGE_PREPROCESS_FORMAT", "jpeg").lower()
+    IMAGE_PREPROCESS_QUALITY = int(os.getenv("IMAGE_PREPROCESS_QUALITY", "82"))
+    IMAGE_VISION_MAX_LONG_SIDE = int(os.getenv("IMAGE_VISION_MAX_LONG_SIDE", "2048"))
+    IMAGE_VISION_MAX_SHORT_SIDE = int(os.getenv("IMAGE_VISION_MAX_SHORT_SIDE", "768"))
+    # Vision analyses are reused for images whose 64-bit perceptual hash is within
+    # this many bits of an earlier upload in the same account/profile.
+    IMAGE_ANALYSIS_MATCH_DISTANCE = int(os.getenv("IMAGE_ANALYSIS_MATCH_DISTANCE", "6"))
+    IMAGE_ANALYSIS_CACHE_TTL = int(os.getenv("IMAGE_ANALYSIS_CACHE_TTL", str(7 * 86400)))
+    IMAGE_ANALYSIS_CACHE_ENTRIES = int(os.getenv("IMAGE_ANALYSIS_CACHE_ENTRIES", "5000"))
+    IMAGE_ANALYSIS_CACHE_PER_SCOPE = int(os.getenv("IMAGE_ANALYSIS_CACHE_PER_SCOPE", "200"))
+    IMAGE_ANALYSIS_CACHE_DISK = os.getenv("IMAGE_ANALYSIS_CACHE_DISK", "true").lower() != "false"
 
     # Optional: Web Search (Tavily)
     TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+    # Tavily responses, keyed by normalized question, in a SQLite table shared by workers.
+    WEB_SEARCH_CACHE_TTL = int(os.getenv("WEB_SEARCH_CACHE_TTL", "86400"))
+    WEB_SEARCH_CACHE_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_ENTRIES", "5000"))
+    WEB_SEARCH_CACHE_DISK = os.getenv("WEB_SEARCH_CACHE_DISK", "true").lower() != "false"
+    # Start Tavily as soon as Pinecone returns when the mean of the top raw vector
+    # scores is below this, so it runs alongside scoring and reranking.
+    WEB_SEARCH_SPECULATIVE = os.getenv("WEB_SEARCH_SPECULATIVE", "true").lower() != "false"
+    WEB_SEARCH_PREDICT_SCORE = float(os.getenv("WEB_SEARCH_PREDICT_SCORE", "0.45"))
+    # Longest a low-confidence answer waits on a web supplement; a slower search
+    # finishes in the background and is cached for the next asker. The full
+    # fallback (no Pinecone results) waits up to WEB_SEARCH_TIMEOUT_SECONDS.
+    WEB_SEARCH_BUDGET_SECONDS = float(os.getenv("WEB_SEARCH_BUDGET_SECONDS", "4"))
+    WEB_SEARCH_TIMEOUT_SECONDS = float(os.getenv("WEB_SEARCH_TIMEOUT_SECONDS", "15"))
 
     # Optional: Weather (OpenWeatherMap)
     OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+    # Responses are cached per location: coordinates rounded to this many decimals
+    # (2 is about a 1 km bucket) or the normalized city/state.
+    WEATHER_COORD_PRECISION = int(os.getenv("WEATHER_COORD_PRECISION", "2"))
+    WEATHER_CACHE_ENTRIES = int(os.getenv("WEATHER_CACHE_ENTRIES", "512"))
+    # Seconds a response is fresh, then served stale while a background refresh runs.
+    WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "600"))
+    WEATHER_CACHE_STALE_SECONDS = int(os.getenv("WEATHER_CACHE_STALE_SECONDS", "3600"))
+    # Failed lookups are not retried for this many seconds.
+    WEATHER_NEGATIVE_CACHE_TTL = int(os.getenv("WEATHER_NEGATIVE_CACHE_TTL", "60"))
+    WEATHER_HTTP_POOL_SIZE = int(os.getenv("WEATHER_HTTP_POOL_SIZE", "8"))
 
     # Demo mode — returns cached responses for common questions (zero API cost)
     DEMO_MODE = os.getenv("DEMO_MODE", "false").lower() == "true"
@@ -55,13 +107,21 @@ class Config:
     KB_TRUST_MIN_IRRIGATION_COVERAGE_PERCENT = float(os.getenv("KB_TRUST_MIN_IRRIGATION_COVERAGE_PERCENT", "85"))
     KB_TRUST_MIN_TANK_MIX_COVERAGE_PERCENT = float(os.getenv("KB_TRUST_MIN_TANK_MIX_COVERAGE_PERCENT", "80"))
     KB_TRUST_MIN_MAX_RATE_COVERAGE_PERCENT = float(os.getenv("KB_TRUST_MIN_MAX_RATE_COVERAGE_PERCENT", "75"))
+    # Admin eval dashboard: worker processes (each with its own DATA_DIR) and cases
+    # per task. 0 workers runs the cases in the background job thread instead.
+    EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", str(min(4, os.cpu_count() or 1))))
+    EVAL_SHARD_SIZE = int(os.getenv("EVAL_SHARD_SIZE", "8"))
     PERSISTENCE_BACKEND = os.getenv("PERSISTENCE_BACKEND", "local").lower()
     AWS_REGION = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION")
     DYNAMODB_ACCOUNTS_TABLE = os.getenv("DYNAMODB_ACCOUNTS_TABLE", "greenside-accounts")
+    DYNAMODB_ACCOUNTS_EMAIL_INDEX = os.getenv("DYNAMODB_ACCOUNTS_EMAIL_INDEX", "email-index")
     DYNAMODB_ACCOUNT_TOKENS_TABLE = os.getenv("DYNAMODB_ACCOUNT_TOKENS_TABLE", "greenside-account-tokens")
     DYNAMODB_COURSE_PROFILES_TABLE = os.getenv("DYNAMODB_COURSE_PROFILES_TABLE", "greenside-course-profiles")
     DYNAMODB_CHAT_TABLE = os.getenv("DYNAMODB_CHAT_TABLE", "greenside-chat")
     DYNAMODB_RATE_LIMIT_TABLE = os.getenv("DYNAMODB_RATE_LIMIT_TABLE", "greenside-rate-limits")
+    # "persistent" uses SQLite/DynamoDB; "memory" keeps limiter state in-process
+    # and is only exact for single-worker (threaded) deployments.
+    RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "persistent").lower()
     DYNAMODB_FEEDBACK_TABLE = os.getenv("DYNAMODB_FEEDBACK_TABLE", "greenside-feedback")
 
     @classmethod
@@ -48,6 +48,9 @@ WRONG_TYPE_KEYWORDS = {
 # Grass types for relevance scoring
 GRASS_TYPES = ['bentgrass', 'bermudagrass', 'poa annua', 'kentucky bluegrass', 'zoysiagrass']
 
+# Regions returned by detection.detect_region
+REGIONS = ['northeast', 'southeast', 'midwest', 'southwest', 'west']
+
 # US States for geographic detection
 US_STATES = [
     'alabama', 'alaska', 'arizona', 'arkansas', 'california', 'colorado', 'connecticut',
@@ -147,6 +150,17 @@ GENERAL_SEARCH_TOP_K = 30
 PRODUCT_SEARCH_TOP_K = 50
 TIMING_SEARCH_TOP_K = 20
 ALGAE_SEARCH_TOP_K = 20
-MAX_CONTEXT_LENGTH = 8000
-MAX_CHUNK_LENGTH = 1200
+# Context budgets are in prompt tokens (see token_accounting.count_tokens).
+MAX_CONTEXT_TOKENS = 2000
+RETRIEVAL_CONTEXT_TOKENS = 900
+STRUCTURED_KB_CONTEXT_TOKENS = 550  # structured KB section; fragments are sized and packed to this
+GROUNDING_CONTEXT_TOKENS = 1000
+COURSE_PROFILE_CONTEXT_TOKENS = 250
+WEATHER_CONTEXT_TOKENS = 225
+# Low-confidence answers: retrieved context plus a web supplement, under their own cap.
+SUPPLEMENTED_RETRIEVAL_CONTEXT_TOKENS = 625
+WEB_SUPPLEMENT_CONTEXT_TOKENS = 400
+SUPPLEMENTED_CONTEXT_TOKENS = 1050
+MAX_CHUNK_TOKENS = 300
+MIN_CHUNK_TOKENS = 90  # floor for a chunk's even share of the retrieval budget
 MAX_SOURCES = 12
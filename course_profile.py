@@ -10,7 +10,13 @@ import copy
 import json
 import os
 import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
 from datetime import date, datetime
+from types import MappingProxyType
 from typing import Any
 
 from config import Config
@@ -40,6 +46,13 @@ DEFAULT_PROFILE = {
 
 PROFILE_PATH = os.path.join(os.getenv("DATA_DIR", "data"), "course_profile.json")
 
+# Per-worker read-through cache of sanitized profiles. Entries are frozen views
+# validated against the file stat signature (local) or the item version
+# (DynamoDB), so edits from other workers are still picked up.
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("COURSE_PROFILE_CACHE_MAX_ENTRIES", "256"))
+_PROFILE_CACHE: OrderedDict[str, tuple[Any, Mapping[str, Any]]] = OrderedDict()
+_PROFILE_CACHE_LOCK = threading.Lock()
+
 
 def _profile_path(profile_key: str | None = None) -> str:
     """Return a safe profile file path, optionally scoped to one session."""
@@ -61,10 +74,10 @@ def _clean_value(value: Any, max_length: int = 120) -> str:
     return cleaned[:max_length]
 
 
-def _merge_profile(raw_profile: dict[str, Any] | None) -> dict[str, Any]:
+def _merge_profile(raw_profile: Mapping[str, Any] | None) -> dict[str, Any]:
     """Merge a loaded/supplied profile into the known safe schema."""
     profile = copy.deepcopy(DEFAULT_PROFILE)
-    if not isinstance(raw_profile, dict):
+    if not isinstance(raw_profile, Mapping):
         return profile
 
     for key in ("course_name", "region", "soil"):
@@ -72,7 +85,7 @@ def _merge_profile(raw_profile: dict[str, Any] | None) -> dict[str, Any]:
 
     for section in ("surfaces", "mowing_heights"):
         values = raw_profile.get(section, {})
-        if isinstance(values, dict):
+        if isinstance(values, Mapping):
             for surface in profile[section]:
                 profile[section][surface] = _clean_value(values.get(surface))
 
@@ -80,7 +93,7 @@ def _merge_profile(raw_profile: dict[str, Any] | None) -> dict[str, Any]:
         values = raw_profile.get(key, [])
         if isinstance(values, str):
             values = [values]
-        if isinstance(values, list):
+        if isinstance(values, (list, tuple)):
             profile[key] = [
                 cleaned
                 for cleaned in (_clean_value(item) for item in values)
@@ -90,8 +103,73 @@ def _merge_profile(raw_profile: dict[str, Any] | None) -> dict[str, Any]:
     return profile
 
 
-def load_course_profile(profile_key: str | None = None) -> dict[str, Any]:
-    """Load the persisted course profile, falling back to a blank profile."""
+def _freeze_profile(profile: dict[str, Any]) -> Mapping[str, Any]:
+    """Return a read-only view of a sanitized profile that is safe to share."""
+    frozen: dict[str, Any] = {}
+    for key, value in profile.items():
+        if isinstance(value, dict):
+            frozen[key] = MappingProxyType(dict(value))
+        elif isinstance(value, list):
+            frozen[key] = tuple(value)
+        else:
+            frozen[key] = value
+    return MappingProxyType(frozen)
+
+
+def _thaw_profile(profile: Mapping[str, Any]) -> dict[str, Any]:
+    """Return a mutable copy of a frozen profile view."""
+    thawed: dict[str, Any] = {}
+    for key, value in profile.items():
+        if isinstance(value, Mapping):
+            thawed[key] = dict(value)
+        elif isinstance(value, tuple):
+            thawed[key] = list(value)
+        else:
+            thawed[key] = value
+    return thawed
+
+
+_BLANK_PROFILE_VIEW = _freeze_profile(copy.deepcopy(DEFAULT_PROFILE))
+# Signature of a DynamoDB item written before profiles carried a version: it
+# exists, but cannot be validated against a cached copy.
+_UNVERSIONED = object()
+
+
+def _profile_cache_key(profile_key: str | None) -> str:
+    if using_dynamodb():
+        return f"dynamodb:{profile_key or 'default'}"
+    return _profile_path(profile_key)
+
+
+def _profile_signature(profile_key: str | None) -> Any:
+    """Return a cheap token that changes whenever the stored profile changes."""
+    if using_dynamodb():
+        response = dynamodb_table(Config.DYNAMODB_COURSE_PROFILES_TABLE).get_item(
+            Key={"profile_key": str(profile_key or "default")},
+            ProjectionExpression="profile_key, #version",
+            ExpressionAttributeNames={"#version": "version"},
+        )
+        item = response.get("Item")
+        if not item:
+            return None
+        version = item.get("version")
+        return _UNVERSIONED if version is None else to_plain_value(version)
+    try:
+        stat = os.stat(_profile_path(profile_key))
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _remember_profile(cache_key: str, signature: Any, view: Mapping[str, Any]) -> None:
+    with _PROFILE_CACHE_LOCK:
+        _PROFILE_CACHE[cache_key] = (signature, view)
+        _PROFILE_CACHE.move_to_end(cache_key)
+        while len(_PROFILE_CACHE) > max(1, PROFILE_CACHE_MAX_ENTRIES):
+            _PROFILE_CACHE.popitem(last=False)
+
+
+def _read_profile(profile_key: str | None) -> dict[str, Any]:
     if using_dynamodb():
         key = str(profile_key or "default")
         response = dynamodb_table(Config.DYNAMODB_COURSE_PROFILES_TABLE).get_item(Key={"profile_key": key})
@@ -108,24 +186,79 @@ def load_course_profile(profile_key: str | None = None) -> dict[str, Any]:
         return copy.deepcopy(DEFAULT_PROFILE)
 
 
-def save_course_profile(profile: dict[str, Any], profile_key: str | None = None) -> dict[str, Any]:
+def get_course_profile_view(profile_key: str | None = None) -> Mapping[str, Any]:
+    """Return a cached, read-only view of the persisted course profile.
+
+    Use this for read paths; call ``load_course_profile`` when the caller needs
+    a dict it can modify.
+    """
+    cache_key = _profile_cache_key(profile_key)
+    signature = _profile_signature(profile_key)
+    if signature is None:
+        return _BLANK_PROFILE_VIEW
+    if signature is _UNVERSIONED:
+        return _freeze_profile(_read_profile(profile_key))
+    with _PROFILE_CACHE_LOCK:
+        cached = _PROFILE_CACHE.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            _PROFILE_CACHE.move_to_end(cache_key)
+            return cached[1]
+    view = _freeze_profile(_read_profile(profile_key))
+    _remember_profile(cache_key, signature, view)
+    return view
+
+
+def load_course_profile(profile_key: str | None = None) -> dict[str, Any]:
+    """Load the persisted course profile, falling back to a blank profile."""
+    return _thaw_profile(get_course_profile_view(profile_key))
+
+
+def _profile_for_read(profile: Mapping[str, Any] | None, profile_key: str | None) -> Mapping[str, Any]:
+    if isinstance(profile, MappingProxyType):
+        return profile
+    if profile:
+        return _merge_profile(profile)
+    return get_course_profile_view(profile_key)
+
+
+def _write_profile_file(path: str, profile: dict[str, Any]) -> None:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as profile_file:
+            json.dump(profile, profile_file, indent=2, sort_keys=True)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def save_course_profile(profile: Mapping[str, Any], profile_key: str | None = None) -> dict[str, Any]:
     """Persist a sanitized course profile and return the saved shape."""
     cleaned = _merge_profile(profile)
+    cache_key = _profile_cache_key(profile_key)
     if using_dynamodb():
         key = str(profile_key or "default")
-        dynamodb_table(Config.DYNAMODB_COURSE_PROFILES_TABLE).put_item(Item={"profile_key": key, "profile": cleaned})
+        version = time.time_ns()
+        dynamodb_table(Config.DYNAMODB_COURSE_PROFILES_TABLE).put_item(
+            Item={"profile_key": key, "profile": cleaned, "version": version}
+        )
+        _remember_profile(cache_key, version, _freeze_profile(cleaned))
         return cleaned
     path = _profile_path(profile_key)
-    directory = os.path.dirname(path)
-    if directory:
-        os.makedirs(directory, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as profile_file:
-        json.dump(cleaned, profile_file, indent=2, sort_keys=True)
+    _write_profile_file(path, cleaned)
+    _remember_profile(cache_key, _profile_signature(profile_key), _freeze_profile(cleaned))
     return cleaned
 
 
 def delete_course_profile(profile_key: str | None = None) -> bool:
     """Delete one stored course profile if it exists."""
+    with _PROFILE_CACHE_LOCK:
+        _PROFILE_CACHE.pop(_profile_cache_key(profile_key), None)
     if using_dynamodb():
         key = str(profile_key or "default")
         dynamodb_table(Config.DYNAMODB_COURSE_PROFILES_TABLE).delete_item(Key={"profile_key": key})
@@ -174,7 +307,7 @@ def update_course_profile(partial_profile: dict[str, Any], profile_key: str | No
 
 def format_course_profile_for_prompt(profile: dict[str, Any] | None = None, profile_key: str | None = None) -> str:
     """Return compact course context for prompt injection."""
-    profile = _merge_profile(profile or load_course_profile(profile_key))
+    profile = _profile_for_read(profile, profile_key)
     lines = []
 
     if profile["course_name"]:
@@ -226,7 +359,7 @@ def format_course_profile_for_prompt(profile: dict[str, Any] | None = None, prof
 
 def summarize_known_profile_for_questions(profile: dict[str, Any] | None = None, profile_key: str | None = None) -> str:
     """Return a short plain-English summary for clarification prompts."""
-    profile = _merge_profile(profile or load_course_profile(profile_key))
+    profile = _profile_for_read(profile, profile_key)
     known = []
     if profile["region"]:
         known.append(f"region: {profile['region']}")
@@ -244,7 +377,7 @@ def summarize_known_profile_for_questions(profile: dict[str, Any] | None = None,
 
 def infer_regional_management_context(profile: dict[str, Any] | None = None, profile_key: str | None = None) -> dict[str, str]:
     """Infer a likely regional turf-management archetype from saved profile details."""
-    profile = _merge_profile(profile or load_course_profile(profile_key))
+    profile = _profile_for_read(profile, profile_key)
     region_text = f" {profile.get('region', '')} ".lower()
     surface_text = " ".join(str(value).lower() for value in profile.get("surfaces", {}).values() if value)
 
@@ -301,7 +434,7 @@ def infer_regional_management_context(profile: dict[str, Any] | None = None, pro
 
 def build_course_profile_kb_hint(profile: dict[str, Any] | None = None, profile_key: str | None = None) -> str:
     """Build a compact hint string so KB lookups can inherit saved regional context."""
-    profile = _merge_profile(profile or load_course_profile(profile_key))
+    profile = _profile_for_read(profile, profile_key)
     inferred = infer_regional_management_context(profile)
 
     parts = []
@@ -439,7 +572,7 @@ def build_current_management_snapshot(
         get_seasonal_operating_plan_info,
     )
 
-    profile = _merge_profile(profile or load_course_profile(profile_key))
+    profile = _profile_for_read(profile, profile_key)
     inferred = infer_regional_management_context(profile)
     if not inferred:
         return {}
@@ -583,7 +716,7 @@ def build_operational_guidance_response(
     if not any((is_priority, is_scout, is_spray)):
         return None
 
-    profile = _merge_profile(profile or load_course_profile(profile_key))
+    profile = _profile_for_read(profile, profile_key)
     requested_surfaces = _detect_requested_surfaces(question)
     snapshot = build_current_management_snapshot(
         profile=profile,
@@ -735,7 +868,7 @@ def build_general_turf_guidance_response(
     if not any(term in q for term in broad_terms) and not any(guidance_patterns):
         return None
 
-    profile = _merge_profile(profile or load_course_profile(profile_key))
+    profile = _profile_for_read(profile, profile_key)
     snapshot = build_current_management_snapshot(
         profile=profile,
         profile_key=profile_key,
@@ -915,7 +1048,7 @@ def _build_bentgrass_seeding_prep_response(
     profile: dict[str, Any] | None = None,
     profile_key: str | None = None,
 ) -> dict[str, Any]:
-    profile = _merge_profile(profile or load_course_profile(profile_key))
+    profile = _profile_for_read(profile, profile_key)
     surface_focus = [
         f"{surface}: {value}"
         for surface, value in profile.get("surfaces", {}).items()
@@ -0,0 +1,250 @@
+"""Shared multi-pattern entity matcher for question text.
+
+Product, target, diagnosis, science and router vocabularies are compiled into
+one Aho-Corasick automaton, so a question is scanned once no matter how many
+aliases exist. Modules register a vocabulary builder at import time; the
+automaton is rebuilt lazily after registration and after every knowledge
+snapshot reload, because several vocabularies come from the structured KB.
+
+Every hit keeps its kind, term, value and span. Boundary rules are checked per
+vocabulary entry so existing matching semantics carry over:
+
+* ``WORD``: ``\\bterm\\b`` on both sides.
+* ``EDGE``: ``\\b`` only on sides where the term starts or ends with a letter
+  or digit (the router's ``_contains`` rule).
+* ``SUBSTRING``: plain ``term in text``.
+
+Callers pass text that is already lowercased, as they did for the regex scans.
+
+Each vocabulary remembers the knowledge sources its builder read. Asking the
+hits for a kind notes those sources, whether or not anything matched, so the
+eval engine's source tracking sees cached scans the same as the first one.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Iterable
+
+from knowledge_snapshot import build_with_source_reads, note_source_reads, register_snapshot_listener
+
+
+WORD = "word"
+EDGE = "edge"
+SUBSTRING = "substring"
+MATCH_CACHE_SIZE = 1024
+
+VocabularyEntry = tuple[str, str, Any, str]
+
+_VOCABULARIES: dict[str, Callable[[], Iterable[VocabularyEntry]]] = {}
+_MATCHER: "EntityMatcher | None" = None
+_MATCHER_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class EntityHit:
+    kind: str
+    term: str
+    value: Any
+    start: int
+    end: int
+    rank: int = 0  # position of the vocabulary entry in registration order
+
+
+class EntityHits:
+    """All typed hits for one text, ordered by span."""
+
+    def __init__(self, hits: tuple[EntityHit, ...], sources: dict[str, frozenset[str]] | None = None):
+        self.hits = hits
+        self._sources = sources or {}
+        self._by_kind: dict[str, list[EntityHit]] = {}
+        for hit in hits:
+            self._by_kind.setdefault(hit.kind, []).append(hit)
+        self._terms = {kind: frozenset(hit.term for hit in items) for kind, items in self._by_kind.items()}
+
+    def _note(self, kind: str | None = None) -> None:
+        if kind is None:
+            for sources in self._sources.values():
+                note_source_reads(sources)
+        else:
+            note_source_reads(self._sources.get(kind))
+
+    def __iter__(self):
+        self._note()
+        return iter(self.hits)
+
+    def __len__(self) -> int:
+        self._note()
+        return len(self.hits)
+
+    def of_kind(self, kind: str) -> list[EntityHit]:
+        self._note(kind)
+        return list(self._by_kind.get(kind, ()))
+
+    def terms(self, kind: str) -> frozenset[str]:
+        self._note(kind)
+        return self._terms.get(kind, frozenset())
+
+    def has(self, kind: str, term: str) -> bool:
+        self._note(kind)
+        return term in self._terms.get(kind, ())
+
+    def values(self, kind: str) -> list[Any]:
+        """Distinct hit values for ``kind`` in order of first appearance."""
+        self._note(kind)
+        seen = []
+        for hit in self._by_kind.get(kind, ()):
+            if hit.value not in seen:
+                seen.append(hit.value)
+        return seen
+
+    def registered_values(self, kind: str) -> list[Any]:
+        """Distinct hit values for ``kind`` in vocabulary registration order.
+
+        This is the order the per-alias loops used to produce, independent of
+        where the terms appear in the text.
+        """
+        self._note(kind)
+        ranked = sorted(self._by_kind.get(kind, ()), key=lambda hit: hit.rank)
+        return list(dict.fromkeys(hit.value for hit in ranked))
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _boundary_flags(term: str, mode: str) -> tuple[bool, bool]:
+    if mode == WORD:
+        return True, True
+    if mode == EDGE:
+        return term[:1].isalnum(), term[-1:].isalnum()
+    return False, False
+
+
+class EntityMatcher:
+    """Aho-Corasick automaton over every registered vocabulary entry.
+
+    ``sources`` maps a kind to the knowledge sources its entries came from.
+    """
+
+    def __init__(self, entries: Iterable[VocabularyEntry], sources: dict[str, frozenset[str]] | None = None):
+        self.sources = dict(sources or {})
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[int]] = [[]]
+        self._terms: list[str] = []
+        self._entries: list[list[tuple[str, Any, bool, bool, int]]] = []
+        term_ids: dict[str, int] = {}
+
+        for rank, (kind, term, value, mode) in enumerate(entries):
+            term = str(term or "").lower().strip() if mode == EDGE else str(term or "").lower()
+            if not term:
+                continue
+            term_id = term_ids.get(term)
+            if term_id is None:
+                term_id = term_ids[term] = len(self._terms)
+                self._terms.append(term)
+                self._entries.append([])
+                self._insert(term, term_id)
+            check_left, check_right = _boundary_flags(term, mode)
+            self._entries[term_id].append((kind, value, check_left, check_right, rank))
+
+        self._build_failure_links()
+        self.find = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._find)
+
+    @property
+    def size(self) -> int:
+        return len(self._terms)
+
+    def _insert(self, term: str, term_id: int) -> None:
+        node = 0
+        for char in term:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(term_id)
+
+    def _build_failure_links(self) -> None:
+        queue = list(self._goto[0].values())
+        index = 0
+        while index < len(queue):
+            node = queue[index]
+            index += 1
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def _find(self, text: str) -> EntityHits:
+        hits = []
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        length = len(text)
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not output[node]:
+                continue
+            end = position + 1
+            for term_id in output[node]:
+                term = self._terms[term_id]
+                start = end - len(term)
+                left_open = start == 0 or _is_word(text[start - 1]) != _is_word(text[start])
+                right_open = end == length or _is_word(text[end - 1]) != _is_word(text[end])
+                for kind, value, check_left, check_right, rank in self._entries[term_id]:
+                    if (check_left and not left_open) or (check_right and not right_open):
+                        continue
+                    hits.append(EntityHit(kind, term, value, start, end, rank))
+        hits.sort(key=lambda hit: (hit.start, -hit.end))
+        return EntityHits(tuple(hits), self.sources)
+
+
+def register_vocabulary(name: str, builder: Callable[[], Iterable[VocabularyEntry]]) -> None:
+    """Add ``(kind, term, value, mode)`` entries from ``builder`` to the shared matcher."""
+    global _MATCHER
+    with _MATCHER_LOCK:
+        _VOCABULARIES[name] = builder
+        _MATCHER = None
+
+
+def get_entity_matcher() -> EntityMatcher:
+    global _MATCHER
+    matcher = _MATCHER
+    if matcher is not None:
+        return matcher
+    with _MATCHER_LOCK:
+        if _MATCHER is None:
+            entries: list[VocabularyEntry] = []
+            sources: dict[str, frozenset[str]] = {}
+            for builder in _VOCABULARIES.values():
+                built, reads = build_with_source_reads(lambda: list(builder()))
+                entries.extend(built)
+                for kind in {entry[0] for entry in built}:
+                    sources[kind] = sources.get(kind, frozenset()) | reads
+            _MATCHER = EntityMatcher(entries, sources)
+        return _MATCHER
+
+
+def match_entities(text: str) -> EntityHits:
+    """Every registered entity in ``text`` (already lowercased), from one scan."""
+    return get_entity_matcher().find(text or "")
+
+
+@register_snapshot_listener
+def reset_entity_matcher(_snapshot=None) -> None:
+    """Rebuild from the current vocabularies on next use."""
+    global _MATCHER
+    with _MATCHER_LOCK:
+        _MATCHER = None
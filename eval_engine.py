@@ -0,0 +1,546 @@
+"""Parallel, incremental runner for the admin eval dashboard suites.
+
+The dashboard used to run every suite serially inside the admin request, with
+each case posted through one Flask test client against the live ``DATA_DIR``.
+``start_eval_job`` now runs the suites in a background thread that shards
+cases across a process pool. Each pool worker gets its own ``DATA_DIR`` and
+imports its own app, so eval accounts, rate-limit buckets and caches never
+touch the serving data.
+
+Only one job runs per ``DATA_DIR`` even with several gunicorn workers: the
+starting process holds ``eval_job.lock`` for the whole run and publishes its
+progress to ``eval_job_status.json``, which ``eval_job_status`` reads from any
+worker. ``/admin/eval-dashboard`` only reports that status; a job starts on an
+explicit ``POST /admin/eval-dashboard/refresh``.
+
+Case results are cached in ``DATA_DIR/eval_case_results.db`` keyed by
+``(suite, case hash, code version)``. Each row also records the structured KB
+sources the case read (``knowledge_snapshot.track_source_reads``) and their
+content hashes, and a cached row counts only while those hashes still match
+the current snapshot. After a KB edit only the cases that read the edited
+source run again; a code change runs everything.
+
+With ``Config.EVAL_WORKERS`` set to 0 the cases run in the job thread instead,
+sharing the app's ``DATA_DIR`` as the old in-request runner did.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Callable, NamedTuple, Optional
+
+from config import Config
+from knowledge_snapshot import refresh_knowledge_snapshot, track_source_reads
+
+try:  # pragma: no cover - POSIX only; other platforms skip the cross-process lock
+    import fcntl
+except Exception:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = Path(__file__).resolve().parent
+
+
+class EvalSuite(NamedTuple):
+    key: str
+    label: str
+    module: str
+    case_path: Path
+
+
+# Keep the admin dashboard aligned with the handoff quality story: one broad
+# regression sweep, plus the narrower families that catch specific behavior drift.
+EVAL_SUITES = [
+    EvalSuite('general_turf', 'General Turf', 'scripts.run_general_turf_eval', APP_ROOT / 'scripts' / 'general_turf_eval_cases.json'),
+    EvalSuite('anti_slop', 'Anti-Slop', 'scripts.run_anti_slop_eval', APP_ROOT / 'scripts' / 'anti_slop_eval_cases.json'),
+    EvalSuite('ambiguity', 'Ambiguity', 'scripts.run_ambiguity_eval', APP_ROOT / 'scripts' / 'ambiguity_eval_cases.json'),
+    EvalSuite('comprehensive_100', 'Comprehensive 100', 'scripts.run_comprehensive_100_eval', APP_ROOT / 'scripts' / 'run_comprehensive_100_eval.py'),
+    EvalSuite('no_account', 'No-Account', 'scripts.run_no_account_turf_eval', APP_ROOT / 'scripts' / 'no_account_turf_eval_cases.json'),
+    EvalSuite('context_switch', 'Context Switch', 'scripts.run_context_switch_eval', APP_ROOT / 'scripts' / 'context_switch_eval_cases.json'),
+    EvalSuite('phd_turf', 'PhD Turf', 'scripts.run_phd_turf_eval', APP_ROOT / 'scripts' / 'phd_turf_eval_cases.json'),
+    EvalSuite('product_label', 'Product / Label', 'scripts.run_product_label_eval', APP_ROOT / 'scripts' / 'product_label_eval_cases.json'),
+    EvalSuite('image', 'Image', 'scripts.run_image_eval', APP_ROOT / 'scripts' / 'image_eval_cases.json'),
+]
+FAILING_CASES_LIMIT = 12
+CODE_VERSIONS_KEPT = 3
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+
+
+def load_suite_cases(suite: EvalSuite) -> list[dict]:
+    """The suite's cases; case files are plain JSON, so this does not import the app."""
+    if suite.key == 'comprehensive_100':
+        from scripts.run_comprehensive_100_eval import load_cases
+        return load_cases()
+    with open(suite.case_path, 'r', encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def case_hash(case: dict) -> str:
+    return hashlib.sha256(json.dumps(case, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def code_version() -> str:
+    """Hash of the application and eval-script sources; any change reruns every case."""
+    digest = hashlib.sha256()
+    paths = sorted(APP_ROOT.glob('*.py')) + sorted((APP_ROOT / 'scripts').glob('run_*_eval.py'))
+    for path in paths:
+        try:
+            digest.update(path.name.encode('utf-8'))
+            digest.update(path.read_bytes())
+        except OSError:
+            continue
+    return digest.hexdigest()[:16]
+
+
+class EvalResultCache:
+    """SQLite store of per-case eval results and the KB sources each one read."""
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS eval_case_results (
+                suite TEXT NOT NULL,
+                case_hash TEXT NOT NULL,
+                code_version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                kb_sources TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (suite, case_hash, code_version)
+            ) WITHOUT ROWID
+            """
+        )
+        self._lock = threading.Lock()
+
+    def get(self, suite: str, digest: str, version: str, source_hash: Callable[[str], str]) -> Optional[dict]:
+        """The cached result, unless a KB source it read has changed since."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, kb_sources FROM eval_case_results WHERE suite = ? AND case_hash = ? AND code_version = ?",
+                (suite, digest, version),
+            ).fetchone()
+        if row is None:
+            return None
+        kb_sources = json.loads(row[1])
+        if any(source_hash(name) != recorded for name, recorded in kb_sources.items()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, suite: str, digest: str, version: str, result: dict, kb_sources: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO eval_case_results VALUES (?, ?, ?, ?, ?, ?)",
+                (suite, digest, version, json.dumps(result, default=str), json.dumps(kb_sources), time.time()),
+            )
+
+    def prune(self, keep_versions: int = CODE_VERSIONS_KEPT) -> None:
+        """Drop results from all but the most recently used code versions."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM eval_case_results WHERE code_version NOT IN ("
+                "SELECT code_version FROM eval_case_results GROUP BY code_version "
+                "ORDER BY MAX(stored_at) DESC LIMIT ?)",
+                (keep_versions,),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Pool workers
+# ---------------------------------------------------------------------------
+
+def _init_worker() -> None:
+    """Give this worker a private DATA_DIR before the app is imported."""
+    data_dir = tempfile.mkdtemp(prefix='greenside-eval-worker-')
+    os.environ['DATA_DIR'] = data_dir
+    Config.DATA_DIR = data_dir
+    atexit.register(shutil.rmtree, data_dir, True)
+
+
+def _run_case(module, case: dict) -> tuple[dict, Optional[str]]:
+    try:
+        report = module.run_eval([case])
+        results = report.get('results') or []
+        if results:
+            return results[0], None
+        error = 'Eval suite returned no result for this case'
+    except Exception as exc:
+        error = f'{type(exc).__name__}: {exc}'
+    return {
+        'id': case.get('id'),
+        'question': case.get('question'),
+        'passed': False,
+        'failures': [error],
+    }, error
+
+
+def run_case_shard(module_name: str, cases: list[dict]) -> list[dict]:
+    """Run ``cases`` one at a time, recording the KB sources each one reads."""
+    module = importlib.import_module(module_name)
+    outcomes = []
+    for case in cases:
+        with track_source_reads() as reads:
+            result, error = _run_case(module, case)
+        snapshot = refresh_knowledge_snapshot()
+        outcomes.append({
+            'case_hash': case_hash(case),
+            'result': result,
+            'error': error,
+            'kb_sources': {name: snapshot.source_hash(name) for name in sorted(reads)},
+        })
+    return outcomes
+
+
+# ---------------------------------------------------------------------------
+# Background job
+# ---------------------------------------------------------------------------
+
+class EvalJob:
+    """One dashboard eval run: shards uncached cases across workers and tracks progress."""
+
+    def __init__(self, suites: list[EvalSuite], *, workers: int, shard_size: int, use_cache: bool = True,
+                 on_complete: Optional[Callable[[dict], None]] = None, lock_handle: Optional[IO] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.suites = suites
+        self.workers = max(0, workers)
+        self.shard_size = max(1, shard_size)
+        self.use_cache = use_cache
+        self.on_complete = on_complete
+        self.status = 'queued'
+        self.error: Optional[str] = None
+        self.payload: Optional[dict] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.total = 0
+        self.completed = 0
+        self.cached = 0
+        self._lock = threading.Lock()
+        self._lock_handle = lock_handle
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'eval-job-{self.id}', daemon=True)
+
+    @property
+    def running(self) -> bool:
+        return not self._done.is_set()
+
+    def start(self) -> 'EvalJob':
+        self._publish()
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def progress(self) -> dict:
+        with self._lock:
+            return {
+                'id': self.id,
+                'status': self.status,
+                'total': self.total,
+                'completed': self.completed,
+                'cached': self.cached,
+                'ran': self.completed - self.cached,
+                'workers': self.workers,
+                'elapsed_seconds': round((self.finished_at or time.time()) - self.started_at, 1),
+                'error': self.error,
+            }
+
+    def _advance(self, count: int, cached: bool = False) -> None:
+        with self._lock:
+            self.completed += count
+            if cached:
+                self.cached += count
+
+    def _publish(self) -> None:
+        """Share progress with the other server processes through ``DATA_DIR``."""
+        try:
+            _write_job_status(self.progress())
+        except OSError as exc:
+            logger.warning('Could not publish eval job status: %s', exc)
+
+    def _run(self) -> None:
+        with self._lock:
+            self.status = 'running'
+        self._publish()
+        cache = None
+        try:
+            if self.use_cache:
+                cache = EvalResultCache(os.path.join(Config.DATA_DIR, 'eval_case_results.db'))
+            self.payload = self._evaluate(cache)
+            # Stored before reporting done, so a poll that sees 'done' also sees the run.
+            if self.on_complete is not None:
+                self.on_complete(self.payload)
+            with self._lock:
+                self.status = 'done'
+        except Exception as exc:
+            logger.exception('Eval job failed')
+            with self._lock:
+                self.status = 'failed'
+                self.error = str(exc)
+        finally:
+            if cache is not None:
+                cache.close()
+            with self._lock:
+                self.finished_at = time.time()
+            self._publish()
+            if self._lock_handle is not None:
+                self._lock_handle.close()
+            self._done.set()
+
+    def _evaluate(self, cache: Optional[EvalResultCache]) -> dict:
+        snapshot = refresh_knowledge_snapshot()
+        version = code_version()
+        suite_cases: dict[str, list[dict]] = {}
+        suite_errors: dict[str, str] = {}
+        for suite in self.suites:
+            try:
+                suite_cases[suite.key] = load_suite_cases(suite)
+            except Exception as exc:
+                suite_cases[suite.key] = []
+                suite_errors[suite.key] = str(exc)
+        with self._lock:
+            self.total = sum(len(cases) for cases in suite_cases.values())
+
+        results: dict[tuple[str, str], dict] = {}
+        pending: list[tuple[EvalSuite, list[dict]]] = []
+        for suite in self.suites:
+            uncached = []
+            for case in suite_cases[suite.key]:
+                digest = case_hash(case)
+                hit = cache.get(suite.key, digest, version, snapshot.source_hash) if cache is not None else None
+                if hit is None:
+                    uncached.append(case)
+                else:
+                    results[(suite.key, digest)] = hit
+                    self._advance(1, cached=True)
+            for start in range(0, len(uncached), self.shard_size):
+                pending.append((suite, uncached[start:start + self.shard_size]))
+        self._publish()
+
+        for suite, outcomes in self._run_shards(pending):
+            for outcome in outcomes:
+                results[(suite.key, outcome['case_hash'])] = outcome['result']
+                if outcome['error']:
+                    suite_errors.setdefault(suite.key, outcome['error'])
+                elif cache is not None:
+                    cache.set(suite.key, outcome['case_hash'], version, outcome['result'], outcome['kb_sources'])
+            self._advance(len(outcomes))
+            self._publish()
+        if cache is not None:
+            cache.prune()
+
+        reports = []
+        for suite in self.suites:
+            suite_results = [results[(suite.key, case_hash(case))] for case in suite_cases[suite.key]]
+            reports.append((suite, suite_results, suite_errors.get(suite.key)))
+        return build_dashboard_payload(reports, progress=self.progress())
+
+    def _run_shards(self, pending):
+        if not pending:
+            return
+        if self.workers == 0:
+            for suite, cases in pending:
+                yield suite, run_case_shard(suite.module, cases)
+            return
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker) as pool:
+            futures = {pool.submit(run_case_shard, suite.module, cases): (suite, cases) for suite, cases in pending}
+            for future in as_completed(futures):
+                suite, cases = futures[future]
+                try:
+                    yield suite, future.result()
+                except Exception as exc:
+                    error = f'{type(exc).__name__}: {exc}'
+                    yield suite, [
+                        {
+                            'case_hash': case_hash(case),
+                            'result': {'id': case.get('id'), 'question': case.get('question'), 'passed': False, 'failures': [error]},
+                            'error': error,
+                            'kb_sources': {},
+                        }
+                        for case in cases
+                    ]
+
+
+def build_dashboard_payload(reports: list[tuple[EvalSuite, list[dict], Optional[str]]], progress: Optional[dict] = None) -> dict:
+    """Summarize per-suite case results in the shape the admin dashboard renders."""
+    suite_reports = []
+    failing_cases = []
+    total_cases = total_passed = 0
+    for suite, results, error in reports:
+        passed = sum(1 for item in results if item.get('passed'))
+        suite_failures = []
+        for item in results:
+            if item.get('passed'):
+                continue
+            failure_entry = {
+                'suite': suite.label,
+                'id': item.get('id'),
+                'question': item.get('question'),
+                'kb_verdict': item.get('kb_verdict'),
+                'selected_mode': item.get('selected_mode') or item.get('mode'),
+                'confidence_label': item.get('confidence_label') or item.get('confidence'),
+                'failures': item.get('failures') or item.get('reasons') or [],
+            }
+            suite_failures.append(failure_entry)
+            failing_cases.append(failure_entry)
+        report = {
+            'key': suite.key,
+            'label': suite.label,
+            'cases': len(results),
+            'passed': passed,
+            'failed': len(results) - passed,
+            'pass_rate': round((passed / len(results)) * 100, 1) if results else 0.0,
+            'failing_cases': suite_failures,
+        }
+        if error:
+            report['error'] = error
+            if not results:
+                failing_cases.append({
+                    'suite': suite.label,
+                    'id': f'{suite.key}_eval_error',
+                    'question': 'Eval suite failed to run',
+                    'kb_verdict': None,
+                    'selected_mode': None,
+                    'confidence_label': None,
+                    'failures': [error],
+                })
+        suite_reports.append(report)
+        total_cases += len(results)
+        total_passed += passed
+
+    summary = {
+        'suite_count': len(suite_reports),
+        'cases': total_cases,
+        'passed': total_passed,
+        'failed': total_cases - total_passed,
+        'pass_rate': round((total_passed / total_cases) * 100, 1) if total_cases else 0.0,
+        'run_at': datetime.now(timezone.utc).isoformat(),
+        'cached': False,
+    }
+    if progress:
+        summary.update({
+            'cases_run': progress['completed'] - progress['cached'],
+            'cases_reused': progress['cached'],
+            'duration_seconds': progress['elapsed_seconds'],
+        })
+    return {
+        'summary': summary,
+        'suites': suite_reports,
+        'failing_cases': failing_cases[:FAILING_CASES_LIMIT],
+    }
+
+
+def _job_lock_path() -> str:
+    return os.path.join(Config.DATA_DIR, 'eval_job.lock')
+
+
+def _job_status_path() -> str:
+    return os.path.join(Config.DATA_DIR, 'eval_job_status.json')
+
+
+def _write_job_status(progress: dict) -> None:
+    path = _job_status_path()
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            json.dump(progress, handle)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_job_status() -> Optional[dict]:
+    try:
+        with open(_job_status_path(), 'r', encoding='utf-8') as handle:
+            status = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    return status if isinstance(status, dict) else None
+
+
+def _acquire_job_lock() -> Optional[IO]:
+    """The open, locked ``eval_job.lock``, or None while another process holds it."""
+    os.makedirs(Config.DATA_DIR, exist_ok=True)
+    handle = open(_job_lock_path(), 'a')
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+_job: Optional[EvalJob] = None
+_job_lock = threading.Lock()
+
+
+def eval_job_status() -> Optional[dict]:
+    """Progress of the latest dashboard eval run, whichever server process started it."""
+    job = _job
+    if job is not None and job.running:
+        return job.progress()
+    status = _read_job_status()
+    if status is None:
+        return job.progress() if job is not None else None
+    if status.get('status') in ACTIVE_JOB_STATUSES and fcntl is not None:
+        handle = _acquire_job_lock()
+        if handle is not None:
+            # Nobody holds the lock; re-read in case the owner finished in between.
+            handle.close()
+            status = _read_job_status() or status
+            if status.get('status') in ACTIVE_JOB_STATUSES:
+                status = {**status, 'status': 'interrupted', 'error': 'The server process running this eval exited'}
+    return status
+
+
+def start_eval_job(on_complete: Optional[Callable[[dict], None]] = None, *, use_cache: bool = True) -> Optional[EvalJob]:
+    """Start a dashboard eval run in the background, or return the one already running.
+
+    Returns None when another server process is already running a job; its
+    progress is available from ``eval_job_status``.
+    """
+    global _job
+    with _job_lock:
+        if _job is not None and _job.running:
+            return _job
+        lock_handle = _acquire_job_lock()
+        if lock_handle is None:
+            return None
+        _job = EvalJob(
+            EVAL_SUITES,
+            workers=Config.EVAL_WORKERS,
+            shard_size=Config.EVAL_SHARD_SIZE,
+            use_cache=use_cache,
+            on_complete=on_complete,
+            lock_handle=lock_handle,
+        ).start()
+        return _job
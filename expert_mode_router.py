@@ -7,6 +7,7 @@ from typing import Any
 
 from advanced_diagnosis import DIAGNOSIS_INTENT_TERMS, DIAGNOSTIC_BUCKETS
 from advanced_turf_science import SCIENCE_INTENT_TERMS, SCIENCE_TOPIC_ALIASES
+from entity_matcher import EDGE, match_entities, register_vocabulary
 from verified_kb import TARGET_ALIASES, _detect_product
 
 
@@ -39,6 +40,24 @@ SYMPTOM_TERMS = [
 ]
 
 
+# Every fixed term the router scores; matched in one pass instead of a regex each.
+_ROUTER_TERMS = frozenset(
+    str(term).lower().strip()
+    for term in (
+        PRODUCT_INTENT_TERMS
+        + GENERAL_GUIDANCE_TERMS
+        + SYMPTOM_TERMS
+        + list(DIAGNOSIS_INTENT_TERMS)
+        + list(SCIENCE_INTENT_TERMS)
+        + [trigger for bucket in DIAGNOSTIC_BUCKETS.values() for trigger in bucket["triggers"]]
+        + [alias for aliases in SCIENCE_TOPIC_ALIASES.values() for alias in aliases]
+        + [alias for aliases in TARGET_ALIASES.values() for alias in aliases]
+    )
+    if str(term or "").strip()
+)
+register_vocabulary("expert_mode_router", lambda: (("router_term", term, term, EDGE) for term in _ROUTER_TERMS))
+
+
 def route_expert_mode(question: str, course_profile: dict[str, Any] | None = None) -> dict[str, Any]:
     """Score product, diagnosis, and science intent and choose an expert mode."""
     q = (question or "").lower()
@@ -376,6 +395,8 @@ def _contains(question_lower: str, term: str) -> bool:
     term = str(term or "").lower().strip()
     if not term:
         return False
+    if term in _ROUTER_TERMS:
+        return match_entities(question_lower).has("router_term", term)
     if term.startswith(" ") or term.endswith(" "):
         return term in question_lower
     escaped = re.escape(term)
@@ -10,6 +10,7 @@ import json
 import logging
 import uuid
 import re
+import tempfile
 from functools import lru_cache
 from pathlib import Path
 from typing import Optional
@@ -18,6 +19,7 @@ from advanced_diagnosis import DIAGNOSTIC_BUCKETS
 from advanced_turf_science import SCIENCE_TOPIC_ALIASES
 from config import Config
 from knowledge_base import load_advanced_turf_science, load_diagnostic_frameworks
+from knowledge_snapshot import publish_knowledge_change
 from persistence_backend import dynamodb_table, to_plain_value, using_dynamodb
 from source_policy import sanitize_source_url
 
@@ -2362,9 +2364,19 @@ def _load_products_file():
 
 
 def _save_products_file(products):
-    with open(PRODUCTS_PATH, 'w', encoding='utf-8') as products_file:
-        json.dump(products, products_file, indent=2, sort_keys=False)
-        products_file.write('\n')
+    # Other workers reload products.json after a generation bump, so never
+    # let them observe a half-written file.
+    directory = os.path.dirname(PRODUCTS_PATH)
+    fd, temp_path = tempfile.mkstemp(prefix='.products-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as products_file:
+            json.dump(products, products_file, indent=2, sort_keys=False)
+            products_file.write('\n')
+        os.replace(temp_path, PRODUCTS_PATH)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
 
 
 def _merge_list(record, field, values):
@@ -2497,6 +2509,11 @@ def apply_kb_candidate(candidate_id, reviewer='admin'):
                 WHERE id = ?
             ''', (candidate['gap_id'],))
         conn.commit()
+        try:
+            publish_knowledge_change()
+        except Exception as e:
+            # The candidate is already written; report success rather than invite a retry.
+            logging.getLogger(__name__).warning(f"KB candidate {candidate_id} applied but not published: {e}")
         return {
             'success': True,
             'id': candidate_id,
@@ -3531,6 +3548,25 @@ def export_feedback_csv():
     return output.getvalue()
 
 
+def export_attachment_manifest():
+    """List feedback rows whose uploaded image is stored out of band."""
+    manifest = []
+    for row in _load_feedback_records(limit=None):
+        attachment = row.get('attachment') or {}
+        digest = attachment.get('blob_sha256')
+        if not digest:
+            continue
+        manifest.append({
+            'feedback_id': row.get('id'),
+            'timestamp': row.get('timestamp'),
+            'name': attachment.get('name'),
+            'mime_type': attachment.get('mime_type'),
+            'size_bytes': attachment.get('size_bytes'),
+            'blob_sha256': digest,
+        })
+    return manifest
+
+
 def export_training_examples_csv():
     """Export training examples to CSV format"""
     examples = _load_training_example_items(unused_only=False, limit=None)
@@ -6,6 +6,7 @@ by retrieved sources. Runs AFTER the main GPT-4o response is generated.
 import re
 import logging
 from typing import Dict, List, Optional
+from answer_validator import get_validator_model
 from product_validator import lookup_product, validate_product_in_answer, format_validation_warning
 
 logger = logging.getLogger(__name__)
@@ -162,7 +163,7 @@ def _check_fabricated_products(answer: str, question: str) -> Dict:
     ]
 
     # Known real products to exclude from false positives
-    known_product_index = {p.lower() for p in _get_all_known_product_names()}
+    known_product_index = get_validator_model().known_product_index
 
     for pattern in product_like_patterns:
         matches = re.finditer(pattern, answer)
@@ -236,11 +237,4 @@ def _check_dangerous_mixing(answer: str, question: str) -> Dict:
 
 def _get_all_known_product_names() -> List[str]:
     """Get all known product names (trade names + active ingredients)."""
-    from knowledge_base import load_products
-    products = load_products()
-    names = []
-    for category, items in products.items():
-        for ai_name, info in items.items():
-            names.append(ai_name)
-            names.extend(info.get('trade_names', []))
-    return names
+    return list(get_validator_model().known_product_names)
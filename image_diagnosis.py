@@ -5,12 +5,19 @@ from __future__ import annotations
 import base64
 import binascii
 import json
+import logging
 import os
 import re
+import time
 from typing import Any
 
 from advanced_diagnosis import answer_advanced_diagnosis
 from advanced_turf_science import answer_advanced_turf_science
+from attachment_store import encode_data_url
+from cache import get_image_analysis_cache
+from image_preprocessing import image_hash, prepare_image, record_vision_latency
+
+logger = logging.getLogger(__name__)
 
 
 ALLOWED_IMAGE_MIME_TYPES = {
@@ -65,8 +72,19 @@ VISUAL_PRODUCT_ONLY_TERMS = [
 ]
 
 
-def validate_image_attachment(raw_attachment: dict[str, Any] | None, *, max_bytes: int) -> dict[str, Any]:
-    """Validate and normalize a single JSON image attachment."""
+def validate_image_attachment(
+    raw_attachment: dict[str, Any] | None,
+    *,
+    max_bytes: int,
+    preprocess: bool = True,
+) -> dict[str, Any]:
+    """Validate and normalize a single JSON image attachment.
+
+    With ``preprocess`` the image is downsized and re-encoded for the vision
+    model (``image_preprocessing.prepare_image``); the attachment then carries
+    the smaller image and a ``preprocessing`` summary. ``image_hash`` is the
+    perceptual hash used to reuse earlier analyses of the same photo.
+    """
     if not raw_attachment:
         return {"ok": True, "attachment": None}
     if not isinstance(raw_attachment, dict):
@@ -97,15 +115,29 @@ def validate_image_attachment(raw_attachment: dict[str, Any] | None, *, max_byte
         }
 
     filename = os.path.basename(str(raw_attachment.get("name") or "turf-image"))
-    return {
-        "ok": True,
-        "attachment": {
-            "data_url": data_url,
-            "mime_type": mime_type,
-            "name": filename,
-            "size_bytes": len(decoded),
-        },
+    attachment = {
+        "data_url": data_url,
+        "mime_type": mime_type,
+        "name": filename,
+        "size_bytes": len(decoded),
     }
+    dhash = None
+    if preprocess:
+        prepared = prepare_image(mime_type, decoded)
+        dhash = prepared.dhash
+        if prepared.reencoded:
+            attachment.update({
+                "data_url": encode_data_url(prepared.mime_type, prepared.raw),
+                "mime_type": prepared.mime_type,
+                "size_bytes": len(prepared.raw),
+                "original_size_bytes": prepared.original_bytes,
+                "preprocessing": prepared.summary(),
+            })
+    if dhash is None:
+        dhash = image_hash(decoded)
+    if dhash is not None:
+        attachment["image_hash"] = f"{dhash:016x}"
+    return {"ok": True, "attachment": attachment}
 
 
 def answer_image_diagnosis(
@@ -115,8 +147,14 @@ def answer_image_diagnosis(
     openai_client: Any,
     *,
     model: str = "gpt-4o-mini",
+    cache_scope: str | None = None,
 ) -> dict[str, Any] | None:
-    """Use uploaded image evidence to strengthen diagnosis mode."""
+    """Use uploaded image evidence to strengthen diagnosis mode.
+
+    With a ``cache_scope`` (account or profile id), the vision analysis of a
+    perceptually matching earlier upload in that scope is reused and only the
+    diagnosis is rebuilt for the new question.
+    """
     if not image_attachment or not openai_client:
         return None
 
@@ -124,19 +162,34 @@ def answer_image_diagnosis(
     if question_text and _looks_like_label_only_question(question_text):
         return None
 
-    visual = _analyze_turf_image(question_text, image_attachment, openai_client, model=model)
+    cache = None
+    dhash = None
+    if cache_scope and image_attachment.get("image_hash"):
+        cache = get_image_analysis_cache()
+        dhash = int(image_attachment["image_hash"], 16)
+    cached = cache.find(cache_scope, dhash) if cache is not None else None
+    if cached:
+        visual, distance = cached
+        logger.info(f"Reusing image analysis {distance} bits from an earlier upload; vision call skipped")
+    else:
+        visual = _analyze_turf_image(question_text, image_attachment, openai_client, model=model)
+        if visual and cache is not None:
+            cache.add(cache_scope, dhash, visual)
     if not visual:
         return None
 
     if not visual.get("turf_related", True):
-        return _build_non_turf_response(visual, image_attachment)
+        response = _build_non_turf_response(visual, image_attachment)
+    else:
+        enhanced_question = _build_image_question(question_text, visual)
+        base_response = answer_advanced_diagnosis(enhanced_question, course_profile)
+        if not base_response:
+            base_response = answer_advanced_turf_science(enhanced_question, course_profile)
+        response = _build_image_response(base_response, visual, image_attachment)
 
-    enhanced_question = _build_image_question(question_text, visual)
-    base_response = answer_advanced_diagnosis(enhanced_question, course_profile)
-    if not base_response:
-        base_response = answer_advanced_turf_science(enhanced_question, course_profile)
-
-    return _build_image_response(base_response, visual, image_attachment)
+    if cached:
+        response.setdefault("image_diagnosis", {})["analysis_reused"] = True
+    return response
 
 
 def _build_image_response(
@@ -290,6 +343,7 @@ def _analyze_turf_image(question: str, image_attachment: dict[str, Any], openai_
         "Question context: "
         + (question or IMAGE_ONLY_DEFAULT_QUESTION)
     )
+    started = time.perf_counter()
     response = openai_client.chat.completions.create(
         model=model,
         temperature=0,
@@ -312,6 +366,13 @@ def _analyze_turf_image(question: str, image_attachment: dict[str, Any], openai_
             },
         ],
     )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    record_vision_latency(elapsed_ms)
+    preprocessing = image_attachment.get("preprocessing") or {}
+    logger.info(
+        f"Vision analysis took {elapsed_ms:.0f}ms for {image_attachment.get('size_bytes') or 0} bytes"
+        + (f" ({preprocessing['saved_bytes']} saved by preprocessing)" if preprocessing else "")
+    )
     try:
         content = response.choices[0].message.content or "{}"
     except (AttributeError, IndexError, KeyError, TypeError):
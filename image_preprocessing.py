@@ -0,0 +1,231 @@
+"""Shrink uploaded images to what the vision model can actually use.
+
+Phone photos arrive at 3-5 MB and 4000+ pixels a side, but the vision model
+scales every image to fit 2048x2048 and then to 768 pixels on the short side
+before tiling it, so anything larger only costs upload time and decode time.
+``prepare_image`` decodes the upload once, applies and drops the EXIF
+orientation (and with it GPS and camera metadata), resizes to those bounds and
+re-encodes at ``Config.IMAGE_PREPROCESS_QUALITY``. The result replaces the
+original for the vision call, the feedback thumbnail and blob storage.
+
+While the image is decoded it also gets a 64-bit difference hash
+(``perceptual_hash``), which ``cache.ImageAnalysisCache`` uses to recognise
+re-uploads and near-identical photos.
+
+``preprocessing_stats`` reports bytes and estimated vision tokens saved and
+vision latency per worker for ``/admin/perf``.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import math
+import time
+from dataclasses import dataclass
+from threading import Lock
+
+from config import Config
+
+try:  # pragma: no cover - Pillow is optional at runtime
+    from PIL import Image, ImageOps
+except Exception:  # pragma: no cover
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# OpenAI high-detail image handling: fit in 2048x2048, short side to 768, then
+# 512 px tiles at 170 tokens each plus a fixed 85.
+VISION_TILE_SIDE = 512
+VISION_TILE_TOKENS = 170
+VISION_BASE_TOKENS = 85
+_OUTPUT_FORMATS = {"jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    mime_type: str
+    raw: bytes
+    width: int
+    height: int
+    original_bytes: int
+    original_width: int
+    original_height: int
+    elapsed_ms: float
+    reencoded: bool
+    dhash: int | None = None
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_bytes - len(self.raw)
+
+    def summary(self) -> dict:
+        return {
+            "original_bytes": self.original_bytes,
+            "bytes": len(self.raw),
+            "saved_bytes": self.saved_bytes,
+            "original_size": [self.original_width, self.original_height],
+            "size": [self.width, self.height],
+            "vision_tokens_before": vision_image_tokens(self.original_width, self.original_height),
+            "vision_tokens_after": vision_image_tokens(self.width, self.height),
+            "reencoded": self.reencoded,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+        }
+
+
+def vision_target_size(width: int, height: int) -> tuple[int, int]:
+    """Largest size the vision model keeps for a ``width`` x ``height`` image."""
+    long_side, short_side = max(width, height), min(width, height)
+    scale = min(
+        1.0,
+        Config.IMAGE_VISION_MAX_LONG_SIDE / long_side if long_side else 1.0,
+        Config.IMAGE_VISION_MAX_SHORT_SIDE / short_side if short_side else 1.0,
+    )
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def vision_image_tokens(width: int, height: int) -> int:
+    """Estimated high-detail vision tokens for an image of this size."""
+    if width <= 0 or height <= 0:
+        return 0
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = math.ceil(width / VISION_TILE_SIDE) * math.ceil(height / VISION_TILE_SIDE)
+    return VISION_BASE_TOKENS + VISION_TILE_TOKENS * tiles
+
+
+def perceptual_hash(image) -> int:
+    """64-bit difference hash: one bit per horizontally adjacent pair of a 9x8 grayscale thumbnail."""
+    pixels = list(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] < pixels[row * 9 + col + 1])
+    return value
+
+
+def image_hash(raw: bytes) -> int | None:
+    """``perceptual_hash`` of encoded image bytes, or None without Pillow or for unreadable data."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(raw)) as image:
+            image.draft("L", (64, 64))
+            return perceptual_hash(_flatten(ImageOps.exif_transpose(image)))
+    except Exception:
+        return None
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return (left ^ right).bit_count()
+
+
+def prepare_image(mime_type: str, raw: bytes) -> PreparedImage:
+    """Downsize and re-encode ``raw`` for vision; the original comes back unchanged when that does not help."""
+    started = time.perf_counter()
+    unchanged = PreparedImage(mime_type, raw, 0, 0, len(raw), 0, 0, 0.0, False)
+    if Image is None or not Config.IMAGE_PREPROCESS:
+        return unchanged
+    image_format, output_mime = _OUTPUT_FORMATS.get(Config.IMAGE_PREPROCESS_FORMAT, _OUTPUT_FORMATS["jpeg"])
+    try:
+        with Image.open(io.BytesIO(raw)) as image:
+            original_size = image.size
+            has_metadata = bool(image.info.get("exif") or image.getexif())
+            # JPEG can decode straight to a 1/2, 1/4 or 1/8 scale, skipping most of the work.
+            image.draft("RGB", vision_target_size(*original_size))
+            image = ImageOps.exif_transpose(image)
+            target = vision_target_size(*_scaled(original_size, image.size))
+            if image.size != target:
+                image = image.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            image = _flatten(image)
+            dhash = perceptual_hash(image)
+            output = io.BytesIO()
+            image.save(output, format=image_format, quality=Config.IMAGE_PREPROCESS_QUALITY, optimize=True)
+            processed = output.getvalue()
+            size = image.size
+    except Exception as exc:
+        logger.debug(f"Image preprocessing skipped: {exc}")
+        return unchanged
+
+    resized = size != tuple(original_size) and size != tuple(reversed(original_size))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if len(processed) >= len(raw) and not resized and not has_metadata:
+        result = PreparedImage(mime_type, raw, *original_size, len(raw), *original_size, elapsed_ms, False, dhash)
+    else:
+        result = PreparedImage(output_mime, processed, *size, len(raw), *original_size, elapsed_ms, True, dhash)
+    _record_preprocessing(result)
+    return result
+
+
+def _scaled(original_size: tuple[int, int], size: tuple[int, int]) -> tuple[int, int]:
+    """Full-resolution size in the orientation of ``size`` (``draft`` may have shrunk it)."""
+    if (size[0] >= size[1]) == (original_size[0] >= original_size[1]):
+        return original_size
+    return original_size[1], original_size[0]
+
+
+def _flatten(image):
+    if image.mode in ("RGB", "L"):
+        return image
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+_stats_lock = Lock()
+_stats = {
+    "images": 0,
+    "reencoded": 0,
+    "original_bytes": 0,
+    "bytes": 0,
+    "vision_tokens_before": 0,
+    "vision_tokens_after": 0,
+    "preprocess_ms": 0.0,
+    "vision_calls": 0,
+    "vision_ms": 0.0,
+}
+
+
+def _record_preprocessing(result: PreparedImage) -> None:
+    summary = result.summary()
+    with _stats_lock:
+        _stats["images"] += 1
+        _stats["reencoded"] += int(result.reencoded)
+        _stats["original_bytes"] += result.original_bytes
+        _stats["bytes"] += len(result.raw)
+        _stats["vision_tokens_before"] += summary["vision_tokens_before"]
+        _stats["vision_tokens_after"] += summary["vision_tokens_after"]
+        _stats["preprocess_ms"] += result.elapsed_ms
+
+
+def record_vision_latency(elapsed_ms: float) -> None:
+    with _stats_lock:
+        _stats["vision_calls"] += 1
+        _stats["vision_ms"] += elapsed_ms
+
+
+def preprocessing_stats() -> dict:
+    """Bytes, estimated vision tokens and time spent on uploaded images in this worker."""
+    with _stats_lock:
+        stats = dict(_stats)
+    images, calls = stats["images"], stats["vision_calls"]
+    return {
+        "enabled": Image is not None and Config.IMAGE_PREPROCESS,
+        "format": Config.IMAGE_PREPROCESS_FORMAT,
+        "images": images,
+        "reencoded": stats["reencoded"],
+        "original_bytes": stats["original_bytes"],
+        "bytes": stats["bytes"],
+        "saved_bytes": stats["original_bytes"] - stats["bytes"],
+        "vision_tokens_before": stats["vision_tokens_before"],
+        "vision_tokens_after": stats["vision_tokens_after"],
+        "mean_preprocess_ms": round(stats["preprocess_ms"] / images, 1) if images else 0.0,
+        "vision_calls": calls,
+        "mean_vision_ms": round(stats["vision_ms"] / calls, 1) if calls else 0.0,
+    }
@@ -3,315 +3,150 @@ Knowledge base loader for structured turf management data.
 Provides quick lookup for products, diseases, and reference tables.
 """
 import json
-import os
 import logging
-import re
-from typing import Dict, Optional, List, Any
+import threading
+from dataclasses import dataclass
 from functools import lru_cache
+from typing import Dict, Optional, List, Any
 
-logger = logging.getLogger(__name__)
-
-KNOWLEDGE_DIR = os.path.join(os.path.dirname(__file__), 'knowledge')
-PRODUCT_OPTIONAL_FIELD_DEFAULTS = {
-    "rei": "",
-    "retreatment_interval": "",
-    "irrigation_guidance": "",
-    "rainfast": "",
-    "tank_mix_guidance": [],
-    "max_apps_per_year": "",
-    "max_rate_per_app": "",
-    "reseeding_interval": "",
-    "overseeding_interval": "",
-    "application_window_notes": "",
-}
-
+from constants import STRUCTURED_KB_CONTEXT_TOKENS
+from entity_matcher import EDGE, SUBSTRING, match_entities, register_vocabulary
+from knowledge_snapshot import (  # noqa: F401 - re-exported for existing importers
+    KNOWLEDGE_DIR,
+    PRODUCT_OPTIONAL_FIELD_DEFAULTS,
+    _normalize_product_schema,
+    get_knowledge_snapshot,
+    note_source_read,
+    register_snapshot_listener,
+)
+from token_accounting import count_chunk_tokens, truncate_to_tokens
 
-def _normalize_product_schema(products: Dict) -> Dict:
-    normalized = {}
-    for category, items in (products or {}).items():
-        normalized[category] = {}
-        for active_ingredient, info in (items or {}).items():
-            normalized_info = dict(info or {})
-            for field, default in PRODUCT_OPTIONAL_FIELD_DEFAULTS.items():
-                if field not in normalized_info:
-                    normalized_info[field] = list(default) if isinstance(default, list) else default
-            normalized[category][active_ingredient] = normalized_info
-    return normalized
+logger = logging.getLogger(__name__)
 
 
-@lru_cache(maxsize=1)
 def load_products() -> Dict:
     """Load the products knowledge base."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'products.json'), 'r') as f:
-            return _normalize_product_schema(json.load(f))
-    except Exception as e:
-        logger.error(f"Failed to load products.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('products')
 
 
-@lru_cache(maxsize=1)
 def load_diseases() -> Dict:
     """Load the diseases knowledge base."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'diseases.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load diseases.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('diseases')
 
 
-@lru_cache(maxsize=1)
 def load_weeds() -> Dict:
     """Load the weeds knowledge base."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'weeds.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load weeds.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('weeds')
 
 
-@lru_cache(maxsize=1)
 def load_pests() -> Dict:
     """Load the insect pests knowledge base."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'pests.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load pests.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('pests')
 
 
-@lru_cache(maxsize=1)
 def load_turfgrasses() -> Dict:
     """Load the turfgrass species knowledge base."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'turfgrasses.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load turfgrasses.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('turfgrasses')
 
 
-@lru_cache(maxsize=1)
 def load_abiotic_stress() -> Dict:
     """Load the abiotic stress and non-pest diagnosis knowledge base."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'abiotic_stress.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load abiotic_stress.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('abiotic_stress')
 
 
-@lru_cache(maxsize=1)
 def load_timing_windows() -> Dict:
     """Load timing window knowledge for seasonal turf decisions."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'timing_windows.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load timing_windows.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('timing_windows')
 
 
-@lru_cache(maxsize=1)
 def load_fertility_programs() -> Dict:
     """Load structured fertility-program knowledge."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'fertility_programs.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load fertility_programs.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('fertility_programs')
 
 
-@lru_cache(maxsize=1)
 def load_irrigation_programs() -> Dict:
     """Load structured irrigation-program knowledge."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'irrigation_programs.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load irrigation_programs.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('irrigation_programs')
 
 
-@lru_cache(maxsize=1)
 def load_cultivation_programs() -> Dict:
     """Load structured cultivation-program knowledge."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'cultivation_programs.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load cultivation_programs.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('cultivation_programs')
 
 
-@lru_cache(maxsize=1)
 def load_diagnostic_frameworks() -> Dict:
     """Load structured diagnostic frameworks for turf troubleshooting."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'diagnostic_frameworks.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load diagnostic_frameworks.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('diagnostic_frameworks')
 
 
-@lru_cache(maxsize=1)
 def load_mowing_programs() -> Dict:
     """Load structured mowing and rolling program knowledge."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'mowing_programs.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load mowing_programs.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('mowing_programs')
 
 
-@lru_cache(maxsize=1)
 def load_salinity_management() -> Dict:
     """Load structured salinity and EC management knowledge."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'salinity_management.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load salinity_management.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('salinity_management')
 
 
-@lru_cache(maxsize=1)
 def load_drainage_rootzone_programs() -> Dict:
     """Load structured drainage and rootzone-management knowledge."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'drainage_rootzone_programs.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load drainage_rootzone_programs.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('drainage_rootzone_programs')
 
 
-@lru_cache(maxsize=1)
 def load_overseeding_transition_programs() -> Dict:
     """Load structured overseeding and transition program knowledge."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'overseeding_transition_programs.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load overseeding_transition_programs.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('overseeding_transition_programs')
 
 
-@lru_cache(maxsize=1)
 def load_disease_ipm_playbooks() -> Dict:
     """Load structured disease IPM playbooks."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'disease_ipm_playbooks.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load disease_ipm_playbooks.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('disease_ipm_playbooks')
 
 
-@lru_cache(maxsize=1)
 def load_surface_management_recipes() -> Dict:
     """Load structured surface management recipes."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'surface_management_recipes.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load surface_management_recipes.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('surface_management_recipes')
 
 
-@lru_cache(maxsize=1)
 def load_climate_zone_playbooks() -> Dict:
     """Load structured climate-zone playbooks."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'climate_zone_playbooks.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load climate_zone_playbooks.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('climate_zone_playbooks')
 
 
-@lru_cache(maxsize=1)
 def load_tournament_prep_recovery() -> Dict:
     """Load structured tournament prep and recovery plans."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'tournament_prep_recovery.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load tournament_prep_recovery.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('tournament_prep_recovery')
 
 
-@lru_cache(maxsize=1)
 def load_nutrient_diagnostics() -> Dict:
     """Load structured nutrient-diagnostic knowledge."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'nutrient_diagnostics.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load nutrient_diagnostics.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('nutrient_diagnostics')
 
 
-@lru_cache(maxsize=1)
 def load_calibration_workflows() -> Dict:
     """Load structured sprayer and spreader calibration workflows."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'calibration_workflows.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load calibration_workflows.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('calibration_workflows')
 
 
-@lru_cache(maxsize=1)
 def load_seasonal_operating_plans() -> Dict:
     """Load structured seasonal operating plans."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'seasonal_operating_plans.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load seasonal_operating_plans.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('seasonal_operating_plans')
 
 
-@lru_cache(maxsize=1)
 def load_regional_pressure_calendars() -> Dict:
     """Load structured regional pest, weed, and disease pressure calendars."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'regional_pressure_calendars.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load regional_pressure_calendars.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('regional_pressure_calendars')
 
 
-@lru_cache(maxsize=1)
 def load_advanced_turf_science() -> Dict:
     """Load advanced turf science principles for physiology, soil physics, epidemiology, and playability."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'advanced_turf_science.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load advanced_turf_science.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('advanced_turf_science')
 
 
-@lru_cache(maxsize=1)
 def load_lookup_tables() -> Dict:
     """Load reference lookup tables."""
-    try:
-        with open(os.path.join(KNOWLEDGE_DIR, 'lookup_tables.json'), 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load lookup_tables.json: {e}")
-        return {}
+    return get_knowledge_snapshot().source('lookup_tables')
 
 
 def get_product_info(product_name: str) -> Optional[Dict]:
@@ -324,9 +159,16 @@ def get_product_info(product_name: str) -> Optional[Dict]:
     Returns:
         Product info dict or None if not found
     """
-    products = load_products()
+    snapshot = get_knowledge_snapshot()
+    products = snapshot.source('products')
     name_lower = product_name.lower()
-    
+
+    # Exact active ingredient or trade name: precomputed in the snapshot
+    ref = snapshot.product_ref(name_lower)
+    if ref:
+        category, ai_name = ref
+        return {'active_ingredient': ai_name, 'category': category, **products[category][ai_name]}
+
     # Search all product categories
     for category in ['fungicides', 'herbicides', 'insecticides', 'pgrs']:
         if category not in products:
@@ -1276,12 +1118,35 @@ def get_products_for_disease(disease_name: str) -> List[Dict]:
     return recommendations
 
 
+# Product fields added to the base summary when the question asks for them,
+# in summary order: (intent, trigger terms, fields).
+_PRODUCT_SUMMARY_INTENTS = (
+    ('rates', ('rate', 'rates', 'how much', 'per 1000', 'per acre', 'oz', 'lb/acre'), ('rates', 'max_rate_per_app')),
+    ('rei', ('rei', 're-entry', 'reentry'), ('rei',)),
+    ('retreatment', ('retreatment', 'retreat', 'again', 'interval', 'how soon'), ('retreatment_interval', 'max_apps_per_year')),
+    ('rainfast', ('rain', 'rainfast', 'water in', 'watering in', 'irrigation'), ('rainfast', 'irrigation_guidance')),
+    ('tank_mix', ('tank mix', 'tank-mix', 'mix', 'compatib'), ('tank_mix_guidance',)),
+    ('reseeding', ('reseed', 'reseeding', 'overseed', 'overseeding'), ('reseeding_interval', 'overseeding_interval')),
+    ('resistance', ('resistance', 'rotate', 'frac', 'hrac', 'irac'), ('resistance_risk', 'verification_status')),
+    ('target', ('what is', 'used for', 'control', 'target', 'good for'), ('rates', 'retreatment_interval')),
+)
+# Recommended products inside a disease fragment carry the "what is it used for" fields.
+_DISEASE_PRODUCT_INTENTS = ('target',)
+_TIMING_CONTEXT_TERMS = (
+    'when', 'timing', 'window', 'soil temp', 'soil temperature', 'schedule', 'preventive',
+    'pre-emergent', 'pre emergent', 'aerate', 'aeration',
+)
+
+
 def _question_wants(question_lower: str, *terms: str) -> bool:
     return any(term in question_lower for term in terms)
 
 
-def _question_aware_product_summary(product_name: str, category: str, info: Dict[str, Any], question_lower: str) -> Dict[str, Any]:
-    """Return only the product fields that are most useful for the current question."""
+def _product_summary_intents(question_lower: str) -> tuple:
+    return tuple(name for name, terms, _ in _PRODUCT_SUMMARY_INTENTS if _question_wants(question_lower, *terms))
+
+
+def _product_summary(product_name: str, category: str, info: Dict[str, Any], intents: tuple) -> Dict[str, Any]:
     summary: Dict[str, Any] = {
         'product_name': product_name,
         'category': category,
@@ -1306,744 +1171,659 @@ def _question_aware_product_summary(product_name: str, category: str, info: Dict
         summary['type'] = info.get('type', '')
         summary['note'] = info.get('note', '')
 
-    if _question_wants(question_lower, 'rate', 'rates', 'how much', 'per 1000', 'per acre', 'oz', 'lb/acre'):
-        summary['rates'] = info.get('rates', {})
-        summary['max_rate_per_app'] = info.get('max_rate_per_app', '')
-
-    if _question_wants(question_lower, 'rei', 're-entry', 'reentry'):
-        summary['rei'] = info.get('rei', '')
+    for intent, _, fields in _PRODUCT_SUMMARY_INTENTS:
+        if intent in intents:
+            for field in fields:
+                summary[field] = info.get(field)
 
-    if _question_wants(question_lower, 'retreatment', 'retreat', 'again', 'interval', 'how soon'):
-        summary['retreatment_interval'] = info.get('retreatment_interval', '')
-        summary['max_apps_per_year'] = info.get('max_apps_per_year', '')
+    return {key: value for key, value in summary.items() if value not in ("", [], {}, None)}
 
-    if _question_wants(question_lower, 'rain', 'rainfast', 'water in', 'watering in', 'irrigation'):
-        summary['rainfast'] = info.get('rainfast', '')
-        summary['irrigation_guidance'] = info.get('irrigation_guidance', '')
 
-    if _question_wants(question_lower, 'tank mix', 'tank-mix', 'mix', 'compatib'):
-        summary['tank_mix_guidance'] = info.get('tank_mix_guidance', [])
+def _question_aware_product_summary(product_name: str, category: str, info: Dict[str, Any], question_lower: str) -> Dict[str, Any]:
+    """Return only the product fields that are most useful for the current question."""
+    return _product_summary(product_name, category, info, _product_summary_intents(question_lower))
 
-    if _question_wants(question_lower, 'reseed', 'reseeding', 'overseed', 'overseeding'):
-        summary['reseeding_interval'] = info.get('reseeding_interval', '')
-        summary['overseeding_interval'] = info.get('overseeding_interval', '')
 
-    if _question_wants(question_lower, 'resistance', 'rotate', 'frac', 'hrac', 'irac'):
-        summary['resistance_risk'] = info.get('resistance_risk', '')
-        summary['verification_status'] = info.get('verification_status', '')
+@dataclass(frozen=True)
+class _ContextSection:
+    """A structured-KB source that contributes at most one fragment per question.
 
-    if _question_wants(question_lower, 'what is', 'used for', 'control', 'target', 'good for'):
-        summary['rates'] = info.get('rates', {})
-        summary['retreatment_interval'] = info.get('retreatment_interval', '')
+    ``aliases`` map question phrases to record keys and win in table order;
+    ``match_keys`` also matches record keys and their spaced display names,
+    in source order. Timing windows are scored instead of matched.
+    """
 
-    compact_summary = {}
-    for key, value in summary.items():
-        if value in ("", [], {}, None):
+    source: str
+    label: str
+    fields: tuple
+    aliases: Optional[Dict[str, str]] = None
+    match_keys: bool = False
+
+
+_CONTEXT_SECTIONS = (
+    _ContextSection(
+        'diseases',
+        '',
+        ('pathogen', 'environmental_triggers', 'cultural_control', 'chemical_control'),
+        match_keys=True,
+    ),
+    _ContextSection(
+        'weeds',
+        ' weed',
+        ('type', 'life_cycle', 'identification', 'timing', 'cultural_control', 'chemical_control'),
+        match_keys=True,
+    ),
+    _ContextSection(
+        'pests',
+        ' pest',
+        ('type', 'damage', 'scouting', 'cultural_control', 'chemical_control'),
+        aliases={
+            'grub': 'white_grubs',
+            'grubs': 'white_grubs',
+            'webworm': 'sod_webworms',
+            'webworms': 'sod_webworms',
+            'abw': 'annual_bluegrass_weevil',
+            'chinch bug': 'chinch_bugs',
+            'billbug': 'billbugs',
+            'cutworm': 'cutworms',
+        },
+        match_keys=True,
+    ),
+    _ContextSection(
+        'turfgrasses',
+        ' turfgrass',
+        ('season', 'primary_uses', 'strengths', 'weaknesses', 'management', 'diagnostic_notes'),
+        aliases={
+            'bentgrass': 'creeping_bentgrass',
+            'poa annua': 'annual_bluegrass',
+            'annual bluegrass': 'annual_bluegrass',
+            'kentucky bluegrass': 'kentucky_bluegrass',
+            'bluegrass': 'kentucky_bluegrass',
+            'kbg': 'kentucky_bluegrass',
+            'tall fescue': 'tall_fescue',
+            'fescue': 'tall_fescue',
+            'ryegrass': 'perennial_ryegrass',
+            'fine fescue': 'fine_fescue',
+            'bermuda': 'bermudagrass',
+            'bermudagrass': 'bermudagrass',
+            'zoysia': 'zoysiagrass',
+            'zoysiagrass': 'zoysiagrass',
+            'st augustine': 'st_augustinegrass',
+            'st. augustine': 'st_augustinegrass',
+            'centipede': 'centipedegrass',
+        },
+    ),
+    _ContextSection(
+        'abiotic_stress',
+        '',
+        ('category', 'common_sites', 'symptoms', 'diagnosis', 'management'),
+        aliases={
+            'localized dry spot': 'localized_dry_spot',
+            'dry spot': 'localized_dry_spot',
+            'lds': 'localized_dry_spot',
+            'heat stress': 'heat_stress',
+            'heat': 'heat_stress',
+            'drought': 'drought_stress',
+            'wilt': 'drought_stress',
+            'too wet': 'overwatering',
+            'overwater': 'overwatering',
+            'compaction': 'compaction',
+            'compact': 'compaction',
+            'shade': 'shade_stress',
+            'traffic': 'traffic_stress',
+            'wear': 'traffic_stress',
+            'scalp': 'scalping',
+            'scalping': 'scalping',
+            'herbicide injury': 'herbicide_injury',
+            'spray injury': 'herbicide_injury',
+            'fertilizer burn': 'fertilizer_burn',
+            'salt burn': 'fertilizer_burn',
+            'pgr stress': 'pgr_stress',
+            'black layer': 'black_layer',
+        },
+    ),
+    _ContextSection(
+        'timing_windows',
+        ' timing',
+        (
+            'topic', 'trigger', 'soil_temperature', 'air_temperature', 'primary_window', 'follow_up',
+            'related_targets', 'related_products', 'cautions',
+        ),
+    ),
+    _ContextSection(
+        'fertility_programs',
+        ' fertility',
+        (
+            'topic', 'primary_goal', 'suitable_sites', 'core_principles', 'benchmark_ranges', 'cautions',
+            'monitoring',
+        ),
+        aliases={
+            'spoon feeding': 'greens_spoon_feeding',
+            'spoon-feeding': 'greens_spoon_feeding',
+            'spoon feed': 'greens_spoon_feeding',
+            'fall nitrogen': 'cool_season_fall_nitrogen',
+            'summer nitrogen': 'warm_season_growth_season_nitrogen',
+            'potassium': 'sand_based_potassium_and_leaching',
+            'leaching': 'sand_based_potassium_and_leaching',
+            'iron': 'iron_color_vs_true_nitrogen_need',
+            'phosphorus': 'phosphorus_for_establishment_only',
+        },
+    ),
+    _ContextSection(
+        'irrigation_programs',
+        ' irrigation',
+        ('topic', 'primary_goal', 'triggers', 'program', 'monitoring', 'cautions'),
+        aliases={
+            'deficit irrigation': 'deficit_irrigation_greens',
+            'syring': 'syringing_for_canopy_cooling',
+            'hand water': 'hand_watering_hot_spots',
+            'wetting agent': 'wetting_agent_strategy_for_lds',
+            'deep and infrequent': 'fairway_deep_infrequent_irrigation',
+            'deep infrequent': 'fairway_deep_infrequent_irrigation',
+            'uniformity': 'irrigation_uniformity_audit',
+            'irrigation audit': 'irrigation_uniformity_audit',
+        },
+    ),
+    _ContextSection(
+        'cultivation_programs',
+        ' cultivation',
+        ('topic', 'primary_goal', 'timing', 'methods', 'expected_benefits', 'cautions'),
+        aliases={
+            'core aeration': 'core_aeration_greens',
+            'core aerate': 'core_aeration_greens',
+            'aerification': 'core_aeration_greens',
+            'venting': 'summer_venting_and_needle_tining',
+            'needle tine': 'summer_venting_and_needle_tining',
+            'topdress': 'frequent_light_topdressing',
+            'solid tine': 'solid_tining_and_root_pruning_balance',
+            'verticut': 'verticutting_and_grooming_management',
+            'grooming': 'verticutting_and_grooming_management',
+            'fairway cultivation': 'fairway_cultivation_and_topdressing',
+        },
+    ),
+    _ContextSection(
+        'diagnostic_frameworks',
+        ' diagnostic',
+        (
+            'problem_space', 'first_checks', 'differentials', 'confirmatory_signs', 'avoid_assumptions',
+            'escalation',
+        ),
+        aliases={
+            'wilt': 'wilt_vs_disease_on_greens',
+            'ring': 'ring_pattern_diagnostics',
+            'rootzone': 'rootzone_failure_framework',
+            'herbicide injury': 'herbicide_injury_framework',
+            'spray injury': 'herbicide_injury_framework',
+            'pgr stress': 'pgr_stress_framework',
+            'traffic': 'traffic_compaction_decline',
+            'compaction': 'traffic_compaction_decline',
+            'anthracnose': 'anthracnose_decline_framework',
+            'salt stress': 'salt_vs_drought_framework',
+            'salinity': 'salt_vs_drought_framework',
+            'spring dead spot': 'bermuda_spring_transition_failure',
+            'bermuda transition': 'bermuda_spring_transition_failure',
+            'slow green up': 'warm_season_slow_greenup_framework',
+            'slow green-up': 'warm_season_slow_greenup_framework',
+            'zoysia': 'warm_season_slow_greenup_framework',
+            'water quality': 'water_quality_chemistry_framework',
+            'reclaimed water': 'water_quality_chemistry_framework',
+            'alkalinity': 'water_quality_chemistry_framework',
+            'nematode sample': 'nematode_sampling_interpretation_framework',
+            'nematode assay': 'nematode_sampling_interpretation_framework',
+            'carryover': 'herbicide_carryover_framework',
+            'residual herbicide': 'herbicide_carryover_framework',
+            'grub damage': 'insect_feeding_pattern_framework',
+            'abw': 'insect_feeding_pattern_framework',
+            'webworm': 'insect_feeding_pattern_framework',
+            'cutworm': 'insect_feeding_pattern_framework',
+            'chinch bug': 'insect_feeding_pattern_framework',
+            'species fit': 'species_fit_renovation_framework',
+            'renovation': 'species_fit_renovation_framework',
+            'ryegrass hanging on': 'overseeded_transition_competition_framework',
+            'spring transition ryegrass': 'overseeded_transition_competition_framework',
+            'seedlings dying': 'seedling_establishment_failure_framework',
+            'establishment failure': 'seedling_establishment_failure_framework',
+        },
+    ),
+    _ContextSection(
+        'disease_ipm_playbooks',
+        ' playbook',
+        (
+            'topic', 'target_disease', 'high_risk_sites', 'scouting_focus', 'environmental_drivers',
+            'cultural_program', 'chemical_strategy', 'monitoring',
+        ),
+        aliases={
+            'dollar spot': 'dollar_spot_ipm',
+            'brown patch': 'brown_patch_ipm',
+            'pythium blight': 'pythium_blight_ipm',
+            'summer patch': 'summer_patch_ipm',
+            'anthracnose': 'anthracnose_ipm',
+            'fairy ring': 'fairy_ring_ipm',
+        },
+    ),
+    _ContextSection(
+        'surface_management_recipes',
+        ' recipe',
+        (
+            'surface', 'primary_goals', 'mowing_and_speed', 'water_management', 'fertility', 'cultivation',
+            'signature_risks',
+        ),
+        aliases={
+            'bentgrass greens': 'bentgrass_greens_recipe',
+            'poa greens': 'poa_annua_greens_recipe',
+            'bermudagrass fairways': 'bermudagrass_fairways_recipe',
+            'tall fescue sports turf': 'tall_fescue_sports_turf_recipe',
+            'zoysiagrass fairways': 'zoysiagrass_fairways_recipe',
+            'overseeded bermudagrass': 'ryegrass_overseeded_transition_recipe',
+            'spring transition': 'ryegrass_overseeded_transition_recipe',
+        },
+    ),
+    _ContextSection(
+        'mowing_programs',
+        ' mowing',
+        (
+            'topic', 'primary_goal', 'suitable_sites', 'core_principles', 'benchmark_ranges', 'cautions',
+            'monitoring',
+        ),
+        aliases={
+            'rolling': 'rolling_frequency_under_stress',
+            'green speed': 'greens_mowing_and_rolling_balance',
+            'tournament speed': 'tournament_speed_tradeoffs',
+            'scalp': 'scalping_prevention_program',
+            'fairway mowing': 'fairway_mowing_frequency_management',
+            'rough mowing': 'rough_mowing_and_clipping_management',
+        },
+    ),
+    _ContextSection(
+        'salinity_management',
+        ' salinity',
+        (
+            'topic', 'primary_goal', 'suitable_sites', 'core_principles', 'benchmark_ranges', 'cautions',
+            'monitoring',
+        ),
+        aliases={
+            'ec': 'ec_monitoring_program',
+            'salinity': 'salt_stress_diagnostics',
+            'salt stress': 'salt_stress_diagnostics',
+            'leaching': 'leaching_program_for_salts',
+            'sodium': 'sodium_hazard_and_structure_loss',
+            'reclaimed water': 'reclaimed_water_management',
+            'gypsum': 'gypsum_and_amendment_decision_tree',
+        },
+    ),
+    _ContextSection(
+        'drainage_rootzone_programs',
+        ' drainage',
+        ('topic', 'triggers', 'program', 'monitoring', 'cautions'),
+        aliases={
+            'surface drainage': 'surface_drainage_correction',
+            'subsurface drainage': 'subsurface_drainage_evaluation',
+            'perched water': 'layering_and_perched_water_table',
+            'layering': 'layering_and_perched_water_table',
+            'organic matter': 'organic_matter_profile_management',
+            'black layer': 'black_layer_prevention_program',
+            'construction mismatch': 'construction_profile_mismatch',
+        },
+    ),
+    _ContextSection(
+        'overseeding_transition_programs',
+        ' overseeding',
+        (
+            'topic', 'primary_goal', 'suitable_sites', 'core_principles', 'benchmark_ranges', 'cautions',
+            'monitoring',
+        ),
+        aliases={
+            'overseed': 'bermudagrass_overseeding_window',
+            'overseeding': 'bermudagrass_overseeding_window',
+            'transition': 'spring_transition_acceleration',
+            'seedhead suppression': 'poa_annua_seedhead_suppression_program',
+            'seedhead': 'poa_annua_seedhead_suppression_program',
+            'establishment restriction': 'cool_season_overseeding_restrictions',
+            'mowing seedlings': 'overseed_mowing_and_establishment',
+            'transition failure': 'transition_failure_diagnostics',
+        },
+    ),
+    _ContextSection(
+        'climate_zone_playbooks',
+        ' climate',
+        (
+            'topic', 'climate_profile', 'best_fit_surfaces', 'seasonal_priorities', 'signature_risks',
+            'management_biases', 'watchouts',
+        ),
+        aliases={
+            'transition zone': 'humid_transition_zone_cool_season',
+            'humid transition zone': 'humid_transition_zone_cool_season',
+            'northern cool season': 'northern_cool_season_intensive',
+            'arid west': 'arid_west_warm_season',
+            'desert': 'arid_west_warm_season',
+            'humid southeast': 'humid_southeast_warm_season',
+            'coastal': 'marine_cool_season_coastal',
+            'marine climate': 'marine_cool_season_coastal',
+            'upper midwest': 'upper_midwest_winter_stress',
+            'winter stress': 'upper_midwest_winter_stress',
+        },
+    ),
+    _ContextSection(
+        'tournament_prep_recovery',
+        ' tournament',
+        (
+            'topic', 'objective', 'prep_window', 'prep_steps', 'during_event', 'recovery_steps',
+            'failure_modes',
+        ),
+        aliases={
+            'green speed': 'greens_speed_ramp_plan',
+            'speed ramp': 'greens_speed_ramp_plan',
+            'firmness': 'firmness_and_moisture_tournament_plan',
+            'moisture plan': 'firmness_and_moisture_tournament_plan',
+            'fairway presentation': 'fairway_tournament_presentation_plan',
+            'event recovery greens': 'event_recovery_greens_plan',
+            'event recovery fairway': 'event_recovery_fairway_plan',
+            'weather disruption': 'weather_disruption_event_plan',
+            'tournament weather': 'weather_disruption_event_plan',
+        },
+    ),
+    _ContextSection(
+        'nutrient_diagnostics',
+        ' nutrient',
+        (
+            'topic', 'symptom_profile', 'common_confusions', 'high_risk_sites', 'confirmation_steps',
+            'response_strategy',
+        ),
+        aliases={
+            'nitrogen deficiency': 'nitrogen_deficiency',
+            'n deficiency': 'nitrogen_deficiency',
+            'potassium deficiency': 'potassium_deficiency',
+            'k deficiency': 'potassium_deficiency',
+            'iron deficiency': 'iron_deficiency_or_color_loss',
+            'color loss': 'iron_deficiency_or_color_loss',
+            'phosphorus deficiency': 'phosphorus_deficiency_or_establishment_issue',
+            'p deficiency': 'phosphorus_deficiency_or_establishment_issue',
+            'micronutrient lockout': 'micronutrient_lockout_high_ph',
+            'high ph chlorosis': 'micronutrient_lockout_high_ph',
+            'fertilizer burn': 'salt_or_fertilizer_burn_diagnostics',
+            'salt burn': 'salt_or_fertilizer_burn_diagnostics',
+        },
+    ),
+    _ContextSection(
+        'calibration_workflows',
+        ' calibration',
+        ('topic', 'objective', 'when_to_use', 'key_steps', 'common_failures', 'documents_to_check'),
+        aliases={
+            'sprayer output': 'sprayer_output_verification',
+            'sprayer calibration': 'sprayer_output_verification',
+            'mixing sequence': 'sprayer_mixing_sequence_workflow',
+            'tank mixing': 'sprayer_mixing_sequence_workflow',
+            'spreader pattern': 'spreader_pattern_testing',
+            'granular conversion': 'granular_rate_per_1000_conversion',
+            'per 1000 conversion': 'granular_rate_per_1000_conversion',
+            'travel speed': 'travel_speed_checkpoint_workflow',
+            'speed check': 'travel_speed_checkpoint_workflow',
+            'recordkeeping': 'recordkeeping_and_post_application_review',
+            'post application review': 'recordkeeping_and_post_application_review',
+        },
+    ),
+    _ContextSection(
+        'seasonal_operating_plans',
+        ' seasonal plan',
+        (
+            'topic', 'best_fit_surfaces', 'spring_priorities', 'summer_priorities', 'fall_priorities',
+            'winter_priorities', 'key_metrics', 'watchouts',
+        ),
+        aliases={
+            'transition zone': 'cool_season_transition_zone_calendar',
+            'cool-season transition zone': 'cool_season_transition_zone_calendar',
+            'northern cool season': 'northern_cool_season_calendar',
+            'southeast warm season': 'warm_season_southeast_calendar',
+            'warm-season southeast': 'warm_season_southeast_calendar',
+            'arid west bermudagrass': 'arid_west_bermudagrass_calendar',
+        },
+    ),
+    _ContextSection(
+        'regional_pressure_calendars',
+        ' pressure',
+        (
+            'topic', 'region', 'spring_pressures', 'summer_pressures', 'fall_pressures', 'winter_pressures',
+            'key_targets', 'scouting_focus', 'timing_biases',
+        ),
+        aliases={
+            'transition zone pressure': 'transition_zone_cool_season_pressure',
+            'cool-season transition pressure': 'transition_zone_cool_season_pressure',
+            'northern cool season pressure': 'northern_cool_season_pressure',
+            'southeast warm season pressure': 'southeast_warm_season_pressure',
+            'arid west bermudagrass pressure': 'arid_west_bermudagrass_pressure',
+            'pressure calendar': 'transition_zone_cool_season_pressure',
+        },
+    ),
+    _ContextSection(
+        'advanced_turf_science',
+        ' advanced science',
+        (
+            'domain', 'principle', 'mechanisms', 'field_indicators', 'decision_rules',
+            'management_implications', 'benchmark_ranges', 'cautions', 'source_basis',
+        ),
+        aliases={
+            'carbohydrate': 'cool_season_heat_carbohydrate_decline',
+            'carbohydrate reserves': 'cool_season_heat_carbohydrate_decline',
+            'heat stress physiology': 'cool_season_heat_carbohydrate_decline',
+            'root respiration': 'root_respiration_oxygen_balance',
+            'oxygen balance': 'root_respiration_oxygen_balance',
+            'air filled porosity': 'usga_rootzone_porosity_hydraulic_conductivity',
+            'air-filled porosity': 'usga_rootzone_porosity_hydraulic_conductivity',
+            'hydraulic conductivity': 'usga_rootzone_porosity_hydraulic_conductivity',
+            'rootzone porosity': 'usga_rootzone_porosity_hydraulic_conductivity',
+            'organic matter physics': 'surface_organic_matter_physics',
+            'surface organic matter': 'surface_organic_matter_physics',
+            'perched water': 'perched_water_layering_diagnostics',
+            'layering': 'perched_water_layering_diagnostics',
+            'disease triangle': 'disease_triangle_leaf_wetness_microclimate',
+            'leaf wetness': 'disease_triangle_leaf_wetness_microclimate',
+            'dollar spot epidemiology': 'dollar_spot_epidemiology_nitrogen_leaf_wetness',
+            'brown patch epidemiology': 'brown_patch_rhizoctonia_heat_humidity',
+            'pgr rebound': 'pgr_growth_suppression_thermal_rebound',
+            'growth potential': 'pgr_growth_suppression_thermal_rebound',
+            'deficit irrigation': 'et_deficit_irrigation_syringing',
+            'syringing': 'et_deficit_irrigation_syringing',
+            'hydrophobicity': 'localized_dry_spot_hydrophobicity',
+            'firmness': 'firmness_green_speed_plant_health_tradeoff',
+            'green speed': 'firmness_green_speed_plant_health_tradeoff',
+            'traffic recovery': 'traffic_recovery_carbohydrate_growth_rate',
+            'winter injury': 'winter_crown_hydration_freeze_injury',
+            'crown hydration': 'winter_crown_hydration_freeze_injury',
+            'freeze injury': 'winter_crown_hydration_freeze_injury',
+            'shade physiology': 'shade_light_carbohydrate_morphology',
+            'low light': 'shade_light_carbohydrate_morphology',
+            'nitrogen form': 'nitrogen_form_release_growth_stress_balance',
+            'slow release nitrogen': 'nitrogen_form_release_growth_stress_balance',
+            'salinity stress': 'salinity_osmotic_sodium_structure_stress',
+            'sodium hazard': 'salinity_osmotic_sodium_structure_stress',
+            'osmotic drought': 'salinity_osmotic_sodium_structure_stress',
+            'nematode': 'nematode_root_pruning_stress_complex',
+            'nematodes': 'nematode_root_pruning_stress_complex',
+            'root pruning': 'nematode_root_pruning_stress_complex',
+            'poa annua decline': 'poa_annua_vs_bentgrass_summer_decline',
+            'poa decline': 'poa_annua_vs_bentgrass_summer_decline',
+            'decline faster than bentgrass': 'poa_annua_vs_bentgrass_summer_decline',
+            'wetting agent chemistry': 'wetting_agent_chemistry_functional_groups',
+            'surfactant chemistry': 'wetting_agent_chemistry_functional_groups',
+            'bicarbonate': 'bicarbonate_alkalinity_micronutrient_lockout',
+            'bicarbonates': 'bicarbonate_alkalinity_micronutrient_lockout',
+            'alkalinity': 'bicarbonate_alkalinity_micronutrient_lockout',
+            'micronutrient lockout': 'bicarbonate_alkalinity_micronutrient_lockout',
+            'pythium root dysfunction': 'pythium_root_dysfunction_vs_wet_wilt',
+            'pythium root rot': 'pythium_root_dysfunction_vs_wet_wilt',
+            'pythium vs wet wilt': 'pythium_root_dysfunction_vs_wet_wilt',
+            'growing degree days': 'gdd_growth_potential_pgr_timing',
+            'gdd': 'gdd_growth_potential_pgr_timing',
+            'pgr timing': 'gdd_growth_potential_pgr_timing',
+        },
+    ),
+)
+
+
+_context_fragments: Optional[Dict[tuple, str]] = None
+_context_fragments_lock = threading.Lock()
+
+
+def _render_fragment(label: str, summary: Dict[str, Any], max_tokens: int) -> str:
+    """Compact JSON fragment, dropping trailing fields until it fits ``max_tokens``."""
+    summary = {key: value for key, value in summary.items() if value not in ("", [], {}, None)}
+    while True:
+        fragment = f"[Knowledge Base - {label}]: {json.dumps(summary, ensure_ascii=False, separators=(', ', ': '))}"
+        if count_chunk_tokens(fragment) <= max_tokens:
+            return fragment
+        if len(summary) <= 1:
+            return truncate_to_tokens(fragment, max_tokens)
+        summary.pop(next(reversed(summary)))
+
+
+def _section_summary(section: _ContextSection, info: Dict[str, Any]) -> Dict[str, Any]:
+    summary = {field: info.get(field) for field in section.fields}
+    if section.source == 'diseases':
+        summary['recommended_product_details'] = [
+            _product_summary(product['active_ingredient'], product['category'], product, _DISEASE_PRODUCT_INTENTS)
+            for product in (get_product_info(name) for name in (info.get('chemical_control') or {}).get('top_products', []))
+            if product
+        ]
+    return summary
+
+
+def build_context_fragments(max_tokens: int = STRUCTURED_KB_CONTEXT_TOKENS) -> Dict[tuple, str]:
+    """Render every section record of the current snapshot, keyed by ``(source, key)``."""
+    snapshot = get_knowledge_snapshot()
+    fragments = {}
+    for section in _CONTEXT_SECTIONS:
+        for key, info in snapshot.source(section.source).items():
+            label = f"{key.replace('_', ' ')}{section.label}"
+            fragments[(section.source, key)] = _render_fragment(label, _section_summary(section, info), max_tokens)
+    return fragments
+
+
+def _structured_context_fragments() -> Dict[tuple, str]:
+    global _context_fragments
+    fragments = _context_fragments
+    if fragments is not None:
+        return fragments
+    with _context_fragments_lock:
+        if _context_fragments is None:
+            _context_fragments = build_context_fragments()
+        return _context_fragments
+
+
+@lru_cache(maxsize=512)
+def _product_fragment(category: str, ai_name: str, label: str, intents: tuple) -> str:
+    info = load_products()[category][ai_name]
+    return _render_fragment(label, _product_summary(label, category, info, intents), STRUCTURED_KB_CONTEXT_TOKENS)
+
+
+@register_snapshot_listener
+def _reset_context_fragments(_snapshot=None) -> None:
+    """Re-render context fragments from the next snapshot after a KB reload."""
+    global _context_fragments
+    with _context_fragments_lock:
+        _context_fragments = None
+    _product_fragment.cache_clear()
+
+
+def _context_vocabulary():
+    snapshot = get_knowledge_snapshot()
+    for section in _CONTEXT_SECTIONS:
+        kind = f'kb_context:{section.source}'
+        aliases = section.aliases or {}
+        for rank, (alias, key) in enumerate(aliases.items()):
+            yield kind, alias, (rank, key), SUBSTRING
+        if section.match_keys:
+            for rank, key in enumerate(snapshot.source(section.source), start=len(aliases)):
+                yield kind, key.replace('_', ' '), (rank, key), SUBSTRING
+                yield kind, key, (rank, key), SUBSTRING
+    products = snapshot.source('products')
+    for category_rank, category in enumerate(['fungicides', 'herbicides', 'insecticides', 'pgrs']):
+        for product_rank, (ai_name, info) in enumerate(products.get(category, {}).items()):
+            yield 'kb_context:product', ai_name, (category_rank, product_rank, -1, category, ai_name, ai_name), SUBSTRING
+            for trade_rank, trade in enumerate(info.get('trade_names', [])):
+                yield 'kb_context:product', trade, (category_rank, product_rank, trade_rank, category, ai_name, trade), SUBSTRING
+
+
+register_vocabulary('knowledge_base_context', _context_vocabulary)
+
+
+def _product_context_parts(question_lower: str, hits) -> List[str]:
+    """One fragment per mentioned product; an active-ingredient hit ends its category."""
+    parts = []
+    intents = _product_summary_intents(question_lower)
+    finished_categories = set()
+    seen_products = set()
+    for _, _, trade_rank, category, ai_name, label in sorted(hits.values('kb_context:product')):
+        if category in finished_categories or (category, ai_name) in seen_products:
             continue
-        compact_summary[key] = value
-
-    return compact_summary
+        seen_products.add((category, ai_name))
+        note_source_read('products')
+        parts.append(_product_fragment(category, ai_name, label, intents))
+        if trade_rank < 0:
+            finished_categories.add(category)
+    return parts
+
+
+def _timing_window_key(question_lower: str) -> Optional[str]:
+    # Only timing-oriented questions get a window so broad target mentions do
+    # not overfill prompts.
+    if not _question_wants(question_lower, *_TIMING_CONTEXT_TERMS):
+        return None
+    best_key, best_score = None, 0
+    for timing_key, info in load_timing_windows().items():
+        score = _timing_window_score(question_lower, timing_key, info)
+        if score > best_score:
+            best_key, best_score = timing_key, score
+    return best_key
+
+
+def _pack_context_parts(parts: List[str], max_tokens: int) -> str:
+    """Keep whole fragments in order, skipping any that would overrun ``max_tokens``."""
+    packed = []
+    used = 0
+    for part in parts:
+        cost = count_chunk_tokens(part) + (1 if packed else 0)
+        if used + cost > max_tokens:
+            continue
+        packed.append(part)
+        used += cost
+    return '\n\n'.join(packed)
 
 
-def build_context_from_knowledge(question: str) -> str:
+def build_context_from_knowledge(question: str, max_tokens: Optional[int] = None) -> str:
     """
     Build additional context from knowledge base based on question content.
-    
+
+    Mentioned entities come from one shared matcher pass; each contributes its
+    fragment pre-rendered for the current KB generation. With ``max_tokens``,
+    whole fragments are packed in section order until the budget is used.
+
     Args:
         question: User's question
-        
+        max_tokens: Optional prompt-token budget for the joined fragments
+
     Returns:
         Additional context string to append to RAG context
     """
-    context_parts = []
     question_lower = question.lower()
-    
-    # Check for product mentions
-    products = load_products()
-    for category in ['fungicides', 'herbicides', 'insecticides', 'pgrs']:
-        if category not in products:
-            continue
-        for ai_name, info in products[category].items():
-            if ai_name in question_lower:
-                summary = _question_aware_product_summary(ai_name, category, info, question_lower)
-                context_parts.append(f"[Knowledge Base - {ai_name}]: {json.dumps(summary, indent=2)}")
-                break
-            for trade in info.get('trade_names', []):
-                if trade.lower() in question_lower:
-                    summary = _question_aware_product_summary(trade, category, info, question_lower)
-                    context_parts.append(f"[Knowledge Base - {trade}]: {json.dumps(summary, indent=2)}")
-                    break
-    
-    # Check for disease mentions
-    diseases = load_diseases()
-    for disease_name, info in diseases.items():
-        display_name = disease_name.replace('_', ' ')
-        if display_name in question_lower or disease_name in question_lower:
-            # Include only key information to avoid context bloat
-            summary = {
-                'pathogen': info.get('pathogen'),
-                'environmental_triggers': info.get('environmental_triggers'),
-                'cultural_control': info.get('cultural_control'),
-                'chemical_control': info.get('chemical_control'),
-                'recommended_product_details': get_products_for_disease(display_name)
-            }
-            context_parts.append(f"[Knowledge Base - {display_name}]: {json.dumps(summary, indent=2)}")
-            break
-
-    # Check for weed mentions
-    weeds = load_weeds()
-    for weed_name, info in weeds.items():
-        display_name = weed_name.replace('_', ' ')
-        if display_name in question_lower or weed_name in question_lower:
-            summary = {
-                'type': info.get('type'),
-                'life_cycle': info.get('life_cycle'),
-                'identification': info.get('identification'),
-                'timing': info.get('timing'),
-                'cultural_control': info.get('cultural_control'),
-                'chemical_control': info.get('chemical_control'),
-            }
-            context_parts.append(f"[Knowledge Base - {display_name} weed]: {json.dumps(summary, indent=2)}")
-            break
-
-    # Check for insect pest mentions
-    pests = load_pests()
-    pest_aliases = {
-        'grub': 'white_grubs',
-        'grubs': 'white_grubs',
-        'webworm': 'sod_webworms',
-        'webworms': 'sod_webworms',
-        'abw': 'annual_bluegrass_weevil',
-        'chinch bug': 'chinch_bugs',
-        'billbug': 'billbugs',
-        'cutworm': 'cutworms',
-    }
-    for alias, pest_key in pest_aliases.items():
-        if alias in question_lower and pest_key in pests:
-            info = pests[pest_key]
-            summary = {
-                'type': info.get('type'),
-                'damage': info.get('damage'),
-                'scouting': info.get('scouting'),
-                'cultural_control': info.get('cultural_control'),
-                'chemical_control': info.get('chemical_control'),
-            }
-            context_parts.append(f"[Knowledge Base - {pest_key.replace('_', ' ')} pest]: {json.dumps(summary, indent=2)}")
-            break
-    else:
-        for pest_name, info in pests.items():
-            display_name = pest_name.replace('_', ' ')
-            if display_name in question_lower or pest_name in question_lower:
-                summary = {
-                    'type': info.get('type'),
-                    'damage': info.get('damage'),
-                    'scouting': info.get('scouting'),
-                    'cultural_control': info.get('cultural_control'),
-                    'chemical_control': info.get('chemical_control'),
-                }
-                context_parts.append(f"[Knowledge Base - {display_name} pest]: {json.dumps(summary, indent=2)}")
+    hits = match_entities(question_lower)
+    fragments = _structured_context_fragments()
+    context_parts = _product_context_parts(question_lower, hits)
+
+    for section in _CONTEXT_SECTIONS:
+        if section.source == 'timing_windows':
+            candidates = [(0, _timing_window_key(question_lower))]
+        else:
+            candidates = sorted(hits.values(f'kb_context:{section.source}'))
+        for _, key in candidates:
+            fragment = fragments.get((section.source, key))
+            if fragment:
+                note_source_read(section.source)
+                context_parts.append(fragment)
                 break
 
-    # Check for turfgrass species mentions
-    turfgrasses = load_turfgrasses()
-    turf_aliases = {
-        'bentgrass': 'creeping_bentgrass',
-        'poa annua': 'annual_bluegrass',
-        'annual bluegrass': 'annual_bluegrass',
-        'kentucky bluegrass': 'kentucky_bluegrass',
-        'bluegrass': 'kentucky_bluegrass',
-        'kbg': 'kentucky_bluegrass',
-        'tall fescue': 'tall_fescue',
-        'fescue': 'tall_fescue',
-        'ryegrass': 'perennial_ryegrass',
-        'fine fescue': 'fine_fescue',
-        'bermuda': 'bermudagrass',
-        'bermudagrass': 'bermudagrass',
-        'zoysia': 'zoysiagrass',
-        'zoysiagrass': 'zoysiagrass',
-        'st augustine': 'st_augustinegrass',
-        'st. augustine': 'st_augustinegrass',
-        'centipede': 'centipedegrass',
-    }
-    for alias, turf_key in turf_aliases.items():
-        if alias in question_lower and turf_key in turfgrasses:
-            info = turfgrasses[turf_key]
-            summary = {
-                'season': info.get('season'),
-                'primary_uses': info.get('primary_uses'),
-                'strengths': info.get('strengths'),
-                'weaknesses': info.get('weaknesses'),
-                'management': info.get('management'),
-                'diagnostic_notes': info.get('diagnostic_notes'),
-            }
-            context_parts.append(f"[Knowledge Base - {turf_key.replace('_', ' ')} turfgrass]: {json.dumps(summary, indent=2)}")
-            break
-
-    # Check for abiotic/non-pest stress mentions
-    stresses = load_abiotic_stress()
-    stress_aliases = {
-        'localized dry spot': 'localized_dry_spot',
-        'dry spot': 'localized_dry_spot',
-        'lds': 'localized_dry_spot',
-        'heat stress': 'heat_stress',
-        'heat': 'heat_stress',
-        'drought': 'drought_stress',
-        'wilt': 'drought_stress',
-        'too wet': 'overwatering',
-        'overwater': 'overwatering',
-        'compaction': 'compaction',
-        'compact': 'compaction',
-        'shade': 'shade_stress',
-        'traffic': 'traffic_stress',
-        'wear': 'traffic_stress',
-        'scalp': 'scalping',
-        'scalping': 'scalping',
-        'herbicide injury': 'herbicide_injury',
-        'spray injury': 'herbicide_injury',
-        'fertilizer burn': 'fertilizer_burn',
-        'salt burn': 'fertilizer_burn',
-        'pgr stress': 'pgr_stress',
-        'black layer': 'black_layer',
-    }
-    for alias, stress_key in stress_aliases.items():
-        if alias in question_lower and stress_key in stresses:
-            info = stresses[stress_key]
-            summary = {
-                'category': info.get('category'),
-                'common_sites': info.get('common_sites'),
-                'symptoms': info.get('symptoms'),
-                'diagnosis': info.get('diagnosis'),
-                'management': info.get('management'),
-            }
-            context_parts.append(f"[Knowledge Base - {stress_key.replace('_', ' ')}]: {json.dumps(summary, indent=2)}")
-            break
-
-    # Check for seasonal timing windows. Only add this context when the question
-    # is actually timing-oriented so broad target mentions do not overfill prompts.
-    if any(term in question_lower for term in ['when', 'timing', 'window', 'soil temp', 'soil temperature', 'schedule', 'preventive', 'pre-emergent', 'pre emergent', 'aerate', 'aeration']):
-        timing_windows = load_timing_windows()
-        timing_matches = []
-        for timing_key, info in timing_windows.items():
-            score = _timing_window_score(question_lower, timing_key, info)
-            if score:
-                timing_matches.append((score, timing_key, info))
-        if timing_matches:
-            _, timing_key, info = sorted(timing_matches, key=lambda item: item[0], reverse=True)[0]
-            summary = {
-                'topic': info.get('topic'),
-                'trigger': info.get('trigger'),
-                'soil_temperature': info.get('soil_temperature'),
-                'air_temperature': info.get('air_temperature'),
-                'primary_window': info.get('primary_window'),
-                'follow_up': info.get('follow_up'),
-                'related_targets': info.get('related_targets'),
-                'related_products': info.get('related_products'),
-                'cautions': info.get('cautions'),
-            }
-            context_parts.append(f"[Knowledge Base - {timing_key.replace('_', ' ')} timing]: {json.dumps(summary, indent=2)}")
-
-    # Check for fertility-program topics.
-    fertility_aliases = {
-        'spoon feeding': 'greens_spoon_feeding',
-        'spoon-feeding': 'greens_spoon_feeding',
-        'spoon feed': 'greens_spoon_feeding',
-        'fall nitrogen': 'cool_season_fall_nitrogen',
-        'summer nitrogen': 'warm_season_growth_season_nitrogen',
-        'potassium': 'sand_based_potassium_and_leaching',
-        'leaching': 'sand_based_potassium_and_leaching',
-        'iron': 'iron_color_vs_true_nitrogen_need',
-        'phosphorus': 'phosphorus_for_establishment_only',
-    }
-    for alias, program_key in fertility_aliases.items():
-        if alias in question_lower and program_key in load_fertility_programs():
-            info = load_fertility_programs()[program_key]
-            summary = {
-                'topic': info.get('topic'),
-                'primary_goal': info.get('primary_goal'),
-                'suitable_sites': info.get('suitable_sites'),
-                'core_principles': info.get('core_principles'),
-                'benchmark_ranges': info.get('benchmark_ranges'),
-                'cautions': info.get('cautions'),
-                'monitoring': info.get('monitoring'),
-            }
-            context_parts.append(f"[Knowledge Base - {program_key.replace('_', ' ')} fertility]: {json.dumps(summary, indent=2)}")
-            break
-
-    # Check for irrigation-program topics.
-    irrigation_aliases = {
-        'deficit irrigation': 'deficit_irrigation_greens',
-        'syring': 'syringing_for_canopy_cooling',
-        'hand water': 'hand_watering_hot_spots',
-        'wetting agent': 'wetting_agent_strategy_for_lds',
-        'deep and infrequent': 'fairway_deep_infrequent_irrigation',
-        'deep infrequent': 'fairway_deep_infrequent_irrigation',
-        'uniformity': 'irrigation_uniformity_audit',
-        'irrigation audit': 'irrigation_uniformity_audit',
-    }
-    for alias, program_key in irrigation_aliases.items():
-        if alias in question_lower and program_key in load_irrigation_programs():
-            info = load_irrigation_programs()[program_key]
-            summary = {
-                'topic': info.get('topic'),
-                'primary_goal': info.get('primary_goal'),
-                'triggers': info.get('triggers'),
-                'program': info.get('program'),
-                'monitoring': info.get('monitoring'),
-                'cautions': info.get('cautions'),
-            }
-            context_parts.append(f"[Knowledge Base - {program_key.replace('_', ' ')} irrigation]: {json.dumps(summary, indent=2)}")
-            break
-
-    # Check for cultivation-program topics.
-    cultivation_aliases = {
-        'core aeration': 'core_aeration_greens',
-        'core aerate': 'core_aeration_greens',
-        'aerification': 'core_aeration_greens',
-        'venting': 'summer_venting_and_needle_tining',
-        'needle tine': 'summer_venting_and_needle_tining',
-        'topdress': 'frequent_light_topdressing',
-        'solid tine': 'solid_tining_and_root_pruning_balance',
-        'verticut': 'verticutting_and_grooming_management',
-        'grooming': 'verticutting_and_grooming_management',
-        'fairway cultivation': 'fairway_cultivation_and_topdressing',
-    }
-    for alias, program_key in cultivation_aliases.items():
-        if alias in question_lower and program_key in load_cultivation_programs():
-            info = load_cultivation_programs()[program_key]
-            summary = {
-                'topic': info.get('topic'),
-                'primary_goal': info.get('primary_goal'),
-                'timing': info.get('timing'),
-                'methods': info.get('methods'),
-                'expected_benefits': info.get('expected_benefits'),
-                'cautions': info.get('cautions'),
-            }
-            context_parts.append(f"[Knowledge Base - {program_key.replace('_', ' ')} cultivation]: {json.dumps(summary, indent=2)}")
-            break
-
-    # Check for diagnostic-framework topics.
-    diagnostic_aliases = {
-        'wilt': 'wilt_vs_disease_on_greens',
-        'ring': 'ring_pattern_diagnostics',
-        'rootzone': 'rootzone_failure_framework',
-        'herbicide injury': 'herbicide_injury_framework',
-        'spray injury': 'herbicide_injury_framework',
-        'pgr stress': 'pgr_stress_framework',
-        'traffic': 'traffic_compaction_decline',
-        'compaction': 'traffic_compaction_decline',
-        'anthracnose': 'anthracnose_decline_framework',
-        'salt stress': 'salt_vs_drought_framework',
-        'salinity': 'salt_vs_drought_framework',
-        'spring dead spot': 'bermuda_spring_transition_failure',
-        'bermuda transition': 'bermuda_spring_transition_failure',
-        'slow green up': 'warm_season_slow_greenup_framework',
-        'slow green-up': 'warm_season_slow_greenup_framework',
-        'zoysia': 'warm_season_slow_greenup_framework',
-        'water quality': 'water_quality_chemistry_framework',
-        'reclaimed water': 'water_quality_chemistry_framework',
-        'alkalinity': 'water_quality_chemistry_framework',
-        'nematode sample': 'nematode_sampling_interpretation_framework',
-        'nematode assay': 'nematode_sampling_interpretation_framework',
-        'carryover': 'herbicide_carryover_framework',
-        'residual herbicide': 'herbicide_carryover_framework',
-        'grub damage': 'insect_feeding_pattern_framework',
-        'abw': 'insect_feeding_pattern_framework',
-        'webworm': 'insect_feeding_pattern_framework',
-        'cutworm': 'insect_feeding_pattern_framework',
-        'chinch bug': 'insect_feeding_pattern_framework',
-        'species fit': 'species_fit_renovation_framework',
-        'renovation': 'species_fit_renovation_framework',
-        'ryegrass hanging on': 'overseeded_transition_competition_framework',
-        'spring transition ryegrass': 'overseeded_transition_competition_framework',
-        'seedlings dying': 'seedling_establishment_failure_framework',
-        'establishment failure': 'seedling_establishment_failure_framework',
-    }
-    for alias, framework_key in diagnostic_aliases.items():
-        if alias in question_lower and framework_key in load_diagnostic_frameworks():
-            info = load_diagnostic_frameworks()[framework_key]
-            summary = {
-                'problem_space': info.get('problem_space'),
-                'first_checks': info.get('first_checks'),
-                'differentials': info.get('differentials'),
-                'confirmatory_signs': info.get('confirmatory_signs'),
-                'avoid_assumptions': info.get('avoid_assumptions'),
-                'escalation': info.get('escalation'),
-            }
-            context_parts.append(f"[Knowledge Base - {framework_key.replace('_', ' ')} diagnostic]: {json.dumps(summary, indent=2)}")
-            break
-
-    disease_playbook_aliases = {
-        'dollar spot': 'dollar_spot_ipm',
-        'brown patch': 'brown_patch_ipm',
-        'pythium blight': 'pythium_blight_ipm',
-        'summer patch': 'summer_patch_ipm',
-        'anthracnose': 'anthracnose_ipm',
-        'fairy ring': 'fairy_ring_ipm',
-    }
-    for alias, playbook_key in disease_playbook_aliases.items():
-        if alias in question_lower and playbook_key in load_disease_ipm_playbooks():
-            info = load_disease_ipm_playbooks()[playbook_key]
-            summary = {
-                'topic': info.get('topic'),
-                'target_disease': info.get('target_disease'),
-                'high_risk_sites': info.get('high_risk_sites'),
-                'scouting_focus': info.get('scouting_focus'),
-                'environmental_drivers': info.get('environmental_drivers'),
-                'cultural_program': info.get('cultural_program'),
-                'chemical_strategy': info.get('chemical_strategy'),
-                'monitoring': info.get('monitoring'),
-            }
-            context_parts.append(f"[Knowledge Base - {playbook_key.replace('_', ' ')} playbook]: {json.dumps(summary, indent=2)}")
-            break
-
-    surface_recipe_aliases = {
-        'bentgrass greens': 'bentgrass_greens_recipe',
-        'poa greens': 'poa_annua_greens_recipe',
-        'bermudagrass fairways': 'bermudagrass_fairways_recipe',
-        'tall fescue sports turf': 'tall_fescue_sports_turf_recipe',
-        'zoysiagrass fairways': 'zoysiagrass_fairways_recipe',
-        'overseeded bermudagrass': 'ryegrass_overseeded_transition_recipe',
-        'spring transition': 'ryegrass_overseeded_transition_recipe',
-    }
-    for alias, recipe_key in surface_recipe_aliases.items():
-        if alias in question_lower and recipe_key in load_surface_management_recipes():
-            info = load_surface_management_recipes()[recipe_key]
-            summary = {
-                'surface': info.get('surface'),
-                'primary_goals': info.get('primary_goals'),
-                'mowing_and_speed': info.get('mowing_and_speed'),
-                'water_management': info.get('water_management'),
-                'fertility': info.get('fertility'),
-                'cultivation': info.get('cultivation'),
-                'signature_risks': info.get('signature_risks'),
-            }
-            context_parts.append(f"[Knowledge Base - {recipe_key.replace('_', ' ')} recipe]: {json.dumps(summary, indent=2)}")
-            break
-
-    mowing_aliases = {
-        'rolling': 'rolling_frequency_under_stress',
-        'green speed': 'greens_mowing_and_rolling_balance',
-        'tournament speed': 'tournament_speed_tradeoffs',
-        'scalp': 'scalping_prevention_program',
-        'fairway mowing': 'fairway_mowing_frequency_management',
-        'rough mowing': 'rough_mowing_and_clipping_management',
-    }
-    for alias, program_key in mowing_aliases.items():
-        if alias in question_lower and program_key in load_mowing_programs():
-            info = load_mowing_programs()[program_key]
-            summary = {
-                'topic': info.get('topic'),
-                'primary_goal': info.get('primary_goal'),
-                'suitable_sites': info.get('suitable_sites'),
-                'core_principles': info.get('core_principles'),
-                'benchmark_ranges': info.get('benchmark_ranges'),
-                'cautions': info.get('cautions'),
-                'monitoring': info.get('monitoring'),
-            }
-            context_parts.append(f"[Knowledge Base - {program_key.replace('_', ' ')} mowing]: {json.dumps(summary, indent=2)}")
-            break
-
-    salinity_aliases = {
-        'ec': 'ec_monitoring_program',
-        'salinity': 'salt_stress_diagnostics',
-        'salt stress': 'salt_stress_diagnostics',
-        'leaching': 'leaching_program_for_salts',
-        'sodium': 'sodium_hazard_and_structure_loss',
-        'reclaimed water': 'reclaimed_water_management',
-        'gypsum': 'gypsum_and_amendment_decision_tree',
-    }
-    for alias, program_key in salinity_aliases.items():
-        if alias in question_lower and program_key in load_salinity_management():
-            info = load_salinity_management()[program_key]
-            summary = {
-                'topic': info.get('topic'),
-                'primary_goal': info.get('primary_goal'),
-                'suitable_sites': info.get('suitable_sites'),
-                'core_principles': info.get('core_principles'),
-                'benchmark_ranges': info.get('benchmark_ranges'),
-                'cautions': info.get('cautions'),
-                'monitoring': info.get('monitoring'),
-            }
-            context_parts.append(f"[Knowledge Base - {program_key.replace('_', ' ')} salinity]: {json.dumps(summary, indent=2)}")
-            break
-
-    drainage_aliases = {
-        'surface drainage': 'surface_drainage_correction',
-        'subsurface drainage': 'subsurface_drainage_evaluation',
-        'perched water': 'layering_and_perched_water_table',
-        'layering': 'layering_and_perched_water_table',
-        'organic matter': 'organic_matter_profile_management',
-        'black layer': 'black_layer_prevention_program',
-        'construction mismatch': 'construction_profile_mismatch',
-    }
-    for alias, program_key in drainage_aliases.items():
-        if alias in question_lower and program_key in load_drainage_rootzone_programs():
-            info = load_drainage_rootzone_programs()[program_key]
-            summary = {
-                'topic': info.get('topic'),
-                'triggers': info.get('triggers'),
-                'program': info.get('program'),
-                'monitoring': info.get('monitoring'),
-                'cautions': info.get('cautions'),
-            }
-            context_parts.append(f"[Knowledge Base - {program_key.replace('_', ' ')} drainage]: {json.dumps(summary, indent=2)}")
-            break
-
-    overseeding_aliases = {
-        'overseed': 'bermudagrass_overseeding_window',
-        'overseeding': 'bermudagrass_overseeding_window',
-        'transition': 'spring_transition_acceleration',
-        'seedhead suppression': 'poa_annua_seedhead_suppression_program',
-        'seedhead': 'poa_annua_seedhead_suppression_program',
-        'establishment restriction': 'cool_season_overseeding_restrictions',
-        'mowing seedlings': 'overseed_mowing_and_establishment',
-        'transition failure': 'transition_failure_diagnostics',
-    }
-    for alias, program_key in overseeding_aliases.items():
-        if alias in question_lower and program_key in load_overseeding_transition_programs():
-            info = load_overseeding_transition_programs()[program_key]
-            summary = {
-                'topic': info.get('topic'),
-                'primary_goal': info.get('primary_goal'),
-                'suitable_sites': info.get('suitable_sites'),
-                'core_principles': info.get('core_principles'),
-                'benchmark_ranges': info.get('benchmark_ranges'),
-                'cautions': info.get('cautions'),
-                'monitoring': info.get('monitoring'),
-            }
-            context_parts.append(f"[Knowledge Base - {program_key.replace('_', ' ')} overseeding]: {json.dumps(summary, indent=2)}")
-            break
-
-    climate_aliases = {
-        'transition zone': 'humid_transition_zone_cool_season',
-        'humid transition zone': 'humid_transition_zone_cool_season',
-        'northern cool season': 'northern_cool_season_intensive',
-        'arid west': 'arid_west_warm_season',
-        'desert': 'arid_west_warm_season',
-        'humid southeast': 'humid_southeast_warm_season',
-        'coastal': 'marine_cool_season_coastal',
-        'marine climate': 'marine_cool_season_coastal',
-        'upper midwest': 'upper_midwest_winter_stress',
-        'winter stress': 'upper_midwest_winter_stress',
-    }
-    for alias, playbook_key in climate_aliases.items():
-        if alias in question_lower and playbook_key in load_climate_zone_playbooks():
-            info = load_climate_zone_playbooks()[playbook_key]
-            summary = {
-                'topic': info.get('topic'),
-                'climate_profile': info.get('climate_profile'),
-                'best_fit_surfaces': info.get('best_fit_surfaces'),
-                'seasonal_priorities': info.get('seasonal_priorities'),
-                'signature_risks': info.get('signature_risks'),
-                'management_biases': info.get('management_biases'),
-                'watchouts': info.get('watchouts'),
-            }
-            context_parts.append(f"[Knowledge Base - {playbook_key.replace('_', ' ')} climate]: {json.dumps(summary, indent=2)}")
-            break
-
-    tournament_aliases = {
-        'green speed': 'greens_speed_ramp_plan',
-        'speed ramp': 'greens_speed_ramp_plan',
-        'firmness': 'firmness_and_moisture_tournament_plan',
-        'moisture plan': 'firmness_and_moisture_tournament_plan',
-        'fairway presentation': 'fairway_tournament_presentation_plan',
-        'event recovery greens': 'event_recovery_greens_plan',
-        'event recovery fairway': 'event_recovery_fairway_plan',
-        'weather disruption': 'weather_disruption_event_plan',
-        'tournament weather': 'weather_disruption_event_plan',
-    }
-    for alias, program_key in tournament_aliases.items():
-        if alias in question_lower and program_key in load_tournament_prep_recovery():
-            info = load_tournament_prep_recovery()[program_key]
-            summary = {
-                'topic': info.get('topic'),
-                'objective': info.get('objective'),
-                'prep_window': info.get('prep_window'),
-                'prep_steps': info.get('prep_steps'),
-                'during_event': info.get('during_event'),
-                'recovery_steps': info.get('recovery_steps'),
-                'failure_modes': info.get('failure_modes'),
-            }
-            context_parts.append(f"[Knowledge Base - {program_key.replace('_', ' ')} tournament]: {json.dumps(summary, indent=2)}")
-            break
-
-    nutrient_aliases = {
-        'nitrogen deficiency': 'nitrogen_deficiency',
-        'n deficiency': 'nitrogen_deficiency',
-        'potassium deficiency': 'potassium_deficiency',
-        'k deficiency': 'potassium_deficiency',
-        'iron deficiency': 'iron_deficiency_or_color_loss',
-        'color loss': 'iron_deficiency_or_color_loss',
-        'phosphorus deficiency': 'phosphorus_deficiency_or_establishment_issue',
-        'p deficiency': 'phosphorus_deficiency_or_establishment_issue',
-        'micronutrient lockout': 'micronutrient_lockout_high_ph',
-        'high ph chlorosis': 'micronutrient_lockout_high_ph',
-        'fertilizer burn': 'salt_or_fertilizer_burn_diagnostics',
-        'salt burn': 'salt_or_fertilizer_burn_diagnostics',
-    }
-    for alias, diagnostic_key in nutrient_aliases.items():
-        if alias in question_lower and diagnostic_key in load_nutrient_diagnostics():
-            info = load_nutrient_diagnostics()[diagnostic_key]
-            summary = {
-                'topic': info.get('topic'),
-                'symptom_profile': info.get('symptom_profile'),
-                'common_confusions': info.get('common_confusions'),
-                'high_risk_sites': info.get('high_risk_sites'),
-                'confirmation_steps': info.get('confirmation_steps'),
-                'response_strategy': info.get('response_strategy'),
-            }
-            context_parts.append(f"[Knowledge Base - {diagnostic_key.replace('_', ' ')} nutrient]: {json.dumps(summary, indent=2)}")
-            break
-
-    calibration_aliases = {
-        'sprayer output': 'sprayer_output_verification',
-        'sprayer calibration': 'sprayer_output_verification',
-        'mixing sequence': 'sprayer_mixing_sequence_workflow',
-        'tank mixing': 'sprayer_mixing_sequence_workflow',
-        'spreader pattern': 'spreader_pattern_testing',
-        'granular conversion': 'granular_rate_per_1000_conversion',
-        'per 1000 conversion': 'granular_rate_per_1000_conversion',
-        'travel speed': 'travel_speed_checkpoint_workflow',
-        'speed check': 'travel_speed_checkpoint_workflow',
-        'recordkeeping': 'recordkeeping_and_post_application_review',
-        'post application review': 'recordkeeping_and_post_application_review',
-    }
-    for alias, workflow_key in calibration_aliases.items():
-        if alias in question_lower and workflow_key in load_calibration_workflows():
-            info = load_calibration_workflows()[workflow_key]
-            summary = {
-                'topic': info.get('topic'),
-                'objective': info.get('objective'),
-                'when_to_use': info.get('when_to_use'),
-                'key_steps': info.get('key_steps'),
-                'common_failures': info.get('common_failures'),
-                'documents_to_check': info.get('documents_to_check'),
-            }
-            context_parts.append(f"[Knowledge Base - {workflow_key.replace('_', ' ')} calibration]: {json.dumps(summary, indent=2)}")
-            break
-
-    seasonal_plan_aliases = {
-        'transition zone': 'cool_season_transition_zone_calendar',
-        'cool-season transition zone': 'cool_season_transition_zone_calendar',
-        'northern cool season': 'northern_cool_season_calendar',
-        'southeast warm season': 'warm_season_southeast_calendar',
-        'warm-season southeast': 'warm_season_southeast_calendar',
-        'arid west bermudagrass': 'arid_west_bermudagrass_calendar',
-    }
-    for alias, plan_key in seasonal_plan_aliases.items():
-        if alias in question_lower and plan_key in load_seasonal_operating_plans():
-            info = load_seasonal_operating_plans()[plan_key]
-            summary = {
-                'topic': info.get('topic'),
-                'best_fit_surfaces': info.get('best_fit_surfaces'),
-                'spring_priorities': info.get('spring_priorities'),
-                'summer_priorities': info.get('summer_priorities'),
-                'fall_priorities': info.get('fall_priorities'),
-                'winter_priorities': info.get('winter_priorities'),
-                'key_metrics': info.get('key_metrics'),
-                'watchouts': info.get('watchouts'),
-            }
-            context_parts.append(f"[Knowledge Base - {plan_key.replace('_', ' ')} seasonal plan]: {json.dumps(summary, indent=2)}")
-            break
-
-    regional_pressure_aliases = {
-        'transition zone pressure': 'transition_zone_cool_season_pressure',
-        'cool-season transition pressure': 'transition_zone_cool_season_pressure',
-        'northern cool season pressure': 'northern_cool_season_pressure',
-        'southeast warm season pressure': 'southeast_warm_season_pressure',
-        'arid west bermudagrass pressure': 'arid_west_bermudagrass_pressure',
-        'pressure calendar': 'transition_zone_cool_season_pressure',
-    }
-    for alias, calendar_key in regional_pressure_aliases.items():
-        if alias in question_lower and calendar_key in load_regional_pressure_calendars():
-            info = load_regional_pressure_calendars()[calendar_key]
-            summary = {
-                'topic': info.get('topic'),
-                'region': info.get('region'),
-                'spring_pressures': info.get('spring_pressures'),
-                'summer_pressures': info.get('summer_pressures'),
-                'fall_pressures': info.get('fall_pressures'),
-                'winter_pressures': info.get('winter_pressures'),
-                'key_targets': info.get('key_targets'),
-                'scouting_focus': info.get('scouting_focus'),
-                'timing_biases': info.get('timing_biases'),
-            }
-            context_parts.append(f"[Knowledge Base - {calendar_key.replace('_', ' ')} pressure]: {json.dumps(summary, indent=2)}")
-            break
-
-    advanced_science_aliases = {
-        'carbohydrate': 'cool_season_heat_carbohydrate_decline',
-        'carbohydrate reserves': 'cool_season_heat_carbohydrate_decline',
-        'heat stress physiology': 'cool_season_heat_carbohydrate_decline',
-        'root respiration': 'root_respiration_oxygen_balance',
-        'oxygen balance': 'root_respiration_oxygen_balance',
-        'air filled porosity': 'usga_rootzone_porosity_hydraulic_conductivity',
-        'air-filled porosity': 'usga_rootzone_porosity_hydraulic_conductivity',
-        'hydraulic conductivity': 'usga_rootzone_porosity_hydraulic_conductivity',
-        'rootzone porosity': 'usga_rootzone_porosity_hydraulic_conductivity',
-        'organic matter physics': 'surface_organic_matter_physics',
-        'surface organic matter': 'surface_organic_matter_physics',
-        'perched water': 'perched_water_layering_diagnostics',
-        'layering': 'perched_water_layering_diagnostics',
-        'disease triangle': 'disease_triangle_leaf_wetness_microclimate',
-        'leaf wetness': 'disease_triangle_leaf_wetness_microclimate',
-        'dollar spot epidemiology': 'dollar_spot_epidemiology_nitrogen_leaf_wetness',
-        'brown patch epidemiology': 'brown_patch_rhizoctonia_heat_humidity',
-        'pgr rebound': 'pgr_growth_suppression_thermal_rebound',
-        'growth potential': 'pgr_growth_suppression_thermal_rebound',
-        'deficit irrigation': 'et_deficit_irrigation_syringing',
-        'syringing': 'et_deficit_irrigation_syringing',
-        'hydrophobicity': 'localized_dry_spot_hydrophobicity',
-        'firmness': 'firmness_green_speed_plant_health_tradeoff',
-        'green speed': 'firmness_green_speed_plant_health_tradeoff',
-        'traffic recovery': 'traffic_recovery_carbohydrate_growth_rate',
-        'winter injury': 'winter_crown_hydration_freeze_injury',
-        'crown hydration': 'winter_crown_hydration_freeze_injury',
-        'freeze injury': 'winter_crown_hydration_freeze_injury',
-        'shade physiology': 'shade_light_carbohydrate_morphology',
-        'low light': 'shade_light_carbohydrate_morphology',
-        'nitrogen form': 'nitrogen_form_release_growth_stress_balance',
-        'slow release nitrogen': 'nitrogen_form_release_growth_stress_balance',
-        'salinity stress': 'salinity_osmotic_sodium_structure_stress',
-        'sodium hazard': 'salinity_osmotic_sodium_structure_stress',
-        'osmotic drought': 'salinity_osmotic_sodium_structure_stress',
-        'nematode': 'nematode_root_pruning_stress_complex',
-        'nematodes': 'nematode_root_pruning_stress_complex',
-        'root pruning': 'nematode_root_pruning_stress_complex',
-        'poa annua decline': 'poa_annua_vs_bentgrass_summer_decline',
-        'poa decline': 'poa_annua_vs_bentgrass_summer_decline',
-        'decline faster than bentgrass': 'poa_annua_vs_bentgrass_summer_decline',
-        'wetting agent chemistry': 'wetting_agent_chemistry_functional_groups',
-        'surfactant chemistry': 'wetting_agent_chemistry_functional_groups',
-        'bicarbonate': 'bicarbonate_alkalinity_micronutrient_lockout',
-        'bicarbonates': 'bicarbonate_alkalinity_micronutrient_lockout',
-        'alkalinity': 'bicarbonate_alkalinity_micronutrient_lockout',
-        'micronutrient lockout': 'bicarbonate_alkalinity_micronutrient_lockout',
-        'pythium root dysfunction': 'pythium_root_dysfunction_vs_wet_wilt',
-        'pythium root rot': 'pythium_root_dysfunction_vs_wet_wilt',
-        'pythium vs wet wilt': 'pythium_root_dysfunction_vs_wet_wilt',
-        'growing degree days': 'gdd_growth_potential_pgr_timing',
-        'gdd': 'gdd_growth_potential_pgr_timing',
-        'pgr timing': 'gdd_growth_potential_pgr_timing',
-    }
-    for alias, science_key in advanced_science_aliases.items():
-        if alias in question_lower and science_key in load_advanced_turf_science():
-            info = load_advanced_turf_science()[science_key]
-            summary = {
-                'domain': info.get('domain'),
-                'principle': info.get('principle'),
-                'mechanisms': info.get('mechanisms'),
-                'field_indicators': info.get('field_indicators'),
-                'decision_rules': info.get('decision_rules'),
-                'management_implications': info.get('management_implications'),
-                'benchmark_ranges': info.get('benchmark_ranges'),
-                'cautions': info.get('cautions'),
-                'source_basis': info.get('source_basis'),
-            }
-            context_parts.append(f"[Knowledge Base - {science_key.replace('_', ' ')} advanced science]: {json.dumps(summary, indent=2)}")
-            break
-    
-    return '\n\n'.join(context_parts)
+    if max_tokens is None:
+        return '\n\n'.join(context_parts)
+    return _pack_context_parts(context_parts, max_tokens)
 
 
 def get_conversion(conversion_name: str) -> Optional[float]:
@@ -2070,21 +1850,7 @@ def extract_product_names(question: str) -> List[str]:
     Returns:
         List of recognized product names
     """
-    found_products = []
-    question_lower = question.lower()
-    products = load_products()
-
-    for category in ['fungicides', 'herbicides', 'insecticides', 'pgrs']:
-        if category not in products:
-            continue
-        for ai_name, info in products[category].items():
-            if ai_name.lower() in question_lower:
-                found_products.append(ai_name)
-            for trade in info.get('trade_names', []):
-                if trade.lower() in question_lower:
-                    found_products.append(trade)
-
-    return list(set(found_products))
+    return _matched_topics(question, 'product')
 
 
 def extract_disease_names(question: str) -> List[str]:
@@ -2097,14 +1863,8 @@ def extract_disease_names(question: str) -> List[str]:
     Returns:
         List of recognized disease names
     """
-    found_diseases = []
     question_lower = question.lower()
-    diseases = load_diseases()
-
-    for disease_name in diseases.keys():
-        display_name = disease_name.replace('_', ' ')
-        if display_name in question_lower or disease_name in question_lower:
-            found_diseases.append(display_name)
+    found_diseases = _matched_topics(question_lower, 'disease')
 
     # Classic symptom-language shortcuts for questions that describe a disease
     # without naming it. Keep these conservative so we add context, not a diagnosis.
@@ -2121,113 +1881,85 @@ def extract_disease_names(question: str) -> List[str]:
     ):
         found_diseases.append('brown patch')
 
-    return list(set(found_diseases))
+    return list(dict.fromkeys(found_diseases))
 
 
 def extract_weed_names(question: str) -> List[str]:
     """Extract weed names mentioned in a question."""
-    found_weeds = []
-    question_lower = question.lower()
-
-    for weed_name in load_weeds().keys():
-        display_name = weed_name.replace('_', ' ')
-        if display_name in question_lower or weed_name in question_lower:
-            found_weeds.append(display_name)
-
-    return list(set(found_weeds))
+    return _matched_topics(question, 'weed')
+
+
+PEST_ALIASES = {
+    'grub': 'white grubs',
+    'grubs': 'white grubs',
+    'webworm': 'sod webworms',
+    'webworms': 'sod webworms',
+    'abw': 'annual bluegrass weevil',
+    'chinch bug': 'chinch bugs',
+    'billbug': 'billbugs',
+    'cutworm': 'cutworms',
+}
 
 
 def extract_pest_names(question: str) -> List[str]:
     """Extract insect pest names mentioned in a question."""
-    found_pests = []
-    question_lower = question.lower()
-    aliases = {
-        'grub': 'white grubs',
-        'grubs': 'white grubs',
-        'webworm': 'sod webworms',
-        'webworms': 'sod webworms',
-        'abw': 'annual bluegrass weevil',
-        'chinch bug': 'chinch bugs',
-        'billbug': 'billbugs',
-        'cutworm': 'cutworms',
-    }
-
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_pests.append(display)
-
-    for pest_name in load_pests().keys():
-        display_name = pest_name.replace('_', ' ')
-        if display_name in question_lower or pest_name in question_lower:
-            found_pests.append(display_name)
-
-    return list(set(found_pests))
+    return _matched_topics(question, 'pest')
+
+
+TURFGRASS_ALIASES = {
+    'bentgrass': 'creeping bentgrass',
+    'poa annua': 'annual bluegrass',
+    'annual bluegrass': 'annual bluegrass',
+    'kentucky bluegrass': 'kentucky bluegrass',
+    'bluegrass': 'kentucky bluegrass',
+    'kbg': 'kentucky bluegrass',
+    'tall fescue': 'tall fescue',
+    'fescue': 'tall fescue',
+    'ryegrass': 'perennial ryegrass',
+    'fine fescue': 'fine fescue',
+    'bermuda': 'bermudagrass',
+    'bermudagrass': 'bermudagrass',
+    'zoysia': 'zoysiagrass',
+    'zoysiagrass': 'zoysiagrass',
+    'st augustine': 'st augustinegrass',
+    'st. augustine': 'st augustinegrass',
+    'centipede': 'centipedegrass',
+}
 
 
 def extract_turfgrass_names(question: str) -> List[str]:
     """Extract turfgrass species names mentioned in a question."""
-    found_turfgrasses = []
-    question_lower = question.lower()
-    aliases = {
-        'bentgrass': 'creeping bentgrass',
-        'poa annua': 'annual bluegrass',
-        'annual bluegrass': 'annual bluegrass',
-        'kentucky bluegrass': 'kentucky bluegrass',
-        'bluegrass': 'kentucky bluegrass',
-        'kbg': 'kentucky bluegrass',
-        'tall fescue': 'tall fescue',
-        'fescue': 'tall fescue',
-        'ryegrass': 'perennial ryegrass',
-        'fine fescue': 'fine fescue',
-        'bermuda': 'bermudagrass',
-        'bermudagrass': 'bermudagrass',
-        'zoysia': 'zoysiagrass',
-        'zoysiagrass': 'zoysiagrass',
-        'st augustine': 'st augustinegrass',
-        'st. augustine': 'st augustinegrass',
-        'centipede': 'centipedegrass',
-    }
-
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_turfgrasses.append(display)
-
-    return list(set(found_turfgrasses))
+    return _matched_topics(question, 'turfgrass')
+
+
+ABIOTIC_STRESS_ALIASES = {
+    'localized dry spot': 'localized dry spot',
+    'dry spot': 'localized dry spot',
+    'lds': 'localized dry spot',
+    'heat stress': 'heat stress',
+    'drought': 'drought stress',
+    'wilt': 'drought stress',
+    'too wet': 'overwatering',
+    'overwater': 'overwatering',
+    'compaction': 'compaction',
+    'compact': 'compaction',
+    'shade': 'shade stress',
+    'traffic': 'traffic stress',
+    'wear': 'traffic stress',
+    'scalp': 'scalping',
+    'scalping': 'scalping',
+    'herbicide injury': 'herbicide injury',
+    'spray injury': 'herbicide injury',
+    'fertilizer burn': 'fertilizer burn',
+    'salt burn': 'fertilizer burn',
+    'pgr stress': 'pgr stress',
+    'black layer': 'black layer',
+}
 
 
 def extract_abiotic_stress_names(question: str) -> List[str]:
     """Extract abiotic stress/non-pest problem names mentioned in a question."""
-    found_stresses = []
-    question_lower = question.lower()
-    aliases = {
-        'localized dry spot': 'localized dry spot',
-        'dry spot': 'localized dry spot',
-        'lds': 'localized dry spot',
-        'heat stress': 'heat stress',
-        'drought': 'drought stress',
-        'wilt': 'drought stress',
-        'too wet': 'overwatering',
-        'overwater': 'overwatering',
-        'compaction': 'compaction',
-        'compact': 'compaction',
-        'shade': 'shade stress',
-        'traffic': 'traffic stress',
-        'wear': 'traffic stress',
-        'scalp': 'scalping',
-        'scalping': 'scalping',
-        'herbicide injury': 'herbicide injury',
-        'spray injury': 'herbicide injury',
-        'fertilizer burn': 'fertilizer burn',
-        'salt burn': 'fertilizer burn',
-        'pgr stress': 'pgr stress',
-        'black layer': 'black layer',
-    }
-
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_stresses.append(display)
-
-    return list(set(found_stresses))
+    return _matched_topics(question, 'abiotic_stress')
 
 
 def extract_timing_window_names(question: str) -> List[str]:
@@ -2244,518 +1976,523 @@ def extract_timing_window_names(question: str) -> List[str]:
     return list(set(found_windows))
 
 
+FERTILITY_PROGRAM_ALIASES = {
+    'spoon feeding': 'greens spoon feeding',
+    'spoon-feeding': 'greens spoon feeding',
+    'fall nitrogen': 'cool season fall nitrogen',
+    'summer nitrogen': 'warm season growth season nitrogen',
+    'potassium': 'sand based potassium and leaching',
+    'iron': 'iron color vs true nitrogen need',
+    'phosphorus': 'phosphorus for establishment only',
+}
+
+
 def extract_fertility_program_names(question: str) -> List[str]:
     """Extract fertility-program topics mentioned in a question."""
-    found_programs = []
-    question_lower = question.lower()
-    aliases = {
-        'spoon feeding': 'greens spoon feeding',
-        'spoon-feeding': 'greens spoon feeding',
-        'fall nitrogen': 'cool season fall nitrogen',
-        'summer nitrogen': 'warm season growth season nitrogen',
-        'potassium': 'sand based potassium and leaching',
-        'iron': 'iron color vs true nitrogen need',
-        'phosphorus': 'phosphorus for establishment only',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_programs.append(display)
-    return list(set(found_programs))
+    return _matched_topics(question, 'fertility_program')
+
+
+IRRIGATION_PROGRAM_ALIASES = {
+    'deficit irrigation': 'deficit irrigation greens',
+    'syring': 'syringing for canopy cooling',
+    'hand water': 'hand watering hot spots',
+    'wetting agent': 'wetting agent strategy for lds',
+    'deep and infrequent': 'fairway deep infrequent irrigation',
+    'deep infrequent': 'fairway deep infrequent irrigation',
+    'uniformity': 'irrigation uniformity audit',
+    'irrigation audit': 'irrigation uniformity audit',
+}
 
 
 def extract_irrigation_program_names(question: str) -> List[str]:
     """Extract irrigation-program topics mentioned in a question."""
-    found_programs = []
-    question_lower = question.lower()
-    aliases = {
-        'deficit irrigation': 'deficit irrigation greens',
-        'syring': 'syringing for canopy cooling',
-        'hand water': 'hand watering hot spots',
-        'wetting agent': 'wetting agent strategy for lds',
-        'deep and infrequent': 'fairway deep infrequent irrigation',
-        'deep infrequent': 'fairway deep infrequent irrigation',
-        'uniformity': 'irrigation uniformity audit',
-        'irrigation audit': 'irrigation uniformity audit',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_programs.append(display)
-    return list(set(found_programs))
+    return _matched_topics(question, 'irrigation_program')
+
+
+CULTIVATION_PROGRAM_ALIASES = {
+    'core aeration': 'core aeration greens',
+    'core aerate': 'core aeration greens',
+    'aerification': 'core aeration greens',
+    'venting': 'summer venting and needle tining',
+    'needle tine': 'summer venting and needle tining',
+    'topdress': 'frequent light topdressing',
+    'solid tine': 'solid tining and root pruning balance',
+    'verticut': 'verticutting and grooming management',
+    'grooming': 'verticutting and grooming management',
+    'fairway cultivation': 'fairway cultivation and topdressing',
+}
 
 
 def extract_cultivation_program_names(question: str) -> List[str]:
     """Extract cultivation-program topics mentioned in a question."""
-    found_programs = []
-    question_lower = question.lower()
-    aliases = {
-        'core aeration': 'core aeration greens',
-        'core aerate': 'core aeration greens',
-        'aerification': 'core aeration greens',
-        'venting': 'summer venting and needle tining',
-        'needle tine': 'summer venting and needle tining',
-        'topdress': 'frequent light topdressing',
-        'solid tine': 'solid tining and root pruning balance',
-        'verticut': 'verticutting and grooming management',
-        'grooming': 'verticutting and grooming management',
-        'fairway cultivation': 'fairway cultivation and topdressing',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_programs.append(display)
-    return list(set(found_programs))
+    return _matched_topics(question, 'cultivation_program')
+
+
+DIAGNOSTIC_FRAMEWORK_ALIASES = {
+    'wilt': 'wilt vs disease on greens',
+    'ring': 'ring pattern diagnostics',
+    'rootzone': 'rootzone failure framework',
+    'herbicide injury': 'herbicide injury framework',
+    'spray injury': 'herbicide injury framework',
+    'pgr stress': 'pgr stress framework',
+    'traffic': 'traffic compaction decline',
+    'compaction': 'traffic compaction decline',
+    'anthracnose': 'anthracnose decline framework',
+    'salt stress': 'salt vs drought framework',
+    'salinity': 'salt vs drought framework',
+    'spring dead spot': 'bermuda spring transition failure',
+    'bermuda transition': 'bermuda spring transition failure',
+    'slow green up': 'warm season slow greenup framework',
+    'slow green-up': 'warm season slow greenup framework',
+    'zoysia': 'warm season slow greenup framework',
+    'water quality': 'water quality chemistry framework',
+    'reclaimed water': 'water quality chemistry framework',
+    'alkalinity': 'water quality chemistry framework',
+    'nematode sample': 'nematode sampling interpretation framework',
+    'nematode assay': 'nematode sampling interpretation framework',
+    'carryover': 'herbicide carryover framework',
+    'residual herbicide': 'herbicide carryover framework',
+    'grub damage': 'insect feeding pattern framework',
+    'abw': 'insect feeding pattern framework',
+    'webworm': 'insect feeding pattern framework',
+    'cutworm': 'insect feeding pattern framework',
+    'chinch bug': 'insect feeding pattern framework',
+    'species fit': 'species fit renovation framework',
+    'renovation': 'species fit renovation framework',
+    'ryegrass hanging on': 'overseeded transition competition framework',
+    'ryegrass is hanging on': 'overseeded transition competition framework',
+    'hanging on too long': 'overseeded transition competition framework',
+    'spring transition ryegrass': 'overseeded transition competition framework',
+    'seedlings dying': 'seedling establishment failure framework',
+    'germination looked fine': 'seedling establishment failure framework',
+    'establishment failure': 'seedling establishment failure framework',
+    'spray passes': 'application pattern coverage framework',
+    'nozzle overlap': 'application pattern coverage framework',
+    'application pattern': 'application pattern coverage framework',
+    'repeated rolling': 'mechanical stress budget framework',
+    'rolling frequency': 'mechanical stress budget framework',
+    'tournament prep stress': 'mechanical stress budget framework',
+    'frayed leaf tips': 'cut quality leaf shredding framework',
+    'cut quality': 'cut quality leaf shredding framework',
+    'leaf shredding': 'cut quality leaf shredding framework',
+    'topdressing drift': 'topdressing program drift framework',
+    'sand compatibility': 'topdressing program drift framework',
+    'layering after topdressing': 'topdressing program drift framework',
+}
 
 
 def extract_diagnostic_framework_names(question: str) -> List[str]:
     """Extract diagnostic-framework topics mentioned in a question."""
-    found_frameworks = []
-    question_lower = question.lower()
-    aliases = {
-        'wilt': 'wilt vs disease on greens',
-        'ring': 'ring pattern diagnostics',
-        'rootzone': 'rootzone failure framework',
-        'herbicide injury': 'herbicide injury framework',
-        'spray injury': 'herbicide injury framework',
-        'pgr stress': 'pgr stress framework',
-        'traffic': 'traffic compaction decline',
-        'compaction': 'traffic compaction decline',
-        'anthracnose': 'anthracnose decline framework',
-        'salt stress': 'salt vs drought framework',
-        'salinity': 'salt vs drought framework',
-        'spring dead spot': 'bermuda spring transition failure',
-        'bermuda transition': 'bermuda spring transition failure',
-        'slow green up': 'warm season slow greenup framework',
-        'slow green-up': 'warm season slow greenup framework',
-        'zoysia': 'warm season slow greenup framework',
-        'water quality': 'water quality chemistry framework',
-        'reclaimed water': 'water quality chemistry framework',
-        'alkalinity': 'water quality chemistry framework',
-        'nematode sample': 'nematode sampling interpretation framework',
-        'nematode assay': 'nematode sampling interpretation framework',
-        'carryover': 'herbicide carryover framework',
-        'residual herbicide': 'herbicide carryover framework',
-        'grub damage': 'insect feeding pattern framework',
-        'abw': 'insect feeding pattern framework',
-        'webworm': 'insect feeding pattern framework',
-        'cutworm': 'insect feeding pattern framework',
-        'chinch bug': 'insect feeding pattern framework',
-        'species fit': 'species fit renovation framework',
-        'renovation': 'species fit renovation framework',
-        'ryegrass hanging on': 'overseeded transition competition framework',
-        'ryegrass is hanging on': 'overseeded transition competition framework',
-        'hanging on too long': 'overseeded transition competition framework',
-        'spring transition ryegrass': 'overseeded transition competition framework',
-        'seedlings dying': 'seedling establishment failure framework',
-        'germination looked fine': 'seedling establishment failure framework',
-        'establishment failure': 'seedling establishment failure framework',
-        'spray passes': 'application pattern coverage framework',
-        'nozzle overlap': 'application pattern coverage framework',
-        'application pattern': 'application pattern coverage framework',
-        'repeated rolling': 'mechanical stress budget framework',
-        'rolling frequency': 'mechanical stress budget framework',
-        'tournament prep stress': 'mechanical stress budget framework',
-        'frayed leaf tips': 'cut quality leaf shredding framework',
-        'cut quality': 'cut quality leaf shredding framework',
-        'leaf shredding': 'cut quality leaf shredding framework',
-        'topdressing drift': 'topdressing program drift framework',
-        'sand compatibility': 'topdressing program drift framework',
-        'layering after topdressing': 'topdressing program drift framework',
-    }
-    for alias, display in aliases.items():
-        escaped = re.escape(alias)
-        prefix = r"\b" if alias[:1].isalnum() else ""
-        suffix = r"\b" if alias[-1:].isalnum() else ""
-        if re.search(prefix + escaped + suffix, question_lower):
-            found_frameworks.append(display)
-    return list(set(found_frameworks))
+    return _matched_topics(question, 'diagnostic_framework')
+
+
+MOWING_PROGRAM_ALIASES = {
+    'rolling': 'rolling frequency under stress',
+    'green speed': 'greens mowing and rolling balance',
+    'tournament speed': 'tournament speed tradeoffs',
+    'scalp': 'scalping prevention program',
+    'fairway mowing': 'fairway mowing frequency management',
+    'rough mowing': 'rough mowing and clipping management',
+}
 
 
 def extract_mowing_program_names(question: str) -> List[str]:
     """Extract mowing and rolling program topics mentioned in a question."""
-    found_programs = []
-    question_lower = question.lower()
-    aliases = {
-        'rolling': 'rolling frequency under stress',
-        'green speed': 'greens mowing and rolling balance',
-        'tournament speed': 'tournament speed tradeoffs',
-        'scalp': 'scalping prevention program',
-        'fairway mowing': 'fairway mowing frequency management',
-        'rough mowing': 'rough mowing and clipping management',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_programs.append(display)
-    return list(set(found_programs))
+    return _matched_topics(question, 'mowing_program')
+
+
+SALINITY_MANAGEMENT_ALIASES = {
+    'ec': 'ec monitoring program',
+    'salinity': 'salt stress diagnostics',
+    'salt stress': 'salt stress diagnostics',
+    'leaching': 'leaching program for salts',
+    'sodium': 'sodium hazard and structure loss',
+    'reclaimed water': 'reclaimed water management',
+    'gypsum': 'gypsum and amendment decision framework',
+}
 
 
 def extract_salinity_management_names(question: str) -> List[str]:
     """Extract salinity and EC management topics mentioned in a question."""
-    found_programs = []
-    question_lower = question.lower()
-    aliases = {
-        'ec': 'ec monitoring program',
-        'salinity': 'salt stress diagnostics',
-        'salt stress': 'salt stress diagnostics',
-        'leaching': 'leaching program for salts',
-        'sodium': 'sodium hazard and structure loss',
-        'reclaimed water': 'reclaimed water management',
-        'gypsum': 'gypsum and amendment decision framework',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_programs.append(display)
-    return list(set(found_programs))
+    return _matched_topics(question, 'salinity_management')
+
+
+DRAINAGE_ROOTZONE_PROGRAM_ALIASES = {
+    'surface drainage': 'surface drainage correction',
+    'subsurface drainage': 'subsurface drainage evaluation',
+    'perched water': 'layering and perched water table',
+    'layering': 'layering and perched water table',
+    'organic matter': 'organic matter profile management',
+    'black layer': 'black layer prevention program',
+    'construction mismatch': 'construction profile mismatch',
+}
 
 
 def extract_drainage_rootzone_program_names(question: str) -> List[str]:
     """Extract drainage and rootzone-management topics mentioned in a question."""
-    found_programs = []
-    question_lower = question.lower()
-    aliases = {
-        'surface drainage': 'surface drainage correction',
-        'subsurface drainage': 'subsurface drainage evaluation',
-        'perched water': 'layering and perched water table',
-        'layering': 'layering and perched water table',
-        'organic matter': 'organic matter profile management',
-        'black layer': 'black layer prevention program',
-        'construction mismatch': 'construction profile mismatch',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_programs.append(display)
-    return list(set(found_programs))
+    return _matched_topics(question, 'drainage_rootzone_program')
+
+
+OVERSEEDING_TRANSITION_PROGRAM_ALIASES = {
+    'overseed': 'bermudagrass overseeding window',
+    'overseeding': 'bermudagrass overseeding window',
+    'transition': 'spring transition acceleration',
+    'seedhead suppression': 'poa annua seedhead suppression program',
+    'seedhead': 'poa annua seedhead suppression program',
+    'establishment restriction': 'cool season overseeding restrictions',
+    'mowing seedlings': 'overseed mowing and establishment',
+    'transition failure': 'transition failure diagnostics',
+}
 
 
 def extract_overseeding_transition_program_names(question: str) -> List[str]:
     """Extract overseeding and transition topics mentioned in a question."""
-    found_programs = []
-    question_lower = question.lower()
-    aliases = {
-        'overseed': 'bermudagrass overseeding window',
-        'overseeding': 'bermudagrass overseeding window',
-        'transition': 'spring transition acceleration',
-        'seedhead suppression': 'poa annua seedhead suppression program',
-        'seedhead': 'poa annua seedhead suppression program',
-        'establishment restriction': 'cool season overseeding restrictions',
-        'mowing seedlings': 'overseed mowing and establishment',
-        'transition failure': 'transition failure diagnostics',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_programs.append(display)
-    return list(set(found_programs))
+    return _matched_topics(question, 'overseeding_transition_program')
+
+
+DISEASE_IPM_PLAYBOOK_ALIASES = {
+    'dollar spot': 'dollar spot ipm',
+    'brown patch': 'brown patch ipm',
+    'pythium blight': 'pythium blight ipm',
+    'summer patch': 'summer patch ipm',
+    'anthracnose': 'anthracnose ipm',
+    'fairy ring': 'fairy ring ipm',
+}
 
 
 def extract_disease_ipm_playbook_names(question: str) -> List[str]:
     """Extract disease IPM playbook topics mentioned in a question."""
-    found_playbooks = []
-    question_lower = question.lower()
-    aliases = {
-        'dollar spot': 'dollar spot ipm',
-        'brown patch': 'brown patch ipm',
-        'pythium blight': 'pythium blight ipm',
-        'summer patch': 'summer patch ipm',
-        'anthracnose': 'anthracnose ipm',
-        'fairy ring': 'fairy ring ipm',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_playbooks.append(display)
-    return list(set(found_playbooks))
+    return _matched_topics(question, 'disease_ipm_playbook')
+
+
+SURFACE_MANAGEMENT_RECIPE_ALIASES = {
+    'bentgrass greens': 'bentgrass greens recipe',
+    'poa greens': 'poa annua greens recipe',
+    'bermudagrass fairways': 'bermudagrass fairways recipe',
+    'tall fescue sports turf': 'tall fescue sports turf recipe',
+    'zoysiagrass fairways': 'zoysiagrass fairways recipe',
+    'overseeded bermudagrass': 'ryegrass overseeded transition recipe',
+    'spring transition': 'ryegrass overseeded transition recipe',
+}
 
 
 def extract_surface_management_recipe_names(question: str) -> List[str]:
     """Extract surface management recipe topics mentioned in a question."""
-    found_recipes = []
-    question_lower = question.lower()
-    aliases = {
-        'bentgrass greens': 'bentgrass greens recipe',
-        'poa greens': 'poa annua greens recipe',
-        'bermudagrass fairways': 'bermudagrass fairways recipe',
-        'tall fescue sports turf': 'tall fescue sports turf recipe',
-        'zoysiagrass fairways': 'zoysiagrass fairways recipe',
-        'overseeded bermudagrass': 'ryegrass overseeded transition recipe',
-        'spring transition': 'ryegrass overseeded transition recipe',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_recipes.append(display)
-    return list(set(found_recipes))
+    return _matched_topics(question, 'surface_management_recipe')
+
+
+CLIMATE_ZONE_PLAYBOOK_ALIASES = {
+    'transition zone': 'humid transition zone cool season',
+    'humid transition zone': 'humid transition zone cool season',
+    'northern cool season': 'northern cool season intensive',
+    'arid west': 'arid west warm season',
+    'desert': 'arid west warm season',
+    'humid southeast': 'humid southeast warm season',
+    'coastal': 'marine cool season coastal',
+    'marine climate': 'marine cool season coastal',
+    'upper midwest': 'upper midwest winter stress',
+    'winter stress': 'upper midwest winter stress',
+}
 
 
 def extract_climate_zone_playbook_names(question: str) -> List[str]:
     """Extract climate-zone playbook topics mentioned in a question."""
-    found_playbooks = []
-    question_lower = question.lower()
-    aliases = {
-        'transition zone': 'humid transition zone cool season',
-        'humid transition zone': 'humid transition zone cool season',
-        'northern cool season': 'northern cool season intensive',
-        'arid west': 'arid west warm season',
-        'desert': 'arid west warm season',
-        'humid southeast': 'humid southeast warm season',
-        'coastal': 'marine cool season coastal',
-        'marine climate': 'marine cool season coastal',
-        'upper midwest': 'upper midwest winter stress',
-        'winter stress': 'upper midwest winter stress',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_playbooks.append(display)
-    return list(set(found_playbooks))
+    return _matched_topics(question, 'climate_zone_playbook')
+
+
+TOURNAMENT_PREP_RECOVERY_ALIASES = {
+    'green speed': 'greens speed ramp plan',
+    'speed ramp': 'greens speed ramp plan',
+    'firmness': 'firmness and moisture tournament plan',
+    'moisture plan': 'firmness and moisture tournament plan',
+    'fairway presentation': 'fairway tournament presentation plan',
+    'event recovery greens': 'event recovery greens plan',
+    'event recovery fairway': 'event recovery fairway plan',
+    'weather disruption': 'weather disruption event plan',
+    'tournament weather': 'weather disruption event plan',
+}
 
 
 def extract_tournament_prep_recovery_names(question: str) -> List[str]:
     """Extract tournament prep and recovery topics mentioned in a question."""
-    found_programs = []
-    question_lower = question.lower()
-    aliases = {
-        'green speed': 'greens speed ramp plan',
-        'speed ramp': 'greens speed ramp plan',
-        'firmness': 'firmness and moisture tournament plan',
-        'moisture plan': 'firmness and moisture tournament plan',
-        'fairway presentation': 'fairway tournament presentation plan',
-        'event recovery greens': 'event recovery greens plan',
-        'event recovery fairway': 'event recovery fairway plan',
-        'weather disruption': 'weather disruption event plan',
-        'tournament weather': 'weather disruption event plan',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_programs.append(display)
-    return list(set(found_programs))
+    return _matched_topics(question, 'tournament_prep_recovery')
+
+
+NUTRIENT_DIAGNOSTIC_ALIASES = {
+    'nitrogen deficiency': 'nitrogen deficiency',
+    'n deficiency': 'nitrogen deficiency',
+    'potassium deficiency': 'potassium deficiency',
+    'k deficiency': 'potassium deficiency',
+    'iron deficiency': 'iron deficiency or color loss',
+    'color loss': 'iron deficiency or color loss',
+    'phosphorus deficiency': 'phosphorus deficiency or establishment issue',
+    'p deficiency': 'phosphorus deficiency or establishment issue',
+    'micronutrient lockout': 'micronutrient lockout high ph',
+    'high ph chlorosis': 'micronutrient lockout high ph',
+    'fertilizer burn': 'salt or fertilizer burn diagnostics',
+    'salt burn': 'salt or fertilizer burn diagnostics',
+}
 
 
 def extract_nutrient_diagnostic_names(question: str) -> List[str]:
     """Extract nutrient diagnostic topics mentioned in a question."""
-    found_diagnostics = []
-    question_lower = question.lower()
-    aliases = {
-        'nitrogen deficiency': 'nitrogen deficiency',
-        'n deficiency': 'nitrogen deficiency',
-        'potassium deficiency': 'potassium deficiency',
-        'k deficiency': 'potassium deficiency',
-        'iron deficiency': 'iron deficiency or color loss',
-        'color loss': 'iron deficiency or color loss',
-        'phosphorus deficiency': 'phosphorus deficiency or establishment issue',
-        'p deficiency': 'phosphorus deficiency or establishment issue',
-        'micronutrient lockout': 'micronutrient lockout high ph',
-        'high ph chlorosis': 'micronutrient lockout high ph',
-        'fertilizer burn': 'salt or fertilizer burn diagnostics',
-        'salt burn': 'salt or fertilizer burn diagnostics',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_diagnostics.append(display)
-    return list(set(found_diagnostics))
+    return _matched_topics(question, 'nutrient_diagnostic')
+
+
+CALIBRATION_WORKFLOW_ALIASES = {
+    'sprayer output': 'sprayer output verification',
+    'sprayer calibration': 'sprayer output verification',
+    'mixing sequence': 'sprayer mixing sequence workflow',
+    'tank mixing': 'sprayer mixing sequence workflow',
+    'spreader pattern': 'spreader pattern testing',
+    'granular conversion': 'granular rate per 1000 conversion',
+    'per 1000 conversion': 'granular rate per 1000 conversion',
+    'travel speed': 'travel speed checkpoint workflow',
+    'speed check': 'travel speed checkpoint workflow',
+    'recordkeeping': 'recordkeeping and post application review',
+    'post application review': 'recordkeeping and post application review',
+}
 
 
 def extract_calibration_workflow_names(question: str) -> List[str]:
     """Extract calibration workflow topics mentioned in a question."""
-    found_workflows = []
-    question_lower = question.lower()
-    aliases = {
-        'sprayer output': 'sprayer output verification',
-        'sprayer calibration': 'sprayer output verification',
-        'mixing sequence': 'sprayer mixing sequence workflow',
-        'tank mixing': 'sprayer mixing sequence workflow',
-        'spreader pattern': 'spreader pattern testing',
-        'granular conversion': 'granular rate per 1000 conversion',
-        'per 1000 conversion': 'granular rate per 1000 conversion',
-        'travel speed': 'travel speed checkpoint workflow',
-        'speed check': 'travel speed checkpoint workflow',
-        'recordkeeping': 'recordkeeping and post application review',
-        'post application review': 'recordkeeping and post application review',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_workflows.append(display)
-    return list(set(found_workflows))
+    return _matched_topics(question, 'calibration_workflow')
+
+
+SEASONAL_OPERATING_PLAN_ALIASES = {
+    'transition zone': 'cool season transition zone',
+    'cool-season transition zone': 'cool season transition zone',
+    'northern cool season': 'northern cool season',
+    'southeast warm season': 'warm season southeast',
+    'warm-season southeast': 'warm season southeast',
+    'arid west bermudagrass': 'arid west bermudagrass',
+}
 
 
 def extract_seasonal_operating_plan_names(question: str) -> List[str]:
     """Extract seasonal operating plan topics mentioned in a question."""
-    found_plans = []
-    question_lower = question.lower()
-    aliases = {
-        'transition zone': 'cool season transition zone',
-        'cool-season transition zone': 'cool season transition zone',
-        'northern cool season': 'northern cool season',
-        'southeast warm season': 'warm season southeast',
-        'warm-season southeast': 'warm season southeast',
-        'arid west bermudagrass': 'arid west bermudagrass',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_plans.append(display)
-    return list(set(found_plans))
+    return _matched_topics(question, 'seasonal_operating_plan')
+
+
+REGIONAL_PRESSURE_CALENDAR_ALIASES = {
+    'transition zone pressure': 'transition zone cool season pressure',
+    'cool-season transition pressure': 'transition zone cool season pressure',
+    'northern cool season pressure': 'northern cool season pressure',
+    'southeast warm season pressure': 'southeast warm season pressure',
+    'arid west bermudagrass pressure': 'arid west bermudagrass pressure',
+}
 
 
 def extract_regional_pressure_calendar_names(question: str) -> List[str]:
     """Extract regional pressure calendar topics mentioned in a question."""
-    found_calendars = []
-    question_lower = question.lower()
-    aliases = {
-        'transition zone pressure': 'transition zone cool season pressure',
-        'cool-season transition pressure': 'transition zone cool season pressure',
-        'northern cool season pressure': 'northern cool season pressure',
-        'southeast warm season pressure': 'southeast warm season pressure',
-        'arid west bermudagrass pressure': 'arid west bermudagrass pressure',
-    }
-    for alias, display in aliases.items():
-        if alias in question_lower:
-            found_calendars.append(display)
-    return list(set(found_calendars))
+    return _matched_topics(question, 'regional_pressure_calendar')
+
+
+ADVANCED_TURF_SCIENCE_ALIASES = {
+    'carbohydrate': 'cool season heat carbohydrate decline',
+    'carbohydrate reserves': 'cool season heat carbohydrate decline',
+    'heat stress physiology': 'cool season heat carbohydrate decline',
+    'root respiration': 'root respiration oxygen balance',
+    'oxygen balance': 'root respiration oxygen balance',
+    'air filled porosity': 'usga rootzone porosity hydraulic conductivity',
+    'air-filled porosity': 'usga rootzone porosity hydraulic conductivity',
+    'hydraulic conductivity': 'usga rootzone porosity hydraulic conductivity',
+    'rootzone porosity': 'usga rootzone porosity hydraulic conductivity',
+    'organic matter physics': 'surface organic matter physics',
+    'surface organic matter': 'surface organic matter physics',
+    'perched water': 'perched water layering diagnostics',
+    'layering': 'perched water layering diagnostics',
+    'disease triangle': 'disease triangle leaf wetness microclimate',
+    'leaf wetness': 'disease triangle leaf wetness microclimate',
+    'dollar spot epidemiology': 'dollar spot epidemiology nitrogen leaf wetness',
+    'brown patch epidemiology': 'brown patch rhizoctonia heat humidity',
+    'pgr rebound': 'pgr growth suppression thermal rebound',
+    'growth potential': 'pgr growth suppression thermal rebound',
+    'deficit irrigation': 'et deficit irrigation syringing',
+    'syringing': 'et deficit irrigation syringing',
+    'hydrophobicity': 'localized dry spot hydrophobicity',
+    'firmness': 'firmness green speed plant health tradeoff',
+    'green speed': 'firmness green speed plant health tradeoff',
+    'traffic recovery': 'traffic recovery carbohydrate growth rate',
+    'winter injury': 'winter crown hydration freeze injury',
+    'crown hydration': 'winter crown hydration freeze injury',
+    'freeze injury': 'winter crown hydration freeze injury',
+    'shade physiology': 'shade light carbohydrate morphology',
+    'low light': 'shade light carbohydrate morphology',
+    'nitrogen form': 'nitrogen form release growth stress balance',
+    'slow release nitrogen': 'nitrogen form release growth stress balance',
+    'salinity stress': 'salinity osmotic sodium structure stress',
+    'sodium hazard': 'salinity osmotic sodium structure stress',
+    'osmotic drought': 'salinity osmotic sodium structure stress',
+    'nematode': 'nematode root pruning stress complex',
+    'nematodes': 'nematode root pruning stress complex',
+    'root pruning': 'nematode root pruning stress complex',
+    'poa annua decline': 'poa annua vs bentgrass summer decline',
+    'poa decline': 'poa annua vs bentgrass summer decline',
+    'decline faster than bentgrass': 'poa annua vs bentgrass summer decline',
+    'wetting agent chemistry': 'wetting agent chemistry functional groups',
+    'surfactant chemistry': 'wetting agent chemistry functional groups',
+    'bicarbonate': 'bicarbonate alkalinity micronutrient lockout',
+    'bicarbonates': 'bicarbonate alkalinity micronutrient lockout',
+    'alkalinity': 'bicarbonate alkalinity micronutrient lockout',
+    'micronutrient lockout': 'bicarbonate alkalinity micronutrient lockout',
+    'pythium root dysfunction': 'pythium root dysfunction vs wet wilt',
+    'pythium root rot': 'pythium root dysfunction vs wet wilt',
+    'pythium vs wet wilt': 'pythium root dysfunction vs wet wilt',
+    'growing degree days': 'gdd growth potential pgr timing',
+    'gdd': 'gdd growth potential pgr timing',
+    'pgr timing': 'gdd growth potential pgr timing',
+    'anthracnose basal rot': 'anthracnose basal rot stress complex',
+    'anthracnose decline': 'anthracnose basal rot stress complex',
+    'basal rot': 'anthracnose basal rot stress complex',
+    'fairy ring hydrophobicity': 'fairy ring hydrophobicity nitrogen masking',
+    'fairy ring masking': 'fairy ring hydrophobicity nitrogen masking',
+    'green ring': 'fairy ring hydrophobicity nitrogen masking',
+    'soil ph buffering': 'soil ph buffering acidification programs',
+    'acidification program': 'soil ph buffering acidification programs',
+    'water acidification': 'soil ph buffering acidification programs',
+    'spring dead spot': 'bermudagrass spring dead spot transition recovery',
+    'bermuda spring recovery': 'bermudagrass spring dead spot transition recovery',
+    'bermuda transition': 'bermudagrass spring dead spot transition recovery',
+    'salt vs drought': 'salt vs drought ec moisture interpretation',
+    'salt stress versus drought': 'salt vs drought ec moisture interpretation',
+    'osmotic stress': 'salt vs drought ec moisture interpretation',
+    'zoysia green up': 'zoysiagrass spring greenup thatch temperature',
+    'zoysia green-up': 'zoysiagrass spring greenup thatch temperature',
+    'zoysia spring lag': 'zoysiagrass spring greenup thatch temperature',
+    'bermuda shade': 'bermudagrass shade cold carbohydrate limits',
+    'bermudagrass shade': 'bermudagrass shade cold carbohydrate limits',
+    'fall hardening': 'warm season fall hardening winter survival',
+    'winter survival': 'warm season fall hardening winter survival',
+    'reclaimed water nutrient credit': 'reclaimed water nutrient credit salt balance',
+    'reclaimed water salts': 'reclaimed water nutrient credit salt balance',
+    'effluent water': 'reclaimed water nutrient credit salt balance',
+    'sar': 'gypsum sar dispersion decision logic',
+    'soil dispersion': 'gypsum sar dispersion decision logic',
+    'gypsum decision': 'gypsum sar dispersion decision logic',
+    'nematode lab': 'nematode lab interpretation threshold context',
+    'nematode assay': 'nematode lab interpretation threshold context',
+    'nematode threshold': 'nematode lab interpretation threshold context',
+    'nematicide expectations': 'nematicide expectation root recovery logic',
+    'nematicide recovery': 'nematicide expectation root recovery logic',
+    'herbicide mode of action': 'herbicide mode of action injury patterns',
+    'herbicide injury pattern': 'herbicide mode of action injury patterns',
+    'herbicide carryover': 'herbicide carryover residual transition risk',
+    'residual herbicide': 'herbicide carryover residual transition risk',
+    'carryover risk': 'herbicide carryover residual transition risk',
+    'tournament stress budget': 'tournament greens stress budget model',
+    'greens conditioning stress': 'tournament greens stress budget model',
+    'greens conditioning budget': 'tournament greens stress budget model',
+    'conditioning budget': 'tournament greens stress budget model',
+    'tournament fairway traffic': 'tournament fairway tee recovery traffic model',
+    'tournament tee traffic': 'tournament fairway tee recovery traffic model',
+    'abw timing': 'annual bluegrass weevil lifecycle threshold timing',
+    'annual bluegrass weevil timing': 'annual bluegrass weevil lifecycle threshold timing',
+    'abw lifecycle': 'annual bluegrass weevil lifecycle threshold timing',
+    'grub threshold': 'white grub species threshold recovery logic',
+    'white grub threshold': 'white grub species threshold recovery logic',
+    'sod webworm': 'sod webworm cutworm night feeding diagnostics',
+    'cutworm feeding': 'sod webworm cutworm night feeding diagnostics',
+    'chinch bug drought': 'chinch bug heat drought interaction model',
+    'chinch bug heat stress': 'chinch bug heat drought interaction model',
+    'species fit': 'species fit surface region tradeoff model',
+    'surface fit': 'species fit surface region tradeoff model',
+    'renovation decision': 'renovation vs rescue program decision model',
+    'renovation versus rescue': 'renovation vs rescue program decision model',
+    'ryegrass hanging on': 'overseeded ryegrass transition competition model',
+    'ryegrass is hanging on': 'overseeded ryegrass transition competition model',
+    'hanging on too long': 'overseeded ryegrass transition competition model',
+    'spring transition ryegrass': 'overseeded ryegrass transition competition model',
+    'bermuda transition competition': 'overseeded ryegrass transition competition model',
+    'seedling establishment': 'seedling establishment temperature moisture oxygen balance',
+    'seedlings dying': 'seedling establishment temperature moisture oxygen balance',
+    'germination looked fine': 'seedling establishment temperature moisture oxygen balance',
+    'cultivar diversity': 'cultivar diversity stress disease buffering',
+    'mixed cultivars': 'cultivar diversity stress disease buffering',
+    'sprayer coverage': 'sprayer coverage nozzle pressure canopy deposition',
+    'nozzle pressure': 'sprayer coverage nozzle pressure canopy deposition',
+    'application pattern': 'sprayer coverage nozzle pressure canopy deposition',
+    'rolling frequency': 'roller frequency mechanical stress budget',
+    'repeated rolling': 'roller frequency mechanical stress budget',
+    'cec': 'soil test cec base saturation practical limits',
+    'base saturation': 'soil test cec base saturation practical limits',
+    'spray water ph': 'spray water ph hardness adjuvant interaction model',
+    'water hardness spray': 'spray water ph hardness adjuvant interaction model',
+    'adjuvant interaction': 'spray water ph hardness adjuvant interaction model',
+    'mower sharpness': 'mower sharpness leaf shredding disease mimic model',
+    'leaf shredding': 'mower sharpness leaf shredding disease mimic model',
+    'cut quality': 'mower sharpness leaf shredding disease mimic model',
+    'topdressing consistency': 'topdressing organic matter dilution layering drift',
+    'organic matter dilution': 'topdressing organic matter dilution layering drift',
+    'sand compatibility': 'topdressing organic matter dilution layering drift',
+}
 
 
 def extract_advanced_turf_science_names(question: str) -> List[str]:
     """Extract advanced turf science topics mentioned in a question."""
-    found_topics = []
-    question_lower = question.lower()
-    aliases = {
-        'carbohydrate': 'cool season heat carbohydrate decline',
-        'carbohydrate reserves': 'cool season heat carbohydrate decline',
-        'heat stress physiology': 'cool season heat carbohydrate decline',
-        'root respiration': 'root respiration oxygen balance',
-        'oxygen balance': 'root respiration oxygen balance',
-        'air filled porosity': 'usga rootzone porosity hydraulic conductivity',
-        'air-filled porosity': 'usga rootzone porosity hydraulic conductivity',
-        'hydraulic conductivity': 'usga rootzone porosity hydraulic conductivity',
-        'rootzone porosity': 'usga rootzone porosity hydraulic conductivity',
-        'organic matter physics': 'surface organic matter physics',
-        'surface organic matter': 'surface organic matter physics',
-        'perched water': 'perched water layering diagnostics',
-        'layering': 'perched water layering diagnostics',
-        'disease triangle': 'disease triangle leaf wetness microclimate',
-        'leaf wetness': 'disease triangle leaf wetness microclimate',
-        'dollar spot epidemiology': 'dollar spot epidemiology nitrogen leaf wetness',
-        'brown patch epidemiology': 'brown patch rhizoctonia heat humidity',
-        'pgr rebound': 'pgr growth suppression thermal rebound',
-        'growth potential': 'pgr growth suppression thermal rebound',
-        'deficit irrigation': 'et deficit irrigation syringing',
-        'syringing': 'et deficit irrigation syringing',
-        'hydrophobicity': 'localized dry spot hydrophobicity',
-        'firmness': 'firmness green speed plant health tradeoff',
-        'green speed': 'firmness green speed plant health tradeoff',
-        'traffic recovery': 'traffic recovery carbohydrate growth rate',
-        'winter injury': 'winter crown hydration freeze injury',
-        'crown hydration': 'winter crown hydration freeze injury',
-        'freeze injury': 'winter crown hydration freeze injury',
-        'shade physiology': 'shade light carbohydrate morphology',
-        'low light': 'shade light carbohydrate morphology',
-        'nitrogen form': 'nitrogen form release growth stress balance',
-        'slow release nitrogen': 'nitrogen form release growth stress balance',
-        'salinity stress': 'salinity osmotic sodium structure stress',
-        'sodium hazard': 'salinity osmotic sodium structure stress',
-        'osmotic drought': 'salinity osmotic sodium structure stress',
-        'nematode': 'nematode root pruning stress complex',
-        'nematodes': 'nematode root pruning stress complex',
-        'root pruning': 'nematode root pruning stress complex',
-        'poa annua decline': 'poa annua vs bentgrass summer decline',
-        'poa decline': 'poa annua vs bentgrass summer decline',
-        'decline faster than bentgrass': 'poa annua vs bentgrass summer decline',
-        'wetting agent chemistry': 'wetting agent chemistry functional groups',
-        'surfactant chemistry': 'wetting agent chemistry functional groups',
-        'bicarbonate': 'bicarbonate alkalinity micronutrient lockout',
-        'bicarbonates': 'bicarbonate alkalinity micronutrient lockout',
-        'alkalinity': 'bicarbonate alkalinity micronutrient lockout',
-        'micronutrient lockout': 'bicarbonate alkalinity micronutrient lockout',
-        'pythium root dysfunction': 'pythium root dysfunction vs wet wilt',
-        'pythium root rot': 'pythium root dysfunction vs wet wilt',
-        'pythium vs wet wilt': 'pythium root dysfunction vs wet wilt',
-        'growing degree days': 'gdd growth potential pgr timing',
-        'gdd': 'gdd growth potential pgr timing',
-        'pgr timing': 'gdd growth potential pgr timing',
-        'anthracnose basal rot': 'anthracnose basal rot stress complex',
-        'anthracnose decline': 'anthracnose basal rot stress complex',
-        'basal rot': 'anthracnose basal rot stress complex',
-        'fairy ring hydrophobicity': 'fairy ring hydrophobicity nitrogen masking',
-        'fairy ring masking': 'fairy ring hydrophobicity nitrogen masking',
-        'green ring': 'fairy ring hydrophobicity nitrogen masking',
-        'soil ph buffering': 'soil ph buffering acidification programs',
-        'acidification program': 'soil ph buffering acidification programs',
-        'water acidification': 'soil ph buffering acidification programs',
-        'spring dead spot': 'bermudagrass spring dead spot transition recovery',
-        'bermuda spring recovery': 'bermudagrass spring dead spot transition recovery',
-        'bermuda transition': 'bermudagrass spring dead spot transition recovery',
-        'salt vs drought': 'salt vs drought ec moisture interpretation',
-        'salt stress versus drought': 'salt vs drought ec moisture interpretation',
-        'osmotic stress': 'salt vs drought ec moisture interpretation',
-        'zoysia green up': 'zoysiagrass spring greenup thatch temperature',
-        'zoysia green-up': 'zoysiagrass spring greenup thatch temperature',
-        'zoysia spring lag': 'zoysiagrass spring greenup thatch temperature',
-        'bermuda shade': 'bermudagrass shade cold carbohydrate limits',
-        'bermudagrass shade': 'bermudagrass shade cold carbohydrate limits',
-        'fall hardening': 'warm season fall hardening winter survival',
-        'winter survival': 'warm season fall hardening winter survival',
-        'reclaimed water nutrient credit': 'reclaimed water nutrient credit salt balance',
-        'reclaimed water salts': 'reclaimed water nutrient credit salt balance',
-        'effluent water': 'reclaimed water nutrient credit salt balance',
-        'sar': 'gypsum sar dispersion decision logic',
-        'soil dispersion': 'gypsum sar dispersion decision logic',
-        'gypsum decision': 'gypsum sar dispersion decision logic',
-        'nematode lab': 'nematode lab interpretation threshold context',
-        'nematode assay': 'nematode lab interpretation threshold context',
-        'nematode threshold': 'nematode lab interpretation threshold context',
-        'nematicide expectations': 'nematicide expectation root recovery logic',
-        'nematicide recovery': 'nematicide expectation root recovery logic',
-        'herbicide mode of action': 'herbicide mode of action injury patterns',
-        'herbicide injury pattern': 'herbicide mode of action injury patterns',
-        'herbicide carryover': 'herbicide carryover residual transition risk',
-        'residual herbicide': 'herbicide carryover residual transition risk',
-        'carryover risk': 'herbicide carryover residual transition risk',
-        'tournament stress budget': 'tournament greens stress budget model',
-        'greens conditioning stress': 'tournament greens stress budget model',
-        'greens conditioning budget': 'tournament greens stress budget model',
-        'conditioning budget': 'tournament greens stress budget model',
-        'tournament fairway traffic': 'tournament fairway tee recovery traffic model',
-        'tournament tee traffic': 'tournament fairway tee recovery traffic model',
-        'abw timing': 'annual bluegrass weevil lifecycle threshold timing',
-        'annual bluegrass weevil timing': 'annual bluegrass weevil lifecycle threshold timing',
-        'abw lifecycle': 'annual bluegrass weevil lifecycle threshold timing',
-        'grub threshold': 'white grub species threshold recovery logic',
-        'white grub threshold': 'white grub species threshold recovery logic',
-        'sod webworm': 'sod webworm cutworm night feeding diagnostics',
-        'cutworm feeding': 'sod webworm cutworm night feeding diagnostics',
-        'chinch bug drought': 'chinch bug heat drought interaction model',
-        'chinch bug heat stress': 'chinch bug heat drought interaction model',
-        'species fit': 'species fit surface region tradeoff model',
-        'surface fit': 'species fit surface region tradeoff model',
-        'renovation decision': 'renovation vs rescue program decision model',
-        'renovation versus rescue': 'renovation vs rescue program decision model',
-        'ryegrass hanging on': 'overseeded ryegrass transition competition model',
-        'ryegrass is hanging on': 'overseeded ryegrass transition competition model',
-        'hanging on too long': 'overseeded ryegrass transition competition model',
-        'spring transition ryegrass': 'overseeded ryegrass transition competition model',
-        'bermuda transition competition': 'overseeded ryegrass transition competition model',
-        'seedling establishment': 'seedling establishment temperature moisture oxygen balance',
-        'seedlings dying': 'seedling establishment temperature moisture oxygen balance',
-        'germination looked fine': 'seedling establishment temperature moisture oxygen balance',
-        'cultivar diversity': 'cultivar diversity stress disease buffering',
-        'mixed cultivars': 'cultivar diversity stress disease buffering',
-        'sprayer coverage': 'sprayer coverage nozzle pressure canopy deposition',
-        'nozzle pressure': 'sprayer coverage nozzle pressure canopy deposition',
-        'application pattern': 'sprayer coverage nozzle pressure canopy deposition',
-        'rolling frequency': 'roller frequency mechanical stress budget',
-        'repeated rolling': 'roller frequency mechanical stress budget',
-        'cec': 'soil test cec base saturation practical limits',
-        'base saturation': 'soil test cec base saturation practical limits',
-        'spray water ph': 'spray water ph hardness adjuvant interaction model',
-        'water hardness spray': 'spray water ph hardness adjuvant interaction model',
-        'adjuvant interaction': 'spray water ph hardness adjuvant interaction model',
-        'mower sharpness': 'mower sharpness leaf shredding disease mimic model',
-        'leaf shredding': 'mower sharpness leaf shredding disease mimic model',
-        'cut quality': 'mower sharpness leaf shredding disease mimic model',
-        'topdressing consistency': 'topdressing organic matter dilution layering drift',
-        'organic matter dilution': 'topdressing organic matter dilution layering drift',
-        'sand compatibility': 'topdressing organic matter dilution layering drift',
-    }
-    for alias, display in aliases.items():
-        escaped = re.escape(alias)
-        prefix = r"\b" if alias[:1].isalnum() else ""
-        suffix = r"\b" if alias[-1:].isalnum() else ""
-        if re.search(prefix + escaped + suffix, question_lower):
-            found_topics.append(display)
-    return list(set(found_topics))
+    return _matched_topics(question, 'advanced_turf_science')
+
+
+
+# Alias tables above are matched together with the product, disease, weed and
+# pest names from the current snapshot in one shared entity-matcher pass.
+_TOPIC_ALIAS_TABLES = {
+    'pest': (PEST_ALIASES, SUBSTRING),
+    'fertility_program': (FERTILITY_PROGRAM_ALIASES, SUBSTRING),
+    'irrigation_program': (IRRIGATION_PROGRAM_ALIASES, SUBSTRING),
+    'cultivation_program': (CULTIVATION_PROGRAM_ALIASES, SUBSTRING),
+    'diagnostic_framework': (DIAGNOSTIC_FRAMEWORK_ALIASES, EDGE),
+    'mowing_program': (MOWING_PROGRAM_ALIASES, SUBSTRING),
+    'salinity_management': (SALINITY_MANAGEMENT_ALIASES, SUBSTRING),
+    'drainage_rootzone_program': (DRAINAGE_ROOTZONE_PROGRAM_ALIASES, SUBSTRING),
+    'overseeding_transition_program': (OVERSEEDING_TRANSITION_PROGRAM_ALIASES, SUBSTRING),
+    'disease_ipm_playbook': (DISEASE_IPM_PLAYBOOK_ALIASES, SUBSTRING),
+    'surface_management_recipe': (SURFACE_MANAGEMENT_RECIPE_ALIASES, SUBSTRING),
+    'climate_zone_playbook': (CLIMATE_ZONE_PLAYBOOK_ALIASES, SUBSTRING),
+    'tournament_prep_recovery': (TOURNAMENT_PREP_RECOVERY_ALIASES, SUBSTRING),
+    'nutrient_diagnostic': (NUTRIENT_DIAGNOSTIC_ALIASES, SUBSTRING),
+    'calibration_workflow': (CALIBRATION_WORKFLOW_ALIASES, SUBSTRING),
+    'seasonal_operating_plan': (SEASONAL_OPERATING_PLAN_ALIASES, SUBSTRING),
+    'regional_pressure_calendar': (REGIONAL_PRESSURE_CALENDAR_ALIASES, SUBSTRING),
+    'advanced_turf_science': (ADVANCED_TURF_SCIENCE_ALIASES, EDGE),
+    'turfgrass': (TURFGRASS_ALIASES, SUBSTRING),
+    'abiotic_stress': (ABIOTIC_STRESS_ALIASES, SUBSTRING),
+}
+
+
+def _topic_alias_vocabulary():
+    for name, (aliases, mode) in _TOPIC_ALIAS_TABLES.items():
+        for alias, display in aliases.items():
+            yield f'kb_topic:{name}', alias, display, mode
+
+
+def _product_name_vocabulary():
+    products = load_products()
+    for category in ['fungicides', 'herbicides', 'insecticides', 'pgrs']:
+        for ai_name, info in products.get(category, {}).items():
+            yield 'kb_topic:product', ai_name, ai_name, SUBSTRING
+            for trade in info.get('trade_names', []):
+                yield 'kb_topic:product', trade, trade, SUBSTRING
+
+
+def _record_name_vocabulary(name: str, load_records):
+    for key in load_records().keys():
+        display_name = key.replace('_', ' ')
+        yield f'kb_topic:{name}', display_name, display_name, SUBSTRING
+        yield f'kb_topic:{name}', key, display_name, SUBSTRING
+
+
+# One vocabulary per source, so each topic kind is tied only to the sources it
+# was built from. Registration order is the order extractors report hits in.
+register_vocabulary('knowledge_base', _topic_alias_vocabulary)
+register_vocabulary('knowledge_base_products', _product_name_vocabulary)
+register_vocabulary('knowledge_base_diseases', lambda: _record_name_vocabulary('disease', load_diseases))
+register_vocabulary('knowledge_base_weeds', lambda: _record_name_vocabulary('weed', load_weeds))
+register_vocabulary('knowledge_base_pests', lambda: _record_name_vocabulary('pest', load_pests))
+
+
+def _matched_topics(question: str, name: str) -> List[str]:
+    return match_entities(question.lower()).registered_values(f'kb_topic:{name}')
 
 
 def _timing_window_score(question_lower: str, timing_key: str, info: dict) -> int:
@@ -2,23 +2,51 @@
 Knowledge Base Builder for Greenside Turf AI
 Scans PDF folders, extracts text, chunks, embeds, and uploads to Pinecone.
 Tracks indexed files to avoid duplicates.
+
+Builds run as a staged pipeline: a process pool extracts and chunks PDFs,
+chunks from any number of documents are packed into embedding requests of up
+to 2048 inputs that run concurrently (with a bounded number in flight), and
+each embedded batch is upserted in parallel sub-batches. Embedding, upsert and
+delete calls retry with exponential backoff. A document is recorded in the
+tracker only once all of its vectors are upserted, at which point vector ids
+left over from an older, longer version of the file are deleted.
+
+Chunk vectors are content-addressed (sha256 of the chunk text), so a chunk
+that is already in the index -- unchanged text in a revised PDF, or the same
+EPA boilerplate on another label -- is referenced instead of re-embedded and
+re-stored. Chunks that are near-duplicates of an indexed chunk (MinHash/LSH,
+same numbers) collapse into it too. Shared vectors list every referencing
+document in their ``sources`` metadata and are deleted once nothing
+references them. Embeddings are also kept in a persistent store keyed by
+(model, sha256), so re-upserting a known chunk never calls the API.
 """
 
 import os
 import json
 import hashlib
+import random
+import struct
+import sqlite3
+import threading
 import time
 import re
 import logging
+import multiprocessing
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 
 import PyPDF2
 import openai
 from pinecone import Pinecone
 from dotenv import load_dotenv
 
+from token_accounting import count_tokens
+
 load_dotenv()
 
 # Configure logging
@@ -34,11 +62,29 @@ CHUNK_OVERLAP = 150  # Overlap between chunks for context
 MIN_CHUNK_SIZE = 200  # Minimum chunk size to keep
 MAX_CHUNKS_PER_DOC = 50  # Limit chunks per document
 EMBEDDING_MODEL = "text-embedding-3-small"
-BATCH_SIZE = 50  # Vectors per upsert batch
+BATCH_SIZE = 100  # Vectors per upsert batch
+EMBEDDING_BATCH_SIZE = 2048  # Inputs per embeddings request (API maximum)
+EMBEDDING_BATCH_TOKENS = 250_000  # Stays under the 300k tokens-per-request cap
+DELETE_BATCH_SIZE = 1000  # Ids per Pinecone delete call
+
+# Chunk dedup
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 16  # LSH bands of MINHASH_PERMUTATIONS // MINHASH_BANDS rows
+SHINGLE_WORDS = 5
+NEAR_DUPLICATE_THRESHOLD = 0.85  # Estimated Jaccard similarity to collapse into an indexed chunk
+
+# Pipeline concurrency
+EXTRACT_WORKERS = int(os.environ.get('KB_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))
+EMBED_WORKERS = int(os.environ.get('KB_EMBED_WORKERS', 4))
+UPSERT_WORKERS = int(os.environ.get('KB_UPSERT_WORKERS', 4))
+MAX_PENDING_BATCHES = EMBED_WORKERS * 2  # Embedding batches queued or in flight
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0  # Seconds; doubles per attempt
 
 # Data directory for tracking
 DATA_DIR = os.environ.get('DATA_DIR', 'data' if os.path.exists('data') else '.')
-INDEX_TRACKER_FILE = os.path.join(DATA_DIR, 'indexed_files.json')
+INDEX_TRACKER_FILE = os.path.join(DATA_DIR, 'indexed_files.json')  # Legacy tracker, imported once
+INDEX_TRACKER_DB = os.path.join(DATA_DIR, 'indexed_files.db')
 
 # PDF source folders with their types
 PDF_FOLDERS = {
@@ -51,74 +97,404 @@ PDF_FOLDERS = {
 }
 
 
+def get_file_hash(filepath: str) -> str:
+    """Get MD5 hash of file for change detection."""
+    hasher = hashlib.md5()
+    with open(filepath, 'rb') as f:
+        buf = f.read(65536)
+        while len(buf) > 0:
+            hasher.update(buf)
+            buf = f.read(65536)
+    return hasher.hexdigest()
+
+
+def file_fingerprint(filepath: str) -> Tuple[int, int, str]:
+    """(size, mtime_ns, md5) of a file, stat taken before the read."""
+    stat = os.stat(filepath)
+    return stat.st_size, stat.st_mtime_ns, get_file_hash(filepath)
+
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MINHASH_RNG = random.Random(0x6B62)
+_MINHASH_PARAMS = [
+    (_MINHASH_RNG.randrange(1, _MERSENNE_PRIME), _MINHASH_RNG.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+
+def chunk_hash(chunk: str) -> str:
+    """sha256 of the chunk text; keys the embedding store."""
+    return hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+
+
+def chunk_vector_id(content_hash: str) -> str:
+    """Content-addressed vector id, so identical chunks share one vector."""
+    return content_hash[:32]
+
+
+def minhash_signature(text: str) -> bytes:
+    """MinHash of the chunk's lowercase word shingles, packed as uint32s."""
+    words = re.findall(r'\w+', text.lower())
+    shingles = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little') for s in shingles]
+    return array('I', (
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) & 0xFFFFFFFF
+        for a, b in _MINHASH_PARAMS
+    )).tobytes()
+
+
+def signature_similarity(left: bytes, right: bytes) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    a, b = array('I', left), array('I', right)
+    return sum(x == y for x, y in zip(a, b)) / len(a) if len(a) == len(b) and a else 0.0
+
+
+def lsh_band_keys(signature: bytes) -> List[int]:
+    """One bucket key per LSH band; near-duplicates share at least one."""
+    width = len(signature) // MINHASH_BANDS
+    return [
+        struct.unpack('<q', hashlib.blake2b(bytes([band]) + signature[band * width:(band + 1) * width], digest_size=8).digest())[0]
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def numeric_tokens(text: str) -> str:
+    """Sorted distinct numbers in a chunk. Near-duplicates must agree on them,
+    so labels that differ only in rates or intervals never collapse."""
+    return ' '.join(sorted(set(re.findall(r'\d+(?:\.\d+)?', text))))
+
+
 class IndexTracker:
-    """Tracks which files have been indexed to avoid duplicates."""
+    """Tracks which files have been indexed to avoid duplicates.
 
-    def __init__(self, tracker_file: str = INDEX_TRACKER_FILE):
-        self.tracker_file = tracker_file
-        self.indexed = self._load()
+    State lives in SQLite, one row per file, so marking a file indexed is a
+    single-row upsert. A file whose size and mtime match its row counts as
+    unchanged without being read; a different size counts as changed; only
+    an mtime-only change falls back to comparing MD5 hashes.
 
-    def _load(self) -> Dict:
-        """Load the tracking file."""
-        if os.path.exists(self.tracker_file):
+    The same database records every content-addressed chunk vector (its
+    MinHash signature and LSH bands, and whether it is stored yet) and which
+    files reference it.
+    """
+
+    def __init__(self, db_path: str = INDEX_TRACKER_DB, legacy_file: Optional[str] = INDEX_TRACKER_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS indexed_files (
+                filepath TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                indexed_at TEXT NOT NULL,
+                chunks INTEGER NOT NULL,
+                vector_ids TEXT NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tracker_meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                vector_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                numbers TEXT NOT NULL,
+                stored INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_bands (
+                band_key INTEGER NOT NULL,
+                vector_id TEXT NOT NULL,
+                PRIMARY KEY (band_key, vector_id)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_refs (
+                filepath TEXT NOT NULL,
+                vector_id TEXT NOT NULL,
+                PRIMARY KEY (filepath, vector_id)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunk_refs_vector ON chunk_refs (vector_id)")
+        if legacy_file:
+            self._import_legacy(legacy_file)
+
+    def _import_legacy(self, legacy_file: str):
+        """Copy an ``indexed_files.json`` tracker into an empty database."""
+        if not os.path.exists(legacy_file):
+            return
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM tracker_meta WHERE key = 'legacy_imported'").fetchone():
+                return
             try:
-                with open(self.tracker_file, 'r') as f:
-                    return json.load(f)
+                with open(legacy_file, 'r') as f:
+                    legacy = json.load(f)
             except Exception as e:
-                logger.warning(f"Error loading tracker: {e}")
-        return {'files': {}, 'last_run': None, 'stats': {}}
-
-    def _save(self):
-        """Save the tracking file."""
-        os.makedirs(os.path.dirname(self.tracker_file) or '.', exist_ok=True)
-        with open(self.tracker_file, 'w') as f:
-            json.dump(self.indexed, f, indent=2)
+                logger.warning(f"Error loading legacy tracker: {e}")
+                return
+            # Unknown size/mtime (-1) makes the first check hash the file, then records its stat.
+            rows = [
+                (filepath, -1, -1, entry.get('hash') or '', entry.get('indexed_at') or '',
+                 int(entry.get('chunks') or 0), json.dumps(entry.get('vector_ids') or []))
+                for filepath, entry in (legacy.get('files') or {}).items()
+            ]
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR IGNORE INTO indexed_files VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_refs VALUES (?, ?)",
+                [(row[0], vector_id) for row in rows for vector_id in json.loads(row[6])],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tracker_meta VALUES (?, ?)",
+                [('legacy_imported', datetime.now().isoformat()),
+                 ('last_run', legacy.get('last_run')),
+                 ('stats', json.dumps(legacy.get('stats') or {}))],
+            )
+            self._conn.execute("COMMIT")
+        logger.info(f"Imported {len(rows)} tracked files from {legacy_file}")
 
     def get_file_hash(self, filepath: str) -> str:
         """Get MD5 hash of file for change detection."""
-        hasher = hashlib.md5()
-        with open(filepath, 'rb') as f:
-            buf = f.read(65536)
-            while len(buf) > 0:
-                hasher.update(buf)
-                buf = f.read(65536)
-        return hasher.hexdigest()
+        return get_file_hash(filepath)
 
     def is_indexed(self, filepath: str) -> bool:
         """Check if file has been indexed (and hasn't changed)."""
-        if filepath not in self.indexed['files']:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, hash FROM indexed_files WHERE filepath = ?", (filepath,)
+            ).fetchone()
+        if row is None:
             return False
-
-        stored_hash = self.indexed['files'][filepath].get('hash')
-        current_hash = self.get_file_hash(filepath)
-        return stored_hash == current_hash
-
-    def mark_indexed(self, filepath: str, chunks: int, vectors: List[str]):
-        """Mark a file as indexed."""
-        self.indexed['files'][filepath] = {
-            'hash': self.get_file_hash(filepath),
-            'indexed_at': datetime.now().isoformat(),
-            'chunks': chunks,
-            'vector_ids': vectors
-        }
-        self._save()
+        size, mtime_ns, stored_hash = row
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return False
+        if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns):
+            return True
+        if size >= 0 and stat.st_size != size:
+            return False
+        if self.get_file_hash(filepath) != stored_hash:
+            return False
+        with self._lock:
+            self._conn.execute(
+                "UPDATE indexed_files SET size = ?, mtime_ns = ? WHERE filepath = ?",
+                (stat.st_size, stat.st_mtime_ns, filepath),
+            )
+        return True
+
+    def get_vector_ids(self, filepath: str) -> List[str]:
+        """Vector ids recorded for a file at its last successful index."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector_ids FROM indexed_files WHERE filepath = ?", (filepath,)
+            ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def mark_indexed(self, filepath: str, chunks: int, vectors: List[str],
+                     fingerprint: Optional[Tuple[int, int, str]] = None):
+        """Mark a file as indexed.
+
+        ``fingerprint`` is the (size, mtime_ns, md5) the chunks were made
+        from; it is taken from the file now when not given.
+        """
+        size, mtime_ns, file_hash = fingerprint or file_fingerprint(filepath)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed_files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (filepath, size, mtime_ns, file_hash, datetime.now().isoformat(), chunks, json.dumps(vectors)),
+            )
+            self._conn.execute("DELETE FROM chunk_refs WHERE filepath = ?", (filepath,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_refs VALUES (?, ?)", [(filepath, vector_id) for vector_id in vectors]
+            )
+            self._conn.execute("COMMIT")
+
+    def forget(self, filepath: str):
+        """Drop a file's row and its chunk references, e.g. after its vectors were deleted."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM indexed_files WHERE filepath = ?", (filepath,))
+            self._conn.execute("DELETE FROM chunk_refs WHERE filepath = ?", (filepath,))
+            self._conn.execute("COMMIT")
+
+    def chunk_state(self, vector_id: str) -> Optional[int]:
+        """None if the chunk is unknown, 0 while its upsert is pending, 1 once stored."""
+        with self._lock:
+            row = self._conn.execute("SELECT stored FROM chunks WHERE vector_id = ?", (vector_id,)).fetchone()
+        return row[0] if row else None
+
+    def find_near_duplicate(self, signature: bytes, numbers: str,
+                            threshold: float = NEAR_DUPLICATE_THRESHOLD) -> Optional[str]:
+        """Most similar known chunk sharing an LSH band and the same numbers, if similar enough."""
+        keys = lsh_band_keys(signature)
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT c.vector_id, c.signature FROM chunks c
+                WHERE c.numbers = ? AND c.vector_id IN (
+                    SELECT vector_id FROM chunk_bands WHERE band_key IN ({','.join('?' * len(keys))})
+                )
+                """,
+                (numbers, *keys),
+            ).fetchall()
+        best_id, best_score = None, threshold
+        for vector_id, candidate in rows:
+            score = signature_similarity(signature, candidate)
+            if score >= best_score:
+                best_id, best_score = vector_id, score
+        return best_id
+
+    def register_chunk(self, vector_id: str, signature: bytes, numbers: str):
+        """Record a chunk about to be upserted, so later chunks can match it."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, 0)", (vector_id, signature, numbers)
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_bands VALUES (?, ?)",
+                [(key, vector_id) for key in lsh_band_keys(signature)],
+            )
+            self._conn.execute("COMMIT")
+
+    def mark_chunks_stored(self, vector_ids: List[str]):
+        with self._lock:
+            self._conn.executemany("UPDATE chunks SET stored = 1 WHERE vector_id = ?", [(v,) for v in vector_ids])
+
+    def drop_chunks(self, vector_ids: List[str], pending_only: bool = False):
+        """Forget chunks (all of them, or only those whose upsert never completed)."""
+        condition = " AND stored = 0" if pending_only else ""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for vector_id in vector_ids:
+                if self._conn.execute(
+                    f"DELETE FROM chunks WHERE vector_id = ?{condition}", (vector_id,)
+                ).rowcount:
+                    self._conn.execute("DELETE FROM chunk_bands WHERE vector_id = ?", (vector_id,))
+            self._conn.execute("COMMIT")
+
+    def discard_pending_chunks(self):
+        """Forget chunks left pending by an interrupted build."""
+        with self._lock:
+            pending = [row[0] for row in self._conn.execute("SELECT vector_id FROM chunks WHERE stored = 0")]
+        self.drop_chunks(pending, pending_only=True)
+
+    def chunk_sources(self, vector_id: str) -> List[str]:
+        """Files that reference a chunk vector."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT filepath FROM chunk_refs WHERE vector_id = ? ORDER BY filepath", (vector_id,)
+            )]
+
+    def unreferenced_chunks(self) -> List[str]:
+        """Stored chunk vectors no indexed file references any more."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                """
+                SELECT vector_id FROM chunks c WHERE stored = 1
+                AND NOT EXISTS (SELECT 1 FROM chunk_refs r WHERE r.vector_id = c.vector_id)
+                """
+            )]
 
     def update_stats(self, stats: Dict):
         """Update run statistics."""
-        self.indexed['last_run'] = datetime.now().isoformat()
-        self.indexed['stats'] = stats
-        self._save()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tracker_meta VALUES (?, ?)",
+                [('last_run', datetime.now().isoformat()), ('stats', json.dumps(stats))],
+            )
 
     def get_stats(self) -> Dict:
         """Get current stats."""
-        total_files = len(self.indexed['files'])
-        total_chunks = sum(f.get('chunks', 0) for f in self.indexed['files'].values())
+        with self._lock:
+            total_files, total_chunks = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM indexed_files"
+            ).fetchone()
+            stored_vectors = self._conn.execute("SELECT COUNT(*) FROM chunks WHERE stored = 1").fetchone()[0]
+            row = self._conn.execute("SELECT value FROM tracker_meta WHERE key = 'last_run'").fetchone()
         return {
             'total_files': total_files,
             'total_chunks': total_chunks,
-            'last_run': self.indexed.get('last_run')
+            'stored_vectors': stored_vectors,
+            'last_run': row[0] if row else None
         }
 
+    def get_run_stats(self) -> Dict:
+        """Statistics recorded by the last build."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM tracker_meta WHERE key = 'stats'").fetchone()
+        return json.loads(row[0]) if row and row[0] else {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingStore:
+    """Persistent chunk embeddings keyed by (model, sha256 of the chunk text).
+
+    Stored as float32, the precision Pinecone keeps. Safe to share between
+    the pipeline's embedding threads.
+    """
+
+    def __init__(self, db_path: str = INDEX_TRACKER_DB):
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_embeddings (
+                model TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (model, chunk_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for content_hash in set(hashes):
+                row = self._conn.execute(
+                    "SELECT embedding FROM chunk_embeddings WHERE model = ? AND chunk_hash = ?", (model, content_hash)
+                ).fetchone()
+                if row:
+                    found[content_hash] = array('f', row[0]).tolist()
+            self.hits += len(found)
+            self.misses += len(set(hashes)) - len(found)
+        return found
+
+    def put_many(self, model: str, embeddings: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_embeddings VALUES (?, ?, ?)",
+                [(model, content_hash, array('f', values).tobytes()) for content_hash, values in embeddings.items()],
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
 
 def extract_text_from_pdf(filepath: str) -> Tuple[str, int]:
     """Extract text from a PDF file."""
@@ -263,12 +639,28 @@ def extract_metadata(filepath: str, text: str) -> Dict:
     return metadata
 
 
+def _with_retry(operation: Callable, description: str, attempts: Optional[int] = None,
+                base_delay: Optional[float] = None):
+    """Run ``operation``, retrying failures with jittered exponential backoff."""
+    attempts = MAX_RETRIES if attempts is None else attempts
+    base_delay = RETRY_BASE_DELAY if base_delay is None else base_delay
+    for attempt in range(1, attempts + 1):
+        try:
+            return operation()
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = base_delay * 2 ** (attempt - 1) * (1 + random.random() / 2)
+            logger.warning(f"{description} failed (attempt {attempt}/{attempts}): {e}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
 def embed_texts(openai_client, texts: List[str]) -> List[List[float]]:
     """Embed multiple texts in a batch."""
     try:
-        response = openai_client.embeddings.create(
-            input=texts,
-            model=EMBEDDING_MODEL
+        response = _with_retry(
+            lambda: openai_client.embeddings.create(input=texts, model=EMBEDDING_MODEL),
+            f"Embedding {len(texts)} texts",
         )
         return [item.embedding for item in response.data]
     except Exception as e:
@@ -276,86 +668,365 @@ def embed_texts(openai_client, texts: List[str]) -> List[List[float]]:
         return []
 
 
-def process_pdf(
-    filepath: str,
-    openai_client,
-    pinecone_index,
-    doc_type: str
-) -> Tuple[int, List[str]]:
-    """Process a single PDF and upload to Pinecone."""
+def upsert_vectors(pinecone_index, vectors: List[Dict], executor: Optional[ThreadPoolExecutor] = None) -> List[str]:
+    """Upsert vectors in BATCH_SIZE requests (in parallel on ``executor``); returns the stored ids."""
+    def upsert(batch: List[Dict]) -> List[str]:
+        try:
+            _with_retry(lambda: pinecone_index.upsert(vectors=batch), f"Upsert of {len(batch)} vectors")
+            return [v['id'] for v in batch]
+        except Exception as e:
+            logger.error(f"Upsert error: {e}")
+            return []
 
-    # Extract text
-    text, num_pages = extract_text_from_pdf(filepath)
-    if len(text) < 500:
-        logger.warning(f"Skipping {filepath}: insufficient text ({len(text)} chars)")
-        return 0, []
+    batches = [vectors[i:i + BATCH_SIZE] for i in range(0, len(vectors), BATCH_SIZE)]
+    mapper = executor.map if executor is not None else map
+    return [vector_id for stored in mapper(upsert, batches) for vector_id in stored]
 
-    # Clean and chunk
-    text = clean_text(text)
-    chunks = smart_chunk(text)
 
-    if not chunks:
-        logger.warning(f"Skipping {filepath}: no valid chunks")
-        return 0, []
+def delete_vectors(pinecone_index, vector_ids: List[str]) -> bool:
+    """Delete vectors by id; False if any delete call ultimately failed."""
+    ok = True
+    for i in range(0, len(vector_ids), DELETE_BATCH_SIZE):
+        batch = vector_ids[i:i + DELETE_BATCH_SIZE]
+        try:
+            _with_retry(lambda: pinecone_index.delete(ids=batch), f"Delete of {len(batch)} vectors")
+        except Exception as e:
+            logger.error(f"Delete error: {e}")
+            ok = False
+    return ok
 
-    logger.info(f"Processing {os.path.basename(filepath)}: {len(chunks)} chunks from {num_pages} pages")
 
-    # Extract metadata
-    base_metadata = extract_metadata(filepath, text)
-    base_metadata['type'] = doc_type
-    base_metadata['num_pages'] = num_pages
+def update_vector_sources(pinecone_index, sources: Dict[str, List[str]],
+                          executor: Optional[ThreadPoolExecutor] = None):
+    """Set the ``sources`` metadata of shared vectors."""
+    def update(item: Tuple[str, List[str]]):
+        vector_id, names = item
+        try:
+            _with_retry(lambda: pinecone_index.update(id=vector_id, set_metadata={'sources': names}),
+                        f"Metadata update of {vector_id}")
+        except Exception as e:
+            logger.error(f"Update error: {e}")
 
-    # Create vector IDs
-    base_id = hashlib.md5(filepath.encode()).hexdigest()[:12]
-    vector_ids = []
+    mapper = executor.map if executor is not None else map
+    list(mapper(update, sources.items()))
 
-    # Process in batches
-    vectors_to_upsert = []
 
-    for i, chunk in enumerate(chunks):
-        vector_id = f"{base_id}-{i}"
-        vector_ids.append(vector_id)
+@dataclass
+class PreparedDocument:
+    """A PDF extracted and chunked, ready to embed. Picklable for the process pool."""
+    filepath: str
+    doc_type: str
+    num_pages: int = 0
+    records: List[Dict] = field(default_factory=list)  # {'id', 'hash', 'chunk', 'tokens', 'signature', 'numbers', 'metadata'}
+    fingerprint: Optional[Tuple[int, int, str]] = None
+    skip_reason: str = ''
+    error: str = ''
+    refs: List[str] = field(default_factory=list)  # Vector ids the document points at, set by the pipeline
 
-        # Chunk-specific metadata
-        metadata = base_metadata.copy()
-        metadata['chunk_id'] = i
-        metadata['total_chunks'] = len(chunks)
+    @property
+    def vector_ids(self) -> List[str]:
+        return [record['id'] for record in self.records]
 
-        vectors_to_upsert.append({
-            'id': vector_id,
-            'chunk': chunk,
-            'metadata': metadata
-        })
 
-    # Embed and upload in batches
-    uploaded = 0
-    for batch_start in range(0, len(vectors_to_upsert), BATCH_SIZE):
-        batch = vectors_to_upsert[batch_start:batch_start + BATCH_SIZE]
+def prepare_pdf(filepath: str, doc_type: str) -> PreparedDocument:
+    """Extract, clean and chunk a PDF into vector records (no network calls)."""
+    doc = PreparedDocument(filepath, doc_type)
+    try:
+        doc.fingerprint = file_fingerprint(filepath)
+
+        # Extract text
+        text, doc.num_pages = extract_text_from_pdf(filepath)
+        if len(text) < 500:
+            doc.skip_reason = f"insufficient text ({len(text)} chars)"
+            return doc
+
+        # Clean and chunk
+        text = clean_text(text)
+        chunks = smart_chunk(text)
+        if not chunks:
+            doc.skip_reason = "no valid chunks"
+            return doc
+
+        # Extract metadata
+        base_metadata = extract_metadata(filepath, text)
+        base_metadata['type'] = doc_type
+        base_metadata['num_pages'] = doc.num_pages
+
+        base_metadata['sources'] = [base_metadata['source']]
+        for i, chunk in enumerate(chunks):
+            # Chunk-specific metadata
+            metadata = base_metadata.copy()
+            metadata['chunk_id'] = i
+            metadata['total_chunks'] = len(chunks)
+            content_hash = chunk_hash(chunk)
+            doc.records.append({
+                'id': chunk_vector_id(content_hash),
+                'hash': content_hash,
+                'chunk': chunk,
+                'tokens': count_tokens(chunk, EMBEDDING_MODEL),
+                'signature': minhash_signature(chunk),
+                'numbers': numeric_tokens(chunk),
+                'metadata': metadata
+            })
+    except Exception as e:
+        doc.error = str(e)
+    return doc
+
+
+def _embedding_batches(records: Iterable[Dict]) -> Iterator[List[Dict]]:
+    """Pack records, across documents, into requests within the input and token caps."""
+    batch, tokens = [], 0
+    for record in records:
+        if batch and (len(batch) >= EMBEDDING_BATCH_SIZE or tokens + record['tokens'] > EMBEDDING_BATCH_TOKENS):
+            yield batch
+            batch, tokens = [], 0
+        batch.append(record)
+        tokens += record['tokens']
+    if batch:
+        yield batch
+
+
+def _embed_and_upsert(openai_client, pinecone_index, records: List[Dict],
+                      executor: Optional[ThreadPoolExecutor] = None,
+                      store: Optional[EmbeddingStore] = None) -> List[str]:
+    """Embed one batch of records (reusing stored embeddings) and upsert it; returns the stored ids."""
+    embeddings = store.get_many(EMBEDDING_MODEL, [record['hash'] for record in records]) if store else {}
+    missing = list({record['hash']: record['chunk'] for record in records if record['hash'] not in embeddings}.items())
+    if missing:
+        fresh = embed_texts(openai_client, [chunk for _, chunk in missing])
+        if len(fresh) != len(missing):
+            return []
+        fresh = dict(zip([content_hash for content_hash, _ in missing], fresh))
+        if store:
+            store.put_many(EMBEDDING_MODEL, fresh)
+        embeddings.update(fresh)
+    vectors = [
+        {'id': record['id'], 'values': embeddings[record['hash']], 'metadata': record['metadata']}
+        for record in records
+    ]
+    return upsert_vectors(pinecone_index, vectors, executor)
+
+
+def _prepared_documents(to_process: List[Tuple[str, str]], workers: int) -> Iterator[PreparedDocument]:
+    """Prepare PDFs on a process pool, at most ``2 * workers`` ahead of the consumer."""
+    if workers <= 1:
+        for filepath, doc_type in to_process:
+            yield prepare_pdf(filepath, doc_type)
+        return
 
-        # Get embeddings
-        texts = [v['chunk'] for v in batch]
-        embeddings = embed_texts(openai_client, texts)
+    # spawn: the admin route runs builds on a thread of a threaded server, where fork is unsafe.
+    context = multiprocessing.get_context('spawn')
+    queued = iter(to_process)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        in_flight = {pool.submit(prepare_pdf, *item): item for item in islice(queued, workers * 2)}
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                filepath, doc_type = in_flight.pop(future)
+                next_item = next(queued, None)
+                if next_item is not None:
+                    in_flight[pool.submit(prepare_pdf, *next_item)] = next_item
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield PreparedDocument(filepath, doc_type, error=str(e))
 
-        if not embeddings:
-            continue
 
-        # Prepare for upsert
-        upsert_batch = []
-        for v, embedding in zip(batch, embeddings):
-            upsert_batch.append({
-                'id': v['id'],
-                'values': embedding,
-                'metadata': v['metadata']
-            })
+def process_pdf(
+    filepath: str,
+    openai_client,
+    pinecone_index,
+    doc_type: str
+) -> Tuple[int, List[str]]:
+    """Process a single PDF and upload to Pinecone."""
+    doc = prepare_pdf(filepath, doc_type)
+    if doc.error:
+        raise RuntimeError(doc.error)
+    if not doc.records:
+        logger.warning(f"Skipping {filepath}: {doc.skip_reason}")
+        return 0, []
 
-        # Upsert to Pinecone
-        try:
-            pinecone_index.upsert(vectors=upsert_batch)
-            uploaded += len(upsert_batch)
-        except Exception as e:
-            logger.error(f"Upsert error: {e}")
+    logger.info(f"Processing {os.path.basename(filepath)}: {len(doc.records)} chunks from {doc.num_pages} pages")
+    uploaded = 0
+    for batch in _embedding_batches(doc.records):
+        uploaded += len(_embed_and_upsert(openai_client, pinecone_index, batch))
+    return uploaded, doc.vector_ids
+
+
+def run_ingestion_pipeline(
+    to_process: List[Tuple[str, str]],
+    openai_client,
+    pinecone_index,
+    tracker: IndexTracker,
+    extract_workers: int = EXTRACT_WORKERS,
+    embed_workers: int = EMBED_WORKERS,
+    upsert_workers: int = UPSERT_WORKERS,
+    embedding_store: Optional[EmbeddingStore] = None,
+    refresh: bool = False,
+) -> Dict:
+    """Extract, embed and upsert ``to_process`` as overlapping stages.
+
+    Chunks already in the index, exactly or as near-duplicates, are
+    referenced rather than re-stored; ``refresh`` re-upserts a document's own
+    exact chunks anyway (embeddings still come from ``embedding_store``).
+    Returns run statistics, including throughput in documents per minute.
+    """
+    start_time = time.time()
+    pending: Dict[str, PreparedDocument] = {}
+    remaining: Dict[str, int] = {}
+    waiters: Dict[str, List[str]] = {}
+    claimed = set()
+    upserted = set()
+    touched = set()
+    incomplete = set()
+    result = {
+        'files_processed': 0, 'chunks_uploaded': 0, 'skipped': 0, 'failed': [], 'stale_vectors_deleted': 0,
+        'vectors_upserted': 0, 'chunks_reused': 0, 'near_duplicates_collapsed': 0, 'embeddings_reused': 0,
+    }
+    embedding_hits = embedding_store.hits if embedding_store else 0
+    tracker.discard_pending_chunks()
+
+    def delete_untracked(vector_ids: Iterable[str]) -> List[str]:
+        # Ids that predate content addressing belong to one file; delete them as soon as it drops them.
+        legacy = sorted(v for v in vector_ids if tracker.chunk_state(v) is None)
+        if legacy and not delete_vectors(pinecone_index, legacy):
+            return legacy
+        result['stale_vectors_deleted'] += len(legacy)
+        return []
+
+    def retire(doc: PreparedDocument):
+        # A previously indexed file that no longer yields chunks leaves only stale references.
+        old_ids = tracker.get_vector_ids(doc.filepath)
+        if old_ids and not delete_untracked(old_ids):
+            tracker.forget(doc.filepath)
+            touched.update(old_ids)
+
+    def finish(doc: PreparedDocument):
+        filename = os.path.basename(doc.filepath)
+        if doc.filepath in incomplete:
+            result['failed'].append(doc.filepath)
+            print(f"  ✗ {filename}: upload incomplete")
+            return
+        old_ids = set(tracker.get_vector_ids(doc.filepath))
+        # Keep undeleted ids tracked so the next change retries the delete.
+        vector_ids = doc.refs + delete_untracked(old_ids - set(doc.refs))
+        tracker.mark_indexed(doc.filepath, len(doc.records), vector_ids, doc.fingerprint)
+        touched.update(old_ids.symmetric_difference(doc.refs))
+        result['files_processed'] += 1
+        result['chunks_uploaded'] += len(doc.records)
+        print(f"  ✓ {filename}: {len(doc.records)} chunks from {doc.num_pages} pages ({len(doc.refs)} vectors)")
+
+    def release(filepath: str, ok: bool):
+        if not ok:
+            incomplete.add(filepath)
+        remaining[filepath] -= 1
+        if remaining[filepath] == 0:
+            del remaining[filepath]
+            finish(pending.pop(filepath))
+
+    def settle(batch: List[Dict], stored_ids: List[str]):
+        stored = set(stored_ids)
+        upserted.update(stored)
+        result['vectors_upserted'] += len(stored)
+        tracker.mark_chunks_stored(sorted(stored))
+        tracker.drop_chunks([record['id'] for record in batch if record['id'] not in stored], pending_only=True)
+        for record in batch:
+            release(record['metadata']['filepath'], record['id'] in stored)
+            for filepath in waiters.pop(record['id'], []):
+                release(filepath, record['id'] in stored)
+
+    def records() -> Iterator[Dict]:
+        for doc in _prepared_documents(to_process, extract_workers):
+            filename = os.path.basename(doc.filepath)
+            if doc.error:
+                logger.error(f"Error processing {doc.filepath}: {doc.error}")
+                result['failed'].append(doc.filepath)
+                print(f"  ✗ {filename}: {doc.error}")
+                continue
+            if not doc.records:
+                result['skipped'] += 1
+                print(f"  ⚠ {filename}: skipped ({doc.skip_reason})")
+                retire(doc)
+                continue
+
+            to_embed, own_ids, waiting_on = [], set(), set()
+            for record in doc.records:
+                vector_id = record['id']
+                state = tracker.chunk_state(vector_id)
+                if state is None:
+                    target = tracker.find_near_duplicate(record['signature'], record['numbers'])
+                    if target:
+                        result['near_duplicates_collapsed'] += 1
+                    else:
+                        tracker.register_chunk(vector_id, record['signature'], record['numbers'])
+                elif refresh and state == 1 and vector_id not in claimed:
+                    target = None
+                else:
+                    target = vector_id
+                    result['chunks_reused'] += 1
+
+                if target is None:
+                    claimed.add(vector_id)
+                    own_ids.add(vector_id)
+                    to_embed.append(record)
+                    target = vector_id
+                elif target not in own_ids and tracker.chunk_state(target) == 0:
+                    waiting_on.add(target)
+                if target not in doc.refs:
+                    doc.refs.append(target)
+
+            remaining[doc.filepath] = len(to_embed) + len(waiting_on)
+            for target in waiting_on:
+                waiters.setdefault(target, []).append(doc.filepath)
+            if not remaining[doc.filepath]:
+                del remaining[doc.filepath]
+                finish(doc)
+                continue
+            pending[doc.filepath] = doc
+            yield from to_embed
+
+    with ThreadPoolExecutor(max_workers=max(1, embed_workers)) as embed_pool, \
+            ThreadPoolExecutor(max_workers=max(1, upsert_workers)) as upsert_pool:
+        in_flight: Dict = {}
+
+        def drain(limit: int):
+            while len(in_flight) > limit:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    try:
+                        stored_ids = future.result()
+                    except Exception as e:
+                        logger.error(f"Batch error: {e}")
+                        stored_ids = []
+                    settle(batch, stored_ids)
+
+        for batch in _embedding_batches(records()):
+            future = embed_pool.submit(
+                _embed_and_upsert, openai_client, pinecone_index, batch, upsert_pool, embedding_store
+            )
+            in_flight[future] = batch
+            drain(MAX_PENDING_BATCHES - 1)
+        drain(0)
+
+        # Point shared vectors at every document that references them.
+        updates = {}
+        for vector_id in sorted(touched):
+            sources = tracker.chunk_sources(vector_id)
+            if tracker.chunk_state(vector_id) == 1 and sources and not (vector_id in upserted and len(sources) == 1):
+                updates[vector_id] = [os.path.basename(path) for path in sources]
+        update_vector_sources(pinecone_index, updates, upsert_pool)
+
+    orphaned = tracker.unreferenced_chunks()
+    if orphaned and delete_vectors(pinecone_index, orphaned):
+        tracker.drop_chunks(orphaned)
+        result['stale_vectors_deleted'] += len(orphaned)
 
-    return uploaded, vector_ids
+    elapsed = time.time() - start_time
+    result['embeddings_reused'] = (embedding_store.hits - embedding_hits) if embedding_store else 0
+    result['elapsed_seconds'] = elapsed
+    result['docs_per_minute'] = round(result['files_processed'] * 60 / elapsed, 1) if elapsed > 0 else 0.0
+    return result
 
 
 def scan_for_pdfs(folders: Dict[str, str] = PDF_FOLDERS) -> List[Tuple[str, str]]:
@@ -378,7 +1049,8 @@ def scan_for_pdfs(folders: Dict[str, str] = PDF_FOLDERS) -> List[Tuple[str, str]
 def build_knowledge_base(
     folders: Optional[Dict[str, str]] = None,
     force_reindex: bool = False,
-    limit: Optional[int] = None
+    limit: Optional[int] = None,
+    workers: Optional[int] = None
 ):
     """
     Main function to build/update the knowledge base.
@@ -387,6 +1059,7 @@ def build_knowledge_base(
         folders: Dict of folder paths to document types (uses defaults if None)
         force_reindex: If True, reindex all files even if already indexed
         limit: Maximum number of new files to process (for testing)
+        workers: Extraction processes (defaults to EXTRACT_WORKERS; 1 extracts inline)
     """
     if folders is None:
         folders = PDF_FOLDERS
@@ -432,44 +1105,23 @@ def build_knowledge_base(
 
     # Process files
     print("\n" + "-" * 60)
-    start_time = time.time()
-
-    total_chunks = 0
-    processed = 0
-    failed = []
-
-    for i, (filepath, doc_type) in enumerate(to_process, 1):
-        filename = os.path.basename(filepath)
-        print(f"\n[{i}/{len(to_process)}] {filename}")
-
-        try:
-            chunks, vector_ids = process_pdf(filepath, openai_client, index, doc_type)
-
-            if chunks > 0:
-                tracker.mark_indexed(filepath, chunks, vector_ids)
-                total_chunks += chunks
-                processed += 1
-                print(f"  ✓ Uploaded {chunks} chunks")
-            else:
-                print(f"  ⚠ Skipped (no content)")
-
-        except Exception as e:
-            logger.error(f"Error processing {filepath}: {e}")
-            failed.append(filepath)
-            print(f"  ✗ Failed: {e}")
-
-        # Rate limiting
-        time.sleep(0.1)
-
-    # Final stats
-    elapsed = time.time() - start_time
+    run = run_ingestion_pipeline(
+        to_process, openai_client, index, tracker,
+        extract_workers=EXTRACT_WORKERS if workers is None else workers,
+        embedding_store=EmbeddingStore(),
+        refresh=force_reindex,
+    )
+    failed = run['failed']
 
     print("\n" + "=" * 60)
     print("BUILD COMPLETE")
     print("=" * 60)
-    print(f"Files processed: {processed}/{len(to_process)}")
-    print(f"Chunks uploaded: {total_chunks}")
-    print(f"Time elapsed: {elapsed:.1f}s")
+    print(f"Files processed: {run['files_processed']}/{len(to_process)} ({run['skipped']} skipped)")
+    print(f"Chunks uploaded: {run['chunks_uploaded']} ({run['vectors_upserted']} vectors upserted)")
+    print(f"Chunks reused: {run['chunks_reused']}, near-duplicates collapsed: {run['near_duplicates_collapsed']}, "
+          f"embeddings reused: {run['embeddings_reused']}")
+    print(f"Stale vectors deleted: {run['stale_vectors_deleted']}")
+    print(f"Time elapsed: {run['elapsed_seconds']:.1f}s ({run['docs_per_minute']} docs/min)")
 
     if failed:
         print(f"\nFailed files ({len(failed)}):")
@@ -477,22 +1129,32 @@ def build_knowledge_base(
             print(f"  - {os.path.basename(f)}")
 
     # Update stats
-    final_stats = tracker.get_stats()
     tracker.update_stats({
-        'files_processed': processed,
-        'chunks_uploaded': total_chunks,
+        'files_processed': run['files_processed'],
+        'chunks_uploaded': run['chunks_uploaded'],
+        'skipped': run['skipped'],
         'failed': len(failed),
-        'elapsed_seconds': elapsed
+        'stale_vectors_deleted': run['stale_vectors_deleted'],
+        'vectors_upserted': run['vectors_upserted'],
+        'chunks_reused': run['chunks_reused'],
+        'near_duplicates_collapsed': run['near_duplicates_collapsed'],
+        'embeddings_reused': run['embeddings_reused'],
+        'elapsed_seconds': run['elapsed_seconds'],
+        'docs_per_minute': run['docs_per_minute'],
     })
+    final_stats = tracker.get_stats()
 
-    print(f"\nTotal in index: {final_stats['total_files']} files, {final_stats['total_chunks']} chunks")
+    print(f"\nTotal in index: {final_stats['total_files']} files, {final_stats['total_chunks']} chunks, "
+          f"{final_stats['stored_vectors']} distinct vectors")
     print("=" * 60 + "\n")
+    return run
 
 
 def show_index_status():
     """Show current index status."""
     tracker = IndexTracker()
     stats = tracker.get_stats()
+    run = tracker.get_run_stats()
 
     print("\n" + "=" * 60)
     print("KNOWLEDGE BASE STATUS")
@@ -500,6 +1162,8 @@ def show_index_status():
     print(f"Indexed files: {stats['total_files']}")
     print(f"Total chunks: {stats['total_chunks']}")
     print(f"Last run: {stats['last_run'] or 'Never'}")
+    if run.get('docs_per_minute') is not None:
+        print(f"Last run throughput: {run['docs_per_minute']} docs/min")
 
     # Scan for new files
     all_pdfs = scan_for_pdfs()
@@ -522,10 +1186,11 @@ if __name__ == "__main__":
     parser.add_argument('--status', action='store_true', help='Show index status')
     parser.add_argument('--force', action='store_true', help='Force reindex all files')
     parser.add_argument('--limit', type=int, help='Limit number of files to process')
+    parser.add_argument('--workers', type=int, help='Extraction processes (1 extracts inline)')
 
     args = parser.parse_args()
 
     if args.status:
         show_index_status()
     else:
-        build_knowledge_base(force_reindex=args.force, limit=args.limit)
+        build_knowledge_base(force_reindex=args.force, limit=args.limit, workers=args.workers)
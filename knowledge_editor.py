@@ -4,12 +4,16 @@ from __future__ import annotations
 
 import copy
 import json
+import logging
+import os
 import re
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
-from knowledge_base import load_diseases, load_pests, load_products, load_weeds
+from knowledge_snapshot import get_knowledge_snapshot, publish_knowledge_change
+
+logger = logging.getLogger(__name__)
 
 
 STORE_PATH = Path(__file__).resolve().parent / "data" / "knowledge_editor.json"
@@ -76,15 +80,17 @@ def load_editor_store() -> dict[str, Any]:
 def save_editor_store(store: dict[str, Any]) -> dict[str, Any]:
     normalized = _normalize_store(store)
     STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with STORE_PATH.open("w", encoding="utf-8") as handle:
+    temp_path = STORE_PATH.with_name(f".{STORE_PATH.name}.{os.getpid()}.tmp")
+    with temp_path.open("w", encoding="utf-8") as handle:
         json.dump(normalized, handle, indent=2, sort_keys=True)
         handle.write("\n")
+    os.replace(temp_path, STORE_PATH)
     return normalized
 
 
 def _product_base_records() -> dict[str, dict[str, Any]]:
     records: dict[str, dict[str, Any]] = {}
-    for category, items in (load_products() or {}).items():
+    for category, items in (get_knowledge_snapshot().base_source("products") or {}).items():
         for key, info in (items or {}).items():
             record = copy.deepcopy(info or {})
             record.setdefault("category", category)
@@ -93,14 +99,10 @@ def _product_base_records() -> dict[str, dict[str, Any]]:
 
 
 def _target_base_records(kind: str) -> dict[str, dict[str, Any]]:
-    loaders = {
-        "diseases": load_diseases,
-        "weeds": load_weeds,
-        "pests": load_pests,
-    }
-    if kind not in loaders:
+    if kind not in TARGET_KINDS:
         raise ValueError(f"Unsupported target kind: {kind}")
-    return copy.deepcopy(loaders[kind]())
+    # Published overlays are layered on top of these, so read the compiled base.
+    return copy.deepcopy(get_knowledge_snapshot().base_source(kind))
 
 
 def _match_query(text: str, query: str) -> bool:
@@ -508,9 +510,19 @@ def save_product_editor_record(key: str, patch: dict[str, Any], publish: bool =
     item["updated_by"] = actor
     product_store[key] = item
     save_editor_store(store)
+    if publish:
+        _publish_saved_change()
     return get_product_editor_record(key)
 
 
+def _publish_saved_change() -> None:
+    # The edit is already on disk; a failed reload must not turn the save into an error.
+    try:
+        publish_knowledge_change()
+    except Exception as exc:
+        logger.warning("Knowledge editor change saved but not published: %s", exc)
+
+
 def list_target_editor_records(kind: str, query: str = "", limit: int = 50) -> list[dict[str, Any]]:
     base_records = _target_base_records(kind)
     store = load_editor_store()["targets"][kind]
@@ -593,11 +605,13 @@ def save_target_editor_record(kind: str, key: str, patch: dict[str, Any], publis
     item["updated_by"] = actor
     target_store[key] = item
     save_editor_store(store)
+    if publish:
+        _publish_saved_change()
     return get_target_editor_record(kind, key)
 
 
 def apply_published_product_overlays(products: dict[str, Any] | None = None) -> dict[str, Any]:
-    merged = copy.deepcopy(products if products is not None else load_products())
+    merged = copy.deepcopy(products if products is not None else get_knowledge_snapshot().base_source("products"))
     store = load_editor_store()["products"]
     for key, item in store.items():
         published = item.get("published")
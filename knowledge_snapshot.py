@@ -0,0 +1,535 @@
+"""
+Compiled snapshot of the structured knowledge base.
+
+The 25 JSON files in ``knowledge/`` are compiled into one versioned snapshot
+with the product indexes the request path needs (name, alias, target and
+mode-of-action lookups). ``scripts/compile_knowledge_snapshot.py`` writes it at
+build time; workers load it once at boot through ``warm_knowledge_snapshot``.
+When the snapshot is missing or older than its sources it is rebuilt from the
+JSON files in memory, so a fresh checkout still works without the build step.
+
+Edits made through the app (KB candidates, published knowledge-editor
+overlays) bump a generation counter stored next to the snapshot. Each request
+stats that file and, when another worker has bumped it, swaps in a rebuilt
+snapshot and runs the registered invalidation callbacks.
+
+``track_source_reads`` records which sources are read while it is active and
+``KnowledgeSnapshot.source_hash`` fingerprints one source, so the eval engine
+can tell which cached case results a KB edit affects. Derived per-generation
+caches build through ``build_with_source_reads`` and replay the sources they
+were built from on every lookup, so a warm hit is attributed like a cold one.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:  # pragma: no cover - orjson is in requirements but keep a stdlib fallback
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
+
+try:  # pragma: no cover - POSIX only; other platforms skip the cross-process lock
+    import fcntl
+except Exception:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_DIR = os.path.join(os.path.dirname(__file__), 'knowledge')
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_PATH = os.getenv(
+    'KNOWLEDGE_SNAPSHOT_PATH',
+    os.path.join(KNOWLEDGE_DIR, '.compiled', 'kb_snapshot.json'),
+)
+GENERATION_PATH = os.getenv(
+    'KNOWLEDGE_GENERATION_PATH',
+    os.path.join(os.path.dirname(SNAPSHOT_PATH), 'generation'),
+)
+
+KNOWLEDGE_SOURCES = (
+    'products',
+    'diseases',
+    'weeds',
+    'pests',
+    'turfgrasses',
+    'abiotic_stress',
+    'timing_windows',
+    'fertility_programs',
+    'irrigation_programs',
+    'cultivation_programs',
+    'diagnostic_frameworks',
+    'mowing_programs',
+    'salinity_management',
+    'drainage_rootzone_programs',
+    'overseeding_transition_programs',
+    'disease_ipm_playbooks',
+    'surface_management_recipes',
+    'climate_zone_playbooks',
+    'tournament_prep_recovery',
+    'nutrient_diagnostics',
+    'calibration_workflows',
+    'seasonal_operating_plans',
+    'regional_pressure_calendars',
+    'advanced_turf_science',
+    'lookup_tables',
+)
+PRODUCT_CATEGORIES = ('fungicides', 'herbicides', 'insecticides', 'pgrs')
+PRODUCT_OPTIONAL_FIELD_DEFAULTS = {
+    "rei": "",
+    "retreatment_interval": "",
+    "irrigation_guidance": "",
+    "rainfast": "",
+    "tank_mix_guidance": [],
+    "max_apps_per_year": "",
+    "max_rate_per_app": "",
+    "reseeding_interval": "",
+    "overseeding_interval": "",
+    "application_window_notes": "",
+}
+_TARGET_FIELDS = ('diseases', 'target_weeds', 'target_pests')
+_MODE_OF_ACTION_FIELDS = {'frac': 'frac_code', 'hrac': 'hrac_group', 'irac': 'irac_group'}
+
+_SNAPSHOT = None
+_SNAPSHOT_LOCK = threading.RLock()
+_GENERATION_SIGNATURE = None
+_LISTENERS: List[Callable[['KnowledgeSnapshot'], None]] = []
+# Process-wide rather than per-context so reads from request worker threads count too.
+_READ_TRACKERS: List[set] = []
+_READ_TRACKERS_LOCK = threading.Lock()
+
+
+@contextmanager
+def track_source_reads():
+    """Collect the names of knowledge sources read in this process while active."""
+    reads: set = set()
+    with _READ_TRACKERS_LOCK:
+        _READ_TRACKERS.append(reads)
+    try:
+        yield reads
+    finally:
+        with _READ_TRACKERS_LOCK:
+            _READ_TRACKERS.remove(reads)
+
+
+def note_source_read(name: str) -> None:
+    """Count a read of ``name`` served from a derived cache rather than ``source``."""
+    if _READ_TRACKERS:
+        with _READ_TRACKERS_LOCK:
+            for reads in _READ_TRACKERS:
+                reads.add(name)
+
+
+def note_source_reads(names) -> None:
+    """Count reads of every source a derived cache was built from."""
+    if _READ_TRACKERS and names:
+        with _READ_TRACKERS_LOCK:
+            for reads in _READ_TRACKERS:
+                reads.update(names)
+
+
+def build_with_source_reads(build: Callable[[], Any]) -> Tuple[Any, frozenset]:
+    """Run ``build`` and return its value with the sources it read.
+
+    Tracking is process-wide, so a concurrent request can add sources it read;
+    that only over-attributes, which costs a cache rerun, never a stale hit.
+    """
+    with track_source_reads() as reads:
+        value = build()
+    return value, frozenset(reads)
+
+
+def _normalize_product_schema(products: Dict) -> Dict:
+    normalized = {}
+    for category, items in (products or {}).items():
+        normalized[category] = {}
+        for active_ingredient, info in (items or {}).items():
+            normalized_info = dict(info or {})
+            for field, default in PRODUCT_OPTIONAL_FIELD_DEFAULTS.items():
+                if field not in normalized_info:
+                    normalized_info[field] = list(default) if isinstance(default, list) else default
+            normalized[category][active_ingredient] = normalized_info
+    return normalized
+
+
+class KnowledgeSnapshot:
+    """Parsed knowledge sources plus precomputed product indexes."""
+
+    def __init__(self, payload: Dict[str, Any], *, path: Optional[str] = None, origin: str = 'compiled', generation: int = 0):
+        self.base_hash = payload.get('snapshot_hash', '')
+        self.overlay_hash = payload.get('overlay_hash', '')
+        self.snapshot_hash = payload.get('effective_hash') or self.base_hash
+        self.compiled_at = payload.get('compiled_at', '')
+        self.sources = payload.get('sources') or {}
+        self.data = payload.get('data') or {}
+        self.base_data = payload.get('base_data') or self.data
+        self.indexes = payload.get('indexes') or {}
+        self.path = path
+        self.origin = origin
+        self.generation = generation
+        self._source_hashes: Dict[str, str] = {}
+
+    def source(self, name: str) -> Dict:
+        note_source_read(name)
+        return self.data.get(name) or {}
+
+    def base_source(self, name: str) -> Dict:
+        """The compiled source without published knowledge-editor overlays."""
+        note_source_read(name)
+        return self.base_data.get(name) or {}
+
+    def source_hash(self, name: str) -> str:
+        """Content hash of one source as served, published overlays included."""
+        digest = self._source_hashes.get(name)
+        if digest is None:
+            if self.data.get(name) is self.base_data.get(name):
+                digest = (self.sources.get(name) or {}).get('sha256', '')
+            else:
+                digest = hashlib.sha256(_dumps_sorted(self.data.get(name))).hexdigest()
+            self._source_hashes[name] = digest
+        return digest
+
+    def product_ref(self, name: str) -> Optional[Tuple[str, str]]:
+        """Return ``(category, active_ingredient)`` for an exact name or trade name."""
+        note_source_read('products')
+        ref = self.indexes.get('product_by_name', {}).get(str(name or '').lower().strip())
+        return (ref[0], ref[1]) if ref else None
+
+    def product_refs_for_target(self, target_key: str) -> List[Tuple[str, str]]:
+        note_source_read('products')
+        return [tuple(ref) for ref in self.indexes.get('products_by_target', {}).get(target_key, [])]
+
+    def product_refs_for_mode_of_action(self, system: str, code: Any) -> List[Tuple[str, str]]:
+        note_source_read('products')
+        by_code = self.indexes.get(f'products_by_{system.lower()}', {})
+        return [tuple(ref) for ref in by_code.get(str(code).upper(), [])]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'snapshot_hash': self.snapshot_hash,
+            'base_hash': self.base_hash,
+            'overlay_hash': self.overlay_hash,
+            'generation': self.generation,
+            'compiled_at': self.compiled_at,
+            'origin': self.origin,
+            'path': self.path,
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'source_count': len(self.sources),
+            'product_names_indexed': len(self.indexes.get('product_by_name', {})),
+        }
+
+
+def _dumps(payload: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _source_path(knowledge_dir: str, name: str) -> str:
+    return os.path.join(knowledge_dir, f'{name}.json')
+
+
+def _source_stats(knowledge_dir: str) -> Dict[str, Dict[str, Any]]:
+    stats = {}
+    for name in KNOWLEDGE_SOURCES:
+        try:
+            stat = os.stat(_source_path(knowledge_dir, name))
+            stats[name] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+        except OSError:
+            stats[name] = {'mtime_ns': 0, 'size': -1}
+    return stats
+
+
+def _build_indexes(products: Dict) -> Dict[str, Any]:
+    product_by_name: Dict[str, List[str]] = {}
+    alias_to_key: Dict[str, str] = {}
+    by_target: Dict[str, List[List[str]]] = {}
+    by_mode: Dict[str, Dict[str, List[List[str]]]] = {system: {} for system in _MODE_OF_ACTION_FIELDS}
+    for category in PRODUCT_CATEGORIES:
+        for ai_name, info in (products.get(category) or {}).items():
+            ref = [category, ai_name]
+            product_by_name.setdefault(ai_name.lower(), ref)
+            for trade in info.get('trade_names', []) or []:
+                product_by_name.setdefault(str(trade).lower(), ref)
+                alias_to_key.setdefault(str(trade).lower(), ai_name)
+            for field in _TARGET_FIELDS:
+                for target in info.get(field, []) or []:
+                    by_target.setdefault(str(target), []).append(ref)
+            for system, field in _MODE_OF_ACTION_FIELDS.items():
+                code = info.get(field)
+                if code not in (None, ''):
+                    by_mode[system].setdefault(str(code).upper(), []).append(ref)
+    return {
+        'product_by_name': product_by_name,
+        'alias_to_key': alias_to_key,
+        'products_by_target': by_target,
+        **{f'products_by_{system}': codes for system, codes in by_mode.items()},
+    }
+
+
+def compile_snapshot(knowledge_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Parse every knowledge source and return the snapshot payload."""
+    knowledge_dir = knowledge_dir or KNOWLEDGE_DIR
+    digest = hashlib.sha256(f'format:{SNAPSHOT_FORMAT_VERSION}'.encode('ascii'))
+    stats = _source_stats(knowledge_dir)
+    sources: Dict[str, Dict[str, Any]] = {}
+    data: Dict[str, Any] = {}
+    for name in KNOWLEDGE_SOURCES:
+        try:
+            with open(_source_path(knowledge_dir, name), 'rb') as f:
+                raw = f.read()
+            parsed = _loads(raw)
+        except Exception as e:
+            logger.error(f"Failed to load {name}.json: {e}")
+            raw, parsed = b'', {}
+        if name == 'products':
+            parsed = _normalize_product_schema(parsed)
+        data[name] = parsed
+        source_hash = hashlib.sha256(raw).hexdigest()
+        sources[name] = {**stats[name], 'sha256': source_hash}
+        digest.update(f'{name}:{source_hash}'.encode('ascii'))
+    return {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'snapshot_hash': digest.hexdigest(),
+        'compiled_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'sources': sources,
+        'data': data,
+        'indexes': _build_indexes(data.get('products') or {}),
+    }
+
+
+def write_snapshot(payload: Dict[str, Any], path: Optional[str] = None) -> str:
+    path = path or SNAPSHOT_PATH
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_dumps(payload))
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+def _sources_match(payload: Dict[str, Any], knowledge_dir: str) -> bool:
+    recorded = payload.get('sources') or {}
+    if set(recorded) != set(KNOWLEDGE_SOURCES):
+        return False
+    for name, current in _source_stats(knowledge_dir).items():
+        entry = recorded[name]
+        if entry.get('mtime_ns') == current['mtime_ns'] and entry.get('size') == current['size']:
+            continue
+        # mtimes do not survive every checkout or copy; fall back to content.
+        try:
+            with open(_source_path(knowledge_dir, name), 'rb') as f:
+                if hashlib.sha256(f.read()).hexdigest() != entry.get('sha256'):
+                    return False
+        except OSError:
+            return False
+    return True
+
+
+def _apply_editor_overlays(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Layer published knowledge-editor records over the compiled sources."""
+    from knowledge_editor import (
+        TARGET_KINDS,
+        apply_published_product_overlays,
+        apply_published_target_overlays,
+        load_editor_store,
+    )
+
+    store = load_editor_store()
+    published = {
+        'products': {key: item['published'] for key, item in store['products'].items() if item.get('published')},
+        'targets': {
+            kind: {key: item['published'] for key, item in store['targets'][kind].items() if item.get('published')}
+            for kind in TARGET_KINDS
+        },
+    }
+    if not published['products'] and not any(published['targets'].values()):
+        return payload
+
+    overlay_hash = hashlib.sha256(_dumps_sorted(published)).hexdigest()
+    data = dict(payload['data'])
+    if published['products']:
+        data['products'] = _normalize_product_schema(apply_published_product_overlays(data.get('products') or {}))
+    for kind in TARGET_KINDS:
+        if published['targets'][kind]:
+            data[kind] = apply_published_target_overlays(kind, data.get(kind) or {})
+    effective_hash = hashlib.sha256(f"{payload['snapshot_hash']}:{overlay_hash}".encode('ascii')).hexdigest()
+    return {
+        **payload,
+        'overlay_hash': overlay_hash,
+        'effective_hash': effective_hash,
+        'data': data,
+        'base_data': payload['data'],
+        'indexes': _build_indexes(data.get('products') or {}),
+    }
+
+
+def _dumps_sorted(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _load_base_payload(path: str, knowledge_dir: str) -> Tuple[Dict[str, Any], str]:
+    try:
+        with open(path, 'rb') as f:
+            payload = _loads(f.read())
+        if payload.get('format_version') == SNAPSHOT_FORMAT_VERSION and _sources_match(payload, knowledge_dir):
+            return payload, 'file'
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable knowledge snapshot {path}: {e}")
+
+    payload = compile_snapshot(knowledge_dir)
+    try:
+        write_snapshot(payload, path)
+    except OSError as e:
+        logger.warning(f"Could not write knowledge snapshot {path}: {e}")
+    return payload, 'compiled'
+
+
+def load_snapshot(
+    path: Optional[str] = None,
+    knowledge_dir: Optional[str] = None,
+    *,
+    apply_overlays: bool = True,
+    generation: int = 0,
+) -> KnowledgeSnapshot:
+    """Load the compiled snapshot, rebuilding it when it no longer matches its sources."""
+    path = path or SNAPSHOT_PATH
+    knowledge_dir = knowledge_dir or KNOWLEDGE_DIR
+    payload, origin = _load_base_payload(path, knowledge_dir)
+    if apply_overlays:
+        try:
+            payload = _apply_editor_overlays(payload)
+        except Exception as e:
+            logger.error(f"Failed to apply published knowledge editor overlays: {e}")
+    return KnowledgeSnapshot(payload, path=path, origin=origin, generation=generation)
+
+
+def _generation_signature() -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(GENERATION_PATH)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def read_knowledge_generation() -> int:
+    try:
+        with open(GENERATION_PATH, 'r', encoding='ascii') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+@contextmanager
+def _generation_lock():
+    os.makedirs(os.path.dirname(GENERATION_PATH) or '.', exist_ok=True)
+    with open(f'{GENERATION_PATH}.lock', 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def bump_knowledge_generation() -> int:
+    """Record that the structured KB changed so every worker reloads it."""
+    with _generation_lock():
+        generation = read_knowledge_generation() + 1
+        directory = os.path.dirname(GENERATION_PATH) or '.'
+        fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+        with os.fdopen(fd, 'w', encoding='ascii') as f:
+            f.write(str(generation))
+        os.replace(temp_path, GENERATION_PATH)
+    return generation
+
+
+def register_snapshot_listener(callback: Callable[[KnowledgeSnapshot], None]) -> Callable[[KnowledgeSnapshot], None]:
+    """Call ``callback(snapshot)`` after each reload; usable as a decorator."""
+    if callback not in _LISTENERS:
+        _LISTENERS.append(callback)
+    return callback
+
+
+def _notify_listeners(snapshot: Optional[KnowledgeSnapshot]) -> None:
+    for callback in list(_LISTENERS):
+        try:
+            callback(snapshot)
+        except Exception as e:
+            logger.error(f"Knowledge snapshot listener {getattr(callback, '__name__', callback)} failed: {e}")
+
+
+def get_knowledge_snapshot() -> KnowledgeSnapshot:
+    global _SNAPSHOT, _GENERATION_SIGNATURE
+    snapshot = _SNAPSHOT
+    if snapshot is not None:
+        return snapshot
+    with _SNAPSHOT_LOCK:
+        if _SNAPSHOT is None:
+            _GENERATION_SIGNATURE = _generation_signature()
+            _SNAPSHOT = load_snapshot(generation=read_knowledge_generation())
+        return _SNAPSHOT
+
+
+def refresh_knowledge_snapshot() -> KnowledgeSnapshot:
+    """Swap in a rebuilt snapshot when the generation file changed; one stat otherwise."""
+    global _SNAPSHOT, _GENERATION_SIGNATURE
+    snapshot = get_knowledge_snapshot()
+    signature = _generation_signature()
+    if signature == _GENERATION_SIGNATURE:
+        return snapshot
+    with _SNAPSHOT_LOCK:
+        if signature == _GENERATION_SIGNATURE:
+            return _SNAPSHOT
+        generation = read_knowledge_generation()
+        if _SNAPSHOT is not None and generation == _SNAPSHOT.generation:
+            _GENERATION_SIGNATURE = signature
+            return _SNAPSHOT
+        _SNAPSHOT = load_snapshot(generation=generation)
+        _GENERATION_SIGNATURE = signature
+        snapshot = _SNAPSHOT
+    logger.info(f"Reloaded structured knowledge snapshot generation {generation} ({snapshot.snapshot_hash[:12]})")
+    _notify_listeners(snapshot)
+    return snapshot
+
+
+def publish_knowledge_change() -> KnowledgeSnapshot:
+    """Bump the generation after a KB write and reload this worker immediately."""
+    bump_knowledge_generation()
+    return refresh_knowledge_snapshot()
+
+
+def reset_knowledge_snapshot() -> None:
+    """Drop the in-process snapshot and derived caches so the next access reloads them."""
+    global _SNAPSHOT, _GENERATION_SIGNATURE
+    with _SNAPSHOT_LOCK:
+        _SNAPSHOT = None
+        _GENERATION_SIGNATURE = None
+    _notify_listeners(None)
+
+
+def warm_knowledge_snapshot() -> Dict[str, Any]:
+    """Load the snapshot at worker boot instead of inside the first request."""
+    return get_knowledge_snapshot().summary()
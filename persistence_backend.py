@@ -66,6 +66,19 @@ def dynamodb_query_all(table, **kwargs) -> list[dict[str, Any]]:
     return [to_plain_value(item) for item in items]
 
 
+def dynamodb_query_limited(table, *, limit: int, **kwargs) -> list[dict[str, Any]]:
+    """Return at most ``limit`` items from a DynamoDB query, paging only until filled."""
+    items: list[dict[str, Any]] = []
+    response = table.query(Limit=limit, **kwargs)
+    items.extend(response.get("Items", []))
+    last_evaluated_key = response.get("LastEvaluatedKey")
+    while last_evaluated_key and len(items) < limit:
+        response = table.query(Limit=limit - len(items), ExclusiveStartKey=last_evaluated_key, **kwargs)
+        items.extend(response.get("Items", []))
+        last_evaluated_key = response.get("LastEvaluatedKey")
+    return [to_plain_value(item) for item in items[:limit]]
+
+
 def to_plain_value(value: Any):
     if isinstance(value, list):
         return [to_plain_value(item) for item in value]
@@ -8,29 +8,33 @@ import re
 import json
 import logging
 from typing import Dict, List, Optional, Tuple
-from knowledge_base import load_products, load_lookup_tables
+from knowledge_base import load_lookup_tables
+from knowledge_snapshot import (
+    build_with_source_reads,
+    get_knowledge_snapshot,
+    note_source_reads,
+    register_snapshot_listener,
+)
 
 logger = logging.getLogger(__name__)
 
 
-# Build lookup indices on first call (cached by load_products)
 def _build_product_index() -> Dict:
     """Build a flat lookup index: name -> product info for fast validation."""
-    products = load_products()
+    snapshot = get_knowledge_snapshot()
+    products = snapshot.source('products')
+    entries = {}
     index = {}
 
-    for category, items in products.items():
-        for ai_name, info in items.items():
-            entry = {
+    # Names and trade names are already indexed in the compiled snapshot
+    for name, (category, ai_name) in snapshot.indexes.get('product_by_name', {}).items():
+        if (category, ai_name) not in entries:
+            entries[(category, ai_name)] = {
                 'active_ingredient': ai_name,
                 'category': category,
-                **info
+                **products[category][ai_name]
             }
-            # Index by active ingredient name
-            index[ai_name.lower()] = entry
-            # Index by trade names
-            for trade in info.get('trade_names', []):
-                index[trade.lower()] = entry
+        index[name] = entries[(category, ai_name)]
 
     return index
 
@@ -38,12 +42,21 @@ def _build_product_index() -> Dict:
 _product_index = None
 
 
+@register_snapshot_listener
+def _reset_product_index(_snapshot=None) -> None:
+    """Rebuild the index from the next snapshot after a KB reload."""
+    global _product_index
+    _product_index = None
+
+
 def get_product_index() -> Dict:
     """Get or build the product index (lazy singleton)."""
     global _product_index
     if _product_index is None:
-        _product_index = _build_product_index()
-    return _product_index
+        _product_index = build_with_source_reads(_build_product_index)
+    index, sources = _product_index
+    note_source_reads(sources)
+    return index
 
 
 def lookup_product(name: str) -> Optional[Dict]:
@@ -1902,19 +1902,30 @@ def get_topic_prompt(question_topic: str, product_need: str = None) -> str:
     return topic_map.get(question_topic, '')
 
 
-def build_system_prompt(question_topic: str = None, product_need: str = None) -> str:
-    """Build the full system prompt by combining base + knowledge + examples + topic-specific prompts."""
-    topic_prompt = get_topic_prompt(question_topic, product_need)
+# Every system prompt starts with this exact text so provider-side prompt
+# caching can reuse it across topics. Extension modules follow in a fixed order,
+# most widely shared first, and the topic-specific module comes last.
+SHARED_PROMPT_PREFIX = "\n\n".join([BASE_PROMPT, KNOWLEDGE_SUPPLEMENT, FEW_SHOT_EXAMPLES])
 
-    # Always include knowledge supplement and few-shot examples
-    components = [BASE_PROMPT, KNOWLEDGE_SUPPLEMENT, FEW_SHOT_EXAMPLES]
+PROMPT_TOPICS = (None, 'irrigation', 'equipment', 'cultural', 'fertilizer', 'diagnostic', 'chemical')
+PROMPT_PRODUCT_NEEDS = (None, 'fungicide', 'herbicide', 'insecticide', 'pgr')
 
-    if topic_prompt:
-        components.append(topic_prompt)
 
-    # Add extended knowledge based on topic
-    if product_need == 'fungicide' or question_topic == 'chemical':
-        components.append(ADDITIONAL_DISEASES)
+def prompt_variant_key(question_topic: str = None, product_need: str = None) -> tuple:
+    """Normalize routing inputs to the (topic, product_need) key of a prompt variant."""
+    return (
+        question_topic if question_topic in PROMPT_TOPICS else None,
+        product_need if product_need in PROMPT_PRODUCT_NEEDS else None,
+    )
+
+
+def prompt_variant_name(question_topic: str = None, product_need: str = None) -> str:
+    topic, need = prompt_variant_key(question_topic, product_need)
+    return f"{topic or 'general'}/{need or 'none'}"
+
+
+def _compose_system_prompt(question_topic: str = None, product_need: str = None) -> str:
+    components = [SHARED_PROMPT_PREFIX]
 
     # Add PGR programs for chemical/cultural topics
     if question_topic in ['chemical', 'cultural'] or product_need in ['pgr', 'fungicide']:
@@ -1924,8 +1935,35 @@ def build_system_prompt(question_topic: str = None, product_need: str = None) ->
     if question_topic in ['chemical', 'cultural', 'diagnostic']:
         components.append(REGIONAL_TIMING)
 
+    # Add extended knowledge based on topic
+    if product_need == 'fungicide' or question_topic == 'chemical':
+        components.append(ADDITIONAL_DISEASES)
+
+    topic_prompt = get_topic_prompt(question_topic, product_need)
+    if topic_prompt:
+        components.append(topic_prompt)
+
     return "\n\n".join(components)
 
 
+def _build_prompt_variants() -> dict:
+    variants = {}
+    by_text = {}
+    for topic in PROMPT_TOPICS:
+        for need in PROMPT_PRODUCT_NEEDS:
+            text = _compose_system_prompt(topic, need)
+            variants[(topic, need)] = by_text.setdefault(text, text)
+    return variants
+
+
+# Precomputed at import; identical variants share one string object.
+SYSTEM_PROMPT_VARIANTS = _build_prompt_variants()
+
+
+def build_system_prompt(question_topic: str = None, product_need: str = None) -> str:
+    """Return the precomputed system prompt: shared prefix + extension modules + topic-specific prompt."""
+    return SYSTEM_PROMPT_VARIANTS[prompt_variant_key(question_topic, product_need)]
+
+
 # Legacy export for backwards compatibility
 system_prompt = BASE_PROMPT
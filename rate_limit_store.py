@@ -1,26 +1,39 @@
-"""Persistent rate limiting for single-node Greenside deployments."""
+"""Persistent rate limiting for single-node Greenside deployments.
+
+Limits use GCRA (generic cell rate algorithm): each (scope, identity) pair keeps
+one "theoretical arrival time" (TAT). A request is allowed when advancing the
+TAT by one emission interval (``window / limit``) keeps it within one window of
+now, which admits a burst of ``limit`` requests and then a steady
+``limit``-per-window rate. Storage is one small row or item per pair instead of
+one row per request.
+"""
 
 from __future__ import annotations
 
+import math
 import os
 import sqlite3
 import threading
 import time
-import uuid
+from decimal import Decimal
 from pathlib import Path
 
 from config import Config
-from persistence_backend import dynamodb_table, to_plain_value, using_dynamodb
+from persistence_backend import dynamodb_scan_all, dynamodb_table, to_plain_value, using_dynamodb
 
 try:  # pragma: no cover - boto3 is deployment-specific
-    from boto3.dynamodb.conditions import Key
+    from botocore.exceptions import ClientError
 except Exception:  # pragma: no cover
-    Key = None
+    ClientError = None
 
 
 DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
 DB_PATH = DATA_DIR / "greenside_rate_limits.db"
 _INIT_LOCK = threading.Lock()
+PRUNE_INTERVAL_SECONDS = 300
+STATE_RETENTION_SECONDS = 86400
+# Absorbs float rounding so exactly ``limit`` requests fit in a burst.
+_TAT_TOLERANCE = 1e-6
 
 
 def _connect() -> sqlite3.Connection:
@@ -39,113 +52,194 @@ def _init_db() -> None:
         try:
             conn.execute(
                 """
-                CREATE TABLE IF NOT EXISTS rate_limit_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                CREATE TABLE IF NOT EXISTS rate_limit_state (
                     scope TEXT NOT NULL,
                     identity_key TEXT NOT NULL,
-                    created_at REAL NOT NULL
-                )
+                    tat REAL NOT NULL,
+                    PRIMARY KEY (scope, identity_key)
+                ) WITHOUT ROWID
                 """
             )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_rate_limit_scope_identity_time "
-                "ON rate_limit_events(scope, identity_key, created_at)"
-            )
+            # The per-event log from the previous limiter is no longer read.
+            conn.execute("DROP TABLE IF EXISTS rate_limit_events")
         finally:
             conn.close()
 
 
+def _emission_interval(limit: int, window_seconds: int) -> float:
+    return float(window_seconds) / max(1, int(limit))
+
+
+def _retry_after(tat: float, now: float, *, interval: float, window_seconds: int) -> int:
+    """Seconds until one more request fits under the window."""
+    return max(1, int(math.ceil(tat + interval - window_seconds - now)))
+
+
 class PersistentRateLimiter:
     def __init__(self) -> None:
         _init_db()
+        self._local = threading.local()
+        self._blocked_until: dict[tuple[str, str], float] = {}
+        self._blocked_lock = threading.Lock()
+        self._memory_state: dict[tuple[str, str], float] = {}
+        self._memory_lock = threading.Lock()
+        self._last_prune = 0.0
 
     def consume(self, scope: str, identity_key: str, *, limit: int, window_seconds: int) -> tuple[bool, int]:
-        if using_dynamodb():
-            return self._consume_dynamodb(scope, identity_key, limit=limit, window_seconds=window_seconds)
         now = time.time()
-        cutoff = now - window_seconds
-        conn = _connect()
-        try:
-            conn.execute("BEGIN IMMEDIATE")
-            conn.execute(
-                "DELETE FROM rate_limit_events WHERE scope = ? AND identity_key = ? AND created_at <= ?",
-                (scope, identity_key, cutoff),
-            )
-            row = conn.execute(
-                """
-                SELECT COUNT(*), MIN(created_at)
-                FROM rate_limit_events
-                WHERE scope = ? AND identity_key = ?
-                """,
-                (scope, identity_key),
-            ).fetchone()
-            count = int(row[0] or 0)
-            oldest = float(row[1]) if row and row[1] is not None else None
-            if count >= limit and oldest is not None:
-                retry_after = max(1, int(window_seconds - (now - oldest)))
-                conn.commit()
-                return True, retry_after
-            conn.execute(
-                "INSERT INTO rate_limit_events (scope, identity_key, created_at) VALUES (?, ?, ?)",
-                (scope, identity_key, now),
-            )
-            # Cheap global pruning to stop unbounded growth.
-            conn.execute(
-                "DELETE FROM rate_limit_events WHERE created_at <= ?",
-                (now - max(window_seconds * 4, 86400),),
-            )
-            conn.commit()
-            return False, 0
-        finally:
-            conn.close()
+        # A limited key cannot become allowed before its TAT drains, and other
+        # workers only push the TAT further out, so rejecting from memory is safe.
+        with self._blocked_lock:
+            blocked_until = self._blocked_until.get((scope, identity_key))
+        if blocked_until is not None:
+            if now < blocked_until:
+                return True, max(1, int(math.ceil(blocked_until - now)))
+            with self._blocked_lock:
+                self._blocked_until.pop((scope, identity_key), None)
+
+        if Config.RATE_LIMIT_STORE == "memory":
+            limited, retry_after = self._consume_memory(scope, identity_key, now, limit=limit, window_seconds=window_seconds)
+        elif using_dynamodb():
+            limited, retry_after = self._consume_dynamodb(scope, identity_key, now, limit=limit, window_seconds=window_seconds)
+        else:
+            limited, retry_after = self._consume_sqlite(scope, identity_key, now, limit=limit, window_seconds=window_seconds)
+        if limited:
+            with self._blocked_lock:
+                if len(self._blocked_until) > 10000:
+                    self._blocked_until = {
+                        key: until for key, until in self._blocked_until.items() if until > now
+                    }
+                self._blocked_until[(scope, identity_key)] = now + retry_after
+        return limited, retry_after
 
     def clear(self) -> None:
+        with self._blocked_lock:
+            self._blocked_until.clear()
+        with self._memory_lock:
+            self._memory_state.clear()
         if using_dynamodb():
             table = dynamodb_table(Config.DYNAMODB_RATE_LIMIT_TABLE)
-            response = table.scan()
-            for item in response.get("Items", []):
-                clean = to_plain_value(item)
-                table.delete_item(Key={"bucket_key": clean["bucket_key"], "event_id": clean["event_id"]})
+            for item in dynamodb_scan_all(table, ProjectionExpression="bucket_key"):
+                table.delete_item(Key={"bucket_key": item["bucket_key"]})
             return
         _init_db()
-        conn = _connect()
-        try:
-            conn.execute("DELETE FROM rate_limit_events")
-            conn.commit()
-        finally:
-            conn.close()
+        conn = self._connection()
+        conn.execute("DELETE FROM rate_limit_state")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Reuse one SQLite connection per thread instead of reconnecting per request."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "db_path", None) != DB_PATH:
+            conn = _connect()
+            self._local.conn = conn
+            self._local.db_path = DB_PATH
+        return conn
+
+    def _consume_sqlite(self, scope: str, identity_key: str, now: float, *, limit: int, window_seconds: int) -> tuple[bool, int]:
+        interval = _emission_interval(limit, window_seconds)
+        conn = self._connection()
+        # One atomic UPSERT: the row only advances when the request is allowed.
+        row = conn.execute(
+            """
+            INSERT INTO rate_limit_state (scope, identity_key, tat)
+            VALUES (:scope, :identity_key, :now + :interval)
+            ON CONFLICT (scope, identity_key) DO UPDATE
+            SET tat = MAX(tat, :now) + :interval
+            WHERE MAX(tat, :now) + :interval - :now <= :window
+            RETURNING tat
+            """,
+            {
+                "scope": scope,
+                "identity_key": identity_key,
+                "now": now,
+                "interval": interval,
+                "window": float(window_seconds) + _TAT_TOLERANCE,
+            },
+        ).fetchone()
+        if row is None:
+            current = conn.execute(
+                "SELECT tat FROM rate_limit_state WHERE scope = ? AND identity_key = ?",
+                (scope, identity_key),
+            ).fetchone()
+            tat = float(current[0]) if current else now
+            return True, _retry_after(tat, now, interval=interval, window_seconds=window_seconds)
+        if now - self._last_prune > PRUNE_INTERVAL_SECONDS:
+            self._last_prune = now
+            # Rows whose TAT has long passed behave exactly like missing rows.
+            conn.execute("DELETE FROM rate_limit_state WHERE tat <= ?", (now - STATE_RETENTION_SECONDS,))
+        return False, 0
 
-    def _consume_dynamodb(self, scope: str, identity_key: str, *, limit: int, window_seconds: int) -> tuple[bool, int]:
-        if Key is None:
+    def _consume_memory(self, scope: str, identity_key: str, now: float, *, limit: int, window_seconds: int) -> tuple[bool, int]:
+        interval = _emission_interval(limit, window_seconds)
+        key = (scope, identity_key)
+        with self._memory_lock:
+            tat = max(self._memory_state.get(key, now), now)
+            if tat + interval - now > window_seconds + _TAT_TOLERANCE:
+                return True, _retry_after(tat, now, interval=interval, window_seconds=window_seconds)
+            self._memory_state[key] = tat + interval
+            return False, 0
+
+    def _consume_dynamodb(self, scope: str, identity_key: str, now: float, *, limit: int, window_seconds: int) -> tuple[bool, int]:
+        if ClientError is None:
             raise RuntimeError("boto3 is required for the DynamoDB persistence backend.")
-        now = time.time()
-        cutoff = now - window_seconds
+        interval = _emission_interval(limit, window_seconds)
         bucket_key = f"{scope}:{identity_key}"
         table = dynamodb_table(Config.DYNAMODB_RATE_LIMIT_TABLE)
-        response = table.query(
-            KeyConditionExpression=Key("bucket_key").eq(bucket_key) & Key("created_at").gte(cutoff),
-        )
-        items = [to_plain_value(item) for item in response.get("Items", [])]
-        count = len(items)
-        oldest = min((float(item.get("created_at")) for item in items), default=None)
-        expired = table.query(
-            KeyConditionExpression=Key("bucket_key").eq(bucket_key) & Key("created_at").lt(cutoff),
-        ).get("Items", [])
-        for item in expired:
-            clean = to_plain_value(item)
-            table.delete_item(Key={"bucket_key": clean["bucket_key"], "event_id": clean["event_id"]})
-        if count >= limit and oldest is not None:
-            retry_after = max(1, int(window_seconds - (now - oldest)))
-            return True, retry_after
-        table.put_item(
-            Item={
-                "bucket_key": bucket_key,
-                "event_id": uuid.uuid4().hex,
-                "created_at": now,
-                "expires_at": int(now + max(window_seconds * 4, 86400)),
-            }
-        )
-        return False, 0
+        expires_at = int(now + window_seconds + STATE_RETENTION_SECONDS)
+        max_tat = now + window_seconds - interval + _TAT_TOLERANCE
+        tat = now
+        for _ in range(3):
+            # Steady state is one conditional update: advance a TAT that is
+            # still in the future as long as it stays within one window of now.
+            try:
+                table.update_item(
+                    Key={"bucket_key": bucket_key},
+                    UpdateExpression="SET tat = tat + :interval, expires_at = :expires_at",
+                    ConditionExpression="tat >= :now AND tat <= :max_tat",
+                    ExpressionAttributeValues={
+                        ":interval": _dynamodb_number(interval),
+                        ":now": _dynamodb_number(now),
+                        ":max_tat": _dynamodb_number(max_tat),
+                        ":expires_at": expires_at,
+                    },
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD",
+                )
+                return False, 0
+            except ClientError as exc:
+                if not _is_conditional_failure(exc):
+                    raise
+                old_tat = to_plain_value(exc.response.get("Item") or {}).get("tat")
+            if old_tat is not None and float(old_tat) >= now:
+                tat = float(old_tat)
+                if tat > max_tat:
+                    break
+                continue
+            # First request, or the previous TAT has drained: restart from now.
+            try:
+                table.update_item(
+                    Key={"bucket_key": bucket_key},
+                    UpdateExpression="SET tat = :new_tat, expires_at = :expires_at",
+                    ConditionExpression="attribute_not_exists(tat) OR tat < :now",
+                    ExpressionAttributeValues={
+                        ":new_tat": _dynamodb_number(now + interval),
+                        ":now": _dynamodb_number(now),
+                        ":expires_at": expires_at,
+                    },
+                )
+                return False, 0
+            except ClientError as exc:
+                if not _is_conditional_failure(exc):
+                    raise
+        return True, _retry_after(tat, now, interval=interval, window_seconds=window_seconds)
+
+
+def _dynamodb_number(value: float) -> Decimal:
+    return Decimal(str(round(value, 6)))
+
+
+def _is_conditional_failure(exc: Exception) -> bool:
+    error = getattr(exc, "response", {}).get("Error", {})
+    return error.get("Code") == "ConditionalCheckFailedException"
 
 
 RATE_LIMIT_BUCKETS = PersistentRateLimiter()
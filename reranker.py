@@ -3,26 +3,109 @@ Cross-encoder reranking for improved search result relevance.
 Uses a lightweight model to score query-document pairs more accurately than vector similarity.
 Falls back to BM25 if cross-encoder is unavailable.
 Optimized for batch processing and caching.
+
+Two backends run the same ms-marco MiniLM model: sentence-transformers
+(PyTorch), or an int8-quantized ONNX export (``scripts/export_onnx_reranker.py``)
+run with ONNX Runtime, selected with ``RERANKER_BACKEND``. The model is
+loaded at app start (``warm_reranker``) rather than on the first request.
+With ``RERANK_BATCH_WINDOW_MS`` > 0, pairs from concurrent requests are scored
+together by one scoring thread (``RerankBatcher``).
 """
 import logging
-import hashlib
+import math
+import os
+import queue
+import threading
 import time
+from concurrent.futures import Future
 from typing import List, Dict, Optional, Tuple
 from functools import lru_cache
 from threading import Lock
+from cache import get_rerank_score_cache
 from chunk_store import get_match_text
+from config import Config
 
 logger = logging.getLogger(__name__)
 
+CROSS_ENCODER_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+CROSS_ENCODER_MAX_LENGTH = 512
+RERANK_BATCH_SIZE = 32
+RERANK_RESULT_TIMEOUT_SECONDS = 30
+
 # Try to import sentence-transformers for cross-encoder
 _cross_encoder = None
-_cross_encoder_available = False
+_cross_encoder_lock = Lock()
+_sentence_transformers_available = False
+_onnx_available = False
 
 try:
     from sentence_transformers import CrossEncoder
-    _cross_encoder_available = True
+    _sentence_transformers_available = True
+except ImportError:
+    CrossEncoder = None
+
+try:
+    import numpy as np
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+    _onnx_available = True
 except ImportError:
-    logger.warning("sentence-transformers not installed. Using BM25-only reranking.")
+    np = ort = Tokenizer = None
+
+if Config.RERANKER_BACKEND == 'onnx':
+    _cross_encoder_available = _onnx_available
+    if not _onnx_available:
+        logger.warning("onnxruntime/tokenizers not installed. Using BM25-only reranking.")
+else:
+    _cross_encoder_available = _sentence_transformers_available
+    if not _sentence_transformers_available:
+        logger.warning("sentence-transformers not installed. Using BM25-only reranking.")
+
+
+class OnnxCrossEncoder:
+    """The cross-encoder as an ONNX model run with ONNX Runtime.
+
+    ``model_dir`` holds ``model_quantized.onnx`` (or ``model.onnx``) and the
+    model's ``tokenizer.json``. ``predict`` returns the sigmoid of the logit,
+    as ``CrossEncoder.predict`` does for single-label models, so blended
+    scores keep the same scale on either backend.
+    """
+
+    def __init__(self, model_dir: str, threads: int = 1, max_length: int = CROSS_ENCODER_MAX_LENGTH):
+        model_path = os.path.join(model_dir, 'model_quantized.onnx')
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, 'model.onnx')
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = max(1, threads)
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {item.name for item in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        stat = os.stat(model_path)
+        self.model_id = f"onnx:{CROSS_ENCODER_MODEL}:{os.path.basename(model_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def predict(self, pairs: List[List[str]], batch_size: int = RERANK_BATCH_SIZE) -> List[float]:
+        scores = []
+        for start in range(0, len(pairs), batch_size):
+            encodings = self.tokenizer.encode_batch([tuple(pair) for pair in pairs[start:start + batch_size]])
+            feed = {
+                'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+                'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            logits = self.session.run(None, {name: value for name, value in feed.items() if name in self.input_names})[0]
+            scores.extend(1.0 / (1.0 + math.exp(-float(logit))) for logit in logits[:, 0])
+        return scores
+
+
+def _load_cross_encoder():
+    if Config.RERANKER_BACKEND == 'onnx':
+        return OnnxCrossEncoder(Config.RERANKER_ONNX_DIR, threads=Config.RERANKER_THREADS)
+    # ms-marco-MiniLM-L-6-v2 is optimized for passage reranking
+    return CrossEncoder(CROSS_ENCODER_MODEL, max_length=CROSS_ENCODER_MAX_LENGTH)
 
 
 def get_cross_encoder():
@@ -36,54 +119,166 @@ def get_cross_encoder():
         return None
 
     if _cross_encoder is None:
-        try:
-            # Use a small, fast cross-encoder model
-            # ms-marco-MiniLM-L-6-v2 is optimized for passage reranking
-            _cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2', max_length=512)
-            logger.info("Cross-encoder model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load cross-encoder: {e}")
-            return None
+        with _cross_encoder_lock:
+            if _cross_encoder is None:
+                try:
+                    _cross_encoder = _load_cross_encoder()
+                    logger.info(f"Cross-encoder model loaded successfully ({Config.RERANKER_BACKEND})")
+                except Exception as e:
+                    logger.error(f"Failed to load cross-encoder: {e}")
+                    return None
 
     return _cross_encoder
 
 
-# Reranking score cache
-_rerank_cache = {}
-_rerank_cache_lock = Lock()
-_rerank_cache_max_size = 500
-_rerank_cache_ttl = 600  # 10 minutes
+class RerankBatcher:
+    """Scores query-document pairs from concurrent requests in shared batches.
 
+    Callers queue their pairs and block on a future. The scoring thread takes
+    the next queued request plus whatever else is queued or arrives within
+    ``window_ms`` (up to ``max_pairs``), runs one ``predict``, and hands each
+    caller its slice. It stops waiting early once every request currently in
+    ``score`` is collected, so a lone request adds no delay; under load,
+    requests that arrive while a batch runs form the next batch.
+    """
 
-def _get_cache_key(query: str, doc_text: str) -> str:
-    """Generate a cache key for query-document pair."""
-    content = f"{query}|{doc_text[:200]}"
-    return hashlib.md5(content.encode()).hexdigest()
+    def __init__(self, encoder, window_ms: float = 3.0, max_pairs: int = 128):
+        self.encoder = encoder
+        self.window = max(0.0, window_ms) / 1000
+        self.max_pairs = max(1, max_pairs)
+        self._queue = queue.Queue()
+        self._lock = Lock()
+        self._thread = None
+        self._pid = None
+        self._active = 0
+        self.batches = 0
+        self.requests = 0
+        self.pairs = 0
+
+    def _ensure_thread(self):
+        # Threads do not survive fork; a worker forked after preload starts its own.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name='rerank-batcher', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def score(self, pairs: List[List[str]], timeout: float = RERANK_RESULT_TIMEOUT_SECONDS) -> List[float]:
+        if not pairs:
+            return []
+        self._ensure_thread()
+        future = Future()
+        with self._lock:
+            self._active += 1
+        try:
+            self._queue.put((pairs, future))
+            return future.result(timeout=timeout)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _collect(self) -> List[Tuple[List[List[str]], Future]]:
+        batch = [self._queue.get()]
+        count = len(batch[0][0])
+        deadline = time.perf_counter() + self.window
+        while count < self.max_pairs:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.perf_counter()
+                with self._lock:
+                    everyone_queued = len(batch) >= self._active
+                if remaining <= 0 or everyone_queued:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            batch.append(item)
+            count += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            pairs = [pair for request_pairs, _ in batch for pair in request_pairs]
+            try:
+                scores = [float(score) for score in self.encoder.predict(pairs, batch_size=self.max_pairs)]
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self.pairs += len(pairs)
+            offset = 0
+            for request_pairs, future in batch:
+                future.set_result(scores[offset:offset + len(request_pairs)])
+                offset += len(request_pairs)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'requests': self.requests,
+                'pairs': self.pairs,
+                'requests_per_batch': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            }
+
+
+_rerank_batcher = None
+_rerank_batcher_lock = Lock()
+
+
+def get_rerank_batcher(encoder) -> Optional[RerankBatcher]:
+    """The process-wide batcher for ``encoder``, or None when batching is off."""
+    global _rerank_batcher
+    if Config.RERANK_BATCH_WINDOW_MS <= 0:
+        return None
+    if _rerank_batcher is None or _rerank_batcher.encoder is not encoder:
+        with _rerank_batcher_lock:
+            if _rerank_batcher is None or _rerank_batcher.encoder is not encoder:
+                _rerank_batcher = RerankBatcher(
+                    encoder, window_ms=Config.RERANK_BATCH_WINDOW_MS, max_pairs=Config.RERANK_MAX_BATCH_PAIRS
+                )
+    return _rerank_batcher
 
 
-def _get_cached_score(query: str, doc_text: str) -> Optional[float]:
-    """Get cached reranking score if available."""
-    key = _get_cache_key(query, doc_text)
-    with _rerank_cache_lock:
-        if key in _rerank_cache:
-            score, timestamp = _rerank_cache[key]
-            if time.time() - timestamp < _rerank_cache_ttl:
-                return score
-            else:
-                del _rerank_cache[key]
-    return None
+def _score_pairs(encoder, pairs: List[List[str]]) -> List[float]:
+    batcher = get_rerank_batcher(encoder)
+    if batcher is not None:
+        return batcher.score(pairs)
+    return encoder.predict(pairs, batch_size=RERANK_BATCH_SIZE)
 
 
-def _cache_score(query: str, doc_text: str, score: float):
-    """Cache a reranking score."""
-    key = _get_cache_key(query, doc_text)
-    with _rerank_cache_lock:
-        if len(_rerank_cache) >= _rerank_cache_max_size:
-            # Evict oldest 25%
-            sorted_items = sorted(_rerank_cache.items(), key=lambda x: x[1][1])
-            for k, _ in sorted_items[:len(sorted_items) // 4]:
-                del _rerank_cache[k]
-        _rerank_cache[key] = (score, time.time())
+def warm_reranker() -> bool:
+    """Load the cross-encoder and score one pair so no request pays for it."""
+    encoder = get_cross_encoder()
+    if encoder is None:
+        return False
+    started = time.perf_counter()
+    _score_pairs(encoder, [['warmup query', 'warmup passage']])
+    logger.info(f"Cross-encoder warm in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return True
+
+
+def reranker_stats() -> Dict:
+    """Backend and batching counters for /admin/perf."""
+    return {
+        'backend': Config.RERANKER_BACKEND,
+        'available': _cross_encoder_available,
+        'loaded': _cross_encoder is not None,
+        'batching': _rerank_batcher.stats() if _rerank_batcher is not None else None,
+    }
+
+
+def reranker_model_id(encoder) -> str:
+    """Identifies the scoring model, so cached scores never outlive it."""
+    return getattr(encoder, 'model_id', None) or f"sentence-transformers:{CROSS_ENCODER_MODEL}"
 
 
 def rerank_with_cross_encoder(
@@ -117,34 +312,30 @@ def rerank_with_cross_encoder(
         return results[:top_k]
 
     try:
-        # Prepare query-document pairs, checking cache first
-        pairs_to_score = []
-        pair_indices = []
-        cached_scores = {}
-
+        # Prepare query-document pairs
+        score_cache = get_rerank_score_cache(reranker_model_id(encoder))
+        query_hash = score_cache.query_hash(query)
+        doc_texts = {}
         for i, result in enumerate(results):
             text = get_match_text(result)
             source = result.get('metadata', {}).get('source', '')
 
             if text:
                 # Include source name for context
-                doc_text = f"{source}: {text[:500]}"  # Limit length for efficiency
+                doc_texts[i] = f"{source}: {text[:500]}"  # Limit length for efficiency
 
-                # Check cache first
-                cached = _get_cached_score(query, doc_text)
-                if cached is not None:
-                    cached_scores[i] = cached
-                else:
-                    pairs_to_score.append([query, doc_text])
-                    pair_indices.append((i, doc_text))
+        # Check cache first
+        keys = {i: score_cache.key(query_hash, doc_text) for i, doc_text in doc_texts.items()}
+        cached = score_cache.get_many(list(keys.values()))
+        cached_scores = {i: cached[key] for i, key in keys.items() if key in cached}
+        pair_indices = [i for i in doc_texts if i not in cached_scores]
 
         # Batch score uncached pairs
         new_scores = {}
-        if pairs_to_score:
-            scores = encoder.predict(pairs_to_score, batch_size=32)
-            for (idx, doc_text), score in zip(pair_indices, scores):
-                new_scores[idx] = float(score)
-                _cache_score(query, doc_text, float(score))
+        if pair_indices:
+            scores = _score_pairs(encoder, [[query, doc_texts[i]] for i in pair_indices])
+            new_scores = {i: float(score) for i, score in zip(pair_indices, scores)}
+            score_cache.set_many({keys[i]: score for i, score in new_scores.items()})
 
         # Combine all scores
         all_scores = {**cached_scores, **new_scores}
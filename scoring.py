@@ -27,12 +27,31 @@ RATE_TERMS = {
     'per 1000', 'per acre', 'rate', 'dosage', 'application',
 }
 
+# Multi-word disease and product names checked by phrase_match_score
+PHRASE_TERMS = [
+    'dollar spot', 'brown patch', 'fairy ring', 'summer patch',
+    'gray leaf spot', 'spring dead spot', 'snow mold', 'take-all',
+    'banner maxx', 'primo maxx', 'drive xlr8', 'poa annua',
+]
+
+# Disease/weed terms that boost a source named after them
+SOURCE_PROBLEM_TERMS = ['dollar spot', 'brown patch', 'crabgrass', 'poa', 'pythium']
+
+# boost_for_source_match multipliers
+SOURCE_TERM_BOOST = 2.0
+SOURCE_PROBLEM_TERM_BOOST = 1.5
+
 
 def tokenize(text: str) -> list:
     """Tokenize text into lowercase words."""
     return re.findall(r'\b\w+\b', text.lower())
 
 
+def question_keywords(question: str) -> list:
+    """Question terms that count toward ``keyword_score`` (stop words and short words dropped)."""
+    return [w for w in tokenize(question) if w not in STOP_WORDS and len(w) > 2]
+
+
 def keyword_score(text: str, question: str) -> float:
     """
     Score text based on keyword overlap with question using TF-IDF principles.
@@ -44,20 +63,15 @@ def keyword_score(text: str, question: str) -> float:
     Returns:
         Relevance score between 0 and 1
     """
-    # Tokenize
-    question_words = tokenize(question)
     text_words = tokenize(text)
+    return keyword_score_from_counts(Counter(text_words), len(text_words), question_keywords(question))
 
-    # Remove stop words from question
-    question_keywords = [w for w in question_words if w not in STOP_WORDS and len(w) > 2]
 
+def keyword_score_from_counts(text_tf: Counter, text_len: int, question_keywords: list) -> float:
+    """``keyword_score`` from a text's precomputed term counts, so a chunk is tokenized once."""
     if not question_keywords:
         return 0.0
 
-    # Count term frequencies in text
-    text_tf = Counter(text_words)
-    text_len = len(text_words)
-
     if text_len == 0:
         return 0.0
 
@@ -108,30 +122,11 @@ def phrase_match_score(text: str, question: str) -> float:
     question_lower = question.lower()
 
     # Check for multi-word phrase matches
-    phrase_matches = 0
-    total_phrases = 0
-
-    # Check disease names
-    diseases = ['dollar spot', 'brown patch', 'fairy ring', 'summer patch',
-                'gray leaf spot', 'spring dead spot', 'snow mold', 'take-all']
-    for disease in diseases:
-        if disease in question_lower:
-            total_phrases += 1
-            if disease in text_lower:
-                phrase_matches += 1
-
-    # Check product names with spaces
-    products = ['banner maxx', 'primo maxx', 'drive xlr8', 'poa annua']
-    for product in products:
-        if product in question_lower:
-            total_phrases += 1
-            if product in text_lower:
-                phrase_matches += 1
-
-    if total_phrases == 0:
+    phrases = [phrase for phrase in PHRASE_TERMS if phrase in question_lower]
+    if not phrases:
         return 0.0
 
-    return phrase_matches / total_phrases
+    return sum(1 for phrase in phrases if phrase in text_lower) / len(phrases)
 
 
 def combined_relevance_score(text: str, question: str) -> float:
@@ -145,10 +140,11 @@ def combined_relevance_score(text: str, question: str) -> float:
     Returns:
         Combined relevance score between 0 and 1
     """
-    kw_score = keyword_score(text, question)
-    phrase_score = phrase_match_score(text, question)
+    return combine_relevance_scores(keyword_score(text, question), phrase_match_score(text, question))
+
 
-    # Weight keyword matching higher, but boost for phrase matches
+def combine_relevance_scores(kw_score: float, phrase_score: float) -> float:
+    """Weight keyword matching higher, but boost for phrase matches."""
     if phrase_score > 0:
         return (0.7 * kw_score) + (0.3 * phrase_score)
     return kw_score
@@ -173,14 +169,13 @@ def boost_for_source_match(source_name: str, question: str) -> float:
     # Check if product name is in both question and source
     for term in SYNONYMS:
         if term in question_lower and term in source_lower:
-            boost *= 2.0
+            boost *= SOURCE_TERM_BOOST
             break
 
     # Check for disease/weed terms
-    problem_terms = ['dollar spot', 'brown patch', 'crabgrass', 'poa', 'pythium']
-    for term in problem_terms:
+    for term in SOURCE_PROBLEM_TERMS:
         if term in question_lower and term in source_lower:
-            boost *= 1.5
+            boost *= SOURCE_PROBLEM_TERM_BOOST
             break
 
     return boost
@@ -2,19 +2,300 @@
 Scoring service for ranking search results.
 Handles relevance scoring, boosting, and filtering logic.
 Includes hybrid BM25 reranking for better keyword matching.
+
+``score_results`` works on feature vectors. A chunk's query-independent
+features (grass, state and region mentions, product-type flags, wrong-type
+keywords, country tag, source quality and term counts) are extracted once and
+memoized by chunk id and content; the question's features come from one pass
+of a multi-pattern matcher. Each boost or penalty is a column of the
+candidate feature matrix, so ``base * exp(features . log(multipliers))``
+applies all of them in one dot product (NumPy when installed, plain Python
+otherwise).
 """
+import math
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+
 from chunk_store import get_match_text
-from scoring import keyword_score, combined_relevance_score, boost_for_source_match
+from entity_matcher import SUBSTRING, EntityMatcher
+from query_expansion import SYNONYMS
+from scoring import (
+    PHRASE_TERMS, SOURCE_PROBLEM_TERMS, SOURCE_TERM_BOOST, SOURCE_PROBLEM_TERM_BOOST,
+    combine_relevance_scores, keyword_score_from_counts, question_keywords, tokenize,
+)
 from bm25_search import rerank_with_bm25
 from constants import (
     HERBICIDES, FUNGICIDES, INSECTICIDES,
-    US_STATES, GRASS_TYPES, TOPIC_KEYWORDS,
+    US_STATES, GRASS_TYPES, REGIONS, TOPIC_KEYWORDS,
     LOW_QUALITY_SOURCES, HIGH_VALUE_FUNGICIDE_SOURCES,
     WRONG_TYPE_KEYWORDS,
     VECTOR_SCORE_WEIGHT, KEYWORD_SCORE_WEIGHT,
     SCORE_BOOSTS, SCORE_PENALTIES,
-    MAX_CHUNK_LENGTH, MAX_SOURCES, MAX_CONTEXT_LENGTH
+    MAX_CHUNK_TOKENS, MIN_CHUNK_TOKENS, MAX_SOURCES, MAX_CONTEXT_TOKENS
 )
+from token_accounting import count_chunk_tokens, count_tokens, truncate_to_tokens
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNK_FEATURE_CACHE_SIZE = 4096
+QUERY_FEATURE_CACHE_SIZE = 256
+
+# One column per boost/penalty, with its multiplier.
+SCORE_FEATURES = (
+    ('source_term', SOURCE_TERM_BOOST),
+    ('source_problem_term', SOURCE_PROBLEM_TERM_BOOST),
+    ('high_value_fungicide', SCORE_BOOSTS['high_value_fungicide']),
+    ('product_label', SCORE_BOOSTS['product_label']),
+    ('solution_sheet', SCORE_PENALTIES['solution_sheet']),
+    ('low_quality_source', SCORE_PENALTIES['low_quality_source']),
+    ('keyword_in_source', SCORE_BOOSTS['keyword_in_source']),
+    ('grass_type_match', SCORE_BOOSTS['grass_type_match']),
+    ('state_match', SCORE_BOOSTS['state_match']),
+    ('region_match', SCORE_BOOSTS['region_match']),
+    ('water_keyword_match', SCORE_BOOSTS['water_keyword_match']),
+    ('wrong_grass', SCORE_PENALTIES['wrong_grass']),
+    ('canada_product', SCORE_PENALTIES['canada_product']),
+    ('wrong_product_type', SCORE_PENALTIES['wrong_product_type']),
+    ('wrong_type_keyword', SCORE_PENALTIES['wrong_type_keyword']),
+)
+LOG_FEATURE_WEIGHTS = tuple(math.log(multiplier) for _, multiplier in SCORE_FEATURES)
+_LOG_WEIGHT_ARRAY = np.array(LOG_FEATURE_WEIGHTS) if np is not None else None
+
+PRODUCT_TYPE_NAMES = {
+    'herbicide': HERBICIDES,
+    'fungicide': FUNGICIDES,
+    'insecticide': INSECTICIDES,
+}
+
+# Product types whose names penalize a result for each product need.
+CONFLICTING_PRODUCT_TYPES = {
+    'fungicide': ('herbicide', 'insecticide'),
+    'herbicide': ('fungicide', 'insecticide'),
+    'insecticide': ('fungicide', 'herbicide'),
+}
+
+# Only these leading characters of a chunk count for the head-of-text checks.
+WRONG_GRASS_WINDOW = 200
+WRONG_TYPE_WINDOW = 300
+WATER_WINDOW = 500
+
+_QUESTION_MATCHER = None
+_QUESTION_MATCHER_LOCK = threading.Lock()
+
+
+def _question_vocabulary():
+    vocabularies = (
+        ('state', US_STATES),
+        ('water', TOPIC_KEYWORDS['water']),
+        ('source_term', SYNONYMS),
+        ('problem_term', SOURCE_PROBLEM_TERMS),
+        ('phrase', PHRASE_TERMS),
+    )
+    for kind, terms in vocabularies:
+        for term in terms:
+            yield kind, term, term, SUBSTRING
+
+
+def _question_matcher():
+    global _QUESTION_MATCHER
+    if _QUESTION_MATCHER is None:
+        with _QUESTION_MATCHER_LOCK:
+            if _QUESTION_MATCHER is None:
+                _QUESTION_MATCHER = EntityMatcher(_question_vocabulary())
+    return _QUESTION_MATCHER
+
+
+@dataclass(frozen=True)
+class ChunkFeatures:
+    """Query-independent scoring features of one chunk."""
+    text_lower: str
+    source_lower: str
+    document_name_lower: str
+    metadata_source_lower: str
+    term_counts: Counter
+    term_total: int
+    phrases: frozenset
+    grasses: frozenset
+    head_grasses: frozenset
+    states: frozenset
+    regions: frozenset
+    source_terms: frozenset
+    source_problem_terms: frozenset
+    product_types: frozenset
+    wrong_type_needs: frozenset
+    water: bool
+    high_value_fungicide: bool
+    product_label: bool
+    solution_sheet: bool
+    low_quality_source: bool
+    canada: bool
+
+
+def _present(terms, *texts):
+    # NUL never occurs in a term, so one scan of the joined texts finds every term in any of them.
+    text = texts[0] if len(texts) == 1 else '\0'.join(texts)
+    return frozenset([term for term in terms if term in text])
+
+
+@lru_cache(maxsize=CHUNK_FEATURE_CACHE_SIZE)
+def _source_features(source_lower):
+    """Vocabulary hits in a source name; most sources are shared by many chunks."""
+    return {
+        'states': _present(US_STATES, source_lower),
+        'grasses': _present(GRASS_TYPES, source_lower),
+        'regions': _present(REGIONS, source_lower),
+        'source_terms': _present(SYNONYMS, source_lower),
+        'source_problem_terms': _present(SOURCE_PROBLEM_TERMS, source_lower),
+        'product_types': frozenset(
+            product_type for product_type, names in PRODUCT_TYPE_NAMES.items() if _present(names, source_lower)
+        ),
+        'water': bool(_present(TOPIC_KEYWORDS['water'], source_lower)),
+        'high_value_fungicide': bool(_present(HIGH_VALUE_FUNGICIDE_SOURCES, source_lower)),
+        'low_quality_source': bool(_present(LOW_QUALITY_SOURCES, source_lower)),
+    }
+
+
+@lru_cache(maxsize=CHUNK_FEATURE_CACHE_SIZE)
+def chunk_features(chunk_id, text, source, metadata_source='', document_name='', source_type='', country='USA'):
+    """Features of one chunk, memoized by chunk id and everything the features read."""
+    text_lower = text.lower()
+    source_lower = source.lower()
+    document_name_lower = document_name.lower()
+    metadata_source_lower = metadata_source.lower()
+    source_type_lower = source_type.lower()
+    source_hits = _source_features(source_lower)
+    metadata_source_hits = _source_features(metadata_source_lower)
+    words = tokenize(text)
+
+    product_types = source_hits['product_types'] | frozenset(
+        product_type for product_type, names in PRODUCT_TYPE_NAMES.items() if _present(names, text_lower)
+    )
+    wrong_type_head = text_lower[:WRONG_TYPE_WINDOW]
+    wrong_type_needs = frozenset(
+        need for need, keywords in WRONG_TYPE_KEYWORDS.items() if _present(keywords, wrong_type_head)
+    )
+    product_label = 'label' in source_type_lower or 'pesticide_label' in source_type_lower
+    return ChunkFeatures(
+        text_lower=text_lower,
+        source_lower=source_lower,
+        document_name_lower=document_name_lower,
+        metadata_source_lower=metadata_source_lower,
+        term_counts=Counter(words),
+        term_total=len(words),
+        phrases=_present(PHRASE_TERMS, text_lower),
+        grasses=source_hits['grasses'] | _present(GRASS_TYPES, text_lower, document_name_lower),
+        head_grasses=_present(GRASS_TYPES, text_lower[:WRONG_GRASS_WINDOW]),
+        states=source_hits['states'],
+        regions=source_hits['regions'] | _present(REGIONS, text_lower),
+        source_terms=source_hits['source_terms'],
+        source_problem_terms=source_hits['source_problem_terms'],
+        product_types=product_types,
+        wrong_type_needs=wrong_type_needs,
+        water=source_hits['water'] or bool(_present(TOPIC_KEYWORDS['water'], text_lower[:WATER_WINDOW])),
+        high_value_fungicide=metadata_source_hits['high_value_fungicide'],
+        product_label=product_label,
+        solution_sheet=not product_label and ('solution' in source_type_lower or 'sheet' in source_type_lower),
+        low_quality_source=metadata_source_hits['low_quality_source'],
+        canada=country == 'Canada',
+    )
+
+
+@dataclass(frozen=True)
+class QueryFeatures:
+    """Question-side scoring features from one scan of the question."""
+    keywords: tuple
+    phrases: frozenset
+    states: frozenset
+    source_terms: frozenset
+    source_problem_terms: frozenset
+    water: bool
+    long_words: tuple
+
+
+@lru_cache(maxsize=QUERY_FEATURE_CACHE_SIZE)
+def query_features(question):
+    question_lower = question.lower()
+    hits = _question_matcher().find(question_lower)
+    return QueryFeatures(
+        keywords=tuple(question_keywords(question)),
+        phrases=hits.terms('phrase'),
+        states=hits.terms('state'),
+        source_terms=hits.terms('source_term'),
+        source_problem_terms=hits.terms('problem_term'),
+        water=bool(hits.terms('water')),
+        long_words=tuple(word for word in question_lower.split() if len(word) > 4),
+    )
+
+
+def _match_features(match, text, source):
+    metadata = match['metadata']
+    return chunk_features(
+        match.get('id', 'unknown'),
+        text,
+        source,
+        metadata.get('source', ''),
+        metadata.get('document_name') or '',
+        metadata.get('type', ''),
+        metadata.get('country', 'USA'),
+    )
+
+
+def _relevance(chunk, query):
+    kw_score = keyword_score_from_counts(chunk.term_counts, chunk.term_total, query.keywords)
+    phrase_score = len(query.phrases & chunk.phrases) / len(query.phrases) if query.phrases else 0.0
+    return combine_relevance_scores(kw_score, phrase_score)
+
+
+def _mentions(term, vocabulary_hits, vocabulary, *texts):
+    """``term`` in any of ``texts``, answered from the chunk's scan when the term is in the vocabulary."""
+    if term in vocabulary:
+        return term in vocabulary_hits
+    return any(term in text for text in texts)
+
+
+def _feature_row(chunk, query, grass_type, region, product_need, source_keyword_hits):
+    """One candidate-matrix row, aligned with ``SCORE_FEATURES``."""
+    fungicide = product_need == 'fungicide'
+    grass_lower = grass_type.lower() if grass_type else ''
+    conflicts = CONFLICTING_PRODUCT_TYPES.get(product_need, ()) if product_need else ()
+    return (
+        1.0 if query.source_terms & chunk.source_terms else 0.0,
+        1.0 if query.source_problem_terms & chunk.source_problem_terms else 0.0,
+        1.0 if fungicide and chunk.high_value_fungicide else 0.0,
+        1.0 if fungicide and chunk.product_label else 0.0,
+        1.0 if fungicide and chunk.solution_sheet else 0.0,
+        1.0 if fungicide and chunk.low_quality_source else 0.0,
+        float(source_keyword_hits) if fungicide else 0.0,
+        1.0 if grass_type and _mentions(
+            grass_lower, chunk.grasses, GRASS_TYPES,
+            chunk.text_lower, chunk.source_lower, chunk.document_name_lower,
+        ) else 0.0,
+        1.0 if query.states & chunk.states else 0.0,
+        1.0 if region and _mentions(region, chunk.regions, REGIONS, chunk.text_lower, chunk.source_lower) else 0.0,
+        1.0 if query.water and chunk.water else 0.0,
+        1.0 if grass_type and chunk.head_grasses - {grass_type} else 0.0,
+        1.0 if chunk.canada else 0.0,
+        1.0 if any(product_type in chunk.product_types for product_type in conflicts) else 0.0,
+        1.0 if product_need and product_need in chunk.wrong_type_needs else 0.0,
+    )
+
+
+def _apply_feature_weights(bases, rows):
+    """``base * exp(row . log(multipliers))`` for every candidate."""
+    if not rows:
+        return []
+    if np is not None:
+        multipliers = np.exp(np.asarray(rows, dtype=np.float64) @ _LOG_WEIGHT_ARRAY)
+        return (np.asarray(bases, dtype=np.float64) * multipliers).tolist()
+    return [
+        base * math.exp(sum(value * weight for value, weight in zip(row, LOG_FEATURE_WEIGHTS) if value))
+        for base, row in zip(bases, rows)
+    ]
 
 
 def score_results(matches, question, grass_type, region, product_need, use_hybrid=True):
@@ -38,8 +319,11 @@ def score_results(matches, question, grass_type, region, product_need, use_hybri
     if use_hybrid and matches:
         matches = rerank_with_bm25(question, matches, top_k=50)
 
-    question_lower = question.lower()
+    query = query_features(question)
     scored_results = []
+    bases = []
+    rows = []
+    source_keyword_hits = {}
 
     for match in matches:
         if not match or 'metadata' not in match:
@@ -47,180 +331,41 @@ def score_results(matches, question, grass_type, region, product_need, use_hybri
 
         text = get_match_text(match)
         source = match.get('metadata', {}).get('source', 'Unknown')
+        chunk = _match_features(match, text, source)
 
-        # Calculate base score using enhanced keyword scoring
-        vector_score = match.get('score', 0)
-        rrf_score = match.get('rrf_score', 0)  # From hybrid search
-        kw_score = combined_relevance_score(text, question)
-        source_boost = boost_for_source_match(source, question)
-
-        # Combine scores: vector + keyword + RRF bonus
+        # Base score: RRF from hybrid search when available, else vector + keyword
+        rrf_score = match.get('rrf_score', 0)
         if rrf_score > 0:
-            # Use RRF score as base when available
-            combined_score = rrf_score * 10 * source_boost
+            bases.append(rrf_score * 10)
         else:
-            combined_score = (VECTOR_SCORE_WEIGHT * vector_score) + (KEYWORD_SCORE_WEIGHT * kw_score)
-            combined_score *= source_boost
-
-        # Apply boosts and penalties
-        combined_score = _apply_fungicide_boosts(combined_score, match, product_need, question_lower)
-        combined_score = _apply_grass_type_boost(combined_score, match, text, source, grass_type)
-        combined_score = _apply_state_boost(combined_score, source, question_lower)
-        combined_score = _apply_region_boost(combined_score, text, source, region)
-        combined_score = _apply_water_boost(combined_score, text, source, question_lower)
-        combined_score = _apply_wrong_grass_penalty(combined_score, text, grass_type)
-        combined_score = _apply_country_penalty(combined_score, match)
-        combined_score = _apply_product_type_penalties(combined_score, text, source, product_need)
+            vector_score = match.get('score', 0)
+            bases.append((VECTOR_SCORE_WEIGHT * vector_score) + (KEYWORD_SCORE_WEIGHT * _relevance(chunk, query)))
+
+        # Fungicide questions boost sources named by each question word longer than four characters
+        hits = 0
+        if product_need == 'fungicide':
+            hits = source_keyword_hits.get(chunk.metadata_source_lower)
+            if hits is None:
+                hits = source_keyword_hits[chunk.metadata_source_lower] = sum(
+                    1 for word in query.long_words if word in chunk.metadata_source_lower
+                )
+        rows.append(_feature_row(chunk, query, grass_type, region, product_need, hits))
 
         scored_results.append({
             'text': text,
             'source': source,
-            'score': combined_score,
+            'score': 0.0,
             'match_id': match.get('id', 'unknown'),
             'metadata': match['metadata']
         })
 
+    for result, score in zip(scored_results, _apply_feature_weights(bases, rows)):
+        result['score'] = score
+
     scored_results.sort(key=lambda x: x['score'], reverse=True)
     return scored_results
 
 
-def _apply_fungicide_boosts(score, match, product_need, question_lower):
-    """Apply boosts for fungicide-related searches."""
-    if product_need != 'fungicide':
-        return score
-
-    source_type = match['metadata'].get('type', '')
-    source_name = match['metadata'].get('source', '').lower()
-
-    # Boost high-value fungicide sources
-    if any(pattern in source_name for pattern in HIGH_VALUE_FUNGICIDE_SOURCES):
-        score *= SCORE_BOOSTS['high_value_fungicide']
-
-    # Boost product labels
-    if 'label' in source_type.lower() or 'pesticide_label' in source_type.lower():
-        score *= SCORE_BOOSTS['product_label']
-    elif 'solution' in source_type.lower() or 'sheet' in source_type.lower():
-        score *= SCORE_PENALTIES['solution_sheet']
-
-    # Penalize low-quality sources
-    if any(bad in source_name for bad in LOW_QUALITY_SOURCES):
-        score *= SCORE_PENALTIES['low_quality_source']
-
-    # Boost if product keyword in source name
-    for keyword in question_lower.split():
-        if len(keyword) > 4 and keyword in source_name:
-            score *= SCORE_BOOSTS['keyword_in_source']
-
-    return score
-
-
-def _apply_grass_type_boost(score, match, text, source, grass_type):
-    """Boost score if grass type matches."""
-    if not grass_type:
-        return score
-
-    text_lower = text.lower()
-    source_lower = source.lower()
-    doc_name = (match['metadata'].get('document_name') or '').lower()
-    grass_lower = grass_type.lower()
-
-    if grass_lower in text_lower or grass_lower in source_lower or grass_lower in doc_name:
-        score *= SCORE_BOOSTS['grass_type_match']
-
-    return score
-
-
-def _apply_state_boost(score, source, question_lower):
-    """Boost score if state matches."""
-    source_lower = source.lower()
-    for state in US_STATES:
-        if state in question_lower and state in source_lower:
-            score *= SCORE_BOOSTS['state_match']
-            break
-    return score
-
-
-def _apply_region_boost(score, text, source, region):
-    """Boost score if region matches."""
-    if not region:
-        return score
-
-    text_lower = text.lower()
-    source_lower = source.lower()
-
-    if region in text_lower or region in source_lower:
-        score *= SCORE_BOOSTS['region_match']
-
-    return score
-
-
-def _apply_water_boost(score, text, source, question_lower):
-    """Boost score for water-related queries."""
-    water_keywords = TOPIC_KEYWORDS['water']
-    if any(kw in question_lower for kw in water_keywords):
-        source_lower = source.lower()
-        text_lower = text.lower()[:500]
-        if any(kw in source_lower or kw in text_lower for kw in water_keywords):
-            score *= SCORE_BOOSTS['water_keyword_match']
-    return score
-
-
-def _apply_wrong_grass_penalty(score, text, grass_type):
-    """Penalize results about wrong grass types."""
-    if not grass_type:
-        return score
-
-    wrong_grasses = [g for g in GRASS_TYPES if g != grass_type]
-    text_lower = text.lower()[:200]
-
-    for wrong_grass in wrong_grasses:
-        if wrong_grass in text_lower:
-            score *= SCORE_PENALTIES['wrong_grass']
-            break
-
-    return score
-
-
-def _apply_country_penalty(score, match):
-    """Penalize Canadian products for US users."""
-    if match['metadata'].get('country', 'USA') == 'Canada':
-        score *= SCORE_PENALTIES['canada_product']
-    return score
-
-
-def _apply_product_type_penalties(score, text, source, product_need):
-    """Penalize results about wrong product types."""
-    if not product_need:
-        return score
-
-    text_lower = text.lower()
-    source_lower = source.lower()
-
-    # Penalize wrong product names
-    if product_need == 'fungicide':
-        if any(h in text_lower or h in source_lower for h in HERBICIDES):
-            score *= SCORE_PENALTIES['wrong_product_type']
-        elif any(i in text_lower or i in source_lower for i in INSECTICIDES):
-            score *= SCORE_PENALTIES['wrong_product_type']
-    elif product_need == 'herbicide':
-        if any(f in text_lower or f in source_lower for f in FUNGICIDES):
-            score *= SCORE_PENALTIES['wrong_product_type']
-        elif any(i in text_lower or i in source_lower for i in INSECTICIDES):
-            score *= SCORE_PENALTIES['wrong_product_type']
-    elif product_need == 'insecticide':
-        if any(f in text_lower or f in source_lower for f in FUNGICIDES):
-            score *= SCORE_PENALTIES['wrong_product_type']
-        elif any(h in text_lower or h in source_lower for h in HERBICIDES):
-            score *= SCORE_PENALTIES['wrong_product_type']
-
-    # Penalize wrong type keywords
-    wrong_types = WRONG_TYPE_KEYWORDS.get(product_need, [])
-    if any(wt in text_lower[:300] for wt in wrong_types):
-        score *= SCORE_PENALTIES['wrong_type_keyword']
-
-    return score
-
-
 def safety_filter_results(scored_results, question_topic, product_need, limit=20):
     """
     Apply safety filtering to remove irrelevant product results.
@@ -262,18 +407,6 @@ def safety_filter_results(scored_results, question_topic, product_need, limit=20
     return filtered
 
 
-def _truncate_with_headroom(text, max_chars):
-    """Truncate text cleanly without exceeding the requested budget."""
-    if max_chars <= 0:
-        return ""
-    if len(text) <= max_chars:
-        return text
-    if max_chars <= 3:
-        return text[:max_chars]
-    clipped = text[: max_chars - 3].rstrip()
-    return f"{clipped}..."
-
-
 def _select_diversified_results(filtered_results, max_results, max_per_source=2):
     """Prefer broader source coverage before taking extra chunks from the same document."""
     selected = []
@@ -362,19 +495,19 @@ def select_evidence_results(filtered_results, question, question_topic, product_
     return selected[:max_results]
 
 
-def assemble_context_sections(sections, max_chars=MAX_CONTEXT_LENGTH):
+def assemble_context_sections(sections, max_tokens=MAX_CONTEXT_TOKENS):
     """
-    Build a deterministic final context from ordered sections with per-section budgets.
+    Build a deterministic final context from ordered sections with per-section token budgets.
 
     Args:
-        sections: Iterable of dicts with `title`, `content`, and optional `max_chars`
-        max_chars: Total context budget
+        sections: Iterable of dicts with `title`, `content`, and optional `max_tokens`
+        max_tokens: Total context budget in prompt tokens
 
     Returns:
         Combined context string within the total budget
     """
     parts = []
-    remaining = max_chars
+    remaining = max_tokens
 
     for section in sections:
         content = (section.get('content') or '').strip()
@@ -382,73 +515,96 @@ def assemble_context_sections(sections, max_chars=MAX_CONTEXT_LENGTH):
             continue
 
         title = section.get('title', '').strip()
-        section_budget = min(section.get('max_chars', remaining), remaining)
+        section_budget = min(section.get('max_tokens', remaining), remaining)
         if section_budget <= 0:
             continue
 
         prefix = f"--- {title} ---\n\n" if title else ""
-        suffix = "\n\n"
-        overhead = len(prefix) + len(suffix)
+        overhead = count_tokens(prefix) + 1
         if overhead >= section_budget:
             continue
 
-        body = _truncate_with_headroom(content, section_budget - overhead)
+        body = truncate_to_tokens(content, section_budget - overhead)
         if not body:
             continue
 
-        rendered = f"{prefix}{body}{suffix}"
-        if len(rendered) > remaining:
-            rendered = _truncate_with_headroom(rendered.rstrip(), remaining)
+        rendered = truncate_to_tokens(f"{prefix}{body}", remaining)
         parts.append(rendered.rstrip())
-        remaining -= len(parts[-1]) + 2
+        remaining -= count_tokens(parts[-1]) + 1
 
     return "\n\n".join(parts).strip()
 
 
-def build_context(filtered_results, search_folders, max_results=MAX_SOURCES, max_chars=MAX_CONTEXT_LENGTH):
+def _knapsack_select(weights, values, capacity):
+    """Indices (ascending) of the 0/1 subset with the highest total value within capacity."""
+    best = [(0.0, ())] * (capacity + 1)
+    for index, (weight, value) in enumerate(zip(weights, values)):
+        if weight > capacity or value <= 0:
+            continue
+        for budget in range(capacity, weight - 1, -1):
+            candidate = best[budget - weight][0] + value
+            if candidate > best[budget][0]:
+                best[budget] = (candidate, best[budget - weight][1] + (index,))
+    return list(best[capacity][1])
+
+
+def _evidence_value(result, rank):
+    """Ranking score with a small rank term so unscored results keep their order."""
+    return max(float(result.get('score') or 0.0), 0.0) + 1.0 / (rank + 2)
+
+
+def build_context(filtered_results, search_folders, max_results=MAX_SOURCES, max_tokens=MAX_CONTEXT_TOKENS):
     """
     Build context string and source list from filtered results.
 
+    Candidate chunks are diversified by source and each is capped near an
+    even share of ``max_tokens`` (between MIN_CHUNK_TOKENS and
+    MAX_CHUNK_TOKENS), so a normal budget still cites every candidate. They
+    are then packed knapsack-style: when the floor makes them overrun, the
+    subset with the highest total score that fits wins. Kept chunks stay in
+    ranked order.
+
     Args:
         filtered_results: List of filtered, scored results
         search_folders: List of folders to search for PDFs
         max_results: Maximum number of results to include
-        max_chars: Total character budget for the retrieval context
+        max_tokens: Total prompt-token budget for the retrieval context
 
     Returns:
         Tuple of (context_string, sources_list, images_list)
     """
     from search_service import find_source_url
 
+    candidates = _select_diversified_results(filtered_results, max_results=max_results)
+    chunks = []
+    weights = []
+    for i, result in enumerate(candidates, 1):
+        # Header plus a separator of about two tokens between blocks.
+        overhead = count_tokens(f"[Source {i}: {result['source']}]\n") + 2
+        cap = min(MAX_CHUNK_TOKENS, max(MIN_CHUNK_TOKENS, max_tokens // len(candidates) - overhead))
+        chunk_text = result['text']
+        if count_chunk_tokens(chunk_text) > cap:
+            chunk_text = truncate_to_tokens(chunk_text, cap)
+        chunks.append(chunk_text)
+        weights.append(overhead + count_chunk_tokens(chunk_text))
+    values = [_evidence_value(result, rank) for rank, result in enumerate(candidates)]
+    chosen = _knapsack_select(weights, values, max_tokens)
+    if not chosen and candidates:
+        chosen = [0]
+
     context_parts = []
     sources = []
     images = []
-    remaining_chars = max_chars
-    selected_results = _select_diversified_results(filtered_results, max_results=max_results)
-    per_result_budget = max(350, min(MAX_CHUNK_LENGTH, max_chars // max(1, len(selected_results))))
-
-    for i, result in enumerate(selected_results, 1):
+    for number, index in enumerate(chosen, 1):
+        result = candidates[index]
         source = result['source']
         metadata = result['metadata']
-        header = f"[Source {i}: {source}]\n"
-        separator = "\n\n---\n\n"
-        available_for_chunk = min(per_result_budget, remaining_chars) - len(header) - len(separator)
-        if available_for_chunk <= 80:
-            break
-
-        chunk_text = _truncate_with_headroom(result['text'][:MAX_CHUNK_LENGTH], available_for_chunk)
-        context_block = f"{header}{chunk_text}{separator}"
-        if len(context_block) > remaining_chars:
-            context_block = _truncate_with_headroom(context_block.rstrip(), remaining_chars)
-        if not context_block:
-            break
-
-        context_parts.append(context_block.rstrip())
-        remaining_chars -= len(context_parts[-1]) + 2
+        chunk_text = chunks[index]
+        context_parts.append(f"[Source {number}: {source}]\n{chunk_text}")
 
         source_url = find_source_url(source, search_folders)
         sources.append({
-            'number': i,
+            'number': number,
             'name': source,
             'url': source_url,
             'type': metadata.get('type', 'document'),
@@ -459,7 +615,8 @@ def build_context(filtered_results, search_folders, max_results=MAX_SOURCES, max
         if 'equipment' in result['match_id'].lower():
             images.extend(_get_equipment_images(result['match_id']))
 
-    return "\n\n".join(context_parts).strip(), sources, images
+    context = "\n\n---\n\n".join(context_parts).strip()
+    return truncate_to_tokens(context, max_tokens), sources, images
 
 
 def _get_equipment_images(match_id):
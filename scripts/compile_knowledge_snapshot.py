@@ -0,0 +1,50 @@
+"""Compile knowledge/*.json into the snapshot workers load at boot.
+
+Run at image build time (see Dockerfile). Workers fall back to compiling in
+memory when the snapshot is missing or stale, so this step only moves parsing
+and index building out of worker startup.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from knowledge_snapshot import (  # noqa: E402
+    KNOWLEDGE_DIR,
+    SNAPSHOT_PATH,
+    compile_snapshot,
+    load_snapshot,
+    write_snapshot,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--knowledge-dir", default=KNOWLEDGE_DIR)
+    parser.add_argument("--output", default=SNAPSHOT_PATH)
+    parser.add_argument("--check", action="store_true", help="only report load time of the existing snapshot")
+    args = parser.parse_args()
+
+    if not args.check:
+        started = time.perf_counter()
+        payload = compile_snapshot(args.knowledge_dir)
+        write_snapshot(payload, args.output)
+        print(f"compiled {len(payload['sources'])} sources in {time.perf_counter() - started:.3f}s")
+        print(f"snapshot_hash={payload['snapshot_hash']}")
+        print(f"output={args.output} ({Path(args.output).stat().st_size} bytes)")
+
+    started = time.perf_counter()
+    snapshot = load_snapshot(args.output, args.knowledge_dir)
+    print(f"load origin={snapshot.origin} in {time.perf_counter() - started:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+"""Report system prompt tokens for every (topic, product_need) variant.
+
+Counts are exact when tiktoken can load the chat model's encoding and
+estimated (about four characters per token) otherwise; the counter used is
+printed. The shared prefix is what provider-side prompt caching can reuse
+across variants, so it should stay above the 1024-token caching minimum.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from prompts import PROMPT_PRODUCT_NEEDS, PROMPT_TOPICS, SHARED_PROMPT_PREFIX, SYSTEM_PROMPT_VARIANTS, prompt_variant_name  # noqa: E402
+from token_accounting import PROMPT_CACHE_MIN_TOKENS, count_tokens, token_counter_name  # noqa: E402
+
+
+def build_report(model: str) -> dict:
+    prefix_tokens = count_tokens(SHARED_PROMPT_PREFIX, model)
+    rows = []
+    for topic in PROMPT_TOPICS:
+        for need in PROMPT_PRODUCT_NEEDS:
+            text = SYSTEM_PROMPT_VARIANTS[(topic, need)]
+            rows.append({
+                "variant": prompt_variant_name(topic, need),
+                "chars": len(text),
+                "tokens": count_tokens(text, model),
+            })
+    return {
+        "model": model,
+        "counter": token_counter_name(model),
+        "shared_prefix_tokens": prefix_tokens,
+        "shared_prefix_cacheable": prefix_tokens >= PROMPT_CACHE_MIN_TOKENS,
+        "distinct_variants": len({id(text) for text in SYSTEM_PROMPT_VARIANTS.values()}),
+        "variants": rows,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=os.getenv("CHAT_MODEL", "gpt-4o"), help="model whose tokenizer to use")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = build_report(args.model)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"System prompt tokens for {report['model']} ({report['counter']})")
+    print(
+        f"shared prefix {report['shared_prefix_tokens']} tokens "
+        f"({'cacheable' if report['shared_prefix_cacheable'] else 'below caching minimum'}), "
+        f"{report['distinct_variants']} distinct variants"
+    )
+    for row in sorted(report["variants"], key=lambda item: item["tokens"]):
+        print(f"  {row['variant']:<24} {row['tokens']:>6} tokens {row['chars']:>7} chars")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
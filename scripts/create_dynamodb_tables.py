@@ -1,5 +1,16 @@
 #!/usr/bin/env python3
-"""Create the DynamoDB tables needed for the optional Greenside runtime backend."""
+"""Create the DynamoDB tables needed for the optional Greenside runtime backend.
+
+Existing tables are left in place, but global secondary indexes added to a
+definition since the table was created (such as the accounts email index) are
+created on them with ``update_table``. DynamoDB backfills a new index in the
+background; account lookups scan until it is active.
+
+A table whose key schema differs from its definition cannot be migrated in
+place (the rate-limit table moved from ``bucket_key`` + ``created_at`` to a
+``bucket_key`` hash key), so the script reports it and exits non-zero; delete
+and rerun to recreate it.
+"""
 
 from __future__ import annotations
 
@@ -18,7 +29,17 @@ TABLE_DEFINITIONS = [
     {
         "TableName": Config.DYNAMODB_ACCOUNTS_TABLE,
         "KeySchema": [{"AttributeName": "id", "KeyType": "HASH"}],
-        "AttributeDefinitions": [{"AttributeName": "id", "AttributeType": "S"}],
+        "AttributeDefinitions": [
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "email", "AttributeType": "S"},
+        ],
+        "GlobalSecondaryIndexes": [
+            {
+                "IndexName": Config.DYNAMODB_ACCOUNTS_EMAIL_INDEX,
+                "KeySchema": [{"AttributeName": "email", "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }
+        ],
     },
     {
         "TableName": Config.DYNAMODB_ACCOUNT_TOKENS_TABLE,
@@ -43,14 +64,8 @@ TABLE_DEFINITIONS = [
     },
     {
         "TableName": Config.DYNAMODB_RATE_LIMIT_TABLE,
-        "KeySchema": [
-            {"AttributeName": "bucket_key", "KeyType": "HASH"},
-            {"AttributeName": "created_at", "KeyType": "RANGE"},
-        ],
-        "AttributeDefinitions": [
-            {"AttributeName": "bucket_key", "AttributeType": "S"},
-            {"AttributeName": "created_at", "AttributeType": "N"},
-        ],
+        "KeySchema": [{"AttributeName": "bucket_key", "KeyType": "HASH"}],
+        "AttributeDefinitions": [{"AttributeName": "bucket_key", "AttributeType": "S"}],
     },
     {
         "TableName": Config.DYNAMODB_FEEDBACK_TABLE,
@@ -60,14 +75,65 @@ TABLE_DEFINITIONS = [
 ]
 
 
+def key_schema_mismatch(table, definition: dict) -> str | None:
+    """Describe how ``table``'s key schema differs from ``definition``, or None."""
+    def describe(schema) -> str:
+        return ", ".join(f"{key['AttributeName']} {key['KeyType']}" for key in schema or [])
+
+    actual = describe(table.key_schema)
+    expected = describe(definition["KeySchema"])
+    if actual == expected:
+        return None
+    return f"key schema is ({actual}), expected ({expected})"
+
+
+def add_missing_indexes(table, definition: dict) -> list[str]:
+    """Create the definition's global secondary indexes that ``table`` lacks."""
+    present = {index["IndexName"] for index in table.global_secondary_indexes or []}
+    billing_mode = (table.billing_mode_summary or {}).get("BillingMode", "PROVISIONED")
+    added = []
+    for index in definition.get("GlobalSecondaryIndexes", []):
+        if index["IndexName"] in present:
+            continue
+        create = dict(index)
+        if billing_mode == "PROVISIONED":
+            throughput = table.provisioned_throughput
+            create["ProvisionedThroughput"] = {
+                "ReadCapacityUnits": throughput["ReadCapacityUnits"],
+                "WriteCapacityUnits": throughput["WriteCapacityUnits"],
+            }
+        key_names = {key["AttributeName"] for key in index["KeySchema"]}
+        table.meta.client.update_table(
+            TableName=definition["TableName"],
+            AttributeDefinitions=[
+                attribute for attribute in definition["AttributeDefinitions"]
+                if attribute["AttributeName"] in key_names
+            ],
+            GlobalSecondaryIndexUpdates=[{"Create": create}],
+        )
+        added.append(index["IndexName"])
+    return added
+
+
 def main() -> int:
     dynamodb = get_dynamodb_resource()
     existing = {table.name for table in dynamodb.tables.all()}
     created = []
+    indexed = []
+    mismatched = []
     for definition in TABLE_DEFINITIONS:
         name = definition["TableName"]
         if name in existing:
+            table = dynamodb.Table(name)
+            mismatch = key_schema_mismatch(table, definition)
+            if mismatch:
+                print(f"ERROR   {name}: {mismatch}; delete the table and rerun to recreate it", file=sys.stderr)
+                mismatched.append(name)
+                continue
             print(f"exists  {name}")
+            for index_name in add_missing_indexes(table, definition):
+                print(f"index   {name}.{index_name} (backfilling)")
+                indexed.append(index_name)
             continue
         table = dynamodb.create_table(
             BillingMode="PAY_PER_REQUEST",
@@ -78,7 +144,12 @@ def main() -> int:
         created.append(name)
     if created:
         print(f"created {len(created)} table(s)")
-    else:
+    if indexed:
+        print(f"added {len(indexed)} index(es)")
+    if mismatched:
+        print(f"{len(mismatched)} table(s) need to be recreated: {', '.join(mismatched)}", file=sys.stderr)
+        return 1
+    if not created and not indexed:
         print("no changes")
     return 0
 
@@ -0,0 +1,62 @@
+"""Export the ms-marco cross-encoder to ONNX and quantize it to int8 for RERANKER_BACKEND=onnx.
+
+Needs the export toolchain (``pip install "optimum[onnxruntime]"``), which the
+app itself does not. Dynamic int8 quantization keeps scores within a few
+thousandths of the float model; ``scripts/run_reranker_benchmark.py`` reports
+the difference against the sentence-transformers backend.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from config import Config  # noqa: E402
+from reranker import CROSS_ENCODER_MODEL  # noqa: E402
+
+
+def export(model_name: str, output_dir: Path, target: str) -> Path:
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    quantization = {
+        "avx2": AutoQuantizationConfig.avx2,
+        "avx512": AutoQuantizationConfig.avx512,
+        "avx512_vnni": AutoQuantizationConfig.avx512_vnni,
+        "arm64": AutoQuantizationConfig.arm64,
+    }[target](is_static=False, per_channel=False)
+
+    with tempfile.TemporaryDirectory() as float_dir:
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(float_dir)
+        ORTQuantizer.from_pretrained(float_dir).quantize(save_dir=output_dir, quantization_config=quantization)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+    return output_dir / "model_quantized.onnx"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=CROSS_ENCODER_MODEL, help="Hugging Face cross-encoder to export")
+    parser.add_argument("--output", type=Path, default=ROOT / Config.RERANKER_ONNX_DIR, help="directory to write")
+    parser.add_argument("--target", choices=["avx2", "avx512", "avx512_vnni", "arm64"], default="avx2",
+                        help="instruction set the quantized kernels target")
+    args = parser.parse_args()
+
+    try:
+        path = export(args.model, args.output, args.target)
+    except ImportError as exc:
+        print(f"Export needs optimum[onnxruntime] and transformers: {exc}")
+        return 1
+    print(f"Wrote {path} and tokenizer.json; set RERANKER_BACKEND=onnx RERANKER_ONNX_DIR={args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,396 @@
+"""Deterministic latency benchmark for the full ``/ask`` pipeline.
+
+``run_load_probe.py`` measures one verified-product question against an empty
+Pinecone stub, so the retrieval and LLM path never runs. This benchmark posts
+a stratified mix of eval questions, ``--per-mode`` for every
+``selected_mode`` the router produces, through the Flask app with OpenAI,
+Pinecone and Tavily replaced by ``scripts/upstream_fixtures.py``:
+
+- ``--record`` calls the live services (real API keys needed) and saves every
+  response, its latency and the question mix to ``--fixtures``;
+- by default the recording is replayed, with upstream latency drawn from
+  ``--latency`` (lognormal per service, the recorded times, or zero);
+- calls missing from the recording get deterministic synthetic payloads, so
+  the benchmark also runs with no recording at all.
+
+Requests run one at a time on a fresh conversation. For each request it
+reports wall time, process CPU time and, from a separate ``tracemalloc``
+pass, peak allocation. For general-path answers it also reports the time of
+each stage in ``_log_pipeline_timings``. Results are given per mode and
+overall as p50/p95/p99.
+
+``--write-baseline`` stores the summary. A later run compares against that
+baseline and exits 1 when a metric exceeds ``--tolerance`` (relative) plus
+``--slack-ms``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from course_profile import load_course_profile, save_course_profile  # noqa: E402
+from scripts.upstream_fixtures import LatencyModel, UpstreamTape, install_upstream_stubs  # noqa: E402
+
+DEFAULT_FIXTURES_PATH = ROOT / "scripts" / "ask_latency_fixtures.json"
+DEFAULT_BASELINE_PATH = ROOT / "scripts" / "ask_latency_baseline.json"
+CSRF_TOKEN = "ask-latency-benchmark-csrf"
+PERCENTILES = (50, 95, 99)
+# Compared against the baseline: (section, metric, percentile).
+GATED_METRICS = (("overall", "total_ms", 50), ("overall", "total_ms", 95), ("overall", "cpu_ms", 50),
+                 ("overall", "cpu_ms", 95), ("overall", "alloc_peak_kb", 50))
+# Pipeline timings of the request running on this thread.
+_captured = threading.local()
+
+
+def eval_questions() -> list[str]:
+    questions = []
+    for path in sorted((ROOT / "scripts").glob("*_eval_cases.json")):
+        for case in json.loads(path.read_text(encoding="utf-8")):
+            steps = case.get("steps") or [case]
+            for step in steps:
+                question = step.get("question") if isinstance(step, dict) else step
+                if question:
+                    questions.append(str(question))
+    return list(dict.fromkeys(questions))
+
+
+def _load_app(record: bool):
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="greenside-ask-bench-"))
+    os.environ.setdefault("FLASK_SECRET_KEY", "ask-latency-benchmark-secret")
+    if not record:
+        for name in ("OPENAI_API_KEY", "PINECONE_API_KEY", "TAVILY_API_KEY"):
+            os.environ.setdefault(name, "replay-key")
+    import app as app_module
+
+    app_module.app.testing = True
+    return app_module
+
+
+def _make_client(app_module):
+    from auth_store import create_account
+
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session["_csrf_token"] = CSRF_TOKEN
+    email = f"ask-bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "StrongPass123!"
+    create_account(email, password, name="Ask Benchmark", organization="Benchmark",
+                   accepted_terms=True, accepted_privacy=True, role="user")
+    response = client.post("/login", json={"email": email, "password": password, "csrf_token": CSRF_TOKEN})
+    if response.status_code != 200:
+        raise RuntimeError(f"Failed to log in benchmark account: HTTP {response.status_code}")
+    with client.session_transaction() as session:
+        token = session.get("_csrf_token") or CSRF_TOKEN
+    client.post("/account", json={
+        "csrf_token": token,
+        "region": "Louisville, Kentucky transition zone",
+        "greens_surface": "Creeping bentgrass",
+        "fairways_surface": "Kentucky bluegrass",
+    })
+    with client.session_transaction() as session:
+        return client, session.get("_csrf_token") or token
+
+
+def reset_caches(app_module) -> None:
+    """Empty the per-process answer-path caches so every request takes the cold path."""
+    from cache import get_embedding_cache, get_rerank_score_cache, get_search_cache, get_web_search_cache
+    from query_classifier import clear_classification_cache
+    from query_rewriter import clear_rewrite_cache
+
+    for cache in (get_embedding_cache(), get_search_cache(), get_rerank_score_cache(), get_web_search_cache()):
+        if cache is not None:
+            cache.clear()
+    clear_classification_cache()
+    clear_rewrite_cache()
+    app_module.RATE_LIMIT_BUCKETS.clear()
+
+
+class Runner:
+    def __init__(self, app_module, tape: UpstreamTape, *, cold: bool):
+        self.app_module = app_module
+        self.tape = tape
+        self.cold = cold
+        self.client, self.token = _make_client(app_module)
+        with self.client.session_transaction() as session:
+            self.profile_key = session["account_id"]
+        # /ask learns profile details from questions; every request starts from this one.
+        self.profile = load_course_profile(self.profile_key)
+        _capture_pipeline_timings(app_module)
+
+    def ask(self, question: str, *, measure_allocations: bool = False) -> dict:
+        if self.cold:
+            reset_caches(self.app_module)
+        else:
+            self.app_module.RATE_LIMIT_BUCKETS.clear()
+        save_course_profile(self.profile, self.profile_key)
+        with self.client.session_transaction() as session:
+            for key in ("session_id", "conversation_id", "last_topic", "last_subject"):
+                session.pop(key, None)
+        self.tape.begin(question)
+        _captured.stages = None
+        if measure_allocations:
+            tracemalloc.reset_peak()
+            baseline_bytes = tracemalloc.get_traced_memory()[0]
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        try:
+            response = self.client.post("/ask", json={"question": question, "csrf_token": self.token})
+        finally:
+            self.tape.end()
+        total_ms = (time.perf_counter() - started) * 1000
+        cpu_ms = (time.process_time() - cpu_started) * 1000
+        payload = response.get_json(silent=True) or {}
+        sample = {
+            "question": question,
+            "status": response.status_code,
+            "mode": _response_mode(payload, _captured.stages),
+            "total_ms": total_ms,
+            "cpu_ms": cpu_ms,
+            "stages": _stage_deltas(_captured.stages),
+        }
+        if measure_allocations:
+            sample["alloc_peak_kb"] = (tracemalloc.get_traced_memory()[1] - baseline_bytes) / 1024
+        return sample
+
+
+def _capture_pipeline_timings(app_module) -> None:
+    """Wrap ``_log_pipeline_timings`` once so each thread can read its request's stages."""
+    original = app_module._log_pipeline_timings
+    if getattr(original, "captures_stages", False):
+        return
+
+    def capture(timings, *args, **kwargs):
+        _captured.stages = dict(timings)
+        return original(timings, *args, **kwargs)
+
+    capture.captures_stages = True
+    app_module._log_pipeline_timings = capture
+
+
+def _response_mode(payload: dict, stages: dict | None) -> str:
+    """The router's ``selected_mode``; unrouted answers are the LLM path or a deterministic shortcut."""
+    mode = (payload.get("expert_router") or {}).get("selected_mode")
+    if mode:
+        return mode
+    if stages:
+        return "general"
+    if payload.get("operational_guidance"):
+        return "operational_guidance"
+    return "deterministic"
+
+
+def _stage_deltas(timings: dict | None) -> dict:
+    """Per-stage milliseconds from the cumulative seconds the pipeline records."""
+    if not timings:
+        return {}
+    deltas = {}
+    previous = 0.0
+    for key in sorted(timings, key=lambda item: int(item.split("_", 1)[0])):
+        if key == "10_total":
+            continue
+        deltas[key] = max(0.0, (timings[key] - previous) * 1000)
+        previous = timings[key]
+    return deltas
+
+
+def select_mix(samples: list[dict], per_mode: int, seed: int) -> list[str]:
+    """``per_mode`` questions for every mode seen, in a seeded but stable order."""
+    by_mode = defaultdict(list)
+    for sample in samples:
+        if sample["status"] == 200:
+            by_mode[sample["mode"]].append(sample["question"])
+    rng = random.Random(seed)
+    mix = []
+    for mode in sorted(by_mode):
+        questions = sorted(by_mode[mode])
+        mix.extend(rng.sample(questions, min(per_mode, len(questions))))
+    return mix
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (pct / 100) * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _distribution(values: list[float]) -> dict:
+    summary = {f"p{pct}": round(percentile(values, pct), 2) for pct in PERCENTILES}
+    summary["count"] = len(values)
+    return summary
+
+
+def summarize(samples: list[dict]) -> dict:
+    def metrics(group: list[dict]) -> dict:
+        result = {metric: _distribution([sample[metric] for sample in group if metric in sample])
+                  for metric in ("total_ms", "cpu_ms", "alloc_peak_kb")}
+        result["errors"] = sum(1 for sample in group if sample["status"] != 200)
+        return result
+
+    by_mode = defaultdict(list)
+    stage_values = defaultdict(list)
+    for sample in samples:
+        by_mode[sample["mode"]].append(sample)
+        for stage, elapsed in sample["stages"].items():
+            stage_values[stage].append(elapsed)
+    return {
+        "overall": metrics(samples),
+        "modes": {mode: metrics(group) for mode, group in sorted(by_mode.items())},
+        "stages": {stage: _distribution(values) for stage, values in sorted(stage_values.items(),
+                                                                           key=lambda item: int(item[0].split("_", 1)[0]))},
+    }
+
+
+def compare(summary: dict, baseline: dict, tolerance: float, slack_ms: float) -> list[str]:
+    """Metrics worse than the baseline by more than ``tolerance`` plus ``slack_ms``."""
+    checks = [(section, metric, pct) for section, metric, pct in GATED_METRICS]
+    checks += [("stages", stage, 95) for stage in baseline.get("stages", {})]
+    checks += [(f"modes.{mode}", "total_ms", 50) for mode in baseline.get("modes", {})]
+    regressions = []
+    for section, metric, pct in checks:
+        current, previous = summary, baseline
+        for part in section.split("."):
+            current, previous = current.get(part, {}), previous.get(part, {})
+        current, previous = current.get(metric, {}).get(f"p{pct}"), previous.get(metric, {}).get(f"p{pct}")
+        if current is None or previous is None:
+            continue
+        limit = previous * (1 + tolerance) + slack_ms
+        if current > limit:
+            regressions.append(f"{section} {metric} p{pct}: {current:.1f} > {previous:.1f} (limit {limit:.1f})")
+    return regressions
+
+
+def _print_summary(summary: dict) -> None:
+    def row(label: str, metrics: dict) -> str:
+        total, cpu, alloc = metrics["total_ms"], metrics["cpu_ms"], metrics["alloc_peak_kb"]
+        return (
+            f"  {label:<28} n={total['count']:>3} total p50/p95/p99={total['p50']:.0f}/{total['p95']:.0f}/{total['p99']:.0f}ms "
+            f"cpu p50/p95={cpu['p50']:.0f}/{cpu['p95']:.0f}ms alloc p50={alloc['p50']:.0f}KB errors={metrics['errors']}"
+        )
+
+    print(row("overall", summary["overall"]))
+    for mode, metrics in summary["modes"].items():
+        print(row(mode, metrics))
+    if summary["stages"]:
+        print("  general-path stages (ms):")
+        for stage, values in summary["stages"].items():
+            print(f"    {stage:<22} p50={values['p50']:>7.1f} p95={values['p95']:>7.1f} p99={values['p99']:>7.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="call the live services and save a new recording")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES_PATH)
+    parser.add_argument("--per-mode", type=int, default=5, help="questions per selected_mode")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes over the question mix")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", choices=("model", "recorded", "zero"), default="model")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply every upstream delay")
+    parser.add_argument("--latency-ms", action="append", default=[], metavar="KIND=P50,P95",
+                        help="override a service's lognormal fit, e.g. chat=400,1200")
+    parser.add_argument("--warm", action="store_true", help="keep embedding/search/rerank caches between requests")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="allowed absolute slowdown")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    overrides = {}
+    for item in args.latency_ms:
+        kind, _, values = item.partition("=")
+        p50, p95 = (float(value) for value in values.split(","))
+        overrides[kind.strip()] = (p50, p95)
+    latency = LatencyModel(args.latency, scale=args.latency_scale, seed=args.seed, overrides=overrides)
+
+    app_module = _load_app(args.record)
+    tape = UpstreamTape() if args.record else UpstreamTape.load(args.fixtures)
+    install_upstream_stubs(app_module, tape, latency, mode="record" if args.record else "replay")
+    runner = Runner(app_module, tape, cold=not args.warm)
+
+    mix = [] if args.record else list(tape.meta.get("questions") or [])
+    if not mix:
+        discovery_latency, latency.profile = latency.profile, "zero"
+        discovered = [runner.ask(question) for question in eval_questions()]
+        latency.profile = discovery_latency
+        mix = select_mix(discovered, args.per_mode, args.seed)
+    if args.record:
+        tape.calls = {}
+        samples = [runner.ask(question) for question in mix]
+        tape.meta = {"questions": mix, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        tape.save(args.fixtures)
+        print(f"Recorded {sum(len(calls) for calls in tape.calls.values())} upstream calls for {len(mix)} questions to {args.fixtures}")
+    else:
+        runner.ask(mix[0])  # warm imports and lazy singletons outside the timed passes
+        samples = [runner.ask(question) for _ in range(args.repeat) for question in mix]
+        tracemalloc.start()
+        saved_profile, latency.profile = latency.profile, "zero"
+        allocations = {question: runner.ask(question, measure_allocations=True)["alloc_peak_kb"] for question in mix}
+        latency.profile = saved_profile
+        tracemalloc.stop()
+        for sample in samples:
+            sample["alloc_peak_kb"] = allocations[sample["question"]]
+
+    summary = summarize(samples)
+    summary["config"] = {
+        "fixtures": tape.fingerprint(),
+        "questions": len(mix),
+        "repeat": 1 if args.record else args.repeat,
+        "cold_caches": not args.warm,
+        "latency": latency.describe(),
+    }
+    summary["upstream_calls"] = tape.stats()
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"/ask latency benchmark: {len(mix)} questions x {summary['config']['repeat']} "
+              f"({args.latency} latency x{args.latency_scale}, fixtures {summary['config']['fixtures']}, "
+              f"{'cold' if not args.warm else 'warm'} caches)")
+        _print_summary(summary)
+        print("  upstream calls: " + ", ".join(
+            f"{kind} {sum(counts.values())} ({counts['exact']} exact, {counts['ordinal']} ordinal, {counts['synthetic']} synthetic)"
+            for kind, counts in summary["upstream_calls"].items()
+        ))
+
+    if args.write_baseline:
+        args.baseline.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if args.record or not args.baseline.exists():
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("config", {}).get("latency") != summary["config"]["latency"] or \
+            baseline.get("config", {}).get("fixtures") != summary["config"]["fixtures"]:
+        print("WARNING: baseline was taken with different fixtures or latency settings")
+    regressions = compare(summary, baseline, args.tolerance, args.slack_ms)
+    if regressions:
+        print(f"REGRESSION against {args.baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%} + {args.slack_ms:.0f}ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,175 @@
+"""Compare verified_kb recommendation lanes: per-question catalog scan vs. catalog index.
+
+The legacy lane is reproduced here (rebuild every product record, recompute
+supported targets and surface restrictions per product, per question) so both
+can be timed side by side on the real catalog and on a synthetic catalog made
+by cloning every product ``--scale`` times.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import verified_kb  # noqa: E402
+from knowledge_base import load_products  # noqa: E402
+
+
+SURFACE_CONTEXTS = [
+    ("greens", "bentgrass"),
+    ("fairways", "bermudagrass"),
+    ("tees", "zoysiagrass"),
+    ("rough", "tall fescue"),
+]
+
+
+def synthetic_catalog(products: dict, scale: int) -> dict:
+    """Every product cloned ``scale`` times under distinct active-ingredient keys."""
+    if scale <= 1:
+        return products
+    catalog = {}
+    for category, category_products in products.items():
+        catalog[category] = {}
+        for ai_name, info in category_products.items():
+            for copy in range(scale):
+                key = ai_name if copy == 0 else f"{ai_name}_synthetic_{copy}"
+                trade_names = [f"{name} {copy}" if copy else name for name in info.get("trade_names") or []]
+                catalog[category][key] = {**info, "trade_names": trade_names}
+    return catalog
+
+
+def _legacy_records(products: dict) -> list[dict]:
+    records = []
+    for category, category_products in products.items():
+        for ai_name, info in category_products.items():
+            trade_names = info.get("trade_names") or []
+            records.append({
+                "active_ingredient": ai_name,
+                "category": category,
+                "display_name": trade_names[0] if trade_names else ai_name.replace("_", " ").title(),
+                "matched_name": trade_names[0] if trade_names else ai_name.replace("_", " "),
+                "info": info,
+            })
+    return records
+
+
+def _legacy_supported_targets(product: dict) -> set[str]:
+    field = verified_kb.TARGET_FIELDS.get(product["category"])
+    if not field:
+        return set()
+    targets = set()
+    for target in product["info"].get(field, []):
+        target_key = str(target).lower().replace(" ", "_").replace("-", "_")
+        targets.add(target_key)
+        for canonical, aliases in verified_kb.TARGET_ALIASES.items():
+            if target_key == canonical or target_key in {alias.replace(" ", "_") for alias in aliases}:
+                targets.add(canonical)
+    return targets
+
+
+def _legacy_surface_restriction_issue(product: dict, q: str) -> str | None:
+    info = product["info"]
+    note = str(info.get("note", "")).lower()
+    mentioned = verified_kb._mentioned_surface_terms(q)
+    prohibited = verified_kb._expanded_surface_terms(info.get("prohibited_turf", []))
+    allowed = verified_kb._expanded_surface_terms(info.get("allowed_turf", []))
+    if mentioned & prohibited:
+        return "prohibited"
+    if allowed and mentioned and not (mentioned & allowed):
+        return "outside allowed"
+    if any(surface in q for surface in verified_kb.COOL_SURFACE_TERMS) and any(
+        phrase in note for phrase in ("warm-season", "warm season", "not safe on cool-season", "not safe on cool season")
+    ):
+        return "warm-season note"
+    if any(surface in q for surface in verified_kb.WARM_SURFACE_TERMS) and (
+        "cool-season turf only" in note or "cool season turf only" in note
+    ):
+        return "cool-season note"
+    match = re.search(r"not safe on ([^.]+)", f"{q} {note}")
+    if match and any(surface in q and surface in match.group(1) for surface in sorted(verified_kb.COOL_SURFACE_TERMS | verified_kb.WARM_SURFACE_TERMS)):
+        return "unsafe note"
+    return None
+
+
+def legacy_lane(products: dict, q: str, target_key: str, surface: str, turf: str) -> list[dict]:
+    candidates = []
+    for product in _legacy_records(products):
+        if product["category"] not in verified_kb.RECOMMENDATION_CATEGORIES:
+            continue
+        if target_key not in _legacy_supported_targets(product):
+            continue
+        if _legacy_surface_restriction_issue(product, f"{q} on {turf} {surface}"):
+            continue
+        candidates.append(product)
+    return candidates
+
+
+def indexed_lane(index: verified_kb.CatalogIndex, q: str, target_key: str, surface: str, turf: str) -> list[dict]:
+    surface_question = f"{q} on {turf} {surface}"
+    surface_query = verified_kb._surface_query(surface_question)
+    return [
+        entry.record
+        for entry in index.by_target.get(target_key, ())
+        if entry.record["category"] in verified_kb.RECOMMENDATION_CATEGORIES
+        and not verified_kb._surface_restriction_issue(entry.record, surface_question, surface_query)
+    ]
+
+
+def _time_lane(lane, catalog, questions: list[tuple[str, str, str, str]], repeat: int) -> tuple[list[float], int]:
+    samples = []
+    found = 0
+    for _ in range(repeat):
+        for q, target_key, surface, turf in questions:
+            started = time.perf_counter()
+            found += len(lane(catalog, q, target_key, surface, turf))
+            samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples, found
+
+
+def run(scale: int, repeat: int) -> None:
+    products = synthetic_catalog(load_products(), scale)
+    product_count = sum(len(items) for items in products.values())
+    questions = [
+        (f"what {target.replace('_', ' ')} product should i use on {surface}?", target, surface, turf)
+        for target in verified_kb.TARGET_ALIASES
+        for surface, turf in SURFACE_CONTEXTS
+    ]
+
+    started = time.perf_counter()
+    index = verified_kb.build_catalog_index(products)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    legacy_samples, legacy_found = _time_lane(legacy_lane, products, questions, repeat)
+    indexed_samples, indexed_found = _time_lane(indexed_lane, index, questions, repeat)
+    if legacy_found != indexed_found:
+        print(f"  WARNING candidate counts differ: legacy={legacy_found} indexed={indexed_found}")
+
+    print(f"catalog x{scale}: {product_count} products, index build {build_ms:.1f}ms, {len(questions) * repeat} lane calls")
+    for label, samples in (("scan", legacy_samples), ("index", indexed_samples)):
+        ordered = sorted(samples)
+        p95 = ordered[int(len(ordered) * 0.95) - 1]
+        print(f"  {label:>5} mean={statistics.fmean(samples):>9.1f}us p95={p95:>9.1f}us")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10], help="catalog size multipliers")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the question set")
+    args = parser.parse_args()
+
+    print("verified_kb catalog index benchmark")
+    for scale in args.scale:
+        run(scale, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -202,7 +202,7 @@ def _fixture_response_for_case(case: dict) -> dict:
 
 
 def _fixture_answer_image_diagnosis(case_lookup: dict[str, dict]):
-    def _answer_image_diagnosis(question, image_attachment, course_profile, openai_client, *, model="gpt-4o-mini"):
+    def _answer_image_diagnosis(question, image_attachment, course_profile, openai_client, *, model="gpt-4o-mini", cache_scope=None):
         case = case_lookup.get(question)
         if not case:
             return None
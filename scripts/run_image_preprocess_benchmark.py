@@ -0,0 +1,114 @@
+"""Measure what upload preprocessing saves: bytes, vision tokens and vision latency.
+
+Each image is run through ``image_preprocessing.prepare_image`` and the
+original and prepared sizes, estimated high-detail vision tokens and
+preprocessing time are reported. With ``--live`` both versions are also sent
+to ``Config.VISION_MODEL`` with the same diagnosis prompt and timed, which
+needs ``OPENAI_API_KEY``.
+
+Without ``--images`` the run uses synthetic phone-camera frames (4032x3024
+JPEGs with EXIF) so the byte and token numbers are reproducible offline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from attachment_store import encode_data_url  # noqa: E402
+from config import Config  # noqa: E402
+from image_diagnosis import _analyze_turf_image  # noqa: E402
+from image_preprocessing import prepare_image, vision_image_tokens  # noqa: E402
+
+_MIME_BY_SUFFIX = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp", ".gif": "image/gif"}
+
+
+def synthetic_photos(count: int, size: tuple[int, int] = (4032, 3024)) -> list[tuple[str, str, bytes]]:
+    from PIL import Image
+
+    photos = []
+    for index in range(count):
+        image = Image.effect_noise(size, 24 + index * 4).convert("RGB")
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneMaker"
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=92, exif=exif.tobytes())
+        photos.append((f"synthetic-{index}.jpg", "image/jpeg", output.getvalue()))
+    return photos
+
+
+def load_images(paths: list[str]) -> list[tuple[str, str, bytes]]:
+    images = []
+    for path_str in paths:
+        path = Path(path_str)
+        path = path if path.is_absolute() else ROOT / path
+        images.append((path.name, _MIME_BY_SUFFIX.get(path.suffix.lower(), "image/jpeg"), path.read_bytes()))
+    return images
+
+
+def _time_vision(client, mime_type: str, raw: bytes) -> float:
+    started = time.perf_counter()
+    _analyze_turf_image("", {"data_url": encode_data_url(mime_type, raw)}, client, model=Config.VISION_MODEL)
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", nargs="*", default=[], help="image files (default: synthetic phone photos)")
+    parser.add_argument("--synthetic", type=int, default=4, help="synthetic photos when --images is not given")
+    parser.add_argument("--live", action="store_true", help="also time the vision model on both versions")
+    args = parser.parse_args()
+
+    images = load_images(args.images) if args.images else synthetic_photos(args.synthetic)
+    client = None
+    if args.live:
+        from openai import OpenAI
+
+        client = OpenAI(api_key=Config.OPENAI_API_KEY)
+
+    print(f"image preprocessing benchmark ({Config.IMAGE_PREPROCESS_FORMAT} q{Config.IMAGE_PREPROCESS_QUALITY})")
+    totals = {"before": 0, "after": 0, "prep_ms": [], "vision_before": [], "vision_after": []}
+    for name, mime_type, raw in images:
+        prepared = prepare_image(mime_type, raw)
+        summary = prepared.summary()
+        totals["before"] += summary["original_bytes"]
+        totals["after"] += summary["bytes"]
+        totals["prep_ms"].append(prepared.elapsed_ms)
+        line = (
+            f"  {name}: {summary['original_bytes'] / 1024:.0f}KB -> {summary['bytes'] / 1024:.0f}KB "
+            f"{summary['original_size'][0]}x{summary['original_size'][1]} -> {summary['size'][0]}x{summary['size'][1]} "
+            f"tokens {vision_image_tokens(*summary['original_size'])} -> {vision_image_tokens(*summary['size'])} "
+            f"prep {prepared.elapsed_ms:.0f}ms"
+        )
+        if client is not None:
+            before_ms = _time_vision(client, mime_type, raw)
+            after_ms = _time_vision(client, prepared.mime_type, prepared.raw)
+            totals["vision_before"].append(before_ms)
+            totals["vision_after"].append(after_ms)
+            line += f" vision {before_ms:.0f}ms -> {after_ms:.0f}ms"
+        print(line)
+
+    saved = totals["before"] - totals["after"]
+    print(
+        f"{len(images)} images, {totals['before'] / 1024:.0f}KB -> {totals['after'] / 1024:.0f}KB "
+        f"({saved / totals['before'] * 100 if totals['before'] else 0:.1f}% saved), "
+        f"mean prep {statistics.fmean(totals['prep_ms']) if images else 0:.1f}ms"
+    )
+    if totals["vision_before"]:
+        print(
+            f"  vision mean {statistics.fmean(totals['vision_before']):.0f}ms -> "
+            f"{statistics.fmean(totals['vision_after']):.0f}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+"""Compare rate limiter throughput: per-event SQLite log vs. GCRA state rows.
+
+The legacy limiter is reproduced here (one row per request, BEGIN IMMEDIATE with
+DELETE + COUNT + global prune) so the two can be measured side by side on the
+same disk. Each scenario runs worker processes that hammer ``consume`` for a mix
+of identities, the same way several gunicorn workers share one SQLite file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+class LegacyEventLogLimiter:
+    """The pre-GCRA limiter: one inserted row per allowed request."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_limit_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                identity_key TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rate_limit_scope_identity_time "
+            "ON rate_limit_events(scope, identity_key, created_at)"
+        )
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def consume(self, scope: str, identity_key: str, *, limit: int, window_seconds: int) -> tuple[bool, int]:
+        now = time.time()
+        cutoff = now - window_seconds
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM rate_limit_events WHERE scope = ? AND identity_key = ? AND created_at <= ?",
+                (scope, identity_key, cutoff),
+            )
+            row = conn.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM rate_limit_events WHERE scope = ? AND identity_key = ?",
+                (scope, identity_key),
+            ).fetchone()
+            count = int(row[0] or 0)
+            oldest = float(row[1]) if row and row[1] is not None else None
+            if count >= limit and oldest is not None:
+                conn.commit()
+                return True, max(1, int(window_seconds - (now - oldest)))
+            conn.execute(
+                "INSERT INTO rate_limit_events (scope, identity_key, created_at) VALUES (?, ?, ?)",
+                (scope, identity_key, now),
+            )
+            conn.execute(
+                "DELETE FROM rate_limit_events WHERE created_at <= ?",
+                (now - max(window_seconds * 4, 86400),),
+            )
+            conn.commit()
+            return False, 0
+        finally:
+            conn.close()
+
+
+def _build_limiter(kind: str, data_dir: str):
+    if kind == "legacy":
+        return LegacyEventLogLimiter(Path(data_dir) / "legacy_rate_limits.db")
+    os.environ["DATA_DIR"] = data_dir
+    os.environ["RATE_LIMIT_STORE"] = "memory" if kind == "memory" else "persistent"
+    import rate_limit_store
+
+    rate_limit_store.DATA_DIR = Path(data_dir)
+    rate_limit_store.DB_PATH = Path(data_dir) / "greenside_rate_limits.db"
+    rate_limit_store.Config.RATE_LIMIT_STORE = os.environ["RATE_LIMIT_STORE"]
+    return rate_limit_store.PersistentRateLimiter()
+
+
+def _worker(kind: str, data_dir: str, worker_id: int, calls: int, identities: int, limit: int) -> dict:
+    limiter = _build_limiter(kind, data_dir)
+    limited = 0
+    started = time.perf_counter()
+    for call in range(calls):
+        identity = f"w{worker_id}-id{call % identities}"
+        blocked, _ = limiter.consume("ask", identity, limit=limit, window_seconds=60)
+        limited += int(blocked)
+    return {"calls": calls, "limited": limited, "seconds": time.perf_counter() - started}
+
+
+def run_scenario(kind: str, *, workers: int, calls: int, identities: int, limit: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix=f"greenside-ratelimit-{kind}-") as data_dir:
+        _build_limiter(kind, data_dir)
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_worker, kind, data_dir, worker_id, calls, identities, limit)
+                for worker_id in range(workers)
+            ]
+            results = [future.result() for future in futures]
+        duration = max(time.perf_counter() - started, 0.001)
+    total_calls = sum(item["calls"] for item in results)
+    return {
+        "limiter": kind,
+        "workers": workers,
+        "calls": total_calls,
+        "limited": sum(item["limited"] for item in results),
+        "duration_seconds": round(duration, 3),
+        "calls_per_second": round(total_calls / duration, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--calls", type=int, default=2000, help="consume() calls per worker")
+    parser.add_argument("--identities", type=int, default=50, help="distinct identities per worker")
+    parser.add_argument("--limit", type=int, default=60, help="requests allowed per 60s window")
+    parser.add_argument("--include-memory", action="store_true", help="also measure RATE_LIMIT_STORE=memory")
+    args = parser.parse_args()
+
+    kinds = ["legacy", "gcra"] + (["memory"] if args.include_memory else [])
+    print("Rate limiter benchmark")
+    for workers in args.workers:
+        for kind in kinds:
+            row = run_scenario(
+                kind,
+                workers=workers,
+                calls=args.calls,
+                identities=args.identities,
+                limit=args.limit,
+            )
+            print(
+                "{limiter:>7} workers={workers:>2} calls={calls:>6} limited={limited:>6} "
+                "duration={duration_seconds:>7}s calls/s={calls_per_second:>9}".format(**row)
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
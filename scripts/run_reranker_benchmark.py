@@ -0,0 +1,150 @@
+"""Compare cross-encoder reranking: per-request predict vs. the micro-batched scoring thread.
+
+Each simulated request reranks ``--pairs`` (eval question, KB passage) pairs,
+the way ``rerank_results`` scores the top 2x candidates. ``--concurrency``
+threads issue requests back to back, as gunicorn worker threads would.
+``per-request`` is the current path (``predict(pairs, batch_size=32)`` on
+the request thread); ``batched`` goes through ``RerankBatcher``. Each
+available backend is measured. When both are installed, the mean absolute
+score difference between them is reported too.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import reranker  # noqa: E402
+from config import Config  # noqa: E402
+from knowledge_base import build_context_fragments  # noqa: E402
+
+
+def _eval_questions() -> list[str]:
+    questions = []
+    for path in sorted((ROOT / "scripts").glob("*_eval_cases.json")):
+        for case in json.loads(path.read_text(encoding="utf-8")):
+            steps = case.get("steps") or [case]
+            for step in steps:
+                question = step.get("question") if isinstance(step, dict) else step
+                if question:
+                    questions.append(str(question))
+    return questions
+
+
+def build_requests(count: int, pairs_per_request: int) -> list[list[list[str]]]:
+    passages = [fragment[:500] for fragment in build_context_fragments().values()]
+    passage_cycle = cycle(passages)
+    questions = cycle(_eval_questions() or ["how do i control dollar spot on bentgrass greens"])
+    return [
+        [[question, passage] for passage in islice(passage_cycle, pairs_per_request)]
+        for question in islice(questions, count)
+    ]
+
+
+def load_backend(name: str, threads: int):
+    if name == "onnx":
+        if not reranker._onnx_available:
+            return None
+        return reranker.OnnxCrossEncoder(Config.RERANKER_ONNX_DIR, threads=threads)
+    if not reranker._sentence_transformers_available:
+        return None
+    return reranker.CrossEncoder(reranker.CROSS_ENCODER_MODEL, max_length=reranker.CROSS_ENCODER_MAX_LENGTH)
+
+
+def run(score, requests: list[list[list[str]]], concurrency: int) -> dict:
+    latencies = []
+    lock = threading.Lock()
+    pending = iter(requests)
+
+    def worker():
+        while True:
+            with lock:
+                pairs = next(pending, None)
+            if pairs is None:
+                return
+            started = time.perf_counter()
+            score(pairs)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        "pairs_per_second": sum(len(pairs) for pairs in requests) / wall,
+        "p50_ms": statistics.median(ordered),
+        "p95_ms": ordered[max(0, int(len(ordered) * 0.95) - 1)],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=["sentence-transformers", "onnx"],
+                        default=["sentence-transformers", "onnx"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="concurrent request threads")
+    parser.add_argument("--requests", type=int, default=64, help="rerank requests per run")
+    parser.add_argument("--pairs", type=int, default=40, help="query-document pairs per request")
+    parser.add_argument("--threads", type=int, default=Config.RERANKER_THREADS, help="ONNX Runtime intra-op threads")
+    parser.add_argument("--window-ms", type=float, default=Config.RERANK_BATCH_WINDOW_MS or 3.0)
+    parser.add_argument("--max-batch", type=int, default=Config.RERANK_MAX_BATCH_PAIRS)
+    args = parser.parse_args()
+
+    requests = build_requests(args.requests, args.pairs)
+    encoders = {}
+    for name in args.backends:
+        started = time.perf_counter()
+        encoder = load_backend(name, args.threads)
+        if encoder is None:
+            print(f"{name}: not installed, skipped")
+            continue
+        encoder.predict(requests[0][:1], batch_size=1)
+        encoders[name] = encoder
+        print(f"{name}: loaded in {(time.perf_counter() - started) * 1000:.0f}ms")
+    if not encoders:
+        print("No cross-encoder backend available")
+        return 1
+
+    if len(encoders) == 2:
+        sample = [pair for pairs in requests[:4] for pair in pairs]
+        torch_scores, onnx_scores = (list(encoders[name].predict(sample)) for name in ("sentence-transformers", "onnx"))
+        drift = statistics.fmean(abs(float(a) - float(b)) for a, b in zip(torch_scores, onnx_scores))
+        print(f"mean |score difference| onnx vs sentence-transformers: {drift:.4f} over {len(sample)} pairs")
+
+    print(f"\n{args.requests} requests x {args.pairs} pairs")
+    for name, encoder in encoders.items():
+        batcher = reranker.RerankBatcher(encoder, window_ms=args.window_ms, max_pairs=args.max_batch)
+        modes = {
+            "per-request": lambda pairs, encoder=encoder: encoder.predict(pairs, batch_size=reranker.RERANK_BATCH_SIZE),
+            "batched": batcher.score,
+        }
+        for concurrency in args.concurrency:
+            for mode, score in modes.items():
+                result = run(score, requests, concurrency)
+                print(
+                    f"  {name:<21} {mode:<11} c={concurrency:<2} "
+                    f"{result['pairs_per_second']:>8.0f} pairs/s  "
+                    f"p50={result['p50_ms']:>7.1f}ms p95={result['p95_ms']:>7.1f}ms"
+                )
+        stats = batcher.stats()
+        print(f"  {name:<21} batcher: {stats['batches']} batches, {stats['requests_per_batch']} requests/batch")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
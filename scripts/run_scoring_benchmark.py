@@ -0,0 +1,239 @@
+"""Compare score_results: per-match keyword scans vs. cached feature-matrix scoring.
+
+The legacy scorer is reproduced here (``combined_relevance_score``,
+``boost_for_source_match`` and the eight boost/penalty passes, each
+lowercasing and scanning its keyword lists per match) so both can be timed on
+the same candidates and their rankings compared.
+
+Candidates are synthetic but deterministic: chunks cut from the structured
+knowledge JSON, paired with source names and metadata that exercise every
+boost and penalty (state and product names, label and solution-sheet types,
+low-quality sources, Canadian products). Every eval-case question is scored
+against a sample of ``--candidates`` chunks from that corpus, once without and
+once with BM25 hybrid reranking, so chunks recur across questions as they do
+across real requests.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import scoring_service  # noqa: E402
+from bm25_search import rerank_with_bm25  # noqa: E402
+from chunk_store import get_match_text  # noqa: E402
+from constants import (  # noqa: E402
+    FUNGICIDES,
+    GRASS_TYPES,
+    HERBICIDES,
+    HIGH_VALUE_FUNGICIDE_SOURCES,
+    INSECTICIDES,
+    KEYWORD_SCORE_WEIGHT,
+    LOW_QUALITY_SOURCES,
+    SCORE_BOOSTS,
+    SCORE_PENALTIES,
+    TOPIC_KEYWORDS,
+    US_STATES,
+    VECTOR_SCORE_WEIGHT,
+    WRONG_TYPE_KEYWORDS,
+)
+from detection import detect_grass_type, detect_product_need, detect_region  # noqa: E402
+from scoring import boost_for_source_match, combined_relevance_score  # noqa: E402
+
+
+def legacy_score_results(matches, question, grass_type, region, product_need, use_hybrid=True):
+    matches = matches or []
+    if use_hybrid and matches:
+        matches = rerank_with_bm25(question, matches, top_k=50)
+    question_lower = question.lower()
+    scored = []
+    for match in matches:
+        if not match or 'metadata' not in match:
+            continue
+        metadata = match['metadata']
+        text = get_match_text(match)
+        source = metadata.get('source', 'Unknown')
+        text_lower = text.lower()
+        source_lower = source.lower()
+        kw_score = combined_relevance_score(text, question)
+        source_boost = boost_for_source_match(source, question)
+        rrf_score = match.get('rrf_score', 0)
+        if rrf_score > 0:
+            score = rrf_score * 10 * source_boost
+        else:
+            score = ((VECTOR_SCORE_WEIGHT * match.get('score', 0)) + (KEYWORD_SCORE_WEIGHT * kw_score)) * source_boost
+
+        if product_need == 'fungicide':
+            source_type = metadata.get('type', '').lower()
+            source_name = metadata.get('source', '').lower()
+            if any(pattern in source_name for pattern in HIGH_VALUE_FUNGICIDE_SOURCES):
+                score *= SCORE_BOOSTS['high_value_fungicide']
+            if 'label' in source_type or 'pesticide_label' in source_type:
+                score *= SCORE_BOOSTS['product_label']
+            elif 'solution' in source_type or 'sheet' in source_type:
+                score *= SCORE_PENALTIES['solution_sheet']
+            if any(bad in source_name for bad in LOW_QUALITY_SOURCES):
+                score *= SCORE_PENALTIES['low_quality_source']
+            for keyword in question_lower.split():
+                if len(keyword) > 4 and keyword in source_name:
+                    score *= SCORE_BOOSTS['keyword_in_source']
+        if grass_type:
+            grass_lower = grass_type.lower()
+            doc_name = (metadata.get('document_name') or '').lower()
+            if grass_lower in text_lower or grass_lower in source_lower or grass_lower in doc_name:
+                score *= SCORE_BOOSTS['grass_type_match']
+        for state in US_STATES:
+            if state in question_lower and state in source_lower:
+                score *= SCORE_BOOSTS['state_match']
+                break
+        if region and (region in text_lower or region in source_lower):
+            score *= SCORE_BOOSTS['region_match']
+        water_keywords = TOPIC_KEYWORDS['water']
+        if any(kw in question_lower for kw in water_keywords):
+            if any(kw in source_lower or kw in text_lower[:500] for kw in water_keywords):
+                score *= SCORE_BOOSTS['water_keyword_match']
+        if grass_type and any(g in text_lower[:200] for g in GRASS_TYPES if g != grass_type):
+            score *= SCORE_PENALTIES['wrong_grass']
+        if metadata.get('country', 'USA') == 'Canada':
+            score *= SCORE_PENALTIES['canada_product']
+        if product_need:
+            conflicts = {
+                'fungicide': (HERBICIDES, INSECTICIDES),
+                'herbicide': (FUNGICIDES, INSECTICIDES),
+                'insecticide': (FUNGICIDES, HERBICIDES),
+            }.get(product_need, ())
+            for names in conflicts:
+                if any(name in text_lower or name in source_lower for name in names):
+                    score *= SCORE_PENALTIES['wrong_product_type']
+                    break
+            if any(wt in text_lower[:300] for wt in WRONG_TYPE_KEYWORDS.get(product_need, [])):
+                score *= SCORE_PENALTIES['wrong_type_keyword']
+
+        scored.append({'text': text, 'source': source, 'score': score, 'match_id': match.get('id', 'unknown'), 'metadata': metadata})
+    scored.sort(key=lambda x: x['score'], reverse=True)
+    return scored
+
+
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def build_chunks(min_chars: int = 200, max_chars: int = 1200) -> list[str]:
+    chunks = []
+    for path in sorted((ROOT / "knowledge").glob("*.json")):
+        buffer = ""
+        for text in _strings(json.loads(path.read_text(encoding="utf-8"))):
+            buffer = f"{buffer} {text}".strip()
+            if len(buffer) >= min_chars:
+                chunks.append(buffer[:max_chars])
+                buffer = ""
+    return chunks
+
+
+SOURCE_WORDS = (
+    US_STATES[:12] + GRASS_TYPES + HERBICIDES[:6] + FUNGICIDES[:8] + INSECTICIDES[:4]
+    + LOW_QUALITY_SOURCES + HIGH_VALUE_FUNGICIDE_SOURCES
+    + ['dollar spot', 'brown patch', 'crabgrass', 'pythium', 'irrigation', 'drought', 'southeast', 'west']
+)
+SOURCE_TYPES = ['pesticide_label', 'solution_sheet', 'document', 'research', 'spray_program']
+
+
+def build_candidates(chunks: list[str], count: int, rng: random.Random) -> list[dict]:
+    candidates = []
+    for index, text in enumerate(rng.sample(chunks, min(count, len(chunks)))):
+        words = rng.sample(SOURCE_WORDS, rng.randint(1, 3))
+        source = " ".join(word.title() for word in words) + rng.choice([" Label", " Guide", " Fact Sheet", ""])
+        metadata = {
+            "source": source,
+            "text": text,
+            "type": rng.choice(SOURCE_TYPES),
+            "country": "Canada" if rng.random() < 0.1 else "USA",
+        }
+        if rng.random() < 0.3:
+            metadata["document_name"] = rng.choice(GRASS_TYPES + ["turf guide"])
+        candidates.append({"id": f"chunk-{index}", "score": round(rng.random(), 4), "metadata": metadata})
+    return candidates
+
+
+def _eval_questions() -> list[str]:
+    questions = []
+    for path in sorted((ROOT / "scripts").glob("*_eval_cases.json")):
+        for case in json.loads(path.read_text(encoding="utf-8")):
+            for step in case.get("steps") or [case]:
+                question = step.get("question") if isinstance(step, dict) else step
+                if question:
+                    questions.append(str(question))
+    return questions
+
+
+def _time_scorer(scorer, workload, repeat: int) -> tuple[list[float], list[list[dict]]]:
+    samples = []
+    results = []
+    for _ in range(repeat):
+        results = []
+        for question, candidates, use_hybrid in workload:
+            args = (candidates, question, detect_grass_type(question), detect_region(question), detect_product_need(question), use_hybrid)
+            started = time.perf_counter()
+            results.append(scorer(*args))
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples, results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=50, help="candidate matches per question")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the question set")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chunks = build_chunks()
+    corpus = build_candidates(chunks, len(chunks), rng)
+    workload = [
+        (question, rng.sample(corpus, min(args.candidates, len(corpus))), use_hybrid)
+        for question in _eval_questions()
+        for use_hybrid in (False, True)
+    ]
+
+    legacy_samples, legacy_results = _time_scorer(legacy_score_results, workload, args.repeat)
+    feature_samples, feature_results = _time_scorer(scoring_service.score_results, workload, args.repeat)
+    mismatched = 0
+    max_relative_error = 0.0
+    for legacy, features in zip(legacy_results, feature_results):
+        if [r["match_id"] for r in legacy] != [r["match_id"] for r in features]:
+            mismatched += 1
+        for old, new in zip(legacy, features):
+            if old["score"]:
+                max_relative_error = max(max_relative_error, abs(new["score"] - old["score"]) / abs(old["score"]))
+
+    backend = "numpy" if scoring_service.np is not None else "python"
+    print(f"score_results benchmark ({backend} dot product)")
+    print(
+        f"{len(workload)} rankings x {args.candidates} candidates, {mismatched} ordering mismatches, "
+        f"max relative score error {max_relative_error:.2e}"
+    )
+    for label, samples in (("legacy", legacy_samples), ("matrix", feature_samples)):
+        ordered = sorted(samples)
+        p95 = ordered[int(len(ordered) * 0.95) - 1]
+        print(f"  {label:>6} mean={statistics.fmean(samples):>7.2f}ms p95={p95:>7.2f}ms")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,367 @@
+"""Replay sampled production questions against the app for capacity planning.
+
+``run_ask_latency_benchmark.py`` times eval questions one at a time. This
+script replays what users actually asked, at production-like concurrency, to
+size gunicorn's ``--workers`` and ``--threads`` (the Procfile runs 2 x 4):
+
+- questions come from the expert router events in the feedback database
+  (``--source-data-dir``; DynamoDB when ``PERSISTENCE_BACKEND=dynamodb``).
+  Those rows carry the ``selected_mode`` and KB verdict the sample is
+  stratified on; the plain feedback rows do not record a mode;
+- every question is anonymized before it is used or written anywhere:
+  emails, URLs, phone numbers, long account-style numbers, "my name is ..."
+  and club names are replaced with placeholders;
+- arrivals are open loop: Poisson at each ``--rate`` (requests/second), or
+  the recorded inter-arrival gaps of the event history sped up by each
+  ``--speedup``. Requests are never held back because earlier ones are slow;
+- each worker is a separate process running the app with a pool of
+  ``--threads`` request threads, and receives every ``workers``-th arrival.
+  All workers share one scratch ``DATA_DIR``, as they do in production;
+- OpenAI, Pinecone and Tavily are replaced by ``scripts/upstream_fixtures.py``
+  with ``--latency`` upstream delays. ``--record`` calls the live services
+  once per question and saves the responses, the anonymized sample and the
+  arrival gaps to ``--fixtures``, so later replays need neither API keys nor
+  access to production data.
+
+For every (workers, threads, load) point it reports throughput, latency from
+scheduled arrival to response (queueing included) at p50/p95/p99, service
+time, errors and 429s, and the share of requests answered without reaching
+the general LLM path next to the share recorded in production.
+``--output`` writes the curves as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from scripts.run_ask_latency_benchmark import Runner, _load_app, percentile  # noqa: E402
+from scripts.upstream_fixtures import LatencyModel, UpstreamTape, install_upstream_stubs  # noqa: E402
+
+DEFAULT_FIXTURES_PATH = ROOT / "scripts" / "traffic_replay_fixtures.json"
+# Throughput below this share of the offered rate marks a configuration as saturated.
+SATURATION_RATIO = 0.9
+
+_REDACTIONS = (
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "[email]"),
+    (re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE), "[url]"),
+    (re.compile(r"\b([Mm]y name is|[Tt]his is)\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?"), r"\1 [name]"),
+    (re.compile(r"\b(?:[A-Z][\w'&-]*\s+){1,4}(?:Golf\s+(?:Club|Course|Links)|Country\s+Club|G\.?C\.?|C\.?C\.?)(?![\w.])"),
+     "[club]"),
+)
+_PHONE_CANDIDATE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+_LONG_NUMBER = re.compile(r"\b\d{6,}\b")
+
+
+def anonymize_question(text: str) -> str:
+    """Strip contact details and identifying names; agronomic numbers (rates, dates, zips) are kept."""
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    text = _PHONE_CANDIDATE.sub(
+        lambda match: "[phone]" if sum(char.isdigit() for char in match.group()) >= 10 else match.group(), text
+    )
+    return _LONG_NUMBER.sub("[number]", text)
+
+
+def load_router_events(limit: int) -> list[dict]:
+    """Recent routed questions, anonymized, oldest first."""
+    from feedback_system import get_expert_router_events
+
+    events = []
+    for event in get_expert_router_events(limit=limit):
+        question = str(event.get("question") or "").strip()
+        if not question:
+            continue
+        events.append({
+            "question": anonymize_question(question),
+            "selected_mode": event.get("selected_mode") or "general",
+            "kb_verdict": event.get("response_kb_verdict") or "none",
+            "used_deterministic": bool(event.get("used_deterministic")),
+            "created_at": event.get("created_at"),
+        })
+    events.reverse()
+    return events
+
+
+def stratified_sample(events: list[dict], size: int, seed: int) -> list[dict]:
+    """``size`` events allocated across (mode, KB verdict) strata by share, at least one per stratum.
+
+    The result is shuffled so strata interleave over the replay.
+    """
+    strata = defaultdict(list)
+    for event in events:
+        strata[(event["selected_mode"], event["kb_verdict"])].append(event)
+    if size >= len(events):
+        allocation = {key: len(group) for key, group in strata.items()}
+    else:
+        quotas = {key: size * len(group) / len(events) for key, group in strata.items()}
+        allocation = {key: max(1, int(quota)) for key, quota in quotas.items()}
+        by_remainder = sorted(quotas, key=lambda key: (quotas[key] - int(quotas[key]), key), reverse=True)
+        for key in by_remainder[:max(0, size - sum(allocation.values()))]:
+            allocation[key] += 1
+    rng = random.Random(seed)
+    sample = []
+    for key in sorted(strata):
+        sample.extend(rng.sample(strata[key], min(allocation[key], len(strata[key]))))
+    rng.shuffle(sample)
+    return sample
+
+
+def _parse_timestamp(value) -> datetime | None:
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=None)
+
+
+def recorded_gaps(events: list[dict], max_gap: float) -> list[float]:
+    """Seconds between consecutive events, dropping idle stretches longer than ``max_gap``."""
+    stamps = sorted(stamp for stamp in (_parse_timestamp(event.get("created_at")) for event in events) if stamp)
+    gaps = [(later - earlier).total_seconds() for earlier, later in zip(stamps, stamps[1:])]
+    return [gap for gap in gaps if 0 <= gap <= max_gap]
+
+
+def poisson_offsets(count: int, rate: float, seed: int) -> list[float]:
+    rng = random.Random(f"{seed}:poisson:{rate}")
+    offsets, clock = [], 0.0
+    for _ in range(count):
+        offsets.append(clock)
+        clock += rng.expovariate(rate)
+    return offsets
+
+
+def recorded_offsets(count: int, gaps: list[float], speedup: float, seed: int) -> list[float]:
+    """Replay the recorded gaps in order, from a seeded starting point, ``speedup`` times faster."""
+    start = random.Random(f"{seed}:recorded").randrange(len(gaps))
+    offsets, clock = [], 0.0
+    for index in range(count):
+        offsets.append(clock)
+        clock += gaps[(start + index) % len(gaps)] / speedup
+    return offsets
+
+
+def _serve(runners: queue.Queue, question: str, scheduled: float, started_at: float) -> dict:
+    runner = runners.get()
+    try:
+        dequeued = time.perf_counter()
+        sample = runner.ask(question)
+    finally:
+        runners.put(runner)
+    sample["queue_ms"] = max(0.0, (dequeued - scheduled) * 1000)
+    sample["latency_ms"] = sample["queue_ms"] + sample["total_ms"]
+    sample["finished_s"] = time.perf_counter() - started_at
+    return sample
+
+
+def replay_worker(job: dict) -> dict:
+    """Run one app process: ``threads`` request threads serving ``arrivals`` open loop."""
+    app_module = _load_app(job["record"])
+    latency = LatencyModel(**job["latency"])
+    tape = UpstreamTape() if job["record"] else UpstreamTape.load(Path(job["fixtures"]))
+    install_upstream_stubs(app_module, tape, latency, mode="record" if job["record"] else "replay")
+    runners = queue.Queue()
+    for _ in range(job["threads"]):
+        runners.put(Runner(app_module, tape, cold=False))
+    if job["arrivals"] and not job["record"]:
+        saved_profile, latency.profile = latency.profile, "zero"
+        warm = runners.get()
+        warm.ask(job["arrivals"][0][1])  # imports and lazy singletons, outside the timed run
+        runners.put(warm)
+        latency.profile = saved_profile
+    if job.get("barrier") is not None:
+        job["barrier"].wait()
+
+    started_at = time.perf_counter()
+    cpu_started = time.process_time()
+    with ThreadPoolExecutor(max_workers=job["threads"]) as pool:
+        futures = []
+        for offset, question in job["arrivals"]:
+            delay = started_at + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(_serve, runners, question, started_at + offset, started_at))
+        samples = [future.result() for future in futures]
+    return {
+        "samples": samples,
+        "elapsed_s": time.perf_counter() - started_at,
+        "cpu_s": time.process_time() - cpu_started,
+        "upstream_calls": tape.stats(),
+        "calls": tape.calls if job["record"] else None,
+    }
+
+
+def run_point(arrivals: list[tuple[float, str]], workers: int, threads: int, base_job: dict) -> list[dict]:
+    """Split arrivals round-robin across ``workers`` processes and run them against a shared clock."""
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager, ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        barrier = manager.Barrier(workers)
+        futures = [
+            pool.submit(replay_worker, {**base_job, "threads": threads, "barrier": barrier,
+                                        "arrivals": arrivals[index::workers]})
+            for index in range(workers)
+        ]
+        return [future.result() for future in futures]
+
+
+def summarize_point(results: list[dict], offered_rps: float) -> dict:
+    samples = [sample for result in results for sample in result["samples"]]
+    elapsed = max((sample["finished_s"] for sample in samples), default=0.0)
+    throughput = len(samples) / elapsed if elapsed else 0.0
+    statuses = Counter(sample["status"] for sample in samples)
+    ok = [sample for sample in samples if sample["status"] == 200]
+
+    def dist(values: list[float]) -> dict:
+        return {f"p{pct}": round(percentile(values, pct), 1) for pct in (50, 95, 99)}
+
+    by_mode = defaultdict(list)
+    for sample in ok:
+        by_mode[sample["mode"]].append(sample["latency_ms"])
+    return {
+        "requests": len(samples),
+        "offered_rps": round(offered_rps, 3),
+        "throughput_rps": round(throughput, 3),
+        "saturated": bool(offered_rps) and throughput < SATURATION_RATIO * offered_rps,
+        "latency_ms": dist([sample["latency_ms"] for sample in ok]),
+        "service_ms": dist([sample["total_ms"] for sample in ok]),
+        "queue_ms": dist([sample["queue_ms"] for sample in ok]),
+        "errors": sum(count for status, count in statuses.items() if status not in (200, 429)),
+        "rate_limited": statuses.get(429, 0),
+        "deterministic_rate": round(sum(1 for sample in ok if not sample["stages"]) / len(ok), 3) if ok else 0.0,
+        "cpu_utilization": round(sum(result["cpu_s"] for result in results)
+                                 / max(sum(result["elapsed_s"] for result in results), 1e-9), 3),
+        "modes_p95_ms": {mode: round(percentile(values, 95), 1) for mode, values in sorted(by_mode.items())},
+    }
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _float_list(value: str) -> list[float]:
+    return [float(item) for item in value.split(",") if item.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source-data-dir", help="DATA_DIR holding the production feedback database")
+    parser.add_argument("--limit", type=int, default=5000, help="most recent router events to sample from")
+    parser.add_argument("--sample", type=int, default=100, help="questions replayed at every load point")
+    parser.add_argument("--resample", action="store_true", help="draw a new sample even if the fixtures hold one")
+    parser.add_argument("--record", action="store_true", help="call the live services and save a new recording")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES_PATH)
+    parser.add_argument("--arrival", choices=("poisson", "recorded"), default="poisson")
+    parser.add_argument("--rate", type=_float_list, default=[1.0, 2.0, 4.0, 8.0], help="Poisson requests/second")
+    parser.add_argument("--speedup", type=_float_list, default=[1.0, 10.0, 50.0],
+                        help="recorded arrivals compressed by these factors")
+    parser.add_argument("--max-gap", type=float, default=300.0, help="recorded gaps longer than this are idle time")
+    parser.add_argument("--workers", type=_int_list, default=[2], help="gunicorn worker processes")
+    parser.add_argument("--threads", type=_int_list, default=[4], help="request threads per worker")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", choices=("model", "recorded", "zero"), default="model")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply every upstream delay")
+    parser.add_argument("--output", type=Path, help="write the curves as JSON")
+    args = parser.parse_args()
+
+    latency = {"profile": args.latency, "scale": args.latency_scale, "seed": args.seed}
+    tape = UpstreamTape.load(args.fixtures)
+    sample = [] if (args.record or args.resample) else list(tape.meta.get("sample") or [])
+    gaps = list(tape.meta.get("gaps") or [])
+    if not sample:
+        if args.source_data_dir:
+            os.environ["DATA_DIR"] = args.source_data_dir
+        events = load_router_events(args.limit)
+        if not events:
+            print("No router events found; point --source-data-dir at a DATA_DIR with a feedback database.")
+            return 1
+        sample = stratified_sample(events, args.sample, args.seed)
+        gaps = recorded_gaps(events, args.max_gap)
+    if args.arrival == "recorded" and not gaps:
+        print("The event history has no usable inter-arrival gaps; use --arrival poisson.")
+        return 1
+
+    # The replay must never write to the production stores it sampled from.
+    os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="greenside-traffic-replay-")
+    os.environ["PERSISTENCE_BACKEND"] = "local"
+    base_job = {"record": False, "fixtures": str(args.fixtures), "latency": latency}
+
+    if args.record:
+        questions = list(dict.fromkeys(event["question"] for event in sample))
+        recording = run_point([(0.0, question) for question in questions], 1, 1, {**base_job, "record": True})[0]
+        recorded = UpstreamTape(recording["calls"], {
+            "sample": sample,
+            "gaps": gaps,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        })
+        recorded.save(args.fixtures)
+        print(f"Recorded {sum(len(calls) for calls in recorded.calls.values())} upstream calls for "
+              f"{len(questions)} questions to {args.fixtures}")
+        return 0
+
+    questions = [event["question"] for event in sample]
+    if args.arrival == "poisson":
+        schedules = [(f"{rate:g} rps", poisson_offsets(len(questions), rate, args.seed)) for rate in args.rate]
+    else:
+        schedules = [(f"x{speedup:g}", recorded_offsets(len(questions), gaps, speedup, args.seed))
+                     for speedup in args.speedup]
+    # Offered load is measured on the schedule actually replayed, not the nominal rate.
+    levels = [(label, (len(offsets) - 1) / offsets[-1] if len(offsets) > 1 and offsets[-1] else 0.0, offsets)
+              for label, offsets in schedules]
+
+    strata = Counter(f"{event['selected_mode']}/{event['kb_verdict']}" for event in sample)
+    recorded_deterministic = sum(1 for event in sample if event["used_deterministic"]) / len(sample)
+    print(f"Traffic replay: {len(sample)} anonymized questions from {len(strata)} strata, "
+          f"{args.arrival} arrivals, {args.latency} latency x{args.latency_scale}, fixtures {tape.fingerprint()}")
+    print(f"  production deterministic share: {recorded_deterministic:.0%}")
+    print(f"  {'workers':>7} {'threads':>7} {'load':>9} {'offered':>8} {'thruput':>8} "
+          f"{'p50':>7} {'p95':>7} {'p99':>7} {'svc p95':>8} {'errors':>6} {'429':>4} {'determ':>6} {'cpu':>5}")
+
+    curves = []
+    for workers in args.workers:
+        for threads in args.threads:
+            for label, offered, offsets in levels:
+                results = run_point(list(zip(offsets, questions)), workers, threads, base_job)
+                point = {"workers": workers, "threads": threads, "load": label, **summarize_point(results, offered)}
+                curves.append(point)
+                lat = point["latency_ms"]
+                print(f"  {workers:>7} {threads:>7} {label:>9} {offered:>8.2f} {point['throughput_rps']:>8.2f} "
+                      f"{lat['p50']:>7.0f} {lat['p95']:>7.0f} {lat['p99']:>7.0f} {point['service_ms']['p95']:>8.0f} "
+                      f"{point['errors']:>6} {point['rate_limited']:>4} {point['deterministic_rate']:>6.0%} "
+                      f"{point['cpu_utilization']:>5.0%}{'  saturated' if point['saturated'] else ''}")
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "config": {
+                "sample": len(sample),
+                "strata": dict(sorted(strata.items())),
+                "arrival": args.arrival,
+                "latency": LatencyModel(**latency).describe(),
+                "fixtures": tape.fingerprint(),
+                "seed": args.seed,
+            },
+            "production_deterministic_rate": round(recorded_deterministic, 3),
+            "curves": curves,
+        }, indent=2), encoding="utf-8")
+        print(f"Curves written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,224 @@
+"""Compare answer validation: per-answer table rebuilds vs. the compiled validator model.
+
+The legacy rate, FRAC and HRAC checks are reproduced here (rebuild every lookup
+table from products.json and ``str.find`` each name, per answer) so both can be
+timed on the same answers and their issue strings compared.
+
+The default corpus is the deterministic verified-KB answer to every eval-case
+question, plus a perturbed copy of each (FRAC/HRAC codes swapped, oz rates
+inflated) so the mismatch paths run too. ``--answers`` adds answers exported
+from the feedback table or an eval run (JSON list or JSONL of objects with
+``question`` and ``answer``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import answer_validator  # noqa: E402
+from knowledge_base import load_products  # noqa: E402
+from verified_kb import (  # noqa: E402
+    answer_from_verified_kb,
+    answer_product_context_needed,
+    recommend_verified_products_for_surface_target,
+    recommend_verified_products_for_target,
+)
+
+
+def legacy_validate_product_rates(answer: str) -> list[str]:
+    issues = []
+    products = load_products()
+    answer_lower = answer.lower()
+    rate_lookup = {}
+    for category in ["fungicides", "herbicides", "insecticides", "pgrs"]:
+        for ai_name, info in products.get(category, {}).items():
+            rates = info.get("rates", {})
+            all_rates = [float(n) for rate_str in rates.values() for n in re.findall(r"(\d+\.?\d*)", str(rate_str))]
+            if all_rates:
+                entry = {"ai_name": ai_name, "max_rate": max(all_rates), "rate_strings": rates}
+                rate_lookup[ai_name.lower()] = entry
+                for trade in info.get("trade_names", []):
+                    rate_lookup[trade.lower()] = entry
+
+    for name_key, rate_info in rate_lookup.items():
+        if name_key not in answer_lower:
+            continue
+        name_pos = answer_lower.find(name_key)
+        window = answer_lower[max(0, name_pos - 80):name_pos + len(name_key) + 80]
+        for pattern in [r"(\d+\.?\d*)\s*(?:fl\s*)?oz", r"(\d+\.?\d*)\s*ounces?"]:
+            for match in re.findall(pattern, window):
+                mentioned_rate = float(match)
+                if mentioned_rate > rate_info["max_rate"] * 2.5 and mentioned_rate > 1.0:
+                    rate_strs = ", ".join(f"{k}: {v}" for k, v in rate_info["rate_strings"].items())
+                    issues.append(
+                        f"Rate check: {mentioned_rate} oz for {rate_info['ai_name'].title()} may exceed label rates. "
+                        f"Verified rates: {rate_strs}."
+                    )
+    return issues
+
+
+def _legacy_code_issues(answer: str, lookup: dict, pattern: str, max_distance: int, label: str, stated: str) -> list[str]:
+    issues = []
+    seen = set()
+    answer_lower = answer.lower()
+    positions = []
+    for product_name, actual in lookup.items():
+        start = 0
+        while True:
+            pos = answer_lower.find(product_name, start)
+            if pos == -1:
+                break
+            positions.append((pos, pos + len(product_name), product_name, actual))
+            start = pos + 1
+    if not positions:
+        return issues
+
+    for match in re.finditer(pattern, answer, re.IGNORECASE):
+        mentioned = match.group(1).upper()
+        closest, closest_distance = None, float("inf")
+        for prod_start, prod_end, product_name, actual in positions:
+            if match.start() >= prod_end:
+                dist = match.start() - prod_end
+            elif prod_start >= match.end():
+                dist = prod_start - match.end()
+            else:
+                dist = 0
+            if dist < closest_distance:
+                closest_distance, closest = dist, (product_name, actual)
+        if closest and closest_distance <= max_distance and mentioned != closest[1].upper():
+            if (closest[0], mentioned) not in seen:
+                seen.add((closest[0], mentioned))
+                issues.append(
+                    f"{label} code mismatch: {closest[0].title()} is {label} {stated}{closest[1]}, "
+                    f"not {'HRAC/Group' if label == 'HRAC' else 'FRAC'} {mentioned} as stated in the answer."
+                )
+    return issues
+
+
+def _legacy_lookup(category: str, field: str) -> dict:
+    lookup = {}
+    for ai_name, info in load_products().get(category, {}).items():
+        value = info.get(field)
+        if value is not None:
+            lookup[ai_name.lower()] = str(value)
+            for trade in info.get("trade_names", []):
+                lookup[trade.lower()] = str(value)
+    return lookup
+
+
+def legacy_validate_frac_codes(answer: str) -> list[str]:
+    if "frac" not in answer.lower():
+        return []
+    lookup = _legacy_lookup("fungicides", "frac_code")
+    return _legacy_code_issues(answer, lookup, r"frac\s*(?:code\s*)?(\d+|M\d+|P\d+)", 350, "FRAC", "")
+
+
+def legacy_validate_herbicide_moa_codes(answer: str) -> list[str]:
+    answer_lower = answer.lower()
+    if "hrac" not in answer_lower and "group" not in answer_lower:
+        return []
+    lookup = _legacy_lookup("herbicides", "hrac_group")
+    return _legacy_code_issues(answer, lookup, r"(?:hrac\s*(?:group\s*)?|group\s*)(\d+|[A-Z])", 150, "HRAC", "Group ")
+
+
+def legacy_checks(answer: str) -> list[str]:
+    return legacy_validate_product_rates(answer) + legacy_validate_frac_codes(answer) + legacy_validate_herbicide_moa_codes(answer)
+
+
+def model_checks(answer: str) -> list[str]:
+    return (
+        answer_validator._validate_product_rates(answer)
+        + answer_validator._validate_frac_codes(answer)
+        + answer_validator._validate_herbicide_moa_codes(answer)
+    )
+
+
+def _perturb(answer: str) -> str:
+    answer = re.sub(r"FRAC (\d+)", lambda m: f"FRAC {int(m.group(1)) % 40 + 1}", answer)
+    answer = re.sub(r"Group (\d+)", lambda m: f"Group {int(m.group(1)) % 30 + 1}", answer)
+    return re.sub(r"(\d+(?:\.\d+)?)(\s*(?:fl\s*)?oz)", lambda m: f"{float(m.group(1)) * 10:g}{m.group(2)}", answer)
+
+
+def _eval_questions() -> list[str]:
+    questions = []
+    for path in sorted((ROOT / "scripts").glob("*_eval_cases.json")):
+        for case in json.loads(path.read_text(encoding="utf-8")):
+            steps = case.get("steps") or [case]
+            for step in steps:
+                question = step.get("question") if isinstance(step, dict) else step
+                if question:
+                    questions.append(str(question))
+    return questions
+
+
+def build_corpus(extra_path: Path | None) -> list[str]:
+    profile = {"surfaces": {"greens": "creeping bentgrass", "fairways": "bermudagrass"}}
+    answers = []
+    for question in _eval_questions():
+        for lane in (
+            answer_from_verified_kb,
+            lambda q: recommend_verified_products_for_surface_target(q, profile),
+            lambda q: recommend_verified_products_for_target(q, profile),
+            lambda q: answer_product_context_needed(q, profile),
+        ):
+            result = lane(question)
+            if result and result.get("answer"):
+                answers.append(result["answer"])
+                break
+    if extra_path:
+        text = extra_path.read_text(encoding="utf-8")
+        records = json.loads(text) if text.lstrip().startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+        answers.extend(str(record.get("answer") or "") for record in records if record.get("answer"))
+    return answers + [_perturb(answer) for answer in answers]
+
+
+def _time_checks(checks, answers: list[str], repeat: int) -> tuple[list[float], list[list[str]]]:
+    samples = []
+    results = []
+    for _ in range(repeat):
+        results = []
+        for answer in answers:
+            started = time.perf_counter()
+            results.append(checks(answer))
+            samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples, results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--answers", type=Path, help="extra answers as JSON list or JSONL with an 'answer' field")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the answer corpus")
+    args = parser.parse_args()
+
+    answers = build_corpus(args.answers)
+    started = time.perf_counter()
+    answer_validator.ValidatorModel(load_products())
+    build_ms = (time.perf_counter() - started) * 1000
+    answer_validator.get_validator_model()
+
+    legacy_samples, legacy_results = _time_checks(legacy_checks, answers, args.repeat)
+    model_samples, model_results = _time_checks(model_checks, answers, args.repeat)
+    mismatched = sum(1 for legacy, compiled in zip(legacy_results, model_results) if legacy != compiled)
+    flagged = sum(1 for issues in model_results if issues)
+
+    print("Answer validator benchmark")
+    print(f"{len(answers)} answers ({flagged} with issues), model build {build_ms:.1f}ms, {mismatched} issue mismatches")
+    for label, samples in (("legacy", legacy_samples), ("model", model_samples)):
+        ordered = sorted(samples)
+        p95 = ordered[int(len(ordered) * 0.95) - 1]
+        print(f"  {label:>6} mean={statistics.fmean(samples):>8.1f}us p95={p95:>8.1f}us")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
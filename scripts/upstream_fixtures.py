@@ -0,0 +1,438 @@
+"""Record-and-replay stand-ins for the upstream services behind ``/ask``.
+
+``UpstreamTape`` holds, per question, every OpenAI chat and embedding call,
+Pinecone query and Tavily search the app made, with the response payload and
+how long the live call took. ``install_upstream_stubs`` points the app's
+lazily created clients at the tape:
+
+- ``mode="record"`` wraps the live clients and appends to the tape;
+- ``mode="replay"`` answers from the tape and sleeps for a latency drawn from
+  ``LatencyModel``.
+
+A replayed call is matched on its exact request first, then on the next
+unused call of the same kind for the current question. Anything still
+unmatched gets a deterministic synthetic payload of the right shape, so a run
+without a recording still exercises the real routing, retrieval scoring,
+reranking and post-processing. ``tape.stats()`` says how many calls each
+path served.
+
+Weather is left out: benchmarks run with ``OPENWEATHER_API_KEY`` unset.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Optional
+
+UPSTREAM_KINDS = ("chat", "embedding", "pinecone", "tavily")
+# Rough (p50 ms, p95 ms) per upstream; benchmarks can override them per kind.
+DEFAULT_LATENCY_MS = {
+    "chat": (700.0, 2200.0),
+    "embedding": (90.0, 250.0),
+    "pinecone": (60.0, 180.0),
+    "tavily": (1200.0, 3500.0),
+}
+EMBEDDING_DIMENSIONS = 1536
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:20]
+
+
+def _plain(response: Any) -> Any:
+    """JSON-safe copy of an SDK response object."""
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json")
+    if hasattr(response, "to_dict"):
+        return response.to_dict()
+    return json.loads(json.dumps(response, default=str))
+
+
+class LatencyModel:
+    """Per-upstream latency: lognormal fits of (p50, p95), the recorded times, or none.
+
+    Draws are seeded by the call itself, so the same request gets the same
+    delay in every run regardless of thread interleaving.
+    """
+
+    def __init__(self, profile: str = "model", scale: float = 1.0, seed: int = 0,
+                 overrides: Optional[dict[str, tuple[float, float]]] = None):
+        if profile not in {"model", "recorded", "zero"}:
+            raise ValueError(f"Unknown latency profile: {profile}")
+        self.profile = profile
+        self.scale = scale
+        self.seed = seed
+        self.distributions = {**DEFAULT_LATENCY_MS, **(overrides or {})}
+
+    def describe(self) -> dict:
+        return {"profile": self.profile, "scale": self.scale, "seed": self.seed,
+                "distributions": {kind: list(values) for kind, values in self.distributions.items()}}
+
+    def delay_ms(self, kind: str, call_key: str, recorded_ms: Optional[float] = None) -> float:
+        if self.profile == "zero" or self.scale <= 0:
+            return 0.0
+        if self.profile == "recorded" and recorded_ms is not None:
+            return recorded_ms * self.scale
+        p50, p95 = self.distributions[kind]
+        sigma = math.log(p95 / p50) / 1.645 if p95 > p50 > 0 else 0.0
+        rng = random.Random(f"{self.seed}:{kind}:{call_key}")
+        return rng.lognormvariate(math.log(p50), sigma) * self.scale
+
+
+class UpstreamTape:
+    """Recorded upstream calls grouped by question, plus replay bookkeeping.
+
+    Requests may run concurrently (the traffic replay drives several at
+    once), so attribution is per thread. Calls made from helper threads --
+    the parallel search and grounding pools, the Tavily prefetch -- carry no
+    attribution of their own; they resolve to the only in-flight request
+    when there is exactly one, and otherwise to any recorded call with the
+    same request key.
+    """
+
+    def __init__(self, calls: Optional[dict[str, list[dict]]] = None, meta: Optional[dict] = None):
+        self.calls: dict[str, list[dict]] = calls or {}
+        self.meta: dict = meta or {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._active: dict[int, tuple[str, set[int]]] = {}
+        self._by_key: Optional[dict[tuple[str, str], dict]] = None
+        self._stats = {kind: {"exact": 0, "ordinal": 0, "synthetic": 0, "recorded": 0} for kind in UPSTREAM_KINDS}
+
+    @classmethod
+    def load(cls, path: Path) -> "UpstreamTape":
+        if not path.exists():
+            return cls()
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        return cls(payload.get("calls") or {}, payload.get("meta") or {})
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"meta": self.meta, "calls": self.calls}), encoding="utf-8")
+
+    def fingerprint(self) -> str:
+        return _digest(self.calls)[:12] if self.calls else "synthetic"
+
+    def begin(self, question: str) -> None:
+        """Attribute the upstream calls made by this thread to ``question``."""
+        request = (question, set())
+        self._local.request = request
+        with self._lock:
+            self._active[threading.get_ident()] = request
+
+    def end(self) -> None:
+        self._local.request = None
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+    def _request(self) -> Optional[tuple[str, set[int]]]:
+        # Caller holds the lock.
+        request = getattr(self._local, "request", None)
+        if request is None and len(self._active) == 1:
+            request = next(iter(self._active.values()))
+        return request
+
+    def current_question(self) -> str:
+        with self._lock:
+            request = self._request()
+        return request[0] if request else ""
+
+    def record(self, kind: str, key: str, payload: Any, elapsed_ms: float) -> None:
+        with self._lock:
+            request = self._request()
+            self.calls.setdefault(request[0] if request else "", []).append(
+                {"kind": kind, "key": key, "payload": payload, "elapsed_ms": round(elapsed_ms, 1)}
+            )
+            self._by_key = None
+            self._stats[kind]["recorded"] += 1
+
+    def lookup(self, kind: str, key: str) -> tuple[Optional[dict], str]:
+        """The recorded call for this request, and whether it matched exactly or by order."""
+        with self._lock:
+            request = self._request()
+            if request is None:
+                return self._lookup_by_key(kind, key)
+            question, used = request
+            calls = self.calls.get(question) or []
+            fallback = None
+            for index, call in enumerate(calls):
+                if index in used or call["kind"] != kind:
+                    continue
+                if call["key"] == key:
+                    used.add(index)
+                    self._stats[kind]["exact"] += 1
+                    return call, "exact"
+                if fallback is None:
+                    fallback = index
+            if fallback is not None:
+                used.add(fallback)
+                self._stats[kind]["ordinal"] += 1
+                return calls[fallback], "ordinal"
+            self._stats[kind]["synthetic"] += 1
+            return None, "synthetic"
+
+    def _lookup_by_key(self, kind: str, key: str) -> tuple[Optional[dict], str]:
+        # Caller holds the lock.
+        if self._by_key is None:
+            self._by_key = {
+                (call["kind"], call["key"]): call
+                for calls in self.calls.values()
+                for call in calls
+            }
+        call = self._by_key.get((kind, key))
+        outcome = "exact" if call else "synthetic"
+        self._stats[kind][outcome] += 1
+        return call, outcome
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {kind: dict(values) for kind, values in self._stats.items()}
+
+
+# ---------------------------------------------------------------------------
+# Request keys and synthetic payloads
+# ---------------------------------------------------------------------------
+
+def _chat_key(kwargs: dict) -> str:
+    return _digest({"model": kwargs.get("model"), "messages": kwargs.get("messages")})
+
+
+def _embedding_key(kwargs: dict) -> str:
+    return _digest({"model": kwargs.get("model"), "input": kwargs.get("input")})
+
+
+def _pinecone_key(kwargs: dict) -> str:
+    vector = [round(float(value), 5) for value in (kwargs.get("vector") or [])]
+    return _digest({
+        "vector": vector,
+        "top_k": kwargs.get("top_k"),
+        "filter": kwargs.get("filter"),
+        "namespace": kwargs.get("namespace"),
+    })
+
+
+def _template_parts(template: str, field: str) -> tuple[str, str]:
+    prefix, _, suffix = template.partition("{" + field + "}")
+    return prefix.replace("{{", "{").replace("}}", "}"), suffix.replace("{{", "{").replace("}}", "}")
+
+
+def _synthetic_chat(kwargs: dict) -> dict:
+    from answer_grounding import GROUNDING_PROMPT
+    from query_classifier import CLASSIFIER_PROMPT
+    from query_rewriter import REWRITE_PROMPT
+    from token_accounting import count_message_tokens, count_tokens
+
+    messages = kwargs.get("messages") or []
+    prompt = str(messages[-1].get("content") or "") if messages else ""
+    classifier_prefix = CLASSIFIER_PROMPT.split("{", 1)[0]
+    rewrite_prefix, rewrite_suffix = _template_parts(REWRITE_PROMPT, "question")
+    grounding_prefix = GROUNDING_PROMPT.split("{", 1)[0]
+    if classifier_prefix and prompt.startswith(classifier_prefix):
+        content = '{"category": "good_query", "reason": "Synthetic replay classification."}'
+    elif rewrite_prefix and prompt.startswith(rewrite_prefix):
+        content = prompt[len(rewrite_prefix):len(prompt) - len(rewrite_suffix) or None].strip()
+    elif grounding_prefix and prompt.startswith(grounding_prefix):
+        content = '{"grounded": true, "confidence": 0.9, "issues": [], "unsupported_claims": []}'
+    else:
+        content = (
+            "**Bottom Line:** Confirm the diagnosis on the affected surface before treating, then follow the label "
+            "rate and interval for the product that fits the target.\n\n"
+            "**Why:** Symptoms, weather and cultural history narrow the likely causes. Rotate modes of action, "
+            "keep mowing and irrigation steady, and scout again in three to five days.\n\n"
+            "**Next steps:**\n- Check label rates and re-entry intervals.\n- Record the application.\n"
+            "- Adjust nitrogen and water to the current weather."
+        )
+    return {
+        "id": "chatcmpl-replay",
+        "object": "chat.completion",
+        "created": 0,
+        "model": kwargs.get("model") or "replay",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {
+            "prompt_tokens": count_message_tokens(messages),
+            "completion_tokens": count_tokens(content),
+            "total_tokens": count_message_tokens(messages) + count_tokens(content),
+        },
+    }
+
+
+def _synthetic_embedding(kwargs: dict) -> dict:
+    inputs = kwargs.get("input")
+    inputs = inputs if isinstance(inputs, list) else [inputs]
+    data = []
+    for index, text in enumerate(inputs):
+        rng = random.Random(_digest(text))
+        vector = [rng.gauss(0.0, 1.0) for _ in range(EMBEDDING_DIMENSIONS)]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        data.append({"object": "embedding", "index": index, "embedding": [value / norm for value in vector]})
+    return {
+        "object": "list",
+        "model": kwargs.get("model") or "replay",
+        "data": data,
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
+
+
+_fragment_lock = threading.Lock()
+_fragments: list[tuple[str, str]] = []
+
+
+def _kb_fragments() -> list[tuple[str, str]]:
+    with _fragment_lock:
+        if not _fragments:
+            from knowledge_base import build_context_fragments
+            _fragments.extend(
+                (f"{source}:{key}", text[:1200]) for (source, key), text in sorted(build_context_fragments().items())
+            )
+        return _fragments
+
+
+def _synthetic_pinecone(kwargs: dict, key: str) -> dict:
+    """``top_k`` structured-KB passages with scores falling from a per-query top score."""
+    fragments = _kb_fragments()
+    rng = random.Random(key)
+    top_k = min(int(kwargs.get("top_k") or 10), len(fragments))
+    picks = rng.sample(range(len(fragments)), top_k) if fragments else []
+    top_score = rng.uniform(0.35, 0.9)
+    matches = []
+    for rank, index in enumerate(picks):
+        source, text = fragments[index]
+        matches.append({
+            "id": f"replay-{index}",
+            "score": round(top_score - rank * 0.02, 4),
+            "metadata": {"source": source, "type": "replay", "text": text},
+        })
+    return {"matches": matches, "namespace": kwargs.get("namespace") or ""}
+
+
+def _synthetic_tavily(query: str) -> dict:
+    return {
+        "answer": f"Extension guidance for: {query}",
+        "results": [
+            {
+                "title": f"Turfgrass extension note {index + 1}",
+                "url": f"https://extension.example.edu/turf/{_digest([query, index])}",
+                "content": "Scout affected areas, confirm the cause, and follow label directions for any treatment.",
+            }
+            for index in range(3)
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Client stand-ins
+# ---------------------------------------------------------------------------
+
+class _UpstreamCall:
+    """One upstream call site: records around the live function or replays from the tape."""
+
+    def __init__(self, kind: str, tape: UpstreamTape, latency: LatencyModel, live=None, adapt=None):
+        self.kind = kind
+        self.tape = tape
+        self.latency = latency
+        self.live = live
+        self.adapt = adapt or (lambda payload: payload)
+
+    def key(self, kwargs: dict) -> str:
+        if self.kind == "chat":
+            return _chat_key(kwargs)
+        if self.kind == "embedding":
+            return _embedding_key(kwargs)
+        if self.kind == "pinecone":
+            return _pinecone_key(kwargs)
+        return _digest(kwargs.get("query"))
+
+    def synthetic(self, kwargs: dict, key: str) -> Any:
+        if self.kind == "chat":
+            return _synthetic_chat(kwargs)
+        if self.kind == "embedding":
+            return _synthetic_embedding(kwargs)
+        if self.kind == "pinecone":
+            return _synthetic_pinecone(kwargs, key)
+        return _synthetic_tavily(str(kwargs.get("query") or ""))
+
+    def __call__(self, *args, **kwargs):
+        if self.kind == "tavily" and args:
+            kwargs = {"query": args[0], **kwargs}
+        key = self.key(kwargs)
+        if self.live is not None:
+            started = time.perf_counter()
+            response = self.live(**kwargs)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.tape.record(self.kind, key, _plain(response), elapsed_ms)
+            return response
+        call, _ = self.tape.lookup(self.kind, key)
+        payload = call["payload"] if call else self.synthetic(kwargs, key)
+        delay_ms = self.latency.delay_ms(self.kind, f"{self.tape.current_question()}:{key}", call["elapsed_ms"] if call else None)
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        return self.adapt(payload)
+
+
+def _openai_stub(tape: UpstreamTape, latency: LatencyModel, live_client=None):
+    from openai.types import CreateEmbeddingResponse
+    from openai.types.chat import ChatCompletion
+
+    chat = _UpstreamCall(
+        "chat", tape, latency,
+        live=live_client.chat.completions.create if live_client else None,
+        adapt=ChatCompletion.model_validate,
+    )
+    embeddings = _UpstreamCall(
+        "embedding", tape, latency,
+        live=live_client.embeddings.create if live_client else None,
+        adapt=CreateEmbeddingResponse.model_validate,
+    )
+    return SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=chat)),
+        embeddings=SimpleNamespace(create=embeddings),
+    )
+
+
+class _PineconeIndexStub:
+    def __init__(self, tape: UpstreamTape, latency: LatencyModel, live_index=None):
+        self._live = live_index
+        self.query = _UpstreamCall("pinecone", tape, latency, live=live_index.query if live_index else None)
+
+    def describe_index_stats(self):
+        return self._live.describe_index_stats() if self._live is not None else {"total_vector_count": len(_kb_fragments())}
+
+
+def install_upstream_stubs(app_module, tape: UpstreamTape, latency: LatencyModel, *, mode: str = "replay") -> None:
+    """Point the app's OpenAI, Pinecone and Tavily clients at ``tape``.
+
+    Call after ``app`` is imported; record mode needs the real API keys.
+    """
+    import web_search
+    from config import Config
+
+    if mode not in {"record", "replay"}:
+        raise ValueError(f"Unknown upstream mode: {mode}")
+    Config.OPENWEATHER_API_KEY = None
+    if mode == "record":
+        live_openai = app_module.get_openai_client()
+        live_index = app_module.get_pinecone_index()
+        live_tavily_class = web_search.TavilyClient
+    else:
+        live_openai = live_index = live_tavily_class = None
+        app_module.openai_requests_available = lambda: True
+
+    app_module._openai_client = _openai_stub(tape, latency, live_openai)
+    app_module._pinecone_index = _PineconeIndexStub(tape, latency, live_index)
+    app_module._pinecone_unavailable_until = 0.0
+
+    class _TavilyStub:
+        def __init__(self, api_key):
+            live = live_tavily_class(api_key=api_key).search if live_tavily_class else None
+            self.search = _UpstreamCall("tavily", tape, latency, live=live)
+
+    web_search.TavilyClient = _TavilyStub
+    web_search.TAVILY_AVAILABLE = True
+    web_search._tavily_client = None
@@ -1,5 +1,7 @@
+import json
 import unittest
 import os
+import sqlite3
 import tempfile
 from unittest.mock import patch
 
@@ -109,6 +111,121 @@ class AuthFlowTests(unittest.TestCase):
         self.assertEqual(store, {"users": expected_users})
         scan_all.assert_called_once_with(fake_table)
 
+    def test_local_account_index_picks_up_external_writes(self):
+        created, error = auth_store.create_account(
+            "owner@example.com",
+            "supersecure123",
+            accepted_terms=True,
+            accepted_privacy=True,
+        )
+        self.assertIsNone(error)
+        self.assertEqual(auth_store.get_account_by_id(created["id"])["email"], "owner@example.com")
+
+        store = auth_store.load_account_store()
+        store["users"][0]["email"] = "renamed@example.com"
+        store["users"][0]["name"] = "Renamed Owner"
+        with open(auth_store.ACCOUNTS_PATH, "w", encoding="utf-8") as handle:
+            json.dump(store, handle)
+        os.utime(auth_store.ACCOUNTS_PATH, ns=(0, 0))
+
+        self.assertIsNone(auth_store.get_account_by_email("owner@example.com"))
+        self.assertEqual(auth_store.get_account_by_email("renamed@example.com")["name"], "Renamed Owner")
+
+    def test_dynamodb_account_lookups_use_key_and_email_index(self):
+        class FakeKeyBuilder:
+            def __init__(self, name):
+                self.name = name
+
+            def eq(self, value):
+                return (self.name, value)
+
+        class FakeTable:
+            def __init__(self):
+                self.calls = []
+
+            def get_item(self, **kwargs):
+                self.calls.append(("get_item", kwargs))
+                return {"Item": {"id": "acct-1", "email": "owner@example.com"}}
+
+            def query(self, **kwargs):
+                self.calls.append(("query", kwargs))
+                return {"Items": [{"id": "acct-1", "email": "owner@example.com"}]}
+
+            def put_item(self, **kwargs):
+                self.calls.append(("put_item", kwargs))
+
+        fake_table = FakeTable()
+        with patch("auth_store.using_dynamodb", return_value=True), \
+             patch("auth_store.Key", FakeKeyBuilder), \
+             patch("auth_store.dynamodb_table", return_value=fake_table), \
+             patch("auth_store.dynamodb_scan_all") as scan_all:
+            by_id = auth_store.get_account_by_id("acct-1")
+            by_email = auth_store.get_account_by_email("Owner@Example.com")
+            auth_store.mark_email_verified("acct-1")
+
+        scan_all.assert_not_called()
+        self.assertEqual(by_id["email"], "owner@example.com")
+        self.assertEqual(by_email["id"], "acct-1")
+        self.assertEqual(fake_table.calls[0], ("get_item", {"Key": {"id": "acct-1"}}))
+        self.assertEqual(fake_table.calls[1][1]["KeyConditionExpression"], ("email", "owner@example.com"))
+        self.assertEqual(fake_table.calls[-1][0], "put_item")
+
+    def test_dynamodb_email_lookup_scans_until_the_email_index_exists(self):
+        class FakeClientError(Exception):
+            def __init__(self, code):
+                super().__init__(code)
+                self.response = {"Error": {"Code": code, "Message": "The table does not have the specified index: email-index"}}
+
+        class FakeTable:
+            def __init__(self, error_code):
+                self.error_code = error_code
+
+            def query(self, **kwargs):
+                raise FakeClientError(self.error_code)
+
+        with patch("auth_store.using_dynamodb", return_value=True), \
+             patch("auth_store.ClientError", FakeClientError), \
+             patch("auth_store.dynamodb_table", return_value=FakeTable("ValidationException")), \
+             patch("auth_store.dynamodb_scan_all", return_value=[{"id": "acct-1", "email": "owner@example.com"}]) as scan_all:
+            account = auth_store.get_account_by_email("Owner@Example.com")
+
+        self.assertEqual(account["id"], "acct-1")
+        scan_all.assert_called_once()
+
+        with patch("auth_store.using_dynamodb", return_value=True), \
+             patch("auth_store.ClientError", FakeClientError), \
+             patch("auth_store.dynamodb_table", return_value=FakeTable("ProvisionedThroughputExceededException")):
+            with self.assertRaises(FakeClientError):
+                auth_store.get_account_by_email("owner@example.com")
+
+    def test_create_tables_script_adds_the_email_index_to_an_existing_accounts_table(self):
+        from scripts.create_dynamodb_tables import TABLE_DEFINITIONS, add_missing_indexes
+
+        class FakeClient:
+            def __init__(self):
+                self.updates = []
+
+            def update_table(self, **kwargs):
+                self.updates.append(kwargs)
+
+        class FakeTable:
+            global_secondary_indexes = None
+            billing_mode_summary = {"BillingMode": "PAY_PER_REQUEST"}
+
+            def __init__(self):
+                self.meta = type("Meta", (), {"client": FakeClient()})()
+
+        accounts = next(item for item in TABLE_DEFINITIONS if item["TableName"] == Config.DYNAMODB_ACCOUNTS_TABLE)
+        table = FakeTable()
+
+        self.assertEqual(add_missing_indexes(table, accounts), [Config.DYNAMODB_ACCOUNTS_EMAIL_INDEX])
+        update = table.meta.client.updates[0]
+        self.assertEqual(update["AttributeDefinitions"], [{"AttributeName": "email", "AttributeType": "S"}])
+        self.assertEqual(update["GlobalSecondaryIndexUpdates"][0]["Create"]["IndexName"], Config.DYNAMODB_ACCOUNTS_EMAIL_INDEX)
+
+        table.global_secondary_indexes = [{"IndexName": Config.DYNAMODB_ACCOUNTS_EMAIL_INDEX}]
+        self.assertEqual(add_missing_indexes(table, accounts), [])
+
     def test_dynamodb_password_reset_store_uses_paginated_scan_helper(self):
         class FakeAttrBuilder:
             def __init__(self, name):
@@ -129,33 +246,75 @@ class AuthFlowTests(unittest.TestCase):
         self.assertEqual(store, {"tokens": expected_tokens})
         scan_all.assert_called_once_with(fake_table, FilterExpression=expected_filter)
 
-    def test_dynamodb_conversation_history_uses_paginated_query_helper(self):
+    def test_dynamodb_conversation_history_reads_bounded_newest_first_tail(self):
         class FakeKeyCondition:
             def __init__(self, value):
                 self.value = value
 
+            def __and__(self, other):
+                return FakeKeyCondition(("AND", self.value, other.value))
+
         class FakeKeyBuilder:
             def __init__(self, name):
                 self.name = name
 
             def eq(self, value):
-                return FakeKeyCondition((self.name, value))
+                return FakeKeyCondition((self.name, "eq", value))
 
-        fake_table = object()
-        items = [
-            {"entity_type": "conversation", "timestamp": "2026-04-01T09:00:00"},
-            {"entity_type": "message", "role": "user", "content": "First", "timestamp": "2026-04-01T10:00:00"},
-            {"entity_type": "message", "role": "assistant", "content": "Second", "timestamp": "2026-04-01T10:01:00"},
+            def begins_with(self, value):
+                return FakeKeyCondition((self.name, "begins_with", value))
+
+        class FakeTable:
+            def get_item(self, **kwargs):
+                return {"Item": {"message_count": 3}}
+
+        fake_table = FakeTable()
+        newest_first = [
             {"entity_type": "message", "role": "user", "content": "Third", "timestamp": "2026-04-01T10:02:00"},
+            {"entity_type": "message", "role": "assistant", "content": "Second", "timestamp": "2026-04-01T10:01:00"},
+            {"entity_type": "message", "role": "user", "content": "First", "timestamp": "2026-04-01T10:00:00"},
         ]
+        chat_history.clear_history_cache()
         with patch("chat_history.using_dynamodb", return_value=True), \
              patch("chat_history.Key", FakeKeyBuilder), \
              patch("chat_history.dynamodb_table", return_value=fake_table), \
-             patch("chat_history.dynamodb_query_all", return_value=items) as query_all:
+             patch("chat_history.dynamodb_query_limited", return_value=newest_first) as query_limited, \
+             patch("chat_history.dynamodb_query_all") as query_all:
             history = chat_history.get_conversation_history("conv-1", limit=2)
+            cached = chat_history.get_conversation_history("conv-1", limit=3)
 
         self.assertEqual([item["content"] for item in history], ["Second", "Third"])
-        query_all.assert_called_once()
+        self.assertEqual([item["content"] for item in cached], ["First", "Second", "Third"])
+        query_all.assert_not_called()
+        query_limited.assert_called_once()
+        kwargs = query_limited.call_args.kwargs
+        self.assertFalse(kwargs["ScanIndexForward"])
+        self.assertEqual(
+            kwargs["KeyConditionExpression"].value,
+            ("AND", ("pk", "eq", "conversation#conv-1"), ("sk", "begins_with", "message#")),
+        )
+
+    def test_conversation_history_ring_buffer_tracks_local_writes(self):
+        _, conversation_id = create_session()
+        save_message(conversation_id, "user", "First")
+        self.assertEqual([item["content"] for item in chat_history.get_conversation_history(conversation_id, limit=5)], ["First"])
+
+        save_message(conversation_id, "assistant", "Second")
+        with patch("chat_history._read_conversation_tail") as read_tail:
+            history = chat_history.get_conversation_history(conversation_id, limit=5)
+        read_tail.assert_not_called()
+        self.assertEqual([item["content"] for item in history], ["First", "Second"])
+
+        conn = sqlite3.connect(chat_history.DB_PATH)
+        conn.execute(
+            "INSERT INTO messages (conversation_id, role, content) VALUES (?, 'user', 'From another worker')",
+            (conversation_id,),
+        )
+        conn.execute("UPDATE conversations SET message_count = message_count + 1 WHERE id = ?", (conversation_id,))
+        conn.commit()
+        conn.close()
+        history = chat_history.get_conversation_history(conversation_id, limit=5)
+        self.assertEqual(history[-1]["content"], "From another worker")
 
     def test_dynamodb_export_account_conversations_uses_paginated_scan_helper(self):
         class FakeCondition:
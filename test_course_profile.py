@@ -1,13 +1,23 @@
+import json
+import os
+import tempfile
 import unittest
 from datetime import date
+from unittest.mock import patch
 
 from course_profile import (
+    _profile_path,
+    apply_course_profile_updates,
     build_course_profile_kb_hint,
     build_current_management_snapshot,
     build_operational_guidance_response,
     format_current_management_snapshot,
     format_course_profile_for_prompt,
+    get_course_profile_view,
     infer_regional_management_context,
+    load_course_profile,
+    save_course_profile,
+    update_course_profile,
 )
 
 
@@ -190,5 +200,78 @@ class CourseProfileInferenceTests(unittest.TestCase):
         self.assertNotIn("**Fairways (kentucky bluegrass)**", response["answer"])
 
 
+
+class CourseProfileCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(prefix="greenside-profile-")
+        self.env_patcher = patch.dict(os.environ, {"DATA_DIR": self.temp_dir.name})
+        self.env_patcher.start()
+
+    def tearDown(self):
+        self.env_patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_cached_view_is_read_only_and_load_returns_mutable_copy(self):
+        save_course_profile({"region": "Ohio", "notes": ["Dollar spot pressure"]}, "acct-1")
+
+        view = get_course_profile_view("acct-1")
+        self.assertIs(view, get_course_profile_view("acct-1"))
+        with self.assertRaises(TypeError):
+            view["region"] = "Texas"
+
+        loaded = load_course_profile("acct-1")
+        loaded["notes"].append("Edited locally")
+        self.assertEqual(list(get_course_profile_view("acct-1")["notes"]), ["Dollar spot pressure"])
+
+    def test_cache_is_invalidated_by_external_file_write(self):
+        save_course_profile({"region": "Ohio"}, "acct-2")
+        self.assertEqual(get_course_profile_view("acct-2")["region"], "Ohio")
+
+        with open(_profile_path("acct-2"), "w", encoding="utf-8") as handle:
+            json.dump({"region": "Kentucky bluegrass country"}, handle)
+        os.utime(_profile_path("acct-2"), ns=(0, 0))
+
+        self.assertEqual(load_course_profile("acct-2")["region"], "Kentucky bluegrass country")
+        self.assertIn("Kentucky", format_course_profile_for_prompt(profile_key="acct-2"))
+
+    def test_dynamodb_profile_saved_without_version_survives_read_and_update(self):
+        class FakeTable:
+            def __init__(self):
+                self.items = {}
+
+            def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None):
+                item = self.items.get(Key["profile_key"])
+                if item is None:
+                    return {}
+                if ProjectionExpression:
+                    names = ExpressionAttributeNames or {}
+                    wanted = [names.get(part.strip(), part.strip()) for part in ProjectionExpression.split(",")]
+                    item = {name: item[name] for name in wanted if name in item}
+                return {"Item": json.loads(json.dumps(item))}
+
+            def put_item(self, Item):
+                self.items[Item["profile_key"]] = json.loads(json.dumps(Item))
+
+        table = FakeTable()
+        table.items["acct-legacy"] = {
+            "profile_key": "acct-legacy",
+            "profile": {"region": "Louisville, Kentucky", "surfaces": {"greens": "Creeping bentgrass"}},
+        }
+        with patch("course_profile.using_dynamodb", return_value=True), \
+             patch("course_profile.dynamodb_table", return_value=table):
+            self.assertEqual(get_course_profile_view("acct-legacy")["region"], "Louisville, Kentucky")
+
+            update_course_profile({"soil": "Sand-based USGA greens"}, "acct-legacy")
+            apply_course_profile_updates("We have dollar spot pressure every year", "acct-legacy")
+
+            stored = table.items["acct-legacy"]
+            self.assertIn("version", stored)
+            self.assertEqual(stored["profile"]["region"], "Louisville, Kentucky")
+            self.assertEqual(stored["profile"]["surfaces"]["greens"], "Creeping bentgrass")
+            self.assertEqual(stored["profile"]["soil"], "Sand-based USGA greens")
+            self.assertTrue(stored["profile"]["notes"])
+            self.assertEqual(load_course_profile("acct-legacy")["region"], "Louisville, Kentucky")
+
+
 if __name__ == "__main__":
     unittest.main()
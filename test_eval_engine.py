@@ -0,0 +1,170 @@
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import eval_engine
+from answer_validator import validate_answer
+from eval_engine import EvalJob, EvalResultCache, EvalSuite, run_case_shard
+from knowledge_base import extract_disease_names, extract_product_names, extract_weed_names
+from knowledge_snapshot import note_source_read
+from verified_kb import recommend_verified_products_for_target
+
+
+CASES = [
+    {"id": "dollar_spot", "question": "dollar spot rates", "reads": ["products", "diseases"]},
+    {"id": "mowing", "question": "mowing height", "reads": ["cultural_practices"]},
+    {"id": "no_kb", "question": "hello", "reads": []},
+]
+
+
+class FakeSnapshot:
+    def __init__(self, hashes):
+        self.hashes = hashes
+
+    def source_hash(self, name):
+        return self.hashes.get(name, "")
+
+
+class EvalEngineTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.ran = []
+        self.snapshot = FakeSnapshot({"products": "p1", "diseases": "d1", "cultural_practices": "c1"})
+
+        def run_eval(cases):
+            results = []
+            for case in cases:
+                self.ran.append(case["id"])
+                for name in case["reads"]:
+                    note_source_read(name)
+                results.append({"id": case["id"], "question": case["question"], "passed": case["id"] != "mowing"})
+            return {"results": results}
+
+        module = types.ModuleType("fake_eval_suite")
+        module.run_eval = run_eval
+        patches = [
+            patch.dict(sys.modules, {"fake_eval_suite": module}),
+            patch.object(eval_engine.Config, "DATA_DIR", self.tmp.name),
+            patch.object(eval_engine, "refresh_knowledge_snapshot", lambda: self.snapshot),
+            patch.object(eval_engine, "code_version", lambda: "v1"),
+            patch.object(eval_engine, "load_suite_cases", lambda suite: CASES),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.suite = EvalSuite("fake", "Fake", "fake_eval_suite", Path("fake.json"))
+
+    def run_job(self):
+        self.ran = []
+        job = EvalJob([self.suite], workers=0, shard_size=2).start()
+        self.assertTrue(job.wait(10))
+        self.assertEqual(job.status, "done")
+        return job
+
+    def test_unchanged_cases_are_served_from_the_cache(self):
+        first = self.run_job()
+        self.assertEqual(self.ran, ["dollar_spot", "mowing", "no_kb"])
+        self.assertEqual(first.payload["summary"]["passed"], 2)
+        self.assertEqual(first.payload["failing_cases"][0]["id"], "mowing")
+
+        second = self.run_job()
+        self.assertEqual(self.ran, [])
+        self.assertEqual(second.progress()["cached"], 3)
+        self.assertEqual(second.payload["suites"], first.payload["suites"])
+
+    def test_kb_edit_reruns_only_the_cases_that_read_the_source(self):
+        self.run_job()
+        self.snapshot.hashes["diseases"] = "d2"
+
+        job = self.run_job()
+        self.assertEqual(self.ran, ["dollar_spot"])
+        self.assertEqual(job.progress()["ran"], 1)
+
+    def test_code_version_change_reruns_everything(self):
+        self.run_job()
+        with patch.object(eval_engine, "code_version", lambda: "v2"):
+            self.run_job()
+        self.assertEqual(len(self.ran), 3)
+
+    def test_cache_rejects_rows_whose_sources_changed(self):
+        cache = EvalResultCache(str(Path(self.tmp.name) / "results.db"))
+        self.addCleanup(cache.close)
+        cache.set("fake", "abc", "v1", {"passed": True}, {"products": "p1"})
+
+        self.assertEqual(cache.get("fake", "abc", "v1", {"products": "p1"}.get), {"passed": True})
+        self.assertIsNone(cache.get("fake", "abc", "v1", {"products": "p2"}.get))
+        self.assertIsNone(cache.get("fake", "abc", "v2", {"products": "p1"}.get))
+
+    def start_job(self, on_complete=None):
+        with patch.object(eval_engine, "EVAL_SUITES", [self.suite]), \
+             patch.object(eval_engine.Config, "EVAL_WORKERS", 0):
+            return eval_engine.start_eval_job(on_complete=on_complete)
+
+    @unittest.skipIf(eval_engine.fcntl is None, "cross-process job lock needs fcntl")
+    def test_job_running_in_another_process_is_reported_not_restarted(self):
+        patcher = patch.object(eval_engine, "_job", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        other_process = eval_engine._acquire_job_lock()
+        eval_engine._write_job_status({"id": "other", "status": "running", "total": 3, "completed": 1})
+
+        self.assertIsNone(self.start_job())
+        self.assertEqual(self.ran, [])
+        self.assertEqual(eval_engine.eval_job_status()["id"], "other")
+        self.assertEqual(eval_engine.eval_job_status()["status"], "running")
+
+        other_process.close()
+        self.assertEqual(eval_engine.eval_job_status()["status"], "interrupted")
+
+        job = self.start_job()
+        self.assertTrue(job.wait(10))
+        self.assertEqual(self.ran, ["dollar_spot", "mowing", "no_kb"])
+
+    def test_finished_job_publishes_status_after_storing_its_payload(self):
+        patcher = patch.object(eval_engine, "_job", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        seen_while_storing = []
+        job = self.start_job(on_complete=lambda payload: seen_while_storing.append(eval_engine._read_job_status()["status"]))
+        self.assertTrue(job.wait(10))
+
+        self.assertEqual(seen_while_storing, ["running"])
+        status = eval_engine._read_job_status()
+        self.assertEqual(status["id"], job.id)
+        self.assertEqual((status["status"], status["completed"], status["total"]), ("done", 3, 3))
+        rerun = self.start_job()
+        self.assertIsNot(rerun, job)
+        self.assertTrue(rerun.wait(10))
+
+
+
+class RealSnapshotSourceTrackingTests(unittest.TestCase):
+    def test_warm_derived_caches_report_the_sources_they_were_built_from(self):
+        question = "What fungicide should I use for dollar spot on bentgrass greens, and is crabgrass a concern?"
+
+        def run_eval(cases):
+            extract_disease_names(question)
+            extract_product_names(question)
+            extract_weed_names(question)
+            recommend_verified_products_for_target(question)
+            validate_answer("Apply Heritage at 0.4 oz (FRAC 11).", question)
+            return {"results": [{"id": case["id"], "passed": True} for case in cases]}
+
+        module = types.ModuleType("real_kb_suite")
+        module.run_eval = run_eval
+        case = {"id": "dollar_spot", "question": question}
+        with patch.dict(sys.modules, {"real_kb_suite": module}):
+            run_eval([case])  # every derived cache is warm before anything is tracked
+            first = run_case_shard("real_kb_suite", [case])[0]["kb_sources"]
+            second = run_case_shard("real_kb_suite", [case])[0]["kb_sources"]
+
+        self.assertEqual(first, second)
+        self.assertTrue({"diseases", "products", "weeds"} <= set(second))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,17 @@
+import io
+import os
+import random
+import tempfile
 import unittest
 from unittest.mock import patch
 
+from PIL import Image, ImageDraw
+
+from config import Config
+from cache import ImageAnalysisCache
+from attachment_store import build_attachment_reference, decode_data_url, encode_data_url, find_image_blob
 from image_diagnosis import answer_image_diagnosis, validate_image_attachment
+from image_preprocessing import image_hash, vision_image_tokens
 
 
 SMALL_PNG_DATA_URL = (
@@ -179,3 +189,190 @@ class ImageDiagnosisTests(unittest.TestCase):
 
         self.assertIn("Image-Specific Caution", result["answer"])
         self.assertIn("herbicide bleaching", result["answer"].lower())
+
+
+class AttachmentStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(prefix="greenside-attachments-")
+        self.env_patcher = patch.dict(os.environ, {"DATA_DIR": self.temp_dir.name})
+        self.env_patcher.start()
+
+    def tearDown(self):
+        self.env_patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_small_upload_stays_inline(self):
+        reference = build_attachment_reference({"data_url": SMALL_PNG_DATA_URL, "name": "leaf.png"})
+
+        self.assertEqual(reference["data_url"], SMALL_PNG_DATA_URL)
+        self.assertNotIn("blob_sha256", reference)
+
+    def test_large_upload_is_stored_by_hash_with_thumbnail(self):
+        output = io.BytesIO()
+        Image.effect_noise((1200, 900), 64).convert("RGB").save(output, format="PNG")
+        data_url = encode_data_url("image/png", output.getvalue())
+
+        reference = build_attachment_reference({"data_url": data_url, "name": "green.png", "mime_type": "image/png"})
+
+        self.assertTrue(reference["thumbnail"])
+        self.assertTrue(reference["data_url"].startswith("data:image/jpeg;base64,"))
+        self.assertLess(len(reference["data_url"]), len(data_url) // 4)
+        path, mime_type = find_image_blob(reference["blob_sha256"])
+        self.assertEqual(mime_type, "image/png")
+        with open(path, "rb") as handle:
+            self.assertEqual(handle.read(), decode_data_url(data_url)[1])
+        self.assertEqual(build_attachment_reference({"data_url": data_url})["blob_sha256"], reference["blob_sha256"])
+
+
+
+def _photo_data_url(size, *, mode="RGB", image_format="JPEG", orientation=None):
+    image = Image.effect_noise(size, 32).convert(mode)
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"
+    if orientation:
+        exif[0x0112] = orientation
+    output = io.BytesIO()
+    image.save(output, format=image_format, quality=95, exif=exif.tobytes())
+    mime_type = "image/jpeg" if image_format == "JPEG" else "image/png"
+    return encode_data_url(mime_type, output.getvalue())
+
+
+class ImagePreprocessingTests(unittest.TestCase):
+    def validate(self, data_url, **kwargs):
+        result = validate_image_attachment({"data_url": data_url, "name": "green.jpg"}, max_bytes=20 * 1024 * 1024, **kwargs)
+        self.assertTrue(result["ok"])
+        return result["attachment"]
+
+    def test_large_photo_is_downsized_and_stripped_of_exif(self):
+        data_url = _photo_data_url((3000, 2000))
+
+        attachment = self.validate(data_url)
+
+        mime_type, raw = decode_data_url(attachment["data_url"])
+        with Image.open(io.BytesIO(raw)) as image:
+            self.assertEqual(image.size, (1152, 768))
+            self.assertEqual(len(image.getexif()), 0)
+        self.assertEqual(mime_type, "image/jpeg")
+        self.assertEqual(attachment["size_bytes"], len(raw))
+        self.assertEqual(attachment["original_size_bytes"], len(decode_data_url(data_url)[1]))
+        summary = attachment["preprocessing"]
+        self.assertGreater(summary["saved_bytes"], summary["bytes"])
+        self.assertEqual(summary["vision_tokens_after"], summary["vision_tokens_before"])
+
+    def test_exif_orientation_is_applied_before_resizing(self):
+        attachment = self.validate(_photo_data_url((1600, 1000), orientation=6))
+
+        with Image.open(io.BytesIO(decode_data_url(attachment["data_url"])[1])) as image:
+            self.assertEqual(image.size, (768, 1229))
+
+    def test_transparent_png_is_flattened_to_jpeg(self):
+        attachment = self.validate(_photo_data_url((1400, 1400), mode="RGBA", image_format="PNG"))
+
+        self.assertEqual(attachment["mime_type"], "image/jpeg")
+        self.assertEqual(attachment["preprocessing"]["size"], [768, 768])
+
+    def test_preprocessing_can_be_disabled(self):
+        data_url = _photo_data_url((3000, 2000))
+
+        with patch.object(Config, "IMAGE_PREPROCESS", False):
+            attachment = self.validate(data_url)
+
+        self.assertEqual(attachment["data_url"], data_url)
+        self.assertNotIn("preprocessing", attachment)
+        self.assertEqual(self.validate(data_url, preprocess=False)["data_url"], data_url)
+
+    def test_vision_token_estimate_follows_high_detail_tiling(self):
+        self.assertEqual(vision_image_tokens(2048, 4096), 1105)
+        self.assertEqual(vision_image_tokens(4032, 3024), 765)
+        self.assertEqual(vision_image_tokens(1152, 768), 1105)
+        self.assertEqual(vision_image_tokens(512, 512), 255)
+
+
+VISUAL_PAYLOAD = (
+    '{"turf_related": true, "image_type": "green_overview", '
+    '"observed_clues": ["circular straw-colored spots"], '
+    '"diagnostic_signals": ["dollar spot"], '
+    '"field_checks": ["Look for cobwebby mycelium at dawn."], '
+    '"limitations": ["Photo alone cannot confirm disease."], '
+    '"confidence_note": "Spots fit a foliar disease pattern."}'
+)
+
+
+class _CountingClient(_FakeClient):
+    def __init__(self, payload):
+        super().__init__(payload)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return super().create(**kwargs)
+
+
+def _green_photo(seed, size=(1600, 1200)):
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, (60, 120, 50))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y, radius = rng.randrange(size[0]), rng.randrange(size[1]), rng.randrange(80, 300)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=(rng.randrange(100, 220), rng.randrange(120, 200), 60))
+    return image
+
+
+def _jpeg(image, quality=90):
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+class ImageAnalysisCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = ImageAnalysisCache(max_per_scope=3, max_distance=6)
+        patcher = patch("image_diagnosis.get_image_analysis_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = _CountingClient(VISUAL_PAYLOAD)
+
+    def upload(self, raw):
+        result = validate_image_attachment({"data_url": encode_data_url("image/jpeg", raw), "name": "green.jpg"}, max_bytes=20 * 1024 * 1024)
+        return result["attachment"]
+
+    def diagnose(self, question, attachment, scope="profile-1"):
+        with patch("image_diagnosis.answer_advanced_diagnosis", side_effect=lambda q, profile: {"answer": f"Diagnosis for: {q}", "sources": []}):
+            return answer_image_diagnosis(question, attachment, None, self.client, cache_scope=scope)
+
+    def test_recompressed_crop_reuses_the_analysis_with_the_new_question(self):
+        photo = _green_photo(1)
+        width, height = photo.size
+        crop = photo.crop((width * 3 // 100, height * 3 // 100, width * 97 // 100, height * 97 // 100))
+
+        first = self.diagnose("What is on this green?", self.upload(_jpeg(photo)))
+        second = self.diagnose("Is this spreading from the collar?", self.upload(_jpeg(crop, quality=60)))
+
+        self.assertEqual(self.client.calls, 1)
+        self.assertNotIn("analysis_reused", first["image_diagnosis"])
+        self.assertTrue(second["image_diagnosis"]["analysis_reused"])
+        self.assertIn("spreading from the collar", second["answer"])
+        self.assertIn("dollar spot", second["answer"])
+        self.assertEqual(self.cache.stats()["vision_calls_avoided"], 1)
+
+    def test_different_photo_or_scope_runs_the_vision_model(self):
+        attachment = self.upload(_jpeg(_green_photo(1)))
+        self.diagnose("What is on this green?", attachment)
+
+        self.diagnose("What is on this green?", self.upload(_jpeg(_green_photo(2))))
+        self.diagnose("What is on this green?", attachment, scope="profile-2")
+        self.diagnose("What is on this green?", attachment, scope=None)
+
+        self.assertEqual(self.client.calls, 4)
+
+    def test_disk_store_keeps_the_newest_entries_per_scope(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ImageAnalysisCache(db_path=os.path.join(directory, "images.db"), max_per_scope=2, max_distance=0)
+            hashes = [image_hash(_jpeg(_green_photo(seed))) for seed in range(3)]
+            for index, dhash in enumerate(hashes):
+                cache.add("profile-1", dhash, {"image_type": f"photo-{index}"})
+
+            self.assertIsNone(cache.find("profile-1", hashes[0]))
+            self.assertEqual(cache.find("profile-1", hashes[2]), ({"image_type": "photo-2"}, 0))
+            self.assertIsNone(cache.find("profile-2", hashes[2]))
+            self.assertEqual(cache.stats()["size"], 2)
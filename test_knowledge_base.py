@@ -1,5 +1,9 @@
+import json
+import shutil
+import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 from scripts.audit_structured_kb import run_audit as run_structured_kb_audit
 from scripts.run_ambiguity_eval import load_cases as load_ambiguity_eval_cases
@@ -11,6 +15,13 @@ from scripts.run_no_account_turf_eval import load_cases as load_no_account_turf_
 from scripts.run_comprehensive_100_eval import load_cases as load_comprehensive_100_eval_cases
 from scripts.run_phd_turf_eval import load_cases as load_phd_turf_eval_cases
 from scripts.run_product_label_eval import load_cases as load_product_label_eval_cases
+from entity_matcher import EDGE, SUBSTRING, WORD, EntityMatcher, match_entities
+import knowledge_base
+import knowledge_editor
+import knowledge_snapshot
+from constants import STRUCTURED_KB_CONTEXT_TOKENS
+from knowledge_snapshot import KNOWLEDGE_DIR, load_snapshot
+from token_accounting import count_tokens
 from knowledge_base import (
     build_context_from_knowledge,
     extract_advanced_turf_science_names,
@@ -20,6 +31,7 @@ from knowledge_base import (
     extract_drainage_rootzone_program_names,
     extract_disease_ipm_playbook_names,
     extract_diagnostic_framework_names,
+    extract_disease_names,
     extract_fertility_program_names,
     extract_abiotic_stress_names,
     extract_irrigation_program_names,
@@ -27,6 +39,7 @@ from knowledge_base import (
     extract_nutrient_diagnostic_names,
     extract_overseeding_transition_program_names,
     extract_pest_names,
+    extract_product_names,
     extract_regional_pressure_calendar_names,
     extract_salinity_management_names,
     extract_seasonal_operating_plan_names,
@@ -728,5 +741,228 @@ class KnowledgeBaseExpansionTests(unittest.TestCase):
         )
 
 
+class KnowledgeSnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(prefix="greenside-kb-")
+        self.knowledge_dir = Path(self.temp_dir.name) / "knowledge"
+        shutil.copytree(KNOWLEDGE_DIR, self.knowledge_dir)
+        self.snapshot_path = str(Path(self.temp_dir.name) / "kb_snapshot.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_snapshot_indexes_products_by_name_target_and_mode_of_action(self):
+        snapshot = load_snapshot(self.snapshot_path, str(self.knowledge_dir))
+
+        self.assertEqual(snapshot.product_ref("Heritage"), ("fungicides", "azoxystrobin"))
+        self.assertIn(("fungicides", "azoxystrobin"), snapshot.product_refs_for_target("brown_patch"))
+        self.assertIn(("fungicides", "azoxystrobin"), snapshot.product_refs_for_mode_of_action("FRAC", 11))
+        self.assertIn(("herbicides", "prodiamine"), snapshot.product_refs_for_target("crabgrass"))
+        self.assertEqual(snapshot.indexes["alias_to_key"]["barricade"], "prodiamine")
+        self.assertEqual(snapshot.source("products"), load_products())
+
+    def test_snapshot_is_reused_until_a_source_changes(self):
+        first = load_snapshot(self.snapshot_path, str(self.knowledge_dir))
+        second = load_snapshot(self.snapshot_path, str(self.knowledge_dir))
+
+        self.assertEqual(first.origin, "compiled")
+        self.assertEqual(second.origin, "file")
+        self.assertEqual(first.snapshot_hash, second.snapshot_hash)
+
+        weeds_path = self.knowledge_dir / "weeds.json"
+        weeds = json.loads(weeds_path.read_text())
+        weeds["snapshot_test_weed"] = {"common_names": ["snapshot test weed"]}
+        weeds_path.write_text(json.dumps(weeds))
+        rebuilt = load_snapshot(self.snapshot_path, str(self.knowledge_dir))
+
+        self.assertEqual(rebuilt.origin, "compiled")
+        self.assertNotEqual(rebuilt.snapshot_hash, first.snapshot_hash)
+        self.assertIn("snapshot_test_weed", rebuilt.source("weeds"))
+
+
+class KnowledgeSnapshotReloadTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(prefix="greenside-kb-reload-")
+        root = Path(self.temp_dir.name)
+        self.knowledge_dir = root / "knowledge"
+        shutil.copytree(KNOWLEDGE_DIR, self.knowledge_dir, ignore=shutil.ignore_patterns(".compiled"))
+        self.patchers = [
+            patch.object(knowledge_snapshot, "KNOWLEDGE_DIR", str(self.knowledge_dir)),
+            patch.object(knowledge_snapshot, "SNAPSHOT_PATH", str(root / "compiled" / "kb_snapshot.json")),
+            patch.object(knowledge_snapshot, "GENERATION_PATH", str(root / "compiled" / "generation")),
+            patch.object(knowledge_snapshot, "_LISTENERS", list(knowledge_snapshot._LISTENERS)),
+            patch.object(knowledge_editor, "STORE_PATH", root / "knowledge_editor.json"),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        knowledge_snapshot.reset_knowledge_snapshot()
+
+    def tearDown(self):
+        for patcher in reversed(self.patchers):
+            patcher.stop()
+        knowledge_snapshot.reset_knowledge_snapshot()
+        self.temp_dir.cleanup()
+
+    def test_generation_bump_from_another_worker_swaps_snapshot_and_runs_listeners(self):
+        reloaded = []
+        knowledge_snapshot.register_snapshot_listener(reloaded.append)
+        before = knowledge_snapshot.refresh_knowledge_snapshot()
+        self.assertEqual(knowledge_snapshot.refresh_knowledge_snapshot(), before)
+
+        products_path = self.knowledge_dir / "products.json"
+        products = json.loads(products_path.read_text())
+        products["fungicides"]["azoxystrobin"]["trade_names"].append("Heritage Reload Test")
+        products_path.write_text(json.dumps(products))
+        knowledge_snapshot.bump_knowledge_generation()
+
+        after = knowledge_snapshot.refresh_knowledge_snapshot()
+        self.assertIsNot(after, before)
+        self.assertEqual(reloaded, [after])
+        self.assertEqual(after.generation, before.generation + 1)
+        self.assertNotEqual(after.snapshot_hash, before.snapshot_hash)
+        self.assertIn("Heritage Reload Test", load_products()["fungicides"]["azoxystrobin"]["trade_names"])
+        self.assertEqual(after.product_ref("heritage reload test"), ("fungicides", "azoxystrobin"))
+
+    def test_published_editor_overlay_is_served_without_changing_editor_base(self):
+        knowledge_editor.save_product_editor_record(
+            "reload_test_fungicide",
+            {
+                "category": "fungicides",
+                "trade_names": ["Reload Test 50WG"],
+                "rates": {"standard": "1 oz/1000 sq ft"},
+                "diseases": ["dollar_spot"],
+            },
+            publish=True,
+        )
+
+        snapshot = knowledge_snapshot.get_knowledge_snapshot()
+        self.assertTrue(snapshot.overlay_hash)
+        self.assertIn("reload_test_fungicide", load_products()["fungicides"])
+        self.assertEqual(load_products()["fungicides"]["reload_test_fungicide"]["rei"], "")
+        self.assertIn(("fungicides", "reload_test_fungicide"), snapshot.product_refs_for_target("dollar_spot"))
+        self.assertNotIn("reload_test_fungicide", snapshot.base_source("products")["fungicides"])
+        record = knowledge_editor.get_product_editor_record("reload_test_fungicide")
+        self.assertIsNone(record["base"])
+
+        self.assertIn("Reload Test 50WG", extract_product_names("is reload test 50wg safe on greens?"))
+        self.assertIn("[Knowledge Base - Reload Test 50WG]", build_context_from_knowledge("reload test 50wg rates?"))
+
+    def test_editor_save_succeeds_when_publishing_the_change_fails(self):
+        with patch.object(knowledge_snapshot, "bump_knowledge_generation", side_effect=OSError("lock unavailable")):
+            record = knowledge_editor.save_product_editor_record(
+                "reload_test_fungicide",
+                {
+                    "category": "fungicides",
+                    "trade_names": ["Reload Test 50WG"],
+                    "rates": {"standard": "1 oz/1000 sq ft"},
+                    "diseases": ["dollar_spot"],
+                },
+                publish=True,
+            )
+
+        self.assertEqual(record["key"], "reload_test_fungicide")
+        stored = json.loads(knowledge_editor.STORE_PATH.read_text())
+        self.assertIn("reload_test_fungicide", stored["products"])
+
+
+class EntityMatcherTests(unittest.TestCase):
+    def test_boundary_modes_and_spans(self):
+        matcher = EntityMatcher(
+            [
+                ("word", "mow", "mow", WORD),
+                ("edge", " ph ", "ph", EDGE),
+                ("edge", "n+", "n", EDGE),
+                ("substring", "mow", "mow", SUBSTRING),
+            ]
+        )
+
+        hits = matcher.find("mowing ph and n+k; we mow")
+        self.assertEqual([(hit.start, hit.end) for hit in hits.of_kind("word")], [(22, 25)])
+        self.assertEqual([(hit.start, hit.end) for hit in hits.of_kind("substring")], [(0, 3), (22, 25)])
+        self.assertTrue(hits.has("edge", "ph"))
+        self.assertTrue(hits.has("edge", "n+"))
+        self.assertFalse(matcher.find("phosphorus").has("edge", "ph"))
+        self.assertEqual(matcher.size, 3)
+
+    def test_overlapping_aliases_all_reported(self):
+        matcher = EntityMatcher(
+            [
+                ("target", "dollar spot", "dollar_spot", WORD),
+                ("target", "spot", "spot", WORD),
+                ("product", "heritage", "azoxystrobin", SUBSTRING),
+            ]
+        )
+
+        hits = matcher.find("heritage for dollar spot")
+        self.assertEqual(hits.values("target"), ["dollar_spot", "spot"])
+        self.assertEqual(hits.values("product"), ["azoxystrobin"])
+
+    def test_registered_values_follow_vocabulary_order_not_text_order(self):
+        matcher = EntityMatcher(
+            [
+                ("turf", "bentgrass", "creeping bentgrass", SUBSTRING),
+                ("turf", "zoysia", "zoysiagrass", SUBSTRING),
+                ("turf", "creeping bentgrass", "creeping bentgrass", SUBSTRING),
+            ]
+        )
+
+        hits = matcher.find("zoysia tees, creeping bentgrass greens")
+        self.assertEqual(hits.values("turf"), ["zoysiagrass", "creeping bentgrass"])
+        self.assertEqual(hits.registered_values("turf"), ["creeping bentgrass", "zoysiagrass"])
+
+    def test_extractors_return_hits_in_registration_order(self):
+        self.assertEqual(extract_product_names("What is Headway good for on turf?"), ["Headway", "Headway G"])
+        self.assertEqual(
+            extract_turfgrass_names("Zoysia fairways next to bentgrass greens"),
+            ["creeping bentgrass", "zoysiagrass"],
+        )
+
+    def test_shared_matcher_serves_every_extractor(self):
+        hits = match_entities("heritage for dollar spot on greens with poa annua")
+        self.assertIn("Heritage", hits.values("kb_topic:product"))
+        self.assertIn("verified_product", {hit.kind for hit in hits})
+        self.assertIn("router_term", {hit.kind for hit in hits})
+        self.assertEqual(extract_disease_names("dollar spot again"), ["dollar spot"])
+
+
+class StructuredContextFragmentTests(unittest.TestCase):
+    def test_fragments_are_rendered_once_per_generation_within_budget(self):
+        fragments = knowledge_base._structured_context_fragments()
+        self.assertIs(knowledge_base._structured_context_fragments(), fragments)
+        self.assertTrue(fragments[("diseases", "dollar_spot")].startswith("[Knowledge Base - dollar spot]: {"))
+        self.assertTrue(all(count_tokens(fragment) <= STRUCTURED_KB_CONTEXT_TOKENS for fragment in fragments.values()))
+
+        knowledge_snapshot.reset_knowledge_snapshot()
+        self.assertIsNot(knowledge_base._structured_context_fragments(), fragments)
+
+    def test_oversized_fragment_drops_trailing_fields(self):
+        summary = {"topic": "short", "detail": "x" * 500}
+        self.assertEqual(
+            knowledge_base._render_fragment("demo", summary, 15),
+            '[Knowledge Base - demo]: {"topic": "short"}',
+        )
+
+    def test_product_fragments_vary_by_question_intent(self):
+        rate_context = build_context_from_knowledge("What rate of Heritage should I use?")
+        label_context = build_context_from_knowledge("Is Heritage safe on bentgrass?")
+        self.assertIn('"rates"', rate_context)
+        self.assertNotIn('"rates"', label_context)
+
+        hits_before = knowledge_base._product_fragment.cache_info().hits
+        self.assertEqual(build_context_from_knowledge("What rate of Heritage is labeled?"), rate_context)
+        self.assertGreater(knowledge_base._product_fragment.cache_info().hits, hits_before)
+
+    def test_budget_keeps_whole_fragments_in_section_order(self):
+        question = "Heritage and Primo rates for dollar spot on bentgrass greens with heat stress and grubs"
+        parts = build_context_from_knowledge(question).split("\n\n")
+        packed = build_context_from_knowledge(question, max_tokens=STRUCTURED_KB_CONTEXT_TOKENS)
+
+        self.assertGreater(len(parts), 2)
+        self.assertLessEqual(count_tokens(packed), STRUCTURED_KB_CONTEXT_TOKENS)
+        packed_parts = packed.split("\n\n")
+        self.assertEqual(packed_parts[0], parts[0])
+        self.assertEqual([part for part in parts if part in packed_parts], packed_parts)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,264 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import knowledge_builder
+from knowledge_builder import EmbeddingStore, IndexTracker, run_ingestion_pipeline
+
+
+def label_text(seed=0, sentences=60):
+    return " ".join(
+        f"Dollar spot pressure rises when nights stay humid and leaf wetness lasts past sunrise {seed * 1000 + i}."
+        for i in range(sentences)
+    )
+
+
+LONG_TEXT = label_text()
+BOILERPLATE = " ".join(
+    "PRECAUTIONARY STATEMENTS Hazards to Humans and Domestic Animals. Causes moderate eye irritation. "
+    "Avoid contact with eyes or clothing. Wash thoroughly with soap and water after handling and before eating, "
+    "drinking, chewing gum, using tobacco or using the toilet."
+    for _ in range(3)
+)
+
+
+class FakeEmbeddings:
+    def __init__(self, failures=0):
+        self.calls = []
+        self.failures = failures
+
+    def create(self, input, model):
+        self.calls.append(list(input))
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("rate limited")
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[0.1, 0.2]) for _ in input])
+
+
+class FakeIndex:
+    def __init__(self):
+        self.vectors = {}
+        self.deleted = []
+        self.upserts = 0
+
+    def upsert(self, vectors):
+        for vector in vectors:
+            self.upserts += 1
+            self.vectors[vector["id"]] = vector
+
+    def update(self, id, set_metadata):
+        self.vectors[id]["metadata"].update(set_metadata)
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+        for vector_id in ids:
+            self.vectors.pop(vector_id, None)
+
+
+class KnowledgeBuilderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tracker = IndexTracker(os.path.join(self.tmp.name, "indexed_files.db"), legacy_file=None)
+
+    def tearDown(self):
+        self.tracker.close()
+        self.tmp.cleanup()
+
+    def write_pdf(self, name, content=b"%PDF-1.4 test"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+
+class IndexTrackerTests(KnowledgeBuilderTestCase):
+    def test_unchanged_stat_skips_hashing(self):
+        path = self.write_pdf("label.pdf")
+        self.tracker.mark_indexed(path, 3, ["a-0", "a-1", "a-2"])
+
+        with patch.object(IndexTracker, "get_file_hash", side_effect=AssertionError("hashed")):
+            self.assertTrue(self.tracker.is_indexed(path))
+
+    def test_size_change_is_detected_without_hashing(self):
+        path = self.write_pdf("label.pdf")
+        self.tracker.mark_indexed(path, 1, ["a-0"])
+        self.write_pdf("label.pdf", b"%PDF-1.4 a longer revision")
+
+        with patch.object(IndexTracker, "get_file_hash", side_effect=AssertionError("hashed")):
+            self.assertFalse(self.tracker.is_indexed(path))
+
+    def test_touched_file_with_same_content_is_still_indexed(self):
+        path = self.write_pdf("label.pdf")
+        self.tracker.mark_indexed(path, 1, ["a-0"])
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+        self.assertTrue(self.tracker.is_indexed(path))
+        with patch.object(IndexTracker, "get_file_hash", side_effect=AssertionError("hashed")):
+            self.assertTrue(self.tracker.is_indexed(path))
+
+    def test_legacy_json_tracker_is_imported_once(self):
+        path = self.write_pdf("label.pdf")
+        legacy = os.path.join(self.tmp.name, "indexed_files.json")
+        with open(legacy, "w") as f:
+            json.dump({
+                "files": {path: {"hash": knowledge_builder.get_file_hash(path), "chunks": 2, "vector_ids": ["a-0", "a-1"]}},
+                "last_run": "2026-01-01T00:00:00",
+                "stats": {},
+            }, f)
+
+        tracker = IndexTracker(os.path.join(self.tmp.name, "migrated.db"), legacy_file=legacy)
+        try:
+            self.assertTrue(tracker.is_indexed(path))
+            self.assertEqual(tracker.get_vector_ids(path), ["a-0", "a-1"])
+            self.assertEqual(tracker.get_stats(), {"total_files": 1, "total_chunks": 2, "stored_vectors": 0, "last_run": "2026-01-01T00:00:00"})
+        finally:
+            tracker.close()
+
+
+class IngestionPipelineTests(KnowledgeBuilderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = EmbeddingStore(os.path.join(self.tmp.name, "indexed_files.db"))
+
+    def tearDown(self):
+        self.store.close()
+        super().tearDown()
+
+    def run_pipeline(self, to_process, client, index, **kwargs):
+        with patch("knowledge_builder.extract_text_from_pdf", side_effect=lambda path: (self.texts[path], 2)), \
+                patch("knowledge_builder.RETRY_BASE_DELAY", 0):
+            return run_ingestion_pipeline(
+                to_process, client, index, self.tracker, extract_workers=1, embedding_store=self.store, **kwargs
+            )
+
+    def test_documents_share_embedding_batches_and_are_tracked(self):
+        paths = [self.write_pdf(f"label-{i}.pdf") for i in range(3)]
+        self.texts = {path: label_text(i) for i, path in enumerate(paths)}
+        embeddings = FakeEmbeddings()
+        client = SimpleNamespace(embeddings=embeddings)
+        index = FakeIndex()
+
+        result = self.run_pipeline([(path, "pesticide_label") for path in paths], client, index)
+
+        chunks_per_doc = len(knowledge_builder.smart_chunk(knowledge_builder.clean_text(LONG_TEXT)))
+        self.assertEqual(len(embeddings.calls), 1)
+        self.assertEqual(result["files_processed"], 3)
+        self.assertEqual(result["chunks_uploaded"], 3 * chunks_per_doc)
+        self.assertEqual(len(index.vectors), 3 * chunks_per_doc)
+        self.assertIn("docs_per_minute", result)
+        self.assertTrue(all(self.tracker.is_indexed(path) for path in paths))
+
+    def test_embedding_failures_are_retried(self):
+        path = self.write_pdf("label.pdf")
+        self.texts = {path: LONG_TEXT}
+        client = SimpleNamespace(embeddings=FakeEmbeddings(failures=2))
+
+        result = self.run_pipeline([(path, "pesticide_label")], client, FakeIndex())
+
+        self.assertEqual(result["files_processed"], 1)
+        self.assertEqual(len(client.embeddings.calls), 3)
+
+    def test_exhausted_retries_leave_document_unindexed(self):
+        path = self.write_pdf("label.pdf")
+        self.texts = {path: LONG_TEXT}
+        client = SimpleNamespace(embeddings=FakeEmbeddings(failures=knowledge_builder.MAX_RETRIES))
+
+        result = self.run_pipeline([(path, "pesticide_label")], client, FakeIndex())
+
+        self.assertEqual(result["failed"], [path])
+        self.assertFalse(self.tracker.is_indexed(path))
+
+    def test_shorter_revision_deletes_stale_vectors(self):
+        path = self.write_pdf("label.pdf")
+        self.texts = {path: LONG_TEXT}
+        client = SimpleNamespace(embeddings=FakeEmbeddings())
+        index = FakeIndex()
+        self.run_pipeline([(path, "pesticide_label")], client, index)
+        old_ids = self.tracker.get_vector_ids(path)
+
+        self.write_pdf("label.pdf", b"%PDF-1.4 revised label")
+        self.texts = {path: LONG_TEXT[: len(LONG_TEXT) // 2]}
+        result = self.run_pipeline([(path, "pesticide_label")], client, index)
+
+        new_ids = self.tracker.get_vector_ids(path)
+        self.assertLess(len(new_ids), len(old_ids))
+        self.assertEqual(sorted(index.deleted), sorted(set(old_ids) - set(new_ids)))
+        self.assertEqual(result["stale_vectors_deleted"], len(set(old_ids) - set(new_ids)))
+        self.assertEqual(sorted(index.vectors), sorted(new_ids))
+
+    def test_revision_embeds_only_changed_chunks(self):
+        path = self.write_pdf("label.pdf")
+        self.texts = {path: LONG_TEXT}
+        embeddings = FakeEmbeddings()
+        client = SimpleNamespace(embeddings=embeddings)
+        index = FakeIndex()
+        self.run_pipeline([(path, "pesticide_label")], client, index)
+        first_run = sum(len(call) for call in embeddings.calls)
+
+        self.write_pdf("label.pdf", b"%PDF-1.4 revised label")
+        self.texts = {path: LONG_TEXT + " Do not apply more than 4 times per season."}
+        result = self.run_pipeline([(path, "pesticide_label")], client, index)
+
+        self.assertGreater(result["chunks_reused"], 0)
+        self.assertEqual(result["vectors_upserted"], sum(len(call) for call in embeddings.calls) - first_run)
+        self.assertLess(result["vectors_upserted"], first_run)
+        self.assertEqual(sorted(index.vectors), sorted(self.tracker.get_vector_ids(path)))
+
+    def test_shared_boilerplate_is_stored_once_with_all_sources(self):
+        paths = [self.write_pdf(f"label-{i}.pdf") for i in range(3)]
+        self.texts = {path: BOILERPLATE for path in paths}
+        index = FakeIndex()
+
+        result = self.run_pipeline([(path, "pesticide_label") for path in paths], SimpleNamespace(embeddings=FakeEmbeddings()), index)
+
+        self.assertEqual(result["files_processed"], 3)
+        self.assertEqual(len(index.vectors), len(self.tracker.get_vector_ids(paths[0])))
+        for vector in index.vectors.values():
+            self.assertEqual(vector["metadata"]["sources"], [os.path.basename(path) for path in paths])
+
+        self.tracker.forget(paths[0])
+        self.texts[paths[1]] = label_text(1)
+        self.run_pipeline([(paths[1], "pesticide_label")], SimpleNamespace(embeddings=FakeEmbeddings()), index)
+        boilerplate_ids = self.tracker.get_vector_ids(paths[2])
+        self.assertTrue(all(vector_id in index.vectors for vector_id in boilerplate_ids))
+        self.assertEqual(index.vectors[boilerplate_ids[0]]["metadata"]["sources"], ["label-2.pdf"])
+
+    def test_near_duplicate_chunks_collapse_unless_numbers_differ(self):
+        original, reworded, new_rate = (self.write_pdf(name) for name in ("a.pdf", "b.pdf", "c.pdf"))
+        self.texts = {
+            original: LONG_TEXT,
+            reworded: LONG_TEXT.replace("nights stay humid", "nights remain humid", 1),
+            new_rate: LONG_TEXT.replace("sunrise 3.", "sunrise 33.", 1),
+        }
+        index = FakeIndex()
+
+        result = self.run_pipeline(
+            [(path, "pesticide_label") for path in (original, reworded, new_rate)],
+            SimpleNamespace(embeddings=FakeEmbeddings()), index,
+        )
+
+        self.assertEqual(result["near_duplicates_collapsed"], 1)
+        self.assertEqual(self.tracker.get_vector_ids(reworded), self.tracker.get_vector_ids(original))
+        self.assertNotEqual(self.tracker.get_vector_ids(new_rate)[0], self.tracker.get_vector_ids(original)[0])
+
+    def test_refresh_reupserts_from_the_embedding_store(self):
+        path = self.write_pdf("label.pdf")
+        self.texts = {path: LONG_TEXT}
+        index = FakeIndex()
+        self.run_pipeline([(path, "pesticide_label")], SimpleNamespace(embeddings=FakeEmbeddings()), index)
+        upserts = index.upserts
+
+        embeddings = FakeEmbeddings()
+        result = self.run_pipeline([(path, "pesticide_label")], SimpleNamespace(embeddings=embeddings), index, refresh=True)
+
+        self.assertEqual(embeddings.calls, [])
+        self.assertEqual(result["embeddings_reused"], upserts)
+        self.assertEqual(index.upserts, 2 * upserts)
+
+
+if __name__ == "__main__":
+    unittest.main()
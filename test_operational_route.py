@@ -3,11 +3,16 @@ import uuid
 import tempfile
 import os
 import sqlite3
+import sys
+import time
+import types
+from pathlib import Path
 from unittest.mock import Mock, patch
 
 import app as app_module
 from app import RATE_LIMIT_BUCKETS, app, Config
 from auth_store import create_account, mark_email_verified
+import eval_engine
 import feedback_system
 from feedback_system import create_kb_regression_test, get_kb_regression_tests, save_expert_router_event, save_kb_gap
 
@@ -1221,22 +1226,43 @@ class OperationalRouteTests(unittest.TestCase):
             self.assertIn("risky_records", payload)
 
     def test_eval_dashboard_is_available(self):
-        with self.client as client:
-            response = client.get("/admin/eval-dashboard")
+        cases = [{"id": "dollar_spot", "question": "dollar spot rates"}, {"id": "mowing", "question": "mowing height"}]
+        module = types.ModuleType("route_eval_suite")
+        module.run_eval = lambda batch: {"results": [{**case, "passed": case["id"] != "mowing"} for case in batch]}
+        suites = [eval_engine.EvalSuite("route", "Route", "route_eval_suite", Path("route.json"))]
+        with tempfile.TemporaryDirectory() as temp_dir, \
+             patch.dict(sys.modules, {"route_eval_suite": module}), \
+             patch.object(Config, "DATA_DIR", temp_dir), \
+             patch.object(Config, "EVAL_WORKERS", 0), \
+             patch.object(eval_engine, "_job", None), \
+             patch.object(eval_engine, "EVAL_SUITES", suites), \
+             patch.object(eval_engine, "load_suite_cases", lambda suite: cases), \
+             patch.object(app_module, "EVAL_SUITES", suites), \
+             patch.object(app_module, "EVAL_CACHE_PATH", Path(temp_dir) / "eval_dashboard_cache.json"), \
+             self.client as client:
+            idle_response = client.get("/admin/eval-dashboard")
+            self.assertEqual(idle_response.status_code, 200)
+            self.assertIsNone(idle_response.get_json()["job"])
+            self.assertTrue(idle_response.get_json()["suites"][0]["pending"])
+
+            response = self.post(client, "/admin/eval-dashboard/refresh")
             self.assertEqual(response.status_code, 200)
             payload = response.get_json()
             self.assertIn("summary", payload)
-            self.assertIn("suites", payload)
             self.assertIn("history", payload)
-            self.assertGreaterEqual(payload["summary"].get("suite_count", 0), 5)
-            suite_keys = {item.get("key") for item in payload.get("suites", [])}
-            self.assertTrue({"general_turf", "ambiguity", "comprehensive_100", "product_label", "image"}.issubset(suite_keys))
-            self.assertTrue(payload["history"])
-
-            cached_response = client.get("/admin/eval-dashboard")
-            self.assertEqual(cached_response.status_code, 200)
-            cached_payload = cached_response.get_json()
+            self.assertIn(payload["job"]["status"], {"queued", "running", "done"})
+
+            deadline = time.time() + 30
+            cached_payload = client.get("/admin/eval-dashboard").get_json()
+            while cached_payload["job"]["status"] in {"queued", "running"} and time.time() < deadline:
+                time.sleep(0.05)
+                cached_payload = client.get("/admin/eval-dashboard").get_json()
+            self.assertEqual(cached_payload["job"]["status"], "done")
+            self.assertEqual((cached_payload["job"]["completed"], cached_payload["job"]["total"]), (2, 2))
             self.assertTrue(cached_payload["summary"].get("cached"))
+            self.assertEqual(cached_payload["summary"]["passed"], 1)
+            self.assertEqual([item["key"] for item in cached_payload["suites"]], ["route"])
+            self.assertTrue(cached_payload["history"])
 
     def test_public_admin_allows_get_and_post_without_login(self):
         with patch.object(Config, "ALLOW_PUBLIC_ADMIN", True), patch("app.Config.ALLOW_PUBLIC_ADMIN", True):
@@ -1292,6 +1318,38 @@ class OperationalRouteTests(unittest.TestCase):
             self.assertIn('href="/admin"', html)
             self.current_account_patcher.start()
 
+    def test_admin_perf_reports_prompt_completion_and_cached_tokens(self):
+        from types import SimpleNamespace
+
+        from prompts import SHARED_PROMPT_PREFIX, SYSTEM_PROMPT_VARIANTS, build_system_prompt, prompt_variant_name
+        from token_accounting import get_llm_usage_ledger, record_llm_usage
+
+        self.assertTrue(all(text.startswith(SHARED_PROMPT_PREFIX) for text in SYSTEM_PROMPT_VARIANTS.values()))
+        self.assertIs(build_system_prompt("chemical", "fungicide"), build_system_prompt("chemical", "fungicide"))
+        self.assertEqual(build_system_prompt("unknown-topic", None), build_system_prompt(None, None))
+
+        ledger = get_llm_usage_ledger()
+        ledger.clear()
+        self.addCleanup(ledger.clear)
+        response = SimpleNamespace(usage=SimpleNamespace(
+            prompt_tokens=6000,
+            completion_tokens=400,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=4096),
+        ))
+        record_llm_usage(response, route="ask", prompt_variant=prompt_variant_name("chemical", "fungicide"))
+        record_llm_usage(SimpleNamespace(usage=None), route="ask", prompt_variant="general/none")
+
+        with self.client as client:
+            payload = client.get("/admin/perf").get_json()
+
+        self.assertEqual(payload["llm_usage"]["requests"], 2)
+        self.assertEqual(payload["llm_usage"]["prompt_tokens"], 6000)
+        self.assertEqual(payload["llm_usage"]["cached_tokens"], 4096)
+        self.assertEqual(payload["llm_usage"]["recent_by_prompt_variant"]["chemical/fungicide"]["completion_tokens"], 400)
+        self.assertEqual(payload["recent_requests"][0]["prompt_variant"], "general/none")
+        self.assertIn("chemical/fungicide", payload["system_prompts"]["variants"])
+        self.assertTrue(payload["system_prompts"]["shared_prefix_cacheable"])
+
     def test_admin_dashboard_includes_question_lab_and_kb_product_filter(self):
         with self.client as client:
             response = client.get("/admin")
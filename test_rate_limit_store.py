@@ -0,0 +1,86 @@
+import io
+import unittest
+from unittest.mock import Mock, patch
+
+import rate_limit_store
+from rate_limit_store import PersistentRateLimiter
+
+
+class PersistentRateLimiterTests(unittest.TestCase):
+    def setUp(self):
+        self.limiter = PersistentRateLimiter()
+        self.limiter.clear()
+
+    def tearDown(self):
+        self.limiter.clear()
+
+    def test_allows_burst_up_to_limit_then_blocks(self):
+        with patch("rate_limit_store.time.time", return_value=1_000_000.0):
+            results = [
+                self.limiter.consume("login", "ip-1", limit=5, window_seconds=60)
+                for _ in range(6)
+            ]
+
+        self.assertEqual([limited for limited, _ in results], [False] * 5 + [True])
+        self.assertEqual(results[-1][1], 12)
+
+    def test_blocked_identity_recovers_after_emission_interval(self):
+        with patch("rate_limit_store.time.time", return_value=1_000_000.0):
+            for _ in range(3):
+                self.limiter.consume("ask", "acct-1", limit=3, window_seconds=30)
+            self.assertTrue(self.limiter.consume("ask", "acct-1", limit=3, window_seconds=30)[0])
+        with patch("rate_limit_store.time.time", return_value=1_000_010.5):
+            self.assertFalse(self.limiter.consume("ask", "acct-1", limit=3, window_seconds=30)[0])
+            self.assertTrue(self.limiter.consume("ask", "acct-1", limit=3, window_seconds=30)[0])
+
+    def test_keeps_one_row_per_identity(self):
+        with patch("rate_limit_store.time.time", return_value=1_000_000.0):
+            for _ in range(10):
+                self.limiter.consume("ask", "acct-2", limit=60, window_seconds=60)
+        rows = self.limiter._connection().execute(
+            "SELECT COUNT(*) FROM rate_limit_state WHERE scope = ? AND identity_key = ?",
+            ("ask", "acct-2"),
+        ).fetchone()
+        self.assertEqual(rows[0], 1)
+
+    def test_memory_store_matches_persistent_semantics(self):
+        with patch.object(rate_limit_store.Config, "RATE_LIMIT_STORE", "memory"), \
+             patch("rate_limit_store.time.time", return_value=1_000_000.0):
+            results = [
+                self.limiter.consume("login", "ip-2", limit=2, window_seconds=60)[0]
+                for _ in range(3)
+            ]
+        self.assertEqual(results, [False, False, True])
+
+    def test_create_tables_script_rejects_the_old_rate_limit_key_schema(self):
+        from scripts import create_dynamodb_tables
+
+        class FakeTable:
+            def __init__(self, definition):
+                self.name = definition["TableName"]
+                self.key_schema = definition["KeySchema"]
+                self.global_secondary_indexes = definition.get("GlobalSecondaryIndexes")
+                self.billing_mode_summary = {"BillingMode": "PAY_PER_REQUEST"}
+
+        tables = {item["TableName"]: FakeTable(item) for item in create_dynamodb_tables.TABLE_DEFINITIONS}
+        tables[rate_limit_store.Config.DYNAMODB_RATE_LIMIT_TABLE].key_schema = [
+            {"AttributeName": "bucket_key", "KeyType": "HASH"},
+            {"AttributeName": "created_at", "KeyType": "RANGE"},
+        ]
+        resource = Mock()
+        resource.tables.all.return_value = list(tables.values())
+        resource.Table.side_effect = tables.__getitem__
+
+        with patch.object(create_dynamodb_tables, "get_dynamodb_resource", return_value=resource), \
+             patch("sys.stdout", new_callable=io.StringIO), \
+             patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            status = create_dynamodb_tables.main()
+
+        self.assertEqual(status, 1)
+        self.assertIn(rate_limit_store.Config.DYNAMODB_RATE_LIMIT_TABLE, stderr.getvalue())
+        self.assertIn("bucket_key HASH, created_at RANGE", stderr.getvalue())
+        resource.create_table.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,20 @@
+import os
+import tempfile
+import threading
+import time
 import unittest
 from unittest.mock import patch
 
 from knowledge_base import build_context_from_knowledge
-from scoring_service import assemble_context_sections, build_context, select_evidence_results
+import reranker
+import scoring_service
+from cache import RerankScoreCache
+from reranker import RerankBatcher
+from scoring_service import assemble_context_sections, build_context, score_results, select_evidence_results
 from search_service import search_all_parallel
+import token_accounting
+from constants import RETRIEVAL_CONTEXT_TOKENS
+from token_accounting import count_chunk_tokens, count_tokens, truncate_to_tokens
 
 
 class RetrievalImprovementTests(unittest.TestCase):
@@ -54,9 +65,9 @@ class RetrievalImprovementTests(unittest.TestCase):
         ]
 
         with patch("search_service.find_source_url", return_value="/static/product-labels/test.pdf"):
-            context, sources, images = build_context(filtered_results, ["static/product-labels"], max_chars=420)
+            context, sources, images = build_context(filtered_results, ["static/product-labels"], max_tokens=105)
 
-        self.assertLessEqual(len(context), 420)
+        self.assertLessEqual(count_tokens(context), 105)
         self.assertIn("[Source 1: First Source]", context)
         self.assertTrue(sources)
         self.assertEqual(images, [])
@@ -70,21 +81,78 @@ class RetrievalImprovementTests(unittest.TestCase):
         ]
 
         with patch("search_service.find_source_url", return_value="/static/product-labels/test.pdf"):
-            context, sources, _ = build_context(filtered_results, ["static/product-labels"], max_results=3, max_chars=1200)
+            context, sources, _ = build_context(filtered_results, ["static/product-labels"], max_results=3, max_tokens=300)
 
         self.assertEqual([source["name"] for source in sources], ["Doc A", "Doc A", "Doc B"])
         self.assertIn("[Source 3: Doc B]", context)
 
+    def test_build_context_packs_best_scoring_chunks_within_token_budget(self):
+        long_text = "Broad overview of summer decline on greens. " * 20
+        short_rate = "Label rate 3.5 fl oz per 1000 sq ft, REI 12 hours."
+        short_timing = "Apply preventively when night temps stay above 68F."
+        filtered_results = [
+            {"text": long_text, "source": "Overview", "score": 1.0, "match_id": "doc-1", "metadata": {"type": "article"}},
+            {"text": short_rate, "source": "Label", "score": 0.8, "match_id": "doc-2", "metadata": {"type": "label"}},
+            {"text": short_timing, "source": "Guide", "score": 0.7, "match_id": "doc-3", "metadata": {"type": "article"}},
+        ]
+        budget = count_tokens(f"[Source 1: Label]\n{short_rate}") + count_tokens(f"[Source 2: Guide]\n{short_timing}") + 6
+
+        with patch("search_service.find_source_url", return_value=None):
+            context, sources, _ = build_context(filtered_results, [], max_tokens=budget)
+
+        self.assertEqual([source["name"] for source in sources], ["Label", "Guide"])
+        self.assertIn("[Source 1: Label]", context)
+        self.assertNotIn("Broad overview", context)
+        self.assertLessEqual(count_tokens(context), budget)
+
+    def test_build_context_cites_every_candidate_at_the_retrieval_budget(self):
+        filtered_results = [
+            {
+                "text": f"Source {index} guidance on dollar spot fungicide rotation and nitrogen timing. " * 40,
+                "source": f"Doc {index}",
+                "score": 1.0 - index / 10,
+                "match_id": f"doc-{index}",
+                "metadata": {"type": "article"},
+            }
+            for index in range(6)
+        ]
+
+        with patch("search_service.find_source_url", return_value=None):
+            context, sources, _ = build_context(filtered_results, [], max_results=6, max_tokens=RETRIEVAL_CONTEXT_TOKENS)
+
+        self.assertEqual(len(sources), 6)
+        self.assertLessEqual(count_tokens(context), RETRIEVAL_CONTEXT_TOKENS)
+
+    def test_only_chunk_counts_are_memoized(self):
+        prompt = "Assembled prompt that only this request will send. " * 20
+        chunk = "Retrieved chunk that recurs across requests. " * 5
+        before = token_accounting._count_chunk_tokens.cache_info().currsize
+
+        count_tokens(prompt)
+        self.assertEqual(token_accounting._count_chunk_tokens.cache_info().currsize, before)
+        self.assertEqual(count_chunk_tokens(chunk), count_tokens(chunk))
+        hits = token_accounting._count_chunk_tokens.cache_info().hits
+        count_chunk_tokens(chunk)
+        self.assertEqual(token_accounting._count_chunk_tokens.cache_info().hits, hits + 1)
+
+    def test_truncate_to_tokens_clips_within_budget(self):
+        text = "Rate table: 0.2 0.4 0.6 0.8 1.0 1.2 fl oz per 1000 sq ft. " * 30
+        clipped = truncate_to_tokens(text, 40)
+
+        self.assertTrue(clipped.endswith("..."))
+        self.assertLessEqual(count_tokens(clipped), 40)
+        self.assertEqual(truncate_to_tokens("short", 40), "short")
+
     def test_assemble_context_sections_applies_section_caps_in_order(self):
         combined = assemble_context_sections(
             [
-                {"title": "ONE", "content": "A" * 200, "max_chars": 80},
-                {"title": "TWO", "content": "B" * 200, "max_chars": 80},
+                {"title": "ONE", "content": "alpha " * 200, "max_tokens": 20},
+                {"title": "TWO", "content": "beta " * 200, "max_tokens": 20},
             ],
-            max_chars=140,
+            max_tokens=35,
         )
 
-        self.assertLessEqual(len(combined), 140)
+        self.assertLessEqual(count_tokens(combined), 35)
         self.assertIn("--- ONE ---", combined)
         self.assertIn("--- TWO ---", combined)
 
@@ -125,5 +193,180 @@ class RetrievalImprovementTests(unittest.TestCase):
         self.assertEqual(selected[0]["source"], "Daconil Label")
 
 
+class ScoreResultsTests(unittest.TestCase):
+    QUESTION = "What heritage rate controls dollar spot on bentgrass in kentucky?"
+
+    def matches(self):
+        return [
+            {
+                "id": "canada-sheet",
+                "rrf_score": 0.05,
+                "metadata": {
+                    "source": "Kentucky Heritage Solution Sheet",
+                    "type": "solution_sheet",
+                    "country": "Canada",
+                    "text": "Bermudagrass notes: Tenacity and Heritage on bentgrass greens.",
+                },
+            },
+            {
+                "id": "label",
+                "rrf_score": 0.05,
+                "metadata": {
+                    "source": "Kentucky Heritage Label",
+                    "type": "pesticide_label",
+                    "text": "Heritage controls dollar spot on bentgrass greens.",
+                },
+            },
+            {"id": "no-metadata", "score": 0.9},
+        ]
+
+    def score(self, matches=None):
+        return score_results(
+            matches or self.matches(), self.QUESTION, "bentgrass", None, "fungicide", use_hybrid=False
+        )
+
+    def test_every_boost_and_penalty_multiplies_the_base_score(self):
+        results = self.score()
+
+        self.assertEqual([result["match_id"] for result in results], ["label", "canada-sheet"])
+        # rrf base 0.5 x heritage source 2 x high-value source 50 x label 3
+        # x "heritage" in source name 2 x grass 1.3 x state 2
+        self.assertAlmostEqual(results[0]["score"], 0.5 * 2 * 50 * 3 * 2 * 1.3 * 2)
+        # same boosts minus the label, then solution sheet 0.4, wrong grass 0.5,
+        # Canada 0.1 and a herbicide named in a fungicide search 0.05
+        self.assertAlmostEqual(results[1]["score"], 0.5 * 2 * 50 * 2 * 1.3 * 2 * 0.4 * 0.5 * 0.1 * 0.05)
+
+    def test_chunk_features_are_extracted_once_per_chunk(self):
+        scoring_service.chunk_features.cache_clear()
+        matches = self.matches()
+        self.score(matches)
+        self.score(matches)
+
+        info = scoring_service.chunk_features.cache_info()
+        self.assertEqual((info.misses, info.hits), (2, 2))
+
+    def test_pure_python_weights_match_the_vectorized_path(self):
+        expected = [result["score"] for result in self.score()]
+
+        with patch.object(scoring_service, "np", None):
+            scores = [result["score"] for result in self.score()]
+
+        for score, reference in zip(scores, expected):
+            self.assertAlmostEqual(score, reference)
+
+
+class SlowPairScorer:
+    """Scores a pair as the length of its passage, taking a moment per call."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append(len(pairs))
+        time.sleep(0.02)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return [float(len(passage)) for _, passage in pairs]
+
+
+class RerankBatcherTests(unittest.TestCase):
+    def test_concurrent_requests_share_batches_and_get_their_own_scores(self):
+        encoder = SlowPairScorer()
+        batcher = RerankBatcher(encoder, window_ms=5, max_pairs=64)
+        results = {}
+
+        def rerank(request_id):
+            pairs = [["q", "x" * (request_id * 10 + i)] for i in range(4)]
+            results[request_id] = batcher.score(pairs)
+
+        threads = [threading.Thread(target=rerank, args=(request_id,)) for request_id in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for request_id in range(8):
+            self.assertEqual(results[request_id], [float(request_id * 10 + i) for i in range(4)])
+        self.assertEqual(sum(encoder.calls), 32)
+        self.assertLess(len(encoder.calls), 8)
+        self.assertEqual(batcher.stats()["requests"], 8)
+
+    def test_lone_request_is_not_held_for_the_window(self):
+        batcher = RerankBatcher(SlowPairScorer(), window_ms=500, max_pairs=64)
+
+        started = time.perf_counter()
+        self.assertEqual(batcher.score([["q", "abc"]]), [3.0])
+        self.assertLess(time.perf_counter() - started, 0.4)
+
+    def test_model_errors_reach_every_waiting_request(self):
+        batcher = RerankBatcher(SlowPairScorer(fail=True), window_ms=5, max_pairs=64)
+
+        with self.assertRaises(RuntimeError):
+            batcher.score([["q", "abc"]])
+        with self.assertRaises(RuntimeError):
+            batcher.score([["q", "abcd"]])
+
+
+class RerankScoreCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "rerank.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_passages_sharing_a_prefix_get_separate_entries(self):
+        cache = RerankScoreCache("model-a", db_path=self.db_path)
+        query_hash = cache.query_hash("Dollar spot on greens?")
+        boilerplate = "PRECAUTIONARY STATEMENTS " * 20
+        first, second = cache.key(query_hash, boilerplate + "rate A"), cache.key(query_hash, boilerplate + "rate B")
+
+        cache.set_many({first: 0.9})
+
+        self.assertEqual(cache.get_many([first, second]), {first: 0.9})
+        self.assertEqual(cache.query_hash("  dollar SPOT on greens "), query_hash)
+
+    def test_disk_tier_is_shared_and_cleared_for_a_new_model(self):
+        writer = RerankScoreCache("model-a", db_path=self.db_path)
+        key = writer.key(writer.query_hash("brown patch"), "passage")
+        writer.set_many({key: 0.42})
+
+        reader = RerankScoreCache("model-a", db_path=self.db_path)
+        self.assertEqual(reader.get_many([key]), {key: 0.42})
+        self.assertEqual(reader.stats()["disk_hits"], 1)
+
+        RerankScoreCache("model-b", db_path=self.db_path)
+        self.assertEqual(RerankScoreCache("model-a", db_path=self.db_path).get_many([key]), {})
+
+    def test_tiers_are_bounded_by_least_recent_use(self):
+        cache = RerankScoreCache("model-a", db_path=self.db_path, memory_entries=2, disk_entries=3)
+        cache.PRUNE_EVERY_WRITES = 1
+        for i in range(5):
+            cache.set_many({f"k{i}": float(i)})
+
+        self.assertEqual(cache.stats()["size"], 2)
+        self.assertEqual(cache.stats()["disk_size"], 3)
+        self.assertEqual(cache.get_many(["k0", "k4"]), {"k4": 4.0})
+
+    def test_rerank_scores_each_pair_once(self):
+        encoder = SlowPairScorer()
+        cache = RerankScoreCache("model-a", db_path=self.db_path)
+        results = [
+            {"id": f"doc-{i}", "score": 0.5, "metadata": {"source": "Label", "text": "x" * (i + 1)}}
+            for i in range(3)
+        ]
+
+        with patch("reranker.get_cross_encoder", return_value=encoder), \
+                patch("reranker.get_rerank_score_cache", return_value=cache), \
+                patch("reranker.Config.RERANK_BATCH_WINDOW_MS", 0):
+            first = reranker.rerank_with_cross_encoder("Dollar spot?", results, top_k=3)
+            second = reranker.rerank_with_cross_encoder("dollar spot", results, top_k=3)
+
+        self.assertEqual(encoder.calls, [3])
+        self.assertEqual([r["id"] for r in first], ["doc-2", "doc-1", "doc-0"])
+        self.assertEqual([r["cross_encoder_score"] for r in second], [r["cross_encoder_score"] for r in first])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from collections import Counter
+
+from scripts.run_traffic_replay import (
+    anonymize_question,
+    poisson_offsets,
+    recorded_gaps,
+    recorded_offsets,
+    stratified_sample,
+)
+
+
+def _event(index, mode, verdict, created_at=None):
+    return {
+        "question": f"question {index}",
+        "selected_mode": mode,
+        "kb_verdict": verdict,
+        "used_deterministic": mode != "general",
+        "created_at": created_at,
+    }
+
+
+class TrafficReplayTests(unittest.TestCase):
+    def test_anonymize_strips_contact_details_but_keeps_agronomy(self):
+        question = (
+            "My name is Dave Smith at Pine Valley Golf Club, call 502-555-0142 or dave@pv.com "
+            "(see https://example.com/x). Account 12345678. Applied 0.5 oz/1000 sq ft on 2026-05-01 in 40222."
+        )
+        anonymized = anonymize_question(question)
+
+        for secret in ("Dave", "Smith", "Pine Valley", "502-555-0142", "dave@pv.com", "example.com", "12345678"):
+            self.assertNotIn(secret, anonymized)
+        for kept in ("0.5 oz/1000 sq ft", "2026-05-01", "40222"):
+            self.assertIn(kept, anonymized)
+        self.assertIn("My name is [name]", anonymized)
+        self.assertIn("[club]", anonymized)
+
+    def test_stratified_sample_is_proportional_and_keeps_rare_strata(self):
+        events = (
+            [_event(i, "general", "none") for i in range(70)]
+            + [_event(i, "verified_product", "supported") for i in range(28)]
+            + [_event(i, "advanced_diagnosis", "partial") for i in range(2)]
+        )
+        sample = stratified_sample(events, 20, seed=3)
+
+        counts = Counter(event["selected_mode"] for event in sample)
+        self.assertEqual(len(sample), 20)
+        self.assertEqual(counts, {"general": 14, "verified_product": 5, "advanced_diagnosis": 1})
+        self.assertEqual(sample, stratified_sample(events, 20, seed=3))
+
+    def test_arrival_schedules_are_seeded_and_scaled(self):
+        offsets = poisson_offsets(2000, rate=4.0, seed=1)
+        self.assertEqual(offsets, poisson_offsets(2000, rate=4.0, seed=1))
+        self.assertAlmostEqual(offsets[-1] / len(offsets), 0.25, delta=0.02)
+
+        events = [_event(i, "general", "none", f"2026-09-01 08:00:{second:02d}") for i, second in enumerate((0, 10, 20, 50))]
+        events.append(_event(9, "general", "none", "2026-09-02 08:00:00"))
+        gaps = recorded_gaps(events, max_gap=300)
+        self.assertEqual(gaps, [10.0, 10.0, 30.0])
+        self.assertEqual(recorded_offsets(3, [10.0], speedup=10, seed=1), [0.0, 1.0, 2.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
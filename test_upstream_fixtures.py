@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from scripts.upstream_fixtures import LatencyModel, UpstreamTape, _UpstreamCall
+
+
+def _tape():
+    return UpstreamTape({
+        "dollar spot?": [
+            {"kind": "chat", "key": "classify", "payload": {"answer": "classified"}, "elapsed_ms": 120.0},
+            {"kind": "chat", "key": "answer", "payload": {"answer": "recorded answer"}, "elapsed_ms": 900.0},
+        ],
+    })
+
+
+class UpstreamFixtureTests(unittest.TestCase):
+    def test_latency_draws_are_seeded_by_call(self):
+        def draws(seed):
+            model = LatencyModel(seed=seed)
+            return [model.delay_ms(kind, f"q:{index}") for kind in ("chat", "pinecone") for index in range(5)]
+
+        self.assertEqual(draws(7), draws(7))
+        self.assertNotEqual(draws(7), draws(8))
+        self.assertEqual(LatencyModel("recorded", scale=0.5).delay_ms("chat", "q:0", recorded_ms=900.0), 450.0)
+        self.assertEqual(LatencyModel("zero").delay_ms("chat", "q:0"), 0.0)
+        with self.assertRaises(ValueError):
+            LatencyModel("uniform")
+
+    def test_lookup_resolves_exact_then_ordinal_then_synthetic(self):
+        tape = _tape()
+        tape.begin("dollar spot?")
+        try:
+            exact, exact_how = tape.lookup("chat", "answer")
+            ordinal, ordinal_how = tape.lookup("chat", "prompt changed since recording")
+            synthetic, synthetic_how = tape.lookup("chat", "answer")
+        finally:
+            tape.end()
+
+        self.assertEqual((exact["payload"], exact_how), ({"answer": "recorded answer"}, "exact"))
+        self.assertEqual((ordinal["payload"], ordinal_how), ({"answer": "classified"}, "ordinal"))
+        self.assertEqual((synthetic, synthetic_how), (None, "synthetic"))
+        self.assertEqual(tape.stats()["chat"], {"exact": 1, "ordinal": 1, "synthetic": 1, "recorded": 0})
+
+        # Helper threads with no request in flight match on the request key alone.
+        self.assertEqual(tape.lookup("chat", "classify")[1], "exact")
+        self.assertEqual(tape.lookup("chat", "unknown")[1], "synthetic")
+
+    def test_replay_is_deterministic_and_serves_recorded_payloads(self):
+        live_calls = []
+
+        def live_search(**kwargs):
+            live_calls.append(kwargs["query"])
+            return {"answer": "live", "results": [{"title": "Live", "url": "https://example.edu", "content": "x"}]}
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "tape.json"
+            recording = UpstreamTape()
+            recording.begin("fairy ring?")
+            _UpstreamCall("tavily", recording, LatencyModel("zero"), live=live_search)("fairy ring in greens")
+            recording.end()
+            recording.save(path)
+
+            def replay(question, query):
+                tape = UpstreamTape.load(path)
+                tape.begin(question)
+                try:
+                    search = _UpstreamCall("tavily", tape, LatencyModel("zero"))
+                    embed = _UpstreamCall("embedding", tape, LatencyModel("zero"))
+                    return search(query), embed(input=[query]), tape.stats()
+                finally:
+                    tape.end()
+
+            recorded, _, stats = replay("fairy ring?", "fairy ring in greens")
+            self.assertEqual(recorded["answer"], "live")
+            self.assertEqual(stats["tavily"]["exact"], 1)
+            self.assertEqual(live_calls, ["fairy ring in greens"])
+
+            first = replay("pythium?", "pythium blight")
+            second = replay("pythium?", "pythium blight")
+            other = replay("pythium?", "brown patch")
+
+        self.assertEqual(first[:2], second[:2])
+        self.assertNotEqual(first[:2], other[:2])
+        self.assertEqual(first[2]["tavily"]["synthetic"], 1)
+        self.assertEqual(len(first[1]["data"][0]["embedding"]), 1536)
+
+
+if __name__ == "__main__":
+    unittest.main()
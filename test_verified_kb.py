@@ -1,8 +1,14 @@
 import unittest
 
+import answer_validator
+from hallucination_filter import _get_all_known_product_names
+from knowledge_base import load_products
 from verified_kb import (
+    _catalog_index,
+    _reset_catalog_index,
     answer_from_verified_kb,
     answer_product_context_needed,
+    build_catalog_index,
     recommend_verified_products_for_target,
     recommend_verified_products_for_surface_target,
 )
@@ -1604,5 +1610,65 @@ class VerifiedKbAnswerTests(unittest.TestCase):
         self.assertNotIn("verified list", result["answer"].lower())
 
 
+
+class CatalogIndexTests(unittest.TestCase):
+    def test_target_index_resolves_aliases_and_keeps_catalog_order(self):
+        index = build_catalog_index(
+            {
+                "herbicides": {
+                    "alpha": {"trade_names": ["Alpha"], "target_weeds": ["annual bluegrass"], "rates": {"poa_annua": "1 oz"}},
+                    "beta": {"trade_names": [], "target_weeds": ["Poa annua"], "rates": {"standard": "2 oz", "fall": "3 oz"}},
+                },
+                "pgrs": {"gamma": {"trade_names": ["Gamma"], "rates": {}}},
+            }
+        )
+
+        self.assertEqual([entry.record["active_ingredient"] for entry in index.by_target["poa_annua"]], ["alpha", "beta"])
+        self.assertEqual(index.categories_by_target["poa_annua"], frozenset({"herbicides"}))
+        alpha, beta = index.by_target["poa_annua"]
+        self.assertEqual(alpha.rates.get("poa_annua"), "1 oz")
+        self.assertEqual(beta.default_rate, "2 oz")
+        self.assertEqual(index.by_product[("pgrs", "gamma")].default_rate, "No verified rate is stored.")
+        self.assertEqual(index.by_product[("pgrs", "gamma")].targets, frozenset())
+
+    def test_index_is_rebuilt_after_snapshot_reset(self):
+        before = _catalog_index()
+        self.assertIs(_catalog_index(), before)
+        _reset_catalog_index()
+        after = _catalog_index()
+        self.assertIsNot(after, before)
+        self.assertEqual(len(after.entries), sum(len(items) for items in load_products().values()))
+
+
+
+class ValidatorModelTests(unittest.TestCase):
+    def test_code_mismatches_use_compiled_tables(self):
+        self.assertEqual(
+            answer_validator._validate_frac_codes("Apply Daconil (FRAC 3) for dollar spot."),
+            ["FRAC code mismatch: Daconil is FRAC M5, not FRAC 3 as stated in the answer."],
+        )
+        self.assertEqual(
+            answer_validator._validate_herbicide_moa_codes("Tenacity is HRAC Group 4."),
+            ["HRAC code mismatch: Tenacity is HRAC Group 27, not HRAC/Group 4 as stated in the answer."],
+        )
+        self.assertEqual(answer_validator._validate_frac_codes("Daconil is FRAC M5."), [])
+
+    def test_rate_check_reports_first_mention_with_stored_rates(self):
+        issues = answer_validator._validate_product_rates("Apply Daconil at 3000 oz per acre, then Daconil again.")
+
+        self.assertEqual(len(issues), 1)
+        self.assertTrue(issues[0].startswith("Rate check: 3000.0 oz for Chlorothalonil may exceed label rates."))
+        self.assertIn("standard: 3.5-5 fl oz/1000 sq ft", issues[0])
+
+    def test_model_is_rebuilt_after_snapshot_reset(self):
+        model = answer_validator.get_validator_model()
+        self.assertIs(answer_validator.get_validator_model(), model)
+        self.assertIn("daconil", model.known_product_index)
+        self.assertIn("Daconil", _get_all_known_product_names())
+
+        answer_validator._reset_validator_model()
+        self.assertIsNot(answer_validator.get_validator_model(), model)
+
+
 if __name__ == "__main__":
     unittest.main()
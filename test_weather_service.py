@@ -0,0 +1,130 @@
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+import requests
+
+import weather_service
+from cache import StaleWhileRevalidateCache
+
+
+CURRENT = {"name": "Pinehurst", "main": {"temp": 82.0, "feels_like": 85.0, "humidity": 88}, "weather": [{"description": "haze"}], "wind": {"speed": 6.0}}
+FORECAST = {"list": [{"dt": 1780000000, "main": {"temp": 84.0, "humidity": 80}, "pop": 0.4, "weather": [{"main": "Clouds"}]}]}
+
+
+class FakeSession:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.threads = set()
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def get(self, url, params, timeout):
+        with self.lock:
+            self.calls.append((url.rsplit("/", 1)[-1], dict(params)))
+            self.threads.add(threading.current_thread().name)
+        if self.fail:
+            raise requests.ConnectionError("upstream down")
+        payload = CURRENT if url.endswith("/weather") else FORECAST
+        return FakeResponse(payload)
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class WeatherServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = StaleWhileRevalidateCache(max_size=8, ttl_seconds=600, stale_seconds=3600, negative_ttl_seconds=60, clock=self.clock)
+        self.session = FakeSession()
+        patches = [
+            patch.dict(os.environ, {"OPENWEATHER_API_KEY": "test-key"}),
+            patch("weather_service.get_weather_cache", return_value=self.cache),
+            patch("weather_service._http_session", side_effect=lambda: self.session),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def endpoints(self):
+        return sorted(endpoint for endpoint, _ in self.session.calls)
+
+    def test_nearby_coordinates_share_one_cached_lookup(self):
+        first = weather_service.get_weather_data(lat=35.2012, lon=-79.4694)
+        second = weather_service.get_weather_data(lat="35.1988", lon="-79.4701")
+
+        self.assertEqual(self.endpoints(), ["forecast", "weather"])
+        self.assertEqual(self.session.calls[0][1]["lat"], 35.2)
+        self.assertEqual(first["cache"]["status"], "miss")
+        self.assertEqual(second["cache"]["status"], "fresh")
+        self.assertIn("saved_ms", second["cache"])
+        self.assertEqual(second["location"], "Pinehurst")
+        self.assertEqual(self.cache.stats()["hit_rate"], "50.0%")
+
+    def test_city_names_are_normalized(self):
+        weather_service.get_weather_data(city="Pinehurst ", state="NC")
+        weather_service.get_weather_data(city="pinehurst", state="nc")
+
+        self.assertEqual(len(self.session.calls), 2)
+        self.assertEqual(self.session.calls[0][1]["q"], "pinehurst,nc,US")
+
+    def test_current_and_forecast_are_fetched_concurrently(self):
+        weather_service.get_weather_data(lat=35.2, lon=-79.5)
+
+        self.assertEqual(len(self.session.threads), 2)
+
+    def test_stale_entry_is_served_while_refreshing_in_background(self):
+        weather_service.get_weather_data(lat=35.2, lon=-79.5)
+        self.clock.now += 601
+
+        stale = weather_service.get_weather_data(lat=35.2, lon=-79.5)
+        weather_service._executors()[1].submit(lambda: None).result()
+
+        self.assertEqual(stale["cache"]["status"], "stale")
+        self.assertEqual(len(self.session.calls), 4)
+        self.assertEqual(weather_service.get_weather_data(lat=35.2, lon=-79.5)["cache"]["status"], "fresh")
+
+    def test_failures_are_negatively_cached(self):
+        self.session.fail = True
+        with self.assertLogs("weather_service", level="ERROR"):
+            self.assertIsNone(weather_service.get_weather_data(lat=35.2, lon=-79.5))
+        calls = len(self.session.calls)
+
+        self.assertIsNone(weather_service.get_weather_data(lat=35.2, lon=-79.5))
+        self.assertEqual(len(self.session.calls), calls)
+
+        self.clock.now += 61
+        self.session.fail = False
+        self.assertEqual(weather_service.get_weather_data(lat=35.2, lon=-79.5)["cache"]["status"], "miss")
+
+    def test_failed_refresh_keeps_serving_the_stale_entry(self):
+        weather_service.get_weather_data(lat=35.2, lon=-79.5)
+        self.clock.now += 601
+        self.session.fail = True
+
+        with self.assertLogs("weather_service", level="ERROR"):
+            weather_service.get_weather_data(lat=35.2, lon=-79.5)
+            weather_service._executors()[1].submit(lambda: None).result()
+
+        self.assertEqual(weather_service.get_weather_data(lat=35.2, lon=-79.5)["cache"]["status"], "stale")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+import web_search
+from cache import WebSearchCache
+
+
+RESPONSE = {
+    "answer": "Apply a DMI at the first sign of dollar spot.",
+    "results": [{"title": "Dollar Spot", "url": "https://extension.psu.edu/dollar-spot", "content": "Dollar spot is favored by humid nights."}],
+}
+
+
+class FakeTavilyClient:
+    instances = []
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.queries = []
+        self.release = threading.Event()
+        self.release.set()
+        FakeTavilyClient.instances.append(self)
+
+    def search(self, query, **kwargs):
+        self.queries.append(query)
+        self.release.wait(5)
+        return RESPONSE
+
+
+def pinecone(*scores):
+    return {"general": {"matches": [{"id": f"m{i}", "score": score} for i, score in enumerate(scores)]}}
+
+
+class WebSearchTests(unittest.TestCase):
+    def setUp(self):
+        FakeTavilyClient.instances = []
+        self.cache = WebSearchCache(ttl_seconds=3600, max_entries=16)
+        patches = [
+            patch.dict(os.environ, {"TAVILY_API_KEY": "test-key"}),
+            patch("web_search.TavilyClient", FakeTavilyClient, create=True),
+            patch("web_search.TAVILY_AVAILABLE", True),
+            patch("web_search.get_web_search_cache", return_value=self.cache),
+            patch("web_search._tavily_client", None),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def queries(self):
+        return [query for client in FakeTavilyClient.instances for query in client.queries]
+
+    def test_repeat_questions_are_served_from_the_cache(self):
+        first = web_search.search_web_for_turf_info(None, "How do I control dollar spot?")
+        second = web_search.search_web_for_turf_info(None, "how do I control  DOLLAR SPOT")
+
+        self.assertEqual(len(self.queries()), 1)
+        self.assertEqual(first["context"], second["context"])
+        self.assertEqual(second["sources"][0]["note"], "Web search - University Extension")
+
+    def test_client_is_reused_across_searches(self):
+        web_search.search_web_for_turf_info(None, "dollar spot on bentgrass")
+        web_search.search_web_for_turf_info(None, "brown patch on tall fescue")
+
+        self.assertEqual(len(FakeTavilyClient.instances), 1)
+        self.assertEqual(len(self.queries()), 2)
+
+    def test_concurrent_identical_questions_share_one_search(self):
+        client = web_search._get_tavily_client("test-key")
+        client.release.clear()
+        first = web_search.prefetch_web_search("pythium blight")
+        second = web_search.prefetch_web_search("Pythium blight?")
+        client.release.set()
+
+        self.assertIs(first.future, second.future)
+        self.assertEqual(first.response(5), RESPONSE)
+        self.assertEqual(len(client.queries), 1)
+
+    def test_prediction_uses_the_top_raw_vector_scores(self):
+        self.assertTrue(web_search.predict_web_search_needed({}))
+        self.assertTrue(web_search.predict_web_search_needed(pinecone(0.3, 0.35, 0.9), threshold=0.6))
+        self.assertFalse(web_search.predict_web_search_needed(pinecone(0.8, 0.7, 0.6, 0.5, 0.3, 0.0), threshold=0.55))
+
+    def test_slow_search_is_abandoned_at_the_budget_and_cached_later(self):
+        client = web_search._get_tavily_client("test-key")
+        client.release.clear()
+        prefetch = web_search.prefetch_web_search("fairy ring in greens")
+
+        with patch.object(web_search.Config, "WEB_SEARCH_BUDGET_SECONDS", 0.01):
+            self.assertIsNone(
+                web_search.search_web_for_turf_info(None, "fairy ring in greens", supplement_mode=True, prefetch=prefetch)
+            )
+        client.release.set()
+        prefetch.future.result(5)
+
+        self.assertEqual(self.cache.get("fairy ring in greens"), RESPONSE)
+        self.assertIsNotNone(web_search.search_web_for_turf_info(None, "fairy ring in greens"))
+        self.assertEqual(len(client.queries), 1)
+
+    def test_full_fallback_waits_past_the_supplement_budget(self):
+        client = web_search._get_tavily_client("test-key")
+        client.release.clear()
+        prefetch = web_search.prefetch_web_search("pythium blight on ryegrass")
+        release = threading.Timer(0.2, client.release.set)
+        release.start()
+        self.addCleanup(release.cancel)
+
+        with patch.object(web_search.Config, "WEB_SEARCH_BUDGET_SECONDS", 0.01):
+            result = web_search.search_web_for_turf_info(None, "pythium blight on ryegrass", prefetch=prefetch)
+
+        self.assertIsNotNone(result)
+        self.assertFalse(result["supplement_mode"])
+
+    def test_prefetched_response_is_formatted_for_supplement_mode(self):
+        before = web_search.web_search_stats()
+        prefetch = web_search.prefetch_web_search("anthracnose on poa")
+
+        result = web_search.search_web_for_turf_info(None, "anthracnose on poa", supplement_mode=True, prefetch=prefetch)
+        prefetch.discard()
+
+        after = web_search.web_search_stats()
+        self.assertTrue(result["context"].startswith("[SUPPLEMENTAL WEB SEARCH]"))
+        self.assertEqual(after["prefetches_used"] - before["prefetches_used"], 1)
+        self.assertEqual(after["prefetches_unused"], before["prefetches_unused"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,221 @@
+"""Token counting and per-request LLM usage accounting.
+
+``count_tokens`` uses tiktoken when the encoding for the chat model can be
+loaded. tiktoken downloads its BPE files on first use, so offline tools and
+sandboxes fall back to a characters-per-token estimate and say so through
+``token_counter_name``. ``count_chunk_tokens`` memoizes counts for the
+retrieved chunks and KB fragments that recur across requests, so each is
+tokenized once per worker; ``count_tokens`` is uncached and meant for
+one-off text such as assembled prompts.
+
+``record_llm_usage`` keeps the provider-reported usage of recent completions
+(prompt, completion and cached prompt tokens) in memory per worker, like the
+cache stats behind ``/admin/cache``; ``/admin/perf`` reads it.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Iterable, Optional
+
+from config import Config
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN_ESTIMATE = 4
+# Chat format overhead per message and for priming the reply.
+MESSAGE_OVERHEAD_TOKENS = 3
+REPLY_PRIMING_TOKENS = 3
+# OpenAI only caches prompts of at least this many tokens.
+PROMPT_CACHE_MIN_TOKENS = 1024
+FALLBACK_ENCODING = "o200k_base"
+TOKEN_COUNT_CACHE_SIZE = 2048
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as exc:  # BPE download failed (offline) or a corrupt cache
+        logger.info(f"tiktoken encoding unavailable for {model}; estimating tokens: {exc}")
+        return None
+
+
+def token_counter_name(model: Optional[str] = None) -> str:
+    """``tiktoken:<encoding>`` when exact counts are available, else ``estimate``."""
+    encoding = _encoding(model or Config.CHAT_MODEL)
+    return f"tiktoken:{encoding.name}" if encoding is not None else "estimate"
+
+
+def _count_tokens(text: str, model: str) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, -(-len(text) // CHARS_PER_TOKEN_ESTIMATE))
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+_count_chunk_tokens = lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)(_count_tokens)
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    return _count_tokens(text, model or Config.CHAT_MODEL)
+
+
+def count_chunk_tokens(text: str, model: Optional[str] = None) -> int:
+    """``count_tokens`` memoized by text, for chunks and fragments that recur across requests."""
+    if not text:
+        return 0
+    return _count_chunk_tokens(text, model or Config.CHAT_MODEL)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Clip ``text`` to at most ``max_tokens``, ending with ``...`` when clipped."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model or Config.CHAT_MODEL)
+    if encoding is None:
+        return f"{text[:max_tokens * CHARS_PER_TOKEN_ESTIMATE - 3].rstrip()}..."
+    tokens = encoding.encode(text, disallowed_special=())
+    keep = max_tokens - 1
+    while keep > 0:
+        clipped = f"{encoding.decode(tokens[:keep]).rstrip()}..."
+        if count_tokens(clipped, model) <= max_tokens:
+            return clipped
+        keep -= 1
+    return encoding.decode(tokens[:max_tokens])
+
+
+def count_message_tokens(messages: Iterable[dict], model: Optional[str] = None) -> int:
+    """Prompt tokens for a chat request, including per-message framing."""
+    total = REPLY_PRIMING_TOKENS
+    for message in messages:
+        total += MESSAGE_OVERHEAD_TOKENS + count_tokens(str(message.get("content") or ""), model)
+    return total
+
+
+def usage_from_response(response: Any) -> dict:
+    """Prompt, completion and cached prompt tokens from a chat completion response."""
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": int(getattr(usage, "prompt_tokens", 0) or 0),
+        "completion_tokens": int(getattr(usage, "completion_tokens", 0) or 0),
+        "cached_tokens": int(getattr(details, "cached_tokens", 0) or 0),
+    }
+
+
+class LLMUsageLedger:
+    """Thread-safe ring buffer of recent completion usage with running totals."""
+
+    def __init__(self, max_entries: int = 500):
+        self._entries = deque(maxlen=max(1, max_entries))
+        self._lock = Lock()
+        self._requests = 0
+        self._prompt_tokens = 0
+        self._completion_tokens = 0
+        self._cached_tokens = 0
+
+    def record(self, usage: dict, **fields) -> dict:
+        entry = {
+            "at": time.time(),
+            "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+            "completion_tokens": int(usage.get("completion_tokens") or 0),
+            "cached_tokens": int(usage.get("cached_tokens") or 0),
+            **fields,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self._requests += 1
+            self._prompt_tokens += entry["prompt_tokens"]
+            self._completion_tokens += entry["completion_tokens"]
+            self._cached_tokens += entry["cached_tokens"]
+        return entry
+
+    def recent(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            entries = list(self._entries)
+        return list(reversed(entries[-limit:])) if limit > 0 else []
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._entries)
+            totals = {
+                "requests": self._requests,
+                "prompt_tokens": self._prompt_tokens,
+                "completion_tokens": self._completion_tokens,
+                "cached_tokens": self._cached_tokens,
+            }
+        totals["cache_hit_rate"] = (
+            round(totals["cached_tokens"] / totals["prompt_tokens"], 3) if totals["prompt_tokens"] else 0.0
+        )
+        by_variant: dict[str, dict] = {}
+        for entry in entries:
+            bucket = by_variant.setdefault(
+                str(entry.get("prompt_variant") or "unknown"),
+                {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0},
+            )
+            bucket["requests"] += 1
+            for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                bucket[key] += entry[key]
+        totals["recent_by_prompt_variant"] = by_variant
+        return totals
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._requests = self._prompt_tokens = self._completion_tokens = self._cached_tokens = 0
+
+
+_usage_ledger = None
+
+
+def get_llm_usage_ledger() -> LLMUsageLedger:
+    global _usage_ledger
+    if _usage_ledger is None:
+        _usage_ledger = LLMUsageLedger(max_entries=Config.LLM_USAGE_HISTORY)
+    return _usage_ledger
+
+
+def record_llm_usage(response: Any, **fields) -> dict:
+    """Record the usage of one chat completion; never raises into the request path."""
+    try:
+        return get_llm_usage_ledger().record(usage_from_response(response), **fields)
+    except Exception as exc:
+        logger.debug(f"LLM usage not recorded: {exc}")
+        return {}
+
+
+@lru_cache(maxsize=1)
+def prompt_variant_token_counts(model: Optional[str] = None) -> dict:
+    """Token counts for every precomputed system prompt variant and the shared prefix."""
+    from prompts import SHARED_PROMPT_PREFIX, SYSTEM_PROMPT_VARIANTS, prompt_variant_name
+
+    prefix_tokens = count_tokens(SHARED_PROMPT_PREFIX, model)
+    variants = {
+        prompt_variant_name(topic, need): count_tokens(text, model)
+        for (topic, need), text in SYSTEM_PROMPT_VARIANTS.items()
+    }
+    return {
+        "counter": token_counter_name(model),
+        "shared_prefix_tokens": prefix_tokens,
+        "shared_prefix_cacheable": prefix_tokens >= PROMPT_CACHE_MIN_TOKENS,
+        "variants": variants,
+    }
@@ -9,10 +9,14 @@ from __future__ import annotations
 
 import os
 import re
+import threading
+from dataclasses import dataclass
 from typing import Any
 
 from constants import FUNGICIDES, HERBICIDES, INSECTICIDES, PGRS, SEARCH_FOLDERS
+from entity_matcher import WORD, match_entities, register_vocabulary
 from knowledge_base import load_products, load_weeds
+from knowledge_snapshot import build_with_source_reads, note_source_reads, register_snapshot_listener
 from search_service import find_source_url
 from source_policy import sanitize_source_url
 
@@ -431,14 +435,14 @@ def recommend_verified_products_for_surface_target(
 
     candidates = []
     blocked = []
-    for product in _all_product_records():
-        if product["category"] not in {"fungicides", "herbicides", "insecticides"}:
-            continue
-        if target_key not in _supported_targets(product):
+    surface_question = f"{q} on {turf} {surface}"
+    surface_query = _surface_query(surface_question)
+    for entry in _catalog_index().by_target.get(target_key, ()):
+        product = entry.record
+        if product["category"] not in RECOMMENDATION_CATEGORIES:
             continue
 
-        surface_question = f"{q} on {turf} {surface}"
-        issue = _surface_restriction_issue(product, surface_question)
+        issue = _surface_restriction_issue(product, surface_question, surface_query)
         if issue:
             blocked.append((product, issue))
             continue
@@ -547,13 +551,11 @@ def recommend_verified_products_for_target(
         return None
 
     requested_categories = _requested_product_categories(q, target_key)
-    candidates = []
-    for product in _all_product_records():
-        if requested_categories and product["category"] not in requested_categories:
-            continue
-        if target_key not in _supported_targets(product):
-            continue
-        candidates.append(product)
+    candidates = [
+        entry.record
+        for entry in _catalog_index().by_target.get(target_key, ())
+        if not requested_categories or entry.record["category"] in requested_categories
+    ]
 
     if not candidates:
         return None
@@ -716,18 +718,205 @@ def _strip_target_aliases(q: str, target_key: str | None) -> str:
 
 
 def _all_product_records() -> list[dict[str, Any]]:
-    records = []
-    for category, products in load_products().items():
-        for ai_name, info in products.items():
+    return [entry.record for entry in _catalog_index().entries]
+
+
+# Recommendation lanes read a per-generation catalog index instead of
+# rescanning every product record per question. Records are shared with the
+# index and must be treated as read-only.
+TARGET_FIELDS = {
+    "fungicides": "diseases",
+    "herbicides": "target_weeds",
+    "insecticides": "target_pests",
+}
+COOL_SURFACE_TERMS = frozenset({
+    "bentgrass", "creeping bentgrass", "tall fescue", "fine fescue",
+    "kentucky bluegrass", "bluegrass", "ryegrass", "cool-season", "cool season",
+})
+WARM_SURFACE_TERMS = frozenset({
+    "bermudagrass", "bermuda", "zoysia", "zoysiagrass", "st. augustine",
+    "st augustine", "centipede", "centipedegrass", "warm-season", "warm season",
+})
+RECOMMENDATION_CATEGORIES = frozenset({"fungicides", "herbicides", "insecticides"})
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    record: dict[str, Any]
+    targets: frozenset[str]
+    prohibited_turf: frozenset[str]
+    allowed_turf: frozenset[str]
+    note: str
+    rates: dict[str, str]
+    default_rate: str
+    base_score: int
+    pre_emergent: bool
+    frac_code: str
+
+
+@dataclass(frozen=True)
+class CatalogIndex:
+    entries: tuple[CatalogEntry, ...]
+    by_product: dict[tuple[str, str], CatalogEntry]
+    by_target: dict[str, tuple[CatalogEntry, ...]]
+    categories_by_target: dict[str, frozenset[str]]
+
+
+@dataclass(frozen=True)
+class SurfaceQuery:
+    """Surface facts read from one question, shared across candidate products."""
+
+    mentioned: frozenset[str]
+    asks_cool: bool
+    asks_warm: bool
+    surface_terms: tuple[str, ...]
+
+
+_CATALOG_INDEX: tuple[CatalogIndex, frozenset[str]] | None = None
+_CATALOG_INDEX_LOCK = threading.Lock()
+
+
+def _canonical_targets_by_alias() -> dict[str, set[str]]:
+    canonical_by_alias: dict[str, set[str]] = {}
+    for canonical, aliases in TARGET_ALIASES.items():
+        canonical_by_alias.setdefault(canonical, set()).add(canonical)
+        for alias in aliases:
+            canonical_by_alias.setdefault(alias.replace(" ", "_"), set()).add(canonical)
+    return canonical_by_alias
+
+
+def _base_recommendation_score(record: dict[str, Any]) -> int:
+    """The part of the ranking score that does not depend on the question."""
+    value = 0
+    info = record["info"]
+    if info.get("rates", {}):
+        value += 5
+    if info.get("label_review_status") in {"label_reviewed", "machine_audited_clean"}:
+        value += 3
+    if info.get("source_url"):
+        value += 2
+    if _mode_of_action(record):
+        value += 1
+
+    resistance_risk = str(info.get("resistance_risk", "")).lower()
+    if resistance_risk == "low":
+        value += 7
+    elif resistance_risk == "medium":
+        value += 3
+    elif resistance_risk in {"medium-high", "medium high"}:
+        value += 1
+    elif resistance_risk == "high":
+        value -= 5
+
+    frac_code = str(info.get("frac_code", "")).upper()
+    frac_group = str(info.get("frac_group", "")).lower()
+    if record["category"] == "fungicides":
+        if frac_code.startswith("M") or "multi-site" in frac_group or "multi site" in frac_group:
+            value += 6
+    return value
+
+
+def _build_catalog_entry(
+    record: dict[str, Any],
+    canonical_by_alias: dict[str, set[str]] | None = None,
+) -> CatalogEntry:
+    canonical_by_alias = canonical_by_alias if canonical_by_alias is not None else _canonical_targets_by_alias()
+    info = record["info"]
+    targets = set()
+    field = TARGET_FIELDS.get(record["category"])
+    for target in info.get(field, []) if field else []:
+        target_key = str(target).lower().replace(" ", "_").replace("-", "_")
+        targets.add(target_key)
+        targets.update(canonical_by_alias.get(target_key, ()))
+
+    rates = {str(key): str(value) for key, value in (info.get("rates", {}) or {}).items()}
+    if not rates:
+        default_rate = "No verified rate is stored."
+    elif "standard" in rates:
+        default_rate = rates["standard"]
+    else:
+        default_rate = "; ".join(f"{key}: {value}" for key, value in rates.items())
+
+    return CatalogEntry(
+        record=record,
+        targets=frozenset(targets),
+        prohibited_turf=frozenset(_expanded_surface_terms(info.get("prohibited_turf", []))),
+        allowed_turf=frozenset(_expanded_surface_terms(info.get("allowed_turf", []))),
+        note=str(info.get("note", "")).lower(),
+        rates=rates,
+        default_rate=default_rate,
+        base_score=_base_recommendation_score(record),
+        pre_emergent="pre" in str(info.get("type", "")).lower(),
+        frac_code=str(info.get("frac_code", "")).upper(),
+    )
+
+
+def build_catalog_index(products: dict[str, dict[str, Any]]) -> CatalogIndex:
+    """Index the product catalog by target for the recommendation lanes."""
+    canonical_by_alias = _canonical_targets_by_alias()
+    entries = []
+    for category, category_products in products.items():
+        for ai_name, info in category_products.items():
             trade_names = info.get("trade_names") or []
-            records.append({
+            record = {
                 "active_ingredient": ai_name,
                 "category": category,
                 "display_name": trade_names[0] if trade_names else ai_name.replace("_", " ").title(),
                 "matched_name": trade_names[0] if trade_names else ai_name.replace("_", " "),
                 "info": info,
-            })
-    return records
+            }
+            entries.append(_build_catalog_entry(record, canonical_by_alias))
+
+    by_target: dict[str, list[CatalogEntry]] = {}
+    categories_by_target: dict[str, set[str]] = {}
+    for entry in entries:
+        for target in entry.targets:
+            by_target.setdefault(target, []).append(entry)
+            categories_by_target.setdefault(target, set()).add(entry.record["category"])
+
+    return CatalogIndex(
+        entries=tuple(entries),
+        by_product={(entry.record["category"], entry.record["active_ingredient"]): entry for entry in entries},
+        by_target={target: tuple(items) for target, items in by_target.items()},
+        categories_by_target={target: frozenset(items) for target, items in categories_by_target.items()},
+    )
+
+
+def _catalog_index() -> CatalogIndex:
+    global _CATALOG_INDEX
+    cached = _CATALOG_INDEX
+    if cached is None:
+        with _CATALOG_INDEX_LOCK:
+            if _CATALOG_INDEX is None:
+                _CATALOG_INDEX = build_with_source_reads(lambda: build_catalog_index(load_products()))
+            cached = _CATALOG_INDEX
+    index, sources = cached
+    note_source_reads(sources)
+    return index
+
+
+@register_snapshot_listener
+def _reset_catalog_index(_snapshot=None) -> None:
+    """Rebuild the catalog index from the next snapshot after a KB reload."""
+    global _CATALOG_INDEX
+    with _CATALOG_INDEX_LOCK:
+        _CATALOG_INDEX = None
+
+
+def _catalog_entry(product: dict[str, Any]) -> CatalogEntry:
+    entry = _catalog_index().by_product.get((product["category"], product["active_ingredient"]))
+    if entry is None or entry.record["info"] is not product["info"]:
+        return _build_catalog_entry(product)
+    return entry
+
+
+def _surface_query(q: str) -> SurfaceQuery:
+    return SurfaceQuery(
+        mentioned=frozenset(_mentioned_surface_terms(q)),
+        asks_cool=any(surface in q for surface in COOL_SURFACE_TERMS),
+        asks_warm=any(surface in q for surface in WARM_SURFACE_TERMS),
+        surface_terms=tuple(surface for surface in sorted(COOL_SURFACE_TERMS | WARM_SURFACE_TERMS) if surface in q),
+    )
 
 
 def _resolve_surface_and_turf(q: str, course_profile: dict[str, Any]) -> tuple[str | None, str]:
@@ -808,49 +997,26 @@ def _rank_recommendation_candidates(
     target_key: str | None = None,
     surface: str | None = None,
 ) -> list[dict[str, Any]]:
+    wants_pre = any(term in q for term in ["pre", "prevent", "before"])
+
     def score(product: dict[str, Any]) -> tuple[int, str]:
-        value = 0
-        info = product["info"]
-        rates = info.get("rates", {})
-        if rates:
-            value += 5
-        if info.get("label_review_status") in {"label_reviewed", "machine_audited_clean"}:
-            value += 3
-        if info.get("source_url"):
-            value += 2
-        mode = _mode_of_action(product)
-        if mode:
-            value += 1
-        product_type = str(info.get("type", "")).lower()
-        if "pre" in product_type and not any(term in q for term in ["pre", "prevent", "before"]):
+        entry = _catalog_entry(product)
+        value = entry.base_score
+        if entry.pre_emergent and not wants_pre:
             value -= 2
 
-        resistance_risk = str(info.get("resistance_risk", "")).lower()
-        if resistance_risk == "low":
-            value += 7
-        elif resistance_risk == "medium":
-            value += 3
-        elif resistance_risk in {"medium-high", "medium high"}:
-            value += 1
-        elif resistance_risk == "high":
-            value -= 5
-
-        frac_code = str(info.get("frac_code", "")).upper()
-        frac_group = str(info.get("frac_group", "")).lower()
-        if product["category"] == "fungicides":
-            if frac_code.startswith("M") or "multi-site" in frac_group or "multi site" in frac_group:
-                value += 6
-            if target_key == "dollar_spot":
-                if frac_code in {"M5", "29"}:
-                    value += 5
-                if frac_code == "7":
-                    value += 3
-                if frac_code == "3":
-                    value += 1
-                if frac_code in {"1", "2"}:
-                    value -= 3
-                if surface == "greens" and frac_code == "1":
-                    value -= 3
+        frac_code = entry.frac_code
+        if product["category"] == "fungicides" and target_key == "dollar_spot":
+            if frac_code in {"M5", "29"}:
+                value += 5
+            if frac_code == "7":
+                value += 3
+            if frac_code == "3":
+                value += 1
+            if frac_code in {"1", "2"}:
+                value -= 3
+            if surface == "greens" and frac_code == "1":
+                value -= 3
 
         return (-value, product["display_name"])
 
@@ -858,14 +1024,10 @@ def _rank_recommendation_candidates(
 
 
 def _best_rate_for_target(product: dict[str, Any], target_key: str | None = None) -> str:
-    rates = product["info"].get("rates", {})
-    if not rates:
-        return "No verified rate is stored."
-    if target_key and target_key in rates:
-        return str(rates[target_key])
-    if "standard" in rates:
-        return str(rates["standard"])
-    return "; ".join(f"{key}: {value}" for key, value in rates.items())
+    entry = _catalog_entry(product)
+    if target_key and target_key in entry.rates:
+        return entry.rates[target_key]
+    return entry.default_rate
 
 
 def _build_surface_target_recommendation_answer(
@@ -1192,15 +1354,7 @@ def _product_targets_for_comparison(product: dict[str, Any]) -> list[str]:
 
 
 def _detect_catalog_product_terms(q: str) -> list[str]:
-    hits = []
-    for term in sorted(KNOWN_PRODUCT_TERMS, key=len, reverse=True):
-        if re.search(rf"\b{re.escape(term)}\b", q):
-            hits.append(term)
-    unique = []
-    for term in hits:
-        if term not in unique:
-            unique.append(term)
-    return unique
+    return sorted(match_entities(q).terms("verified_catalog_term"), key=lambda term: (-len(term), term))
 
 
 def _requested_product_categories(q: str, target_key: str | None) -> set[str]:
@@ -1214,11 +1368,7 @@ def _requested_product_categories(q: str, target_key: str | None) -> set[str]:
     if requested or not target_key:
         return requested
 
-    inferred = set()
-    for product in _all_product_records():
-        if target_key in _supported_targets(product):
-            inferred.add(product["category"])
-    return inferred
+    return set(_catalog_index().categories_by_target.get(target_key, ()))
 
 
 def _detect_product(q: str) -> dict[str, Any] | None:
@@ -1227,48 +1377,70 @@ def _detect_product(q: str) -> dict[str, Any] | None:
 
 
 def _detect_products(q: str) -> list[dict[str, Any]]:
+    # Keep the first name (AI name, trade names, then shorthand) that matched
+    # for each product, and report products in catalog order.
+    best: dict[int, tuple[int, str, str, str]] = {}
+    for hit in match_entities(q).of_kind("verified_product"):
+        catalog_position, name_position, category, ai_name, name = hit.value
+        if catalog_position not in best or name_position < best[catalog_position][0]:
+            best[catalog_position] = (name_position, category, ai_name, name)
+
+    products = load_products()
     found = []
-    seen = set()
-    for category, products in load_products().items():
-        for ai_name, info in products.items():
-            trade_names = [str(name) for name in info.get("trade_names", [])]
-            shorthand = []
-            for trade_name in trade_names:
-                first_token = trade_name.split()[0].strip()
-                if len(first_token) >= 5:
-                    shorthand.append(first_token)
-            names = [ai_name.replace("_", " ")] + trade_names + shorthand
-            for name in names:
-                name_lower = name.lower()
-                if name_lower and re.search(rf"\b{re.escape(name_lower)}\b", q):
-                    trade_names = info.get("trade_names") or []
-                    normalized_key = f"{category}:{ai_name}"
-                    if normalized_key in seen:
-                        break
-                    seen.add(normalized_key)
-                    found.append({
-                        "active_ingredient": ai_name,
-                        "category": category,
-                        "display_name": trade_names[0] if trade_names else ai_name.replace("_", " ").title(),
-                        "matched_name": name,
-                        "info": info,
-                    })
-                    break
+    for catalog_position in sorted(best):
+        _, category, ai_name, name = best[catalog_position]
+        info = products.get(category, {}).get(ai_name)
+        if info is None:
+            continue
+        trade_names = info.get("trade_names") or []
+        found.append({
+            "active_ingredient": ai_name,
+            "category": category,
+            "display_name": trade_names[0] if trade_names else ai_name.replace("_", " ").title(),
+            "matched_name": name,
+            "info": info,
+        })
     return found
 
 
 def _detect_target(q: str) -> tuple[str | None, str | None]:
     # Prefer longer aliases first so "poa trivialis" wins before "poa".
-    aliases = []
-    for key, names in TARGET_ALIASES.items():
-        for name in names:
-            aliases.append((key, name))
-    aliases.sort(key=lambda item: len(item[1]), reverse=True)
+    hits = match_entities(q).of_kind("verified_target")
+    if not hits:
+        return None, None
+    key = max(hits, key=lambda hit: (len(hit.term), -hit.value[1])).value[0]
+    return key, _display_target_name(key)
 
-    for key, name in aliases:
-        if re.search(rf"\b{re.escape(name)}\b", q):
-            return key, _display_target_name(key)
-    return None, None
+
+def _product_name_variants(ai_name: str, info: dict[str, Any]) -> list[str]:
+    trade_names = [str(name) for name in info.get("trade_names", [])]
+    shorthand = []
+    for trade_name in trade_names:
+        first_token = trade_name.split()[0].strip() if trade_name.split() else ""
+        if len(first_token) >= 5:
+            shorthand.append(first_token)
+    return [ai_name.replace("_", " ")] + trade_names + shorthand
+
+
+def _verified_kb_vocabulary():
+    catalog_position = 0
+    for category, products in load_products().items():
+        for ai_name, info in products.items():
+            for name_position, name in enumerate(_product_name_variants(ai_name, info)):
+                yield "verified_product", name, (catalog_position, name_position, category, ai_name, name), WORD
+            catalog_position += 1
+    aliases = sorted(
+        ((key, name) for key, names in TARGET_ALIASES.items() for name in sorted(names)),
+        key=lambda item: len(item[1]),
+        reverse=True,
+    )
+    for order, (key, name) in enumerate(aliases):
+        yield "verified_target", name, (key, order), WORD
+    for term in KNOWN_PRODUCT_TERMS:
+        yield "verified_catalog_term", term, term, WORD
+
+
+register_vocabulary("verified_kb", _verified_kb_vocabulary)
 
 
 def _display_target_name(target: str) -> str:
@@ -1289,25 +1461,7 @@ def _target_looks_like_surface_context(question_lower: str, target_key: str | No
 
 
 def _supported_targets(product: dict[str, Any]) -> set[str]:
-    info = product["info"]
-    category = product["category"]
-    target_fields = {
-        "fungicides": "diseases",
-        "herbicides": "target_weeds",
-        "insecticides": "target_pests",
-    }
-    field = target_fields.get(category)
-    if not field:
-        return set()
-
-    targets = set()
-    for target in info.get(field, []):
-        target_key = str(target).lower().replace(" ", "_").replace("-", "_")
-        targets.add(target_key)
-        for canonical, aliases in TARGET_ALIASES.items():
-            if target_key == canonical or target_key in {alias.replace(" ", "_") for alias in aliases}:
-                targets.add(canonical)
-    return targets
+    return set(_catalog_entry(product).targets)
 
 
 def _answer_pgr_surface_rate(
@@ -1391,25 +1545,17 @@ def _detect_surface(q: str) -> str | None:
     return None
 
 
-def _surface_restriction_issue(product: dict[str, Any], q: str) -> str | None:
+def _surface_restriction_issue(
+    product: dict[str, Any],
+    q: str,
+    surface_query: SurfaceQuery | None = None,
+) -> str | None:
     """Catch target-supported but surface-unsafe recommendations."""
-    info = product["info"]
-    note = str(info.get("note", "")).lower()
-    combined = f"{q} {note}"
-    cool_surfaces = {
-        "bentgrass", "creeping bentgrass", "tall fescue", "fine fescue",
-        "kentucky bluegrass", "bluegrass", "ryegrass", "cool-season", "cool season",
-    }
-    warm_surfaces = {
-        "bermudagrass", "bermuda", "zoysia", "zoysiagrass", "st. augustine",
-        "st augustine", "centipede", "centipedegrass", "warm-season", "warm season",
-    }
+    entry = _catalog_entry(product)
+    query = surface_query or _surface_query(q)
+    note = entry.note
 
-    mentioned_surfaces = _mentioned_surface_terms(q)
-    prohibited = _expanded_surface_terms(info.get("prohibited_turf", []))
-    allowed = _expanded_surface_terms(info.get("allowed_turf", []))
-
-    blocked = sorted(mentioned_surfaces & prohibited)
+    blocked = sorted(query.mentioned & entry.prohibited_turf)
     if blocked:
         blocked_text = ", ".join(term.replace("_", " ") for term in blocked)
         return (
@@ -1417,16 +1563,13 @@ def _surface_restriction_issue(product: dict[str, Any], q: str) -> str | None:
             f"{blocked_text}. The question mentions that turf surface."
         )
 
-    if allowed and mentioned_surfaces and not (mentioned_surfaces & allowed):
+    if entry.allowed_turf and query.mentioned and not (query.mentioned & entry.allowed_turf):
         return (
             f"{product['display_name']} is only structured as allowed for "
-            f"{', '.join(sorted(allowed))}. The requested turf surface is outside that allowed list."
+            f"{', '.join(sorted(entry.allowed_turf))}. The requested turf surface is outside that allowed list."
         )
 
-    asks_cool_surface = any(surface in q for surface in cool_surfaces)
-    asks_warm_surface = any(surface in q for surface in warm_surfaces)
-
-    if asks_cool_surface and (
+    if query.asks_cool and (
         "warm-season" in note
         or "warm season" in note
         or "not safe on cool-season" in note
@@ -1437,20 +1580,21 @@ def _surface_restriction_issue(product: dict[str, Any], q: str) -> str | None:
             "The question mentions cool-season turf, so this use pattern should not be treated as verified."
         )
 
-    if asks_warm_surface and ("cool-season turf only" in note or "cool season turf only" in note):
+    if query.asks_warm and ("cool-season turf only" in note or "cool season turf only" in note):
         return (
             f"{product['display_name']} has a KB surface restriction: {product['info'].get('note')}. "
             "The question mentions warm-season turf, so this use pattern should not be treated as verified."
         )
 
-    unsafe_surface_match = re.search(r"not safe on ([^.]+)", combined)
-    if unsafe_surface_match:
-        unsafe_text = unsafe_surface_match.group(1)
-        if any(surface in q and surface in unsafe_text for surface in sorted(cool_surfaces | warm_surfaces)):
-            return (
-                f"{product['display_name']} has a KB surface restriction: {product['info'].get('note')}. "
-                "The requested turf surface appears in that restriction."
-            )
+    if query.surface_terms:
+        unsafe_surface_match = re.search(r"not safe on ([^.]+)", f"{q} {note}")
+        if unsafe_surface_match:
+            unsafe_text = unsafe_surface_match.group(1)
+            if any(surface in unsafe_text for surface in query.surface_terms):
+                return (
+                    f"{product['display_name']} has a KB surface restriction: {product['info'].get('note')}. "
+                    "The requested turf surface appears in that restriction."
+                )
 
     return None
 
@@ -1,17 +1,144 @@
 """
 Weather integration for turf management recommendations.
 Uses OpenWeatherMap API to get local weather and factor it into recommendations.
+
+Responses are cached per location: coordinates are rounded into buckets of
+about a kilometre (``Config.WEATHER_COORD_PRECISION``) and city/state names
+are normalized, so everyone asking from one course shares an entry. Stale
+entries are served while a background refresh runs, and failed lookups are
+cached briefly. Current conditions and the forecast are fetched concurrently
+over a shared keep-alive ``requests.Session``.
 """
 import logging
 import os
-from typing import Dict, Optional, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Any, Tuple
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+
+from cache import StaleWhileRevalidateCache, get_weather_cache
+from config import Config
 
 logger = logging.getLogger(__name__)
 
 # OpenWeatherMap API
 OPENWEATHER_API_URL = "https://api.openweathermap.org/data/2.5"
+REQUEST_TIMEOUT = 5
+
+_session = None
+_fetch_executor = None
+_refresh_executor = None
+_http_lock = threading.Lock()
+
+
+def _http_session() -> requests.Session:
+    """Shared keep-alive session, so repeat lookups reuse the TLS connection."""
+    global _session
+    if _session is None:
+        with _http_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=Config.WEATHER_HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _executors() -> Tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+    """Pool for the concurrent half of a fetch, and a separate one for background refreshes."""
+    global _fetch_executor, _refresh_executor
+    if _fetch_executor is None:
+        with _http_lock:
+            if _fetch_executor is None:
+                _refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="weather-refresh")
+                _fetch_executor = ThreadPoolExecutor(
+                    max_workers=Config.WEATHER_HTTP_POOL_SIZE, thread_name_prefix="weather-fetch"
+                )
+    return _fetch_executor, _refresh_executor
+
+
+def weather_location(
+    lat: float = None,
+    lon: float = None,
+    city: str = None,
+    state: str = None
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Cache key and OpenWeatherMap location parameters for a request.
+
+    Returns:
+        (key, params), or None when no usable location was given
+    """
+    if lat is not None and lon is not None:
+        try:
+            precision = Config.WEATHER_COORD_PRECISION
+            lat_bucket = round(float(lat), precision)
+            lon_bucket = round(float(lon), precision)
+            return f"coord:{lat_bucket:.{precision}f},{lon_bucket:.{precision}f}", {'lat': lat_bucket, 'lon': lon_bucket}
+        except (TypeError, ValueError):
+            logger.debug(f"Ignoring unparseable weather coordinates {lat!r}, {lon!r}")
+    if city:
+        city_name = " ".join(str(city).split()).lower()
+        state_name = " ".join(str(state).split()).lower() if state else ""
+        location = f"{city_name},{state_name},US" if state_name else city_name
+        return f"city:{location}", {'q': location}
+    return None
+
+
+def _get_json(endpoint: str, params: Dict[str, Any], api_key: str) -> Dict:
+    response = _http_session().get(
+        f"{OPENWEATHER_API_URL}/{endpoint}",
+        params={**params, 'appid': api_key, 'units': 'imperial'},
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _fetch_weather(params: Dict[str, Any], api_key: str) -> Dict[str, Any]:
+    """Current conditions and 5-day forecast, requested concurrently."""
+    fetch_executor, _ = _executors()
+    current_future = fetch_executor.submit(_get_json, "weather", params, api_key)
+    forecast_data = _get_json("forecast", params, api_key)
+    current_data = current_future.result()
+    return {
+        'current': _parse_current_weather(current_data),
+        'forecast': _parse_forecast(forecast_data),
+        'location': current_data.get('name', 'Unknown')
+    }
+
+
+def _timed_fetch(key: str, params: Dict[str, Any], api_key: str, cache: StaleWhileRevalidateCache):
+    """Fetch and cache one location; returns (data, upstream_ms), data None on failure."""
+    started = time.perf_counter()
+    try:
+        data = _fetch_weather(params, api_key)
+    except requests.RequestException as e:
+        logger.error(f"Weather API request failed: {e}")
+        cache.set_failure(key)
+        return None, (time.perf_counter() - started) * 1000
+    except Exception as e:
+        logger.error(f"Weather parsing failed: {e}")
+        cache.set_failure(key)
+        return None, (time.perf_counter() - started) * 1000
+    upstream_ms = (time.perf_counter() - started) * 1000
+    cache.set(key, data, upstream_ms)
+    return data, upstream_ms
+
+
+def _refresh(key: str, params: Dict[str, Any], api_key: str, cache: StaleWhileRevalidateCache) -> None:
+    try:
+        _timed_fetch(key, params, api_key, cache)
+    finally:
+        cache.end_refresh(key)
+
+
+def _with_cache_info(data: Dict[str, Any], status: str, **timing) -> Dict[str, Any]:
+    return {**data, 'cache': {'status': status, **{name: round(ms, 1) for name, ms in timing.items()}}}
 
 
 def get_weather_data(
@@ -28,47 +155,34 @@ def get_weather_data(
         city, state: City/state name (fallback)
 
     Returns:
-        Weather data dict or None if unavailable
+        Weather data dict or None if unavailable. ``cache`` reports whether it
+        came from the cache (``status``) and the upstream time it took
+        (``upstream_ms``) or saved (``saved_ms``).
     """
     api_key = os.getenv("OPENWEATHER_API_KEY")
     if not api_key:
         logger.debug("No OpenWeatherMap API key configured")
         return None
 
-    try:
-        # Build location query
-        if lat is not None and lon is not None:
-            location_param = f"lat={lat}&lon={lon}"
-        elif city:
-            location = f"{city},{state},US" if state else city
-            location_param = f"q={location}"
-        else:
-            return None
-
-        # Get current weather
-        current_url = f"{OPENWEATHER_API_URL}/weather?{location_param}&appid={api_key}&units=imperial"
-        current_response = requests.get(current_url, timeout=5)
-        current_response.raise_for_status()
-        current_data = current_response.json()
-
-        # Get 5-day forecast
-        forecast_url = f"{OPENWEATHER_API_URL}/forecast?{location_param}&appid={api_key}&units=imperial"
-        forecast_response = requests.get(forecast_url, timeout=5)
-        forecast_response.raise_for_status()
-        forecast_data = forecast_response.json()
-
-        return {
-            'current': _parse_current_weather(current_data),
-            'forecast': _parse_forecast(forecast_data),
-            'location': current_data.get('name', 'Unknown')
-        }
+    location = weather_location(lat=lat, lon=lon, city=city, state=state)
+    if location is None:
+        return None
+    key, params = location
 
-    except requests.RequestException as e:
-        logger.error(f"Weather API request failed: {e}")
+    cache = get_weather_cache()
+    cached = cache.get(key)
+    if cached.status == cache.NEGATIVE:
         return None
-    except Exception as e:
-        logger.error(f"Weather parsing failed: {e}")
+    if cached.value is not None:
+        if cached.status == cache.STALE and cache.begin_refresh(key):
+            _, refresh_executor = _executors()
+            refresh_executor.submit(_refresh, key, params, api_key, cache)
+        return _with_cache_info(cached.value, cached.status, saved_ms=cached.fetch_ms)
+
+    data, upstream_ms = _timed_fetch(key, params, api_key, cache)
+    if data is None:
         return None
+    return _with_cache_info(data, cache.MISS, upstream_ms=upstream_ms)
 
 
 def _parse_current_weather(data: Dict) -> Dict[str, Any]:
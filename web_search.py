@@ -5,12 +5,26 @@ Only triggered when vector search returns empty results, NOT for low confidence.
 Supports two modes:
 1. Tavily API (real web search) - if TAVILY_API_KEY is set
 2. OpenAI knowledge fallback - if no Tavily key
+
+Tavily responses are cached by normalized question (``cache.WebSearchCache``)
+and fetched with one reused client. ``predict_web_search_needed`` looks at the
+raw vector scores as soon as Pinecone returns; when they are weak,
+``prefetch_web_search`` starts Tavily in the background so it overlaps scoring
+and reranking. A low-confidence supplement waits at most
+``Config.WEB_SEARCH_BUDGET_SECONDS`` for it; the full fallback, which has no
+other retrieval context, waits up to ``Config.WEB_SEARCH_TIMEOUT_SECONDS``.
 """
 import logging
 import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, List, Optional, Any
 import openai
 
+from cache import get_web_search_cache, normalize_query
+from config import Config
+
 logger = logging.getLogger(__name__)
 
 # Try to import tavily
@@ -133,78 +147,229 @@ def _identify_source_type(url: str) -> str:
         return 'Industry Source'
 
 
-def _search_with_tavily(question: str, supplement_mode: bool = False) -> Optional[Dict[str, Any]]:
-    """
-    Perform real web search using Tavily API.
-    Searches across trusted turf industry sources, not just universities.
+_tavily_client = None
+_tavily_client_key = None
+_executor = None
+_inflight: Dict[str, Future] = {}
+_state_lock = threading.Lock()
+_stats = {'searches': 0, 'prefetches': 0, 'prefetches_used': 0, 'prefetches_unused': 0, 'budget_timeouts': 0}
 
-    Args:
-        question: The user's question
-        supplement_mode: If True, this is supplementing existing results (use different messaging)
-    """
-    api_key = os.getenv("TAVILY_API_KEY")
-    if not api_key or not TAVILY_AVAILABLE:
-        return None
 
-    try:
-        client = TavilyClient(api_key=api_key)
+def _get_tavily_client(api_key: str):
+    """One client per API key, reused across requests."""
+    global _tavily_client, _tavily_client_key
+    with _state_lock:
+        if _tavily_client is None or _tavily_client_key != api_key:
+            _tavily_client = TavilyClient(api_key=api_key)
+            _tavily_client_key = api_key
+        return _tavily_client
 
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _state_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="web-search")
+    return _executor
+
+
+def _count(stat: str) -> None:
+    with _state_lock:
+        _stats[stat] += 1
+
+
+def web_search_stats() -> Dict[str, int]:
+    """Tavily searches run by this worker and how speculative launches paid off."""
+    with _state_lock:
+        return dict(_stats, in_flight=len(_inflight))
+
+
+def _fetch_tavily_response(question: str, api_key: str) -> Optional[Dict[str, Any]]:
+    """Raw Tavily response for ``question``, stored in the web search cache."""
+    try:
         # Build search query - add turfgrass context but don't restrict to specific sites
         # Let include_domains handle the filtering
         search_query = f"turfgrass golf course {question}"
 
         # Search with Tavily - use include_domains to filter, not site: in query
-        response = client.search(
+        _count('searches')
+        response = _get_tavily_client(api_key).search(
             query=search_query,
             search_depth="advanced",
             include_domains=TRUSTED_DOMAINS,
             max_results=8,  # Get more results for better coverage
             include_answer=True,
             include_raw_content=False,
+            timeout=Config.WEB_SEARCH_TIMEOUT_SECONDS,
         )
+    except Exception as e:
+        logger.error(f"Tavily search failed: {e}")
+        return None
 
-        if not response or not response.get('results'):
-            return None
+    if not response or not response.get('results'):
+        return None
+    response = {'answer': response.get('answer'), 'results': response.get('results', [])[:8]}
+    get_web_search_cache().set(question, response)
+    return response
 
-        # Build context from search results
-        header = "[SUPPLEMENTAL WEB SEARCH]" if supplement_mode else "[WEB SEARCH RESULTS]"
-        context_parts = [f"{header}\n"]
-        sources = []
 
-        # Add Tavily's AI-generated answer if available
-        if response.get('answer'):
-            context_parts.append(f"Summary: {response['answer']}\n")
+def _submit_tavily_search(question: str) -> Optional[Future]:
+    """Future for the Tavily response: already done on a cache hit, shared by concurrent askers."""
+    api_key = os.getenv("TAVILY_API_KEY")
+    if not api_key or not TAVILY_AVAILABLE:
+        return None
 
-        # Add individual search results
-        for i, result in enumerate(response.get('results', [])[:8], 1):
-            title = result.get('title', 'Unknown')
-            content = result.get('content', '')[:600]  # Slightly more content
-            url = result.get('url', '')
+    cached = get_web_search_cache().get(question)
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        return future
+
+    executor = _get_executor()
+    key = normalize_query(question)
+    with _state_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        future = _inflight[key] = executor.submit(_fetch_tavily_response, question, api_key)
+
+    def _done(done_future, key=key):
+        with _state_lock:
+            if _inflight.get(key) is done_future:
+                del _inflight[key]
+
+    future.add_done_callback(_done)
+    return future
+
+
+class WebSearchPrefetch:
+    """A Tavily search started before the pipeline knows whether it needs it."""
+
+    def __init__(self, question: str, future: Future, speculative: bool = True):
+        self.question = question
+        self.future = future
+        self.speculative = speculative
+        self.started_at = time.monotonic()
+        self.used = False
+
+    def response(self, budget_seconds: float) -> Optional[Dict[str, Any]]:
+        """The Tavily response, waiting at most ``budget_seconds`` from now."""
+        if self.speculative and not self.used:
+            _count('prefetches_used')
+        self.used = True
+        try:
+            return self.future.result(timeout=max(0.0, budget_seconds))
+        except FutureTimeoutError:
+            _count('budget_timeouts')
+            logger.info(
+                f"Web search still running after {time.monotonic() - self.started_at:.1f}s; "
+                f"answering without it (it will be cached)"
+            )
+            return None
 
-            # Identify source type for context
-            source_type = _identify_source_type(url)
-            context_parts.append(f"\n[{source_type}: {title}]\n{content}\n")
+    def discard(self) -> None:
+        """Mark an unneeded prefetch; it still completes and fills the cache."""
+        if self.speculative and not self.used:
+            _count('prefetches_unused')
+        self.used = True
 
-            sources.append({
-                'title': title,
-                'url': url,
-                'note': f'Web search - {source_type}'
-            })
 
-        context = "\n".join(context_parts)
-        context += "\n\nNOTE: Web search results. Verify rates with product labels."
+def predict_web_search_needed(pinecone_results: Dict, threshold: float = None) -> bool:
+    """
+    Guess, from raw vector scores alone, whether the answer will need web search.
 
-        return {
-            'context': context,
-            'sources': sources,
-            'is_web_search': True,
-            'search_type': 'tavily',
-            'supplement_mode': supplement_mode
-        }
+    True when Pinecone returned nothing or the mean of the top five vector
+    scores is below ``threshold`` (``Config.WEB_SEARCH_PREDICT_SCORE``).
+    """
+    threshold = Config.WEB_SEARCH_PREDICT_SCORE if threshold is None else threshold
+    scores = sorted(
+        (
+            float(match.get('score') or 0.0)
+            for search_type in ('general', 'product', 'timing')
+            for match in (pinecone_results or {}).get(search_type, {}).get('matches', [])
+            if match
+        ),
+        reverse=True,
+    )[:5]
+    return not scores or sum(scores) / len(scores) < threshold
+
+
+def prefetch_web_search(question: str, speculative: bool = True) -> Optional[WebSearchPrefetch]:
+    """Start the Tavily search for ``question`` in the background, if Tavily is configured."""
+    future = _submit_tavily_search(question)
+    if future is None:
+        return None
+    if speculative:
+        _count('prefetches')
+    return WebSearchPrefetch(question, future, speculative=speculative)
+
+
+def _format_tavily_response(response: Dict[str, Any], supplement_mode: bool) -> Dict[str, Any]:
+    # Build context from search results
+    header = "[SUPPLEMENTAL WEB SEARCH]" if supplement_mode else "[WEB SEARCH RESULTS]"
+    context_parts = [f"{header}\n"]
+    sources = []
+
+    # Add Tavily's AI-generated answer if available
+    if response.get('answer'):
+        context_parts.append(f"Summary: {response['answer']}\n")
+
+    # Add individual search results
+    for i, result in enumerate(response.get('results', [])[:8], 1):
+        title = result.get('title', 'Unknown')
+        content = result.get('content', '')[:600]  # Slightly more content
+        url = result.get('url', '')
+
+        # Identify source type for context
+        source_type = _identify_source_type(url)
+        context_parts.append(f"\n[{source_type}: {title}]\n{content}\n")
+
+        sources.append({
+            'title': title,
+            'url': url,
+            'note': f'Web search - {source_type}'
+        })
+
+    context = "\n".join(context_parts)
+    context += "\n\nNOTE: Web search results. Verify rates with product labels."
+
+    return {
+        'context': context,
+        'sources': sources,
+        'is_web_search': True,
+        'search_type': 'tavily',
+        'supplement_mode': supplement_mode
+    }
+
+
+def _search_with_tavily(
+    question: str,
+    supplement_mode: bool = False,
+    prefetch: Optional[WebSearchPrefetch] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Perform real web search using Tavily API.
+    Searches across trusted turf industry sources, not just universities.
 
-    except Exception as e:
-        logger.error(f"Tavily search failed: {e}")
+    Args:
+        question: The user's question
+        supplement_mode: If True, this is supplementing existing results (use different messaging)
+        prefetch: Search already started for this question by ``prefetch_web_search``
+    """
+    if prefetch is None or prefetch.question != question:
+        if prefetch is not None:
+            prefetch.discard()
+        prefetch = prefetch_web_search(question, speculative=False)
+        if prefetch is None:
+            return None
+
+    # Only a supplement can answer without the search; the full fallback has nothing else.
+    budget = Config.WEB_SEARCH_BUDGET_SECONDS if supplement_mode else Config.WEB_SEARCH_TIMEOUT_SECONDS
+    response = prefetch.response(budget)
+    if not response or not response.get('results'):
         return None
+    return _format_tavily_response(response, supplement_mode)
 
 
 def _search_with_openai_fallback(
@@ -280,7 +445,8 @@ def search_web_for_turf_info(
     openai_client: openai.OpenAI,
     question: str,
     model: str = "gpt-4o-mini",
-    supplement_mode: bool = False
+    supplement_mode: bool = False,
+    prefetch: Optional[WebSearchPrefetch] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Search the web for turf management information.
@@ -293,9 +459,10 @@ def search_web_for_turf_info(
         question: User's question
         model: Model for OpenAI fallback
         supplement_mode: If True, this is supplementing existing results
+        prefetch: Speculative search from ``prefetch_web_search`` to reuse
     """
     # Try real web search first
-    tavily_result = _search_with_tavily(question, supplement_mode=supplement_mode)
+    tavily_result = _search_with_tavily(question, supplement_mode=supplement_mode, prefetch=prefetch)
     if tavily_result:
         logger.info(f"Web search completed via Tavily (supplement_mode={supplement_mode})")
         return tavily_result